@@ -0,0 +1,82 @@
+"""网络后端客户端基准：真实 LLMClient / CosyVoiceBackend 经本机网络访问替身服务。
+
+  - LLM：首 token 时延相对服务端 TTFT 的额外开销；不限速时客户端每秒可解析的 NDJSON token 数
+  - CosyVoice：服务端首块发出时刻 vs 客户端产出首帧时刻（客户端整段读取后才切帧，
+    首帧时延 ≈ 整句合成耗时），按句长列出
+
+用法:
+    python benchmarks/bench_backends.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+
+from standins import cosyvoice, ollama
+from standins.serve import serve_app
+from wallace.config import LLMConfig
+from wallace.pipeline.llm import LLMClient
+from wallace.pipeline.tts import CosyVoiceBackend
+
+
+async def bench_llm(rounds: int = 20) -> None:
+    ttft = 0.2
+    profile = ollama.OllamaProfile(reply="好" * 200, ttft=ttft, tokens_per_second=0)
+    async with serve_app(ollama.create_app(profile)) as url:
+        client = LLMClient(LLMConfig(base_url=url, max_tokens=1000))
+        await client.start()
+        overhead: list[float] = []
+        rates: list[float] = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            first = None
+            count = 0
+            async for _ in client.chat_stream([]):
+                if first is None:
+                    first = time.perf_counter()
+                count += 1
+            end = time.perf_counter()
+            overhead.append(first - start - ttft)
+            rates.append((count - 1) / (end - first))
+        await client.close()
+    print("── LLMClient ↔ Ollama stand-in ──")
+    print(f"first-token overhead   p50 {statistics.median(overhead) * 1000:6.1f} ms")
+    print(f"NDJSON parse rate      p50 {statistics.median(rates) / 1000:6.1f} k tokens/s")
+
+
+async def bench_cosyvoice(rounds: int = 5) -> None:
+    first_chunk, rtf = 0.1, 0.3
+    profile = cosyvoice.CosyVoiceProfile(first_chunk=first_chunk, rtf=rtf)
+    print("── CosyVoiceBackend ↔ CosyVoice stand-in "
+          f"(first chunk {first_chunk * 1000:.0f} ms, RTF {rtf}) ──")
+    print(f"{'chars':>6} {'audio':>8} {'first frame':>12} {'total':>8}")
+    async with serve_app(cosyvoice.create_app(profile)) as url:
+        backend = CosyVoiceBackend(url)
+        for chars in (6, 20, 60):
+            text = "好" * chars
+            firsts, totals = [], []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                first = None
+                async for _ in backend.synthesize(text):
+                    if first is None:
+                        first = time.perf_counter()
+                firsts.append(first - start)
+                totals.append(time.perf_counter() - start)
+            audio = chars * profile.seconds_per_char
+            print(
+                f"{chars:6d} {audio:7.2f}s {statistics.median(firsts) * 1000:9.0f} ms "
+                f"{statistics.median(totals) * 1000:5.0f} ms"
+            )
+
+
+async def main() -> None:
+    await bench_llm()
+    print()
+    await bench_cosyvoice()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""遥测解析基准：v1 JSON 文本帧 vs v2 二进制通道帧。
+
+对 sensor / proximity / imu 三类高频遥测，比较单核每秒可解析的消息数与线上字节数。
+两条路径都得到处理器消费的字段字典：
+  - json：decode_esp32_message（判别联合 TypeAdapter 校验）→ model_dump()
+  - v2：decode_frame（定长结构体解包，不构造模型）
+
+用法:
+    python benchmarks/bench_binary.py
+"""
+
+from __future__ import annotations
+
+import time
+
+from wallace.ws.binary import decode_frame, encode_telemetry
+from wallace.ws.protocol import (
+    ImuMessage,
+    ProximityMessage,
+    SensorMessage,
+    decode_esp32_message,
+)
+
+
+def _json(text: str) -> dict:
+    return decode_esp32_message(text).model_dump()
+
+
+_MESSAGES = {
+    "sensor": SensorMessage(temp=26.5, humidity=60.0, light=300.0, air_quality=50.0),
+    "proximity": ProximityMessage(distance=80.0, user_present=True),
+    "imu": ImuMessage(ax=0.01, ay=-0.98, az=0.12, gx=1.5, gy=-0.25, gz=0.0),
+}
+
+
+def _rate(fn, payload, seconds: float = 0.3) -> float:
+    """在 seconds 内反复解析同一负载，返回每秒消息数。"""
+    done = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            fn(payload)
+        done += 1000
+    return done / (time.perf_counter() - start)
+
+
+def main(rounds: int = 5) -> None:
+    print(f"── telemetry parse, single core, best of {rounds} ──")
+    print(f"{'type':<10} {'json':>10} {'v2':>10} {'speedup':>8} {'bytes':>12}")
+    for name, msg in _MESSAGES.items():
+        text = msg.model_dump_json()
+        frame = encode_telemetry(msg)
+        # 两种方式交替测多轮取最好成绩，减少机器噪声的影响
+        best_json = best_v2 = 0.0
+        for _ in range(rounds):
+            best_json = max(best_json, _rate(_json, text))
+            best_v2 = max(best_v2, _rate(decode_frame, frame))
+        print(
+            f"{name:<10} {best_json / 1000:8.1f} k {best_v2 / 1000:8.1f} k "
+            f"{best_v2 / best_json:7.2f}x {len(text):5d} → {len(frame):3d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""长期记忆检索基准：单用户索引规模 1k / 10k 条，哈希嵌入（512 维）。
+
+  - 嵌入：单句查询的嵌入耗时
+  - 检索：内存映射矩阵点积 + argpartition 取 top-k 的耗时（p50 / p99）
+  - 召回：LongTermMemory.recall 端到端（含线程切换、阈值与预算筛选）
+
+用法:
+    python benchmarks/bench_longterm.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from wallace.config import LongTermConfig
+from wallace.memory.longterm import HashingEmbedder, LongTermMemory, VectorIndex
+
+_SUBJECTS = ["恐龙", "小猫", "乐高", "画画", "足球", "钢琴", "星星", "火箭", "海洋", "蛋糕"]
+_VERBS = ["喜欢", "讨厌", "想要", "害怕", "养了", "学会了"]
+
+
+def _sentence(rng: random.Random, i: int) -> str:
+    return f"主人{rng.choice(_VERBS)}{rng.choice(_SUBJECTS)}，这是第{i}件事"
+
+
+def _percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] * 1e6
+    p99 = samples[int(len(samples) * 0.99)] * 1e6
+    return f"p50 {p50:7.0f} µs  p99 {p99:7.0f} µs"
+
+
+def _fill(path: Path, embedder: HashingEmbedder, size: int, rng: random.Random) -> None:
+    index = VectorIndex(path, embedder)
+    for start in range(0, size, 1000):
+        texts = [_sentence(rng, i) for i in range(start, min(start + 1000, size))]
+        for text, vector in zip(texts, embedder.embed(texts)):
+            index.add(text, vector, kind="fact", source=text)
+    index.close()
+
+
+async def main() -> None:
+    rng = random.Random(0)
+    embedder = HashingEmbedder(512)
+    queries = [f"你还记得我{rng.choice(_VERBS)}什么{rng.choice(_SUBJECTS)}吗" for _ in range(500)]
+
+    embed_times = []
+    for q in queries:
+        t = time.perf_counter()
+        embedder.embed([q])
+        embed_times.append(time.perf_counter() - t)
+    print(f"embed query        {_percentiles(embed_times)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (1_000, 10_000):
+            _fill(Path(tmp) / f"u{size}", embedder, size, rng)
+            index = VectorIndex(Path(tmp) / f"u{size}", embedder)
+            vectors = embedder.embed(queries)
+            search_times = []
+            for vector in vectors:
+                t = time.perf_counter()
+                index.search(np.ascontiguousarray(vector), 8)
+                search_times.append(time.perf_counter() - t)
+            index.close()
+            print(f"search {size:6d} rows {_percentiles(search_times)}")
+
+            longterm = LongTermMemory(LongTermConfig(data_dir=tmp), embedder=embedder)
+            await longterm.recall(f"u{size}", queries[0])  # 打开索引
+            recall_times = []
+            for q in queries:
+                t = time.perf_counter()
+                await longterm.recall(f"u{size}", q)
+                recall_times.append(time.perf_counter() - t)
+            longterm.close()
+            print(f"recall {size:6d} rows {_percentiles(recall_times)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""记忆存储后端基准：JSON 文件 vs SQLite（WAL），库中已有 10k 用户。
+
+  - 单用户写入：断开连接时的强制写回，每次一个用户
+  - 批量写入：后台周期刷写，每批 100 个脏用户（SQLite 一个事务，JSON 逐个文件）
+  - 加载时延：随机用户读取（页缓存已热），p50 / p99
+
+用法:
+    python benchmarks/bench_memory.py [--users 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from wallace.memory.backends import JSONMemoryBackend, MemoryBackend, SQLiteMemoryBackend
+from wallace.ws.session import UserMemory
+
+
+def _record(i: int, count: int = 0) -> tuple[str, dict]:
+    memory = UserMemory(
+        nickname=f"用户{i}",
+        interests=["恐龙", "乐高", "画画"],
+        recent_topics=["今天的天气", "周末去公园", "新学的歌"],
+        important_dates={"birthday": "2018-05-01"},
+        interaction_count=count,
+        first_met="2025-01-01",
+    )
+    return f"user{i:05d}", memory.to_dict()
+
+
+def _bench(name: str, backend: MemoryBackend, users: int, rng: random.Random) -> None:
+    backend.open()
+    start = time.perf_counter()
+    for lo in range(0, users, 500):
+        backend.write_many([_record(i) for i in range(lo, min(lo + 500, users))])
+    populate = time.perf_counter() - start
+
+    rounds = 500
+    start = time.perf_counter()
+    for n in range(rounds):
+        backend.write_many([_record(rng.randrange(users), n)])
+    single = rounds / (time.perf_counter() - start)
+
+    batches, size = 20, 100
+    start = time.perf_counter()
+    for n in range(batches):
+        backend.write_many([_record(i, n) for i in rng.sample(range(users), size)])
+    batched = batches * size / (time.perf_counter() - start)
+
+    loads = []
+    for _ in range(2000):
+        user_id = _record(rng.randrange(users))[0]
+        t = time.perf_counter()
+        backend.load(user_id)
+        loads.append(time.perf_counter() - t)
+    loads.sort()
+    backend.close()
+
+    print(
+        f"{name:7} {populate:7.2f}s {single:9.0f}/s {batched:9.0f}/s "
+        f"{statistics.median(loads) * 1e6:7.0f} µs {loads[int(len(loads) * 0.99)] * 1e6:7.0f} µs"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"── memory backends, {args.users} users ──")
+    print(f"{'backend':7} {'populate':>8} {'single':>11} {'batch×100':>11} {'load p50':>10} "
+          f"{'load p99':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        _bench("json", JSONMemoryBackend(Path(tmp) / "json"), args.users, random.Random(0))
+        _bench("sqlite", SQLiteMemoryBackend(Path(tmp) / "memory.db"), args.users,
+               random.Random(0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""上行消息解码 + 分发基准：单核每秒可处理的 JSON 消息数。
+
+对比：
+  - legacy：json.loads → parse_esp32_message（建模后丢弃）→ 按 dict 的 if/elif 分发，
+    pong 每次重新序列化
+  - typed：decode_esp32_message（判别联合 TypeAdapter，pydantic-core 原生 JSON 解析）
+    → 按 type 查表分发，pong 使用预序列化常量
+  - orjson（已安装时）：orjson.loads → TypeAdapter.validate_python，说明为何不经 orjson
+
+消息按播放期间的典型比例混合：audio_credit 为主，其余为 ping / sensor / config / event。
+
+用法:
+    python benchmarks/bench_protocol.py
+"""
+
+from __future__ import annotations
+
+import json
+import time
+
+from pydantic import TypeAdapter
+
+from wallace.ws.protocol import (
+    PONG,
+    Esp32Message,
+    PongMessage,
+    decode_esp32_message,
+    parse_esp32_message,
+)
+
+_MIX = (
+    ['{"type": "audio_credit", "frames": 8}'] * 12
+    + ['{"type": "ping"}'] * 2
+    + ['{"type": "sensor", "temp": 26.5, "humidity": 60, "light": 300, "air_quality": 50}'] * 2
+    + ['{"type": "proximity", "distance": 80.0, "user_present": true}']
+    + ['{"type": "event", "event": "touch"}']
+    + ['{"type": "config", "trace": true}']
+    + ['{"type": "device_state", "battery_pct": 80, "power_mode": "normal", "wifi_rssi": -50}']
+)
+
+_TYPES = ("ping", "audio_credit", "sensor", "proximity", "event", "config", "device_state")
+
+
+def _noop(msg) -> str | None:
+    return None
+
+
+# 逐项 if/elif 是被测对象本身（各分支在旧代码中调用不同的处理函数），不合并分支
+# ruff: noqa: SIM114
+def legacy(raw: str) -> str | None:
+    data = json.loads(raw)
+    parse_esp32_message(data)
+    msg_type = data.get("type")
+    # 与旧 _route_json 相同的逐项比较
+    if msg_type == "ping":
+        return PongMessage().model_dump_json()
+    elif msg_type == "audio_start":
+        return _noop(data)
+    elif msg_type == "audio_end":
+        return _noop(data)
+    elif msg_type == "wakeword_verify":
+        return _noop(data)
+    elif msg_type == "sensor":
+        return _noop(data)
+    elif msg_type == "proximity":
+        return _noop(data)
+    elif msg_type == "device_state":
+        return _noop(data)
+    elif msg_type == "event":
+        return _noop(data)
+    elif msg_type == "local_cmd":
+        return _noop(data)
+    elif msg_type == "config":
+        return _noop(data)
+    elif msg_type == "audio_credit":
+        return _noop(data)
+    return None
+
+
+_ROUTES = {name: _noop for name in _TYPES}
+_ROUTES["ping"] = lambda msg: PONG
+
+
+def typed(raw: str) -> str | None:
+    msg = decode_esp32_message(raw)
+    return _ROUTES[msg.type](msg)
+
+
+def _orjson_typed():
+    try:
+        import orjson
+    except ImportError:
+        return None
+
+    adapter = TypeAdapter(Esp32Message)
+
+    def run(raw: str) -> str | None:
+        msg = adapter.validate_python(orjson.loads(raw))
+        return _ROUTES[msg.type](msg)
+
+    return run
+
+
+def _rate(fn, seconds: float = 1.0) -> float:
+    """在 seconds 内循环处理消息，返回每秒消息数。"""
+    done = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for raw in _MIX:
+            fn(raw)
+        done += len(_MIX)
+    return done / (time.perf_counter() - start)
+
+
+def main(rounds: int = 5) -> None:
+    candidates = [("legacy", legacy), ("typed", typed)]
+    if (orjson_fn := _orjson_typed()) is not None:
+        candidates.append(("orjson", orjson_fn))
+
+    # 各方案交替测多轮取最好成绩，减少机器噪声的影响
+    best = {name: 0.0 for name, _ in candidates}
+    for _ in range(rounds):
+        for name, fn in candidates:
+            best[name] = max(best[name], _rate(fn, 0.3))
+
+    print(f"── decode + dispatch, single core, {len(_MIX)}-message mix, best of {rounds} ──")
+    base = best["legacy"]
+    for name, rate in best.items():
+        print(f"{name:<8} {rate / 1000:8.1f} k msg/s  {1e6 / rate:6.2f} µs/msg  x{rate / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
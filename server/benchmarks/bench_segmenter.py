@@ -0,0 +1,91 @@
+"""流式分句基准：SentenceSegmenter vs 旧版逐 token 重扫循环。
+
+旧循环每个 token 都从头重扫 sentence_buffer、用 += 重建字符串，且每个 token
+最多切出一句。对比：
+  - 吞吐：整段回复分句总耗时
+  - 首块位置：首个合成单元在第几个 token 送出（越早首音越快）
+  - 积压：一个 token 含多句时，各句实际送出的 token 序号
+
+用法:
+    python benchmarks/bench_segmenter.py
+"""
+
+from __future__ import annotations
+
+import random
+import timeit
+
+from wallace.pipeline.segmenter import SENTENCE_ENDINGS, SentenceSegmenter
+
+_ENDINGS = set(SENTENCE_ENDINGS)
+
+_TEXT = (
+    "今天天气很好，阳光明媚，适合出去走走。你已经坐了两个小时了，站起来活动一下吧！"
+    "章鱼有三颗心脏，其中两颗负责给鳃供血，另一颗负责全身循环。"
+    "晚上记得早点休息，明天还要上班呢；睡前别看太久手机。"
+)
+
+
+def _tokens(text: str, seed: int = 0) -> list[str]:
+    """按 1~4 字随机切成 token，模拟 LLM 流式输出。"""
+    rng = random.Random(seed)
+    out, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 4)
+        out.append(text[i : i + n])
+        i += n
+    return out
+
+
+def legacy(tokens: list[str]) -> list[tuple[int, str]]:
+    """旧版 _run_pipeline 分句循环，返回 [(送出时的 token 序号, 句子)]。"""
+    out = []
+    sentence_buffer = ""
+    for idx, token in enumerate(tokens):
+        sentence_buffer += token
+        for i, ch in enumerate(sentence_buffer):
+            if ch in _ENDINGS:
+                sentence = sentence_buffer[: i + 1].strip()
+                sentence_buffer = sentence_buffer[i + 1 :]
+                if sentence:
+                    out.append((idx, sentence))
+                break
+    if sentence_buffer.strip():
+        out.append((len(tokens), sentence_buffer.strip()))
+    return out
+
+
+def segmenter(tokens: list[str]) -> list[tuple[int, str]]:
+    seg = SentenceSegmenter()
+    out = [(idx, chunk) for idx, token in enumerate(tokens) for chunk in seg.feed(token)]
+    rest = seg.flush()
+    if rest:
+        out.append((len(tokens), rest))
+    return out
+
+
+def _report(title: str, tokens: list[str], number: int) -> None:
+    print(f"── {title}: {sum(map(len, tokens))} chars, {len(tokens)} tokens ──")
+    for name, fn in (("legacy", legacy), ("segmenter", segmenter)):
+        per_run = timeit.timeit(lambda fn=fn: fn(tokens), number=number) / number
+        result = fn(tokens)
+        print(
+            f"{name:<10} {per_run * 1e6:9.1f} µs/response  "
+            f"chunks={len(result):3d}  first_chunk_token={result[0][0]}"
+        )
+
+
+def main() -> None:
+    _report("typical", _tokens(_TEXT), 200)
+    _report("long", _tokens(_TEXT * 20), 20)
+    # 无句末标点的长文本：旧循环每个 token 重扫整个缓冲区，O(n²)
+    _report("unpunctuated", list("一二三四五六七八九十" * 200), 5)
+
+    burst = ["你好。世界！今天怎么样？"] + ["好"] * 5
+    print("── burst: one token with 3 sentences ──")
+    for name, fn in (("legacy", legacy), ("segmenter", segmenter)):
+        print(f"{name:<10} sent at tokens {[idx for idx, _ in fn(burst)]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Piper 本地 TTS 实时率 (RTF) 基准。
+
+RTF = 合成耗时 / 音频时长，< 1 表示合成快于播放。分别测量：
+  - 单句串行：首句延迟与单进程 RTF（含首次加载模型，单独报告）
+  - 并发：N 个会话同时合成，检验进程池在多核上的吞吐
+
+用法（需 pip install ".[piper]" 并下载模型）:
+    python benchmarks/bench_tts_rtf.py --model zh_CN-huayan-medium.onnx --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from wallace.pipeline.tts import FRAME_SIZE, SAMPLE_RATE, PiperBackend
+
+SENTENCES = [
+    "你好，我是瓦力。",
+    "今天天气不错，适合出去走走。",
+    "你已经坐了两个小时了，站起来活动一下吧。",
+    "章鱼有三颗心脏，其中两颗负责给鳃供血。",
+    "晚安，明天见。",
+]
+
+
+async def _synthesize(backend: PiperBackend, text: str) -> tuple[float, float]:
+    """返回 (合成耗时, 音频时长) 秒。"""
+    start = time.perf_counter()
+    frames = [f async for f in backend.synthesize(text)]
+    elapsed = time.perf_counter() - start
+    audio = len(frames) * FRAME_SIZE / 2 / SAMPLE_RATE
+    return elapsed, audio
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", required=True, help="Piper .onnx 模型路径")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    backend = PiperBackend(args.model, workers=args.workers)
+    try:
+        # 预热：每个工作进程各加载一次模型
+        start = time.perf_counter()
+        await asyncio.gather(*(_synthesize(backend, "预热") for _ in range(args.workers)))
+        print(f"warmup ({args.workers} workers): {time.perf_counter() - start:.2f}s")
+
+        rtfs = []
+        for _ in range(args.rounds):
+            for text in SENTENCES:
+                elapsed, audio = await _synthesize(backend, text)
+                rtfs.append(elapsed / audio)
+        print(
+            f"serial      RTF median={statistics.median(rtfs):.3f} "
+            f"max={max(rtfs):.3f} (n={len(rtfs)})"
+        )
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(_synthesize(backend, text) for text in SENTENCES * args.rounds)
+        )
+        wall = time.perf_counter() - start
+        audio_total = sum(audio for _, audio in results)
+        print(
+            f"concurrent  RTF={wall / audio_total:.3f} "
+            f"({audio_total:.1f}s audio in {wall:.2f}s, {len(results)} sentences)"
+        )
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
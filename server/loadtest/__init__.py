@@ -0,0 +1,7 @@
+"""负载测试 — 模拟 N 台 ESP32 按真实协议并发接入，离线运行（ASR / LLM / TTS 为假后端）。
+
+用法（在 server/ 目录下）:
+    python -m loadtest --devices 50 --duration 60
+    python -m loadtest --devices 200 --ramp 20 --llm-ttft 0.8 --tts-rtf 0.3 --json out.json
+    python -m loadtest --url ws://host:8000 --devices 20   # 压测已运行的服务端（不报告 RSS）
+"""
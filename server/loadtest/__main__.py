@@ -0,0 +1,93 @@
+"""python -m loadtest：启动假后端服务端，接入 N 台模拟设备，输出时延 / 丢帧 / RSS 报告。"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from loadtest.device import DeviceProfile, load_utterances
+from loadtest.fakes import FakeProfile
+from loadtest.runner import (
+    RssSampler,
+    fetch_metrics,
+    format_report,
+    free_port,
+    run_devices,
+    start_server,
+    summarize,
+    wait_healthy,
+)
+
+
+def _parse(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="压测时长（秒）")
+    parser.add_argument("--ramp", type=float, default=5.0, help="设备在此秒数内逐台接入")
+    parser.add_argument("--audio", type=Path, default=None, help="语音样本目录（.wav / .pcm）")
+    parser.add_argument("--url", default=None, help="已运行的服务端 ws://host:port，缺省自启动")
+    parser.add_argument("--config", type=Path, default=None, help="自启动服务端的 TOML 配置")
+    parser.add_argument("--server-log", type=Path, default=None, help="自启动服务端的日志文件")
+    parser.add_argument("--json", type=Path, default=None, help="报告另存为 JSON")
+
+    group = parser.add_argument_group("device behaviour")
+    defaults = DeviceProfile()
+    group.add_argument("--think-time", type=float, default=defaults.think_time)
+    group.add_argument("--barge-rate", type=float, default=defaults.barge_rate)
+    group.add_argument("--ping-interval", type=float, default=defaults.ping_interval)
+    group.add_argument("--sensor-interval", type=float, default=defaults.sensor_interval)
+    group.add_argument("--proximity-interval", type=float, default=defaults.proximity_interval)
+    group.add_argument("--reply-timeout", type=float, default=defaults.reply_timeout)
+    group.add_argument("--v2", action="store_true", help="以 wallace.v2 二进制子协议连接")
+
+    FakeProfile.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    device_profile = DeviceProfile(
+        think_time=args.think_time,
+        barge_rate=args.barge_rate,
+        ping_interval=args.ping_interval,
+        sensor_interval=args.sensor_interval,
+        proximity_interval=args.proximity_interval,
+        reply_timeout=args.reply_timeout,
+        protocol_v2=args.v2,
+    )
+    utterances = load_utterances(args.audio)
+
+    if args.url:
+        url = args.url
+        http_url = url.replace("ws", "http", 1)
+        stats = await run_devices(
+            url, args.devices, args.duration, device_profile, utterances, args.ramp, args.seed
+        )
+        return summarize(stats, None, await fetch_metrics(http_url))
+
+    port = free_port()
+    url, http_url = f"ws://127.0.0.1:{port}", f"http://127.0.0.1:{port}"
+    server = start_server(FakeProfile.from_args(args), port, args.config, args.server_log)
+    try:
+        await wait_healthy(http_url)
+        with RssSampler(server.pid) as rss:
+            stats = await run_devices(
+                url, args.devices, args.duration, device_profile, utterances, args.ramp, args.seed
+            )
+        return summarize(stats, rss, await fetch_metrics(http_url))
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse(argv)
+    summary = asyncio.run(_run(args))
+    print(format_report(summary))
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
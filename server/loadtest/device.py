@@ -0,0 +1,286 @@
+"""模拟单台 ESP32：按真实协议连接、说话、上报遥测、打断，并记录设备侧观测到的时延。
+
+每台设备并发运行：
+  - 说话：思考间隔（指数分布）后 audio_start → 按 32 ms 实时节奏发送 PCM 帧 → audio_end，
+    记录 audio_end → 首个下行音频帧的时延；按 barge_rate 概率在播报中途开口打断
+  - 心跳 / 遥测：按各自周期发送 ping、sensor、proximity（起始相位随机，避免所有设备同步）
+  - 播放模型：与服务端 AudioPacer 相同的播放时钟，音频帧到达时设备缓冲已播空记为迟到帧
+连接断开时计错误并在 1 秒后重连，直到压测结束。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import websockets
+
+from wallace.pipeline.pacer import FRAME_DURATION
+from wallace.pipeline.tts import FRAME_SIZE, SAMPLE_RATE, iter_frames
+from wallace.ws.binary import AUDIO_OUT_HEADER, SUBPROTOCOL, encode_audio_in, encode_telemetry
+from wallace.ws.protocol import ProximityMessage, SensorMessage
+
+# 下行 PCM 每字节播放时长
+_SECONDS_PER_BYTE = FRAME_DURATION / FRAME_SIZE
+# 调度误差容限：到达晚于播完时刻超过此值才算迟到
+_LATE_TOLERANCE = 0.01
+
+
+@dataclass
+class DeviceProfile:
+    """设备行为参数。"""
+
+    think_time: float = 3.0  # 两轮之间的平均间隔（秒，指数分布）
+    barge_rate: float = 0.1  # 每轮在播报中打断的概率
+    ping_interval: float = 30.0
+    sensor_interval: float = 10.0
+    proximity_interval: float = 2.0
+    reply_timeout: float = 20.0  # audio_end 后等待回复的上限
+    protocol_v2: bool = False  # 以 wallace.v2 子协议连接（遥测走二进制通道）
+
+
+@dataclass
+class DeviceStats:
+    """单台设备的观测结果。"""
+
+    first_frame: list[float] = field(default_factory=list)  # audio_end → 首个音频帧（秒）
+    barge_cancel: list[float] = field(default_factory=list)  # 打断 audio_start → tts_cancel
+    turns: int = 0
+    timeouts: int = 0
+    barge_ins: int = 0
+    frames: int = 0
+    late_frames: int = 0
+    errors: int = 0
+
+
+class Playback:
+    """设备端播放时钟：估计播放缓冲何时播空，判定音频帧是否迟到（播放出现断续）。"""
+
+    def __init__(self) -> None:
+        self.play_end = 0.0
+        self._playing = False
+
+    def reset(self) -> None:
+        """新一轮回复 / 停播：首帧不计迟到。"""
+        self.play_end = 0.0
+        self._playing = False
+
+    def feed(self, duration: float, now: float | None = None) -> bool:
+        """收到 duration 秒音频，返回是否迟到（此前缓冲已播空）。"""
+        now = time.monotonic() if now is None else now
+        late = self._playing and now > self.play_end + _LATE_TOLERANCE
+        self._playing = True
+        self.play_end = max(self.play_end, now) + duration
+        return late
+
+    def remaining(self) -> float:
+        return max(0.0, self.play_end - time.monotonic())
+
+
+def load_utterances(path: Path | None = None) -> list[list[bytes]]:
+    """读取语音样本（目录下的 16 kHz 单声道 16 bit .wav / .pcm），按帧切分。
+
+    未提供时合成一段 1.2 秒的类语音噪声（能量足以通过 VAD）。
+    """
+    if path is None:
+        return [_split(_synthetic_speech(1.2))]
+    files = sorted(p for p in Path(path).iterdir() if p.suffix in (".wav", ".pcm"))
+    if not files:
+        raise ValueError(f"No .wav / .pcm utterances in {path}")
+    utterances = []
+    for file in files:
+        if file.suffix == ".wav":
+            with wave.open(str(file), "rb") as w:
+                if (w.getframerate(), w.getnchannels(), w.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                    raise ValueError(f"{file}: expected 16 kHz mono 16-bit PCM")
+                pcm = w.readframes(w.getnframes())
+        else:
+            pcm = file.read_bytes()
+        utterances.append(_split(pcm))
+    return utterances
+
+
+def _synthetic_speech(seconds: float, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    # 4 Hz 音节包络调制的噪声
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 4 * t))
+    samples = rng.normal(0, 0.2, n) * envelope
+    return (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def _split(pcm: bytes) -> list[bytes]:
+    return [bytes(f) for f in iter_frames(pcm)]
+
+
+class Device:
+    """一台模拟设备。"""
+
+    def __init__(
+        self,
+        url: str,
+        user_id: str,
+        utterances: list[list[bytes]],
+        profile: DeviceProfile | None = None,
+        seed: int = 0,
+    ) -> None:
+        self.url = f"{url.rstrip('/')}/ws/{user_id}"
+        self.user_id = user_id
+        self.utterances = utterances
+        self.profile = profile or DeviceProfile()
+        self.stats = DeviceStats()
+        self._rng = random.Random(seed)
+        self._ws = None
+        self._playback = Playback()
+        self._audio_end: float | None = None  # 等待首帧的 audio_end 时刻
+        self._barge_at: float | None = None  # 等待 tts_cancel 的打断时刻
+        self._first_audio = asyncio.Event()
+        self._reply_done = asyncio.Event()
+
+    async def run(self, duration: float) -> DeviceStats:
+        """运行 duration 秒，断线自动重连。"""
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                await asyncio.wait_for(self._session(), remaining)
+            except TimeoutError:
+                break
+            except (OSError, websockets.WebSocketException):
+                self.stats.errors += 1
+                await asyncio.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+        return self.stats
+
+    async def _session(self) -> None:
+        subprotocols = [SUBPROTOCOL] if self.profile.protocol_v2 else None
+        async with websockets.connect(self.url, subprotocols=subprotocols, max_size=None) as ws:
+            self._ws = ws
+            self._playback.reset()
+            self._audio_end = self._barge_at = None
+            tasks = [
+                asyncio.create_task(self._talk()),
+                asyncio.create_task(self._every(self.profile.ping_interval, self._ping)),
+                asyncio.create_task(self._every(self.profile.sensor_interval, self._sensor)),
+                asyncio.create_task(self._every(self.profile.proximity_interval, self._proximity)),
+            ]
+            try:
+                await self._read(ws)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ── 下行 ──
+
+    async def _read(self, ws) -> None:
+        async for message in ws:
+            now = time.monotonic()
+            if isinstance(message, bytes):
+                self._on_audio(message, now)
+                continue
+            kind = json.loads(message).get("type")
+            if kind == "tts_start":
+                self._playback.reset()
+            elif kind == "tts_end":
+                self._reply_done.set()
+            elif kind == "tts_cancel":
+                self._playback.reset()
+                if self._barge_at is not None:
+                    self.stats.barge_cancel.append(now - self._barge_at)
+                    self._barge_at = None
+
+    def _on_audio(self, data: bytes, now: float) -> None:
+        if self.profile.protocol_v2 and data[:1] == AUDIO_OUT_HEADER:
+            data = data[1:]
+        self.stats.frames += max(1, len(data) // FRAME_SIZE)
+        if self._audio_end is not None:
+            self.stats.first_frame.append(now - self._audio_end)
+            self._audio_end = None
+            self._first_audio.set()
+        if self._playback.feed(len(data) * _SECONDS_PER_BYTE, now):
+            self.stats.late_frames += 1
+
+    # ── 上行 ──
+
+    async def _talk(self) -> None:
+        interrupt = False
+        while True:
+            if not interrupt:
+                await asyncio.sleep(self._rng.expovariate(1 / self.profile.think_time))
+            if interrupt:
+                self._barge_at = time.monotonic()
+                self.stats.barge_ins += 1
+            await self._speak(self._rng.choice(self.utterances))
+            self.stats.turns += 1
+            try:
+                await asyncio.wait_for(self._first_audio.wait(), self.profile.reply_timeout)
+            except TimeoutError:
+                self.stats.timeouts += 1
+                self._audio_end = None
+                interrupt = False
+                continue
+            interrupt = self._rng.random() < self.profile.barge_rate
+            if interrupt:
+                # 听一小段后开口，下一轮的 audio_start 即打断
+                await asyncio.sleep(self._rng.uniform(0.2, 1.0))
+                if not self._reply_done.is_set():
+                    continue
+                interrupt = False
+            try:
+                await asyncio.wait_for(self._reply_done.wait(), self.profile.reply_timeout)
+            except TimeoutError:
+                self.stats.timeouts += 1
+            # 播完再开始下一轮的思考间隔
+            await asyncio.sleep(self._playback.remaining())
+
+    async def _speak(self, frames: list[bytes]) -> None:
+        """以实时节奏发送一段语音（按绝对时刻调度，不累积漂移）。"""
+        ws = self._ws
+        self._first_audio.clear()
+        self._reply_done.clear()
+        await ws.send(json.dumps({"type": "audio_start"}))
+        start = time.monotonic()
+        for i, frame in enumerate(frames):
+            delay = start + i * FRAME_DURATION - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await ws.send(encode_audio_in(frame) if self.profile.protocol_v2 else frame)
+        await ws.send(json.dumps({"type": "audio_end"}))
+        self._audio_end = time.monotonic()
+
+    async def _every(self, interval: float, send) -> None:
+        if interval <= 0:
+            return
+        await asyncio.sleep(self._rng.uniform(0, interval))
+        while True:
+            await send()
+            await asyncio.sleep(interval)
+
+    async def _ping(self) -> None:
+        await self._ws.send(json.dumps({"type": "ping"}))
+
+    async def _sensor(self) -> None:
+        rng = self._rng
+        msg = SensorMessage(
+            temp=rng.uniform(20, 30),
+            humidity=rng.uniform(40, 70),
+            light=rng.uniform(100, 500),
+            air_quality=rng.uniform(20, 80),
+        )
+        await self._send_telemetry(msg)
+
+    async def _proximity(self) -> None:
+        distance = self._rng.uniform(30, 150)
+        await self._send_telemetry(ProximityMessage(distance=distance, user_present=distance < 100))
+
+    async def _send_telemetry(self, msg: SensorMessage | ProximityMessage) -> None:
+        if self.profile.protocol_v2:
+            await self._ws.send(encode_telemetry(msg))
+        else:
+            await self._ws.send(msg.model_dump_json())
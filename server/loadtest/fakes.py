@@ -0,0 +1,194 @@
+"""离线压测用的假 ASR / LLM / TTS — 不加载模型、不访问网络，按时延模型模拟耗时。
+
+假组件继承真实类，只替换模型 / 网络调用部分，其余逻辑（消息组装、TTS 对冲竞速与降级）
+沿用真实实现：
+  - FakeASR：转写在 asr 阶段线程池中 sleep（占用线程，与真实 CPU 推理的并发约束一致）；
+    VAD 按固定 RMS 阈值判定（asr.vad_threshold 是 Silero 灵敏度，不适用于能量检测）
+  - FakeLLM：首 token 延迟 + 按 tokens/s 流式输出，结尾附情绪标签
+  - FakeTTS：所有后端替换为 FakeTTSBackend，首帧延迟 + 按实时率（RTF）分批产出静音帧
+
+时延按对数正态分布采样（中位数 + 离散度），同一 seed 结果可复现。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+from wallace.config import ASRConfig, LLMConfig, TTSConfig
+from wallace.pipeline.asr import ASREngine
+from wallace.pipeline.llm import LLMClient
+from wallace.pipeline.pacer import FRAME_DURATION
+from wallace.pipeline.tts import FRAME_SIZE, PCMFrame, TTSBackend, TTSManager
+
+TRANSCRIPTS = [
+    "你好华莱士",
+    "今天天气怎么样",
+    "给我讲个笑话吧",
+    "把客厅的灯关掉",
+    "我有点累了",
+]
+
+REPLIES = [
+    "你好呀！今天过得怎么样？",
+    "外面晴天，二十五度，很适合出去走走。",
+    "为什么程序员分不清万圣节和圣诞节？因为十月三十一等于十二月二十五。",
+    "好的，已经帮你关掉客厅的灯啦。",
+    "那就休息一下吧，喝杯水，伸个懒腰。我在这儿陪着你。",
+]
+
+# 归一化音频 RMS 高于此值视为有语音
+VAD_RMS_THRESHOLD = 0.01
+# 每字约 0.22 秒语音（普通语速）
+SECONDS_PER_CHAR = 0.22
+# 每批产出的帧数（256 ms 音频），避免逐帧 sleep
+_BATCH_FRAMES = 8
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """对数正态时延：中位数 median 秒，离散度 sigma（0 为固定值）。"""
+
+    median: float
+    sigma: float = 0.3
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median
+        return self.median * rng.lognormvariate(0.0, self.sigma)
+
+
+@dataclass
+class FakeProfile:
+    """假后端的时延配置。"""
+
+    asr: float = 0.15  # 转写耗时中位数（秒）
+    llm_ttft: float = 0.3  # LLM 首 token 延迟中位数（秒）
+    llm_tps: float = 30.0  # LLM 输出速度（tokens/s）
+    tts_first: float = 0.12  # TTS 首帧延迟中位数（秒）
+    tts_rtf: float = 0.1  # TTS 实时率（合成耗时 / 音频时长）
+    sigma: float = 0.3  # 所有时延的对数正态离散度
+    seed: int = 0
+    rng: random.Random = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.seed)
+
+    def latency(self, median: float) -> float:
+        return LatencyModel(median, self.sigma).sample(self.rng)
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        group = parser.add_argument_group("fake backends")
+        for f in fields(cls):
+            if f.init:
+                group.add_argument(
+                    f"--{f.name.replace('_', '-')}", type=type(f.default), default=f.default
+                )
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> FakeProfile:
+        return cls(**{f.name: getattr(args, f.name) for f in fields(cls) if f.init})
+
+    def to_argv(self) -> list[str]:
+        """转为命令行参数（传给子进程服务端）。"""
+        argv: list[str] = []
+        for f in fields(self):
+            if f.init:
+                argv += [f"--{f.name.replace('_', '-')}", str(getattr(self, f.name))]
+        return argv
+
+
+class FakeASR(ASREngine):
+    """假 ASR：不加载模型，转写在线程池中 sleep 后返回固定文本。"""
+
+    def __init__(
+        self, config: ASRConfig, executor: Executor | None = None, *, profile: FakeProfile
+    ) -> None:
+        super().__init__(config, executor)
+        self.profile = profile
+
+    async def load_model(self) -> None:
+        self._model = object()
+
+    def vad_has_speech(self, audio: np.ndarray) -> bool:
+        return audio.size > 0 and float(np.sqrt(np.mean(audio**2))) > VAD_RMS_THRESHOLD
+
+    def _transcribe_sync(self, audio: np.ndarray, beam_size: int) -> str:
+        time.sleep(self.profile.latency(self.profile.asr))
+        return self.profile.rng.choice(TRANSCRIPTS)
+
+
+class FakeLLM(LLMClient):
+    """假 LLM：不访问 Ollama，按首 token 延迟与 tokens/s 流式输出固定回复。"""
+
+    def __init__(self, config: LLMConfig, *, profile: FakeProfile) -> None:
+        super().__init__(config)
+        self.profile = profile
+
+    async def start(self) -> None:
+        self._healthy = True
+
+    async def close(self) -> None:
+        self._healthy = False
+
+    async def health_check(self) -> bool:
+        return self._healthy
+
+    async def chat_stream(
+        self, messages: list[dict[str, str]], *, max_tokens: int | None = None
+    ) -> AsyncIterator[str]:
+        profile = self.profile
+        reply = profile.rng.choice(REPLIES)
+        # 中文约 1.5 字 / token
+        tokens = [reply[i : i + 2] for i in range(0, len(reply), 2)]
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        await asyncio.sleep(profile.latency(profile.llm_ttft))
+        interval = 1 / profile.llm_tps if profile.llm_tps > 0 else 0.0
+        for i, token in enumerate(tokens):
+            if i and interval:
+                await asyncio.sleep(interval)
+            yield token
+        yield "[mood:happy]"
+
+
+class FakeTTSBackend(TTSBackend):
+    """假 TTS 后端：首帧延迟后按 RTF 分批产出静音帧，时长与文本长度成正比。"""
+
+    def __init__(self, profile: FakeProfile) -> None:
+        self.profile = profile
+
+    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[PCMFrame]:
+        if not text.strip():
+            return
+        profile = self.profile
+        total = max(1, math.ceil(len(text) * SECONDS_PER_CHAR / FRAME_DURATION))
+        await asyncio.sleep(profile.latency(profile.tts_first))
+        frame = bytes(FRAME_SIZE)
+        for start in range(0, total, _BATCH_FRAMES):
+            if start:
+                await asyncio.sleep(_BATCH_FRAMES * FRAME_DURATION * profile.tts_rtf)
+            for _ in range(min(_BATCH_FRAMES, total - start)):
+                yield frame
+
+
+class FakeTTS(TTSManager):
+    """假 TTSManager：保留对冲 / 降级逻辑，各后端均为 FakeTTSBackend。"""
+
+    def __init__(self, config: TTSConfig, *, profile: FakeProfile) -> None:
+        super().__init__(config.model_copy(update={"piper_model": ""}))
+        self._fake = FakeTTSBackend(profile)
+
+    def _backends(self) -> list[tuple[str, TTSBackend]]:
+        return [(name, self._fake) for name in ("edge", "cosyvoice", "piper")]
@@ -0,0 +1,206 @@
+"""压测编排：启动假后端服务端（子进程）、按爬坡节奏接入 N 台设备、汇总报告。"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Self
+
+import httpx
+
+from loadtest.device import Device, DeviceProfile, DeviceStats
+from loadtest.fakes import FakeProfile
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """线性插值分位数，q ∈ [0, 1]；无样本返回 None。"""
+    if not values:
+        return None
+    data = sorted(values)
+    pos = (len(data) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(data) - 1)
+    return data[lo] + (data[hi] - data[lo]) * (pos - lo)
+
+
+def read_rss(pid: int) -> int | None:
+    """进程当前常驻内存（字节），读取 /proc，不支持的平台返回 None。"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """周期采样服务端进程 RSS，记录峰值与最后一次。"""
+
+    def __init__(self, pid: int, interval: float = 0.5) -> None:
+        self.pid = pid
+        self.interval = interval
+        self.start: int | None = None
+        self.peak: int | None = None
+        self.last: int | None = None
+        self._task: asyncio.Task | None = None
+
+    def __enter__(self) -> Self:
+        self.start = self._sample()
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self._sample()
+
+    def _sample(self) -> int | None:
+        rss = read_rss(self.pid)
+        if rss is not None:
+            self.last = rss
+            self.peak = max(self.peak or 0, rss)
+        return rss
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self._sample()
+
+
+async def run_devices(
+    url: str,
+    devices: int,
+    duration: float,
+    profile: DeviceProfile,
+    utterances: list[list[bytes]],
+    ramp: float = 0.0,
+    seed: int = 0,
+) -> list[DeviceStats]:
+    """接入 devices 台设备（在 ramp 秒内均匀爬坡），每台运行到 duration 秒结束。"""
+    start = time.monotonic()
+
+    async def one(i: int) -> DeviceStats:
+        delay = ramp * i / devices
+        await asyncio.sleep(delay)
+        device = Device(url, f"load-{i:04d}", utterances, profile, seed=seed * 100003 + i)
+        return await device.run(max(0.0, duration - (time.monotonic() - start)))
+
+    return await asyncio.gather(*(one(i) for i in range(devices)))
+
+
+def summarize(
+    stats: list[DeviceStats],
+    rss: RssSampler | None = None,
+    server_metrics: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """汇总各设备观测 + 服务端 RSS / 发送队列丢弃数。"""
+    first = [v for s in stats for v in s.first_frame]
+    cancel = [v for s in stats for v in s.barge_cancel]
+    counters = (server_metrics or {}).get("counters", {})
+    return {
+        "devices": len(stats),
+        "turns": sum(s.turns for s in stats),
+        "timeouts": sum(s.timeouts for s in stats),
+        "barge_ins": sum(s.barge_ins for s in stats),
+        "errors": sum(s.errors for s in stats),
+        "first_frame": {
+            "count": len(first),
+            **{f"p{q}": percentile(first, q / 100) for q in (50, 95, 99)},
+        },
+        "barge_cancel_p50": percentile(cancel, 0.5),
+        "frames": sum(s.frames for s in stats),
+        "late_frames": sum(s.late_frames for s in stats),
+        # 服务端只丢弃遥测（合并 / 溢出），音频帧不会被丢弃
+        "server_telemetry_dropped": sum(
+            v for k, v in counters.items() if k.startswith("outbox_dropped_total")
+        ),
+        "server_rss": None if rss is None else {
+            "start": rss.start, "peak": rss.peak, "end": rss.last,
+        },
+    }
+
+
+def format_report(summary: dict[str, Any]) -> str:
+    def ms(v: float | None) -> str:
+        return "   n/a" if v is None else f"{v * 1000:6.0f}"
+
+    def mb(v: int | None) -> str:
+        return "n/a" if v is None else f"{v / 2**20:.1f} MB"
+
+    ff = summary["first_frame"]
+    lines = [
+        (
+            f"devices {summary['devices']}  turns {summary['turns']}  "
+            f"timeouts {summary['timeouts']}  barge-ins {summary['barge_ins']}  "
+            f"errors {summary['errors']}"
+        ),
+        (
+            f"audio_end → first frame (ms, n={ff['count']}): "
+            f"p50 {ms(ff['p50'])}  p95 {ms(ff['p95'])}  p99 {ms(ff['p99'])}"
+        ),
+        f"barge-in → tts_cancel p50 (ms): {ms(summary['barge_cancel_p50'])}",
+        (
+            f"downlink frames {summary['frames']}  late (underrun) {summary['late_frames']}  "
+            f"telemetry dropped by server {summary['server_telemetry_dropped']:.0f}"
+        ),
+    ]
+    rss = summary["server_rss"]
+    if rss is not None:
+        lines.append(
+            f"server RSS: start {mb(rss['start'])}  peak {mb(rss['peak'])}  end {mb(rss['end'])}"
+        )
+    return "\n".join(lines)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(
+    profile: FakeProfile, port: int, config: Path | None = None, log: Path | None = None
+) -> subprocess.Popen:
+    """以假后端启动服务端子进程（独立进程，RSS 不含压测客户端）。"""
+    cmd = [sys.executable, "-m", "loadtest.server", "--port", str(port), *profile.to_argv()]
+    if config is not None:
+        cmd += ["--config", str(config)]
+    if log is None:
+        return subprocess.Popen(
+            cmd, cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT
+        )
+    with open(log, "w") as out:
+        # 子进程持有自己的文件描述符副本
+        return subprocess.Popen(cmd, cwd=SERVER_DIR, stdout=out, stderr=subprocess.STDOUT)
+
+
+async def wait_healthy(http_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(f"{http_url}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Server at {http_url} not healthy after {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+async def fetch_metrics(http_url: str) -> dict[str, Any] | None:
+    try:
+        async with httpx.AsyncClient() as client:
+            resp = await client.get(f"{http_url}/metrics")
+            resp.raise_for_status()
+            return resp.json()
+    except httpx.HTTPError:
+        return None
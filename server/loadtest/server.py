@@ -0,0 +1,54 @@
+"""以假后端启动 Wallace 服务端（真实 WebSocket / 流水线 / 发送队列，ASR / LLM / TTS 为假组件）。
+
+用法:
+    python -m loadtest.server --port 8765 --llm-ttft 0.5 --tts-rtf 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+
+import wallace.app
+from loadtest.fakes import FakeASR, FakeLLM, FakeProfile, FakeTTS
+from wallace.config import load_settings
+
+
+def fake_components(profile: FakeProfile) -> dict[str, Callable[..., Any]]:
+    """wallace.app 中需替换的组件名 → 假组件工厂。"""
+    return {
+        "ASREngine": functools.partial(FakeASR, profile=profile),
+        "LLMClient": functools.partial(FakeLLM, profile=profile),
+        "TTSManager": functools.partial(FakeTTS, profile=profile),
+    }
+
+
+def install(profile: FakeProfile) -> None:
+    """替换 wallace.app 中的组件（lifespan 启动时按模块全局名查找）。"""
+    for name, factory in fake_components(profile).items():
+        setattr(wallace.app, name, factory)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", type=Path, default=None, help="TOML 配置，缺省用默认配置")
+    FakeProfile.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    settings = load_settings(args.config) if args.config else load_settings()
+    settings.server.log_level = "WARNING"
+
+    install(FakeProfile.from_args(args))
+    app = wallace.app.create_app(settings)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", ws_max_size=1 << 20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""本地替身服务 — Ollama / CosyVoice / MQTT broker / 天气 API 的轻量实现，时延可控、结果确定。
+
+服务端代码按真实网络路径（httpx 流式请求、NDJSON 解析、分块 PCM、MQTT 报文）访问替身，
+供集成测试与基准使用：
+    from standins import cosyvoice, ollama, weather
+    from standins.mqtt import MQTTBroker
+    from standins.serve import serve_app
+
+    async with serve_app(ollama.create_app(ollama.OllamaProfile(ttft=0.5))) as url:
+        ...  # LLMConfig(base_url=url)
+
+独立运行（在 server/ 目录下，默认端口与真实服务一致）:
+    python -m standins --ollama-ttft 0.5 --ollama-tps 20 --reasoning inline
+"""
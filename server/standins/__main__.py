@@ -0,0 +1,64 @@
+"""python -m standins：在默认端口上同时运行四个替身服务，直到 Ctrl+C。"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+
+from standins import cosyvoice, ollama, weather
+from standins.mqtt import MQTTBroker
+from standins.serve import serve_app
+
+
+def _parse(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m standins", description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ollama-port", type=int, default=11434)
+    parser.add_argument("--cosyvoice-port", type=int, default=9880)
+    parser.add_argument("--mqtt-port", type=int, default=1883)
+    parser.add_argument("--weather-port", type=int, default=8090)
+    parser.add_argument("--ollama-ttft", type=float, default=0.3)
+    parser.add_argument("--ollama-tps", type=float, default=30.0)
+    parser.add_argument("--reasoning", choices=["none", "field", "inline"], default="none")
+    parser.add_argument("--tts-first-chunk", type=float, default=0.15)
+    parser.add_argument("--tts-rtf", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    llm = ollama.OllamaProfile(
+        ttft=args.ollama_ttft,
+        tokens_per_second=args.ollama_tps,
+        reasoning=args.reasoning,
+        seed=args.seed,
+    )
+    tts = cosyvoice.CosyVoiceProfile(first_chunk=args.tts_first_chunk, rtf=args.tts_rtf)
+    async with contextlib.AsyncExitStack() as stack:
+        ollama_url = await stack.enter_async_context(
+            serve_app(ollama.create_app(llm), args.host, args.ollama_port)
+        )
+        tts_url = await stack.enter_async_context(
+            serve_app(cosyvoice.create_app(tts), args.host, args.cosyvoice_port)
+        )
+        weather_url = await stack.enter_async_context(
+            serve_app(weather.create_app(), args.host, args.weather_port)
+        )
+        broker = MQTTBroker()
+        await broker.start(args.host, args.mqtt_port)
+        stack.push_async_callback(broker.close)
+        print(f"ollama     {ollama_url}")
+        print(f"cosyvoice  {tts_url}/tts")
+        print(f"weather    {weather_url}/v3/weather/now.json")
+        print(f"mqtt       {args.host}:{broker.port}")
+        await asyncio.Event().wait()
+
+
+def main(argv: list[str] | None = None) -> None:
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_run(_parse(argv)))
+
+
+if __name__ == "__main__":
+    main()
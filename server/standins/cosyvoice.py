@@ -0,0 +1,67 @@
+"""CosyVoice 替身 — POST /tts 以分块传输返回 16 kHz int16 PCM，首块延迟与实时率可控。"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+SAMPLE_RATE = 16000
+
+
+@dataclass
+class CosyVoiceProfile:
+    """合成时长与时延。"""
+
+    first_chunk: float = 0.15  # 首块延迟（秒）
+    rtf: float = 0.2  # 实时率：每块音频的合成耗时 / 音频时长，0 为不限速
+    chunk_ms: int = 200  # 每块音频时长
+    seconds_per_char: float = 0.22
+    tone_hz: float = 0.0  # 0 输出静音，否则输出该频率正弦（便于人耳 / 能量检测辨认）
+    fail_status: int = 0  # 非 0 时直接返回该 HTTP 状态码（测试降级）
+    requests: list[dict[str, Any]] = field(default_factory=list, repr=False)
+
+
+def synthesize_pcm(text: str, profile: CosyVoiceProfile) -> bytes:
+    """文本对应的整段 PCM（时长与字数成正比）。"""
+    samples = max(1, math.ceil(len(text) * profile.seconds_per_char * SAMPLE_RATE))
+    if not profile.tone_hz:
+        return bytes(samples * 2)
+    t = np.arange(samples) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * profile.tone_hz * t) * 8000).astype("<i2").tobytes()
+
+
+def create_app(profile: CosyVoiceProfile | None = None) -> FastAPI:
+    profile = profile or CosyVoiceProfile()
+    app = FastAPI(title="CosyVoice stand-in")
+    app.state.profile = profile
+
+    @app.post("/tts")
+    async def tts(request: Request):
+        body = await request.json()
+        profile.requests.append(body)
+        if profile.fail_status:
+            raise HTTPException(profile.fail_status, "injected failure")
+        text = str(body.get("text", "")).strip()
+        if not text:
+            raise HTTPException(400, "empty text")
+
+        pcm = synthesize_pcm(text, profile)
+        chunk = SAMPLE_RATE * 2 * profile.chunk_ms // 1000
+
+        async def stream() -> AsyncIterator[bytes]:
+            await asyncio.sleep(profile.first_chunk)
+            for start in range(0, len(pcm), chunk):
+                if start and profile.rtf:
+                    await asyncio.sleep(profile.chunk_ms / 1000 * profile.rtf)
+                yield pcm[start : start + chunk]
+
+        return StreamingResponse(stream(), media_type="audio/L16;rate=16000;channels=1")
+
+    return app
@@ -0,0 +1,177 @@
+"""最小 MQTT 3.1.1 broker — 单进程 asyncio，用于本地联调与测试。
+
+支持 CONNECT / PUBLISH（QoS 0–2）/ SUBSCRIBE（含 + / # 通配）/ UNSUBSCRIBE / PINGREQ /
+DISCONNECT 与保留消息。订阅一律授予 QoS 0，转发给订阅者时按 QoS 0 投递。
+不支持认证（用户名 / 密码忽略）、遗嘱消息与持久会话。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+from typing import Self
+
+logger = logging.getLogger(__name__)
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = range(8, 15)
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """订阅过滤器匹配（+ 单层、# 多层）。"""
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+def encode_packet(kind: int, flags: int, body: bytes) -> bytes:
+    """固定头（类型 + 标志 + 变长剩余长度）+ 报文体。"""
+    header = bytearray([kind << 4 | flags])
+    length = len(body)
+    while True:
+        byte, length = length % 128, length // 128
+        header.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(header) + body
+
+
+def _string(data: bytes, pos: int) -> tuple[str, int]:
+    (n,) = struct.unpack_from("!H", data, pos)
+    return data[pos + 2 : pos + 2 + n].decode(), pos + 2 + n
+
+
+def _encode_string(s: str) -> bytes:
+    raw = s.encode()
+    return struct.pack("!H", len(raw)) + raw
+
+
+async def _read_packet(reader: asyncio.StreamReader) -> tuple[int, int, bytes]:
+    first = (await reader.readexactly(1))[0]
+    length = shift = 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    body = await reader.readexactly(length) if length else b""
+    return first >> 4, first & 0x0F, body
+
+
+class MQTTBroker:
+    """进程内 broker。messages 记录收到的所有发布 (topic, payload)。"""
+
+    def __init__(self) -> None:
+        self.messages: list[tuple[str, bytes]] = []
+        self._published: asyncio.Queue[tuple[str, bytes]] = asyncio.Queue()
+        self._retained: dict[str, bytes] = {}
+        self._clients: dict[asyncio.StreamWriter, set[str]] = {}
+        self._server: asyncio.Server | None = None
+        self.port = 0
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("MQTT stand-in listening on %s:%d", host, self.port)
+        return self.port
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def next_message(self, timeout: float = 5.0) -> tuple[str, bytes]:
+        """等待下一条发布（测试用）。"""
+        return await asyncio.wait_for(self._published.get(), timeout)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            kind, _, body = await _read_packet(reader)
+            if kind != CONNECT or not self._connect(body, writer):
+                return
+            self._clients[writer] = set()
+            while True:
+                kind, flags, body = await _read_packet(reader)
+                if kind == DISCONNECT:
+                    return
+                await self._dispatch(kind, flags, body, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    def _connect(self, body: bytes, writer: asyncio.StreamWriter) -> bool:
+        name, pos = _string(body, 0)
+        level = body[pos]
+        accepted = (name, level) in (("MQTT", 4), ("MQIsdp", 3))
+        # return code 1 = 不支持的协议版本
+        writer.write(encode_packet(CONNACK, 0, bytes([0, 0 if accepted else 1])))
+        return accepted
+
+    async def _dispatch(
+        self, kind: int, flags: int, body: bytes, writer: asyncio.StreamWriter
+    ) -> None:
+        if kind == PUBLISH:
+            await self._on_publish(flags, body, writer)
+        elif kind == PUBREL:
+            writer.write(encode_packet(PUBCOMP, 0, body[:2]))
+        elif kind == SUBSCRIBE:
+            packet_id, filters = body[:2], []
+            pos = 2
+            while pos < len(body):
+                topic, pos = _string(body, pos)
+                filters.append(topic)
+                pos += 1  # 请求的 QoS
+            self._clients[writer].update(filters)
+            writer.write(encode_packet(SUBACK, 0, packet_id + bytes(len(filters))))
+            for topic, payload in self._retained.items():
+                if any(topic_matches(f, topic) for f in filters):
+                    writer.write(encode_packet(PUBLISH, 1, _encode_string(topic) + payload))
+        elif kind == UNSUBSCRIBE:
+            pos = 2
+            while pos < len(body):
+                topic, pos = _string(body, pos)
+                self._clients[writer].discard(topic)
+            writer.write(encode_packet(UNSUBACK, 0, body[:2]))
+        elif kind == PINGREQ:
+            writer.write(encode_packet(PINGRESP, 0, b""))
+        await writer.drain()
+
+    async def _on_publish(self, flags: int, body: bytes, writer: asyncio.StreamWriter) -> None:
+        qos, retain = (flags >> 1) & 0x03, flags & 0x01
+        topic, pos = _string(body, 0)
+        if qos:
+            packet_id, pos = body[pos : pos + 2], pos + 2
+            writer.write(encode_packet(PUBACK if qos == 1 else PUBREC, 0, packet_id))
+        payload = body[pos:]
+
+        self.messages.append((topic, payload))
+        self._published.put_nowait((topic, payload))
+        if retain:
+            if payload:
+                self._retained[topic] = payload
+            else:
+                self._retained.pop(topic, None)
+
+        packet = encode_packet(PUBLISH, 0, _encode_string(topic) + payload)
+        for client, filters in list(self._clients.items()):
+            if any(topic_matches(f, topic) for f in filters):
+                client.write(packet)
@@ -0,0 +1,116 @@
+"""Ollama 替身 — /api/tags 与 /api/chat（NDJSON 流式），首 token 延迟与输出速度可控。
+
+推理模型的思考过程两种形式：
+  - field：`message.thinking` 字段（Ollama 0.9+，请求带 think=true）
+  - inline：正文中的 `<think>…</think>`（旧版 deepseek-r1 / qwen3 等）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any, Literal
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DEFAULT_REPLY = "你好呀！今天过得怎么样？有什么想和我聊的吗？[mood:happy]"
+
+
+@dataclass
+class OllamaProfile:
+    """回复内容与时延。"""
+
+    model: str = "qwen2.5:7b"
+    reply: str = DEFAULT_REPLY
+    ttft: float = 0.3  # 首 token 延迟（秒），思考内容也计入
+    tokens_per_second: float = 30.0  # 0 为不限速
+    jitter: float = 0.0  # 每 token 间隔的相对抖动（0.2 = ±20%）
+    chars_per_token: int = 2
+    reasoning: Literal["none", "field", "inline"] = "none"
+    reasoning_text: str = "用户在打招呼，我应该热情回应，顺便问问今天的情况。"
+    seed: int = 0
+    requests: list[dict[str, Any]] = field(default_factory=list, repr=False)  # 收到的请求体
+
+
+def _tokens(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _chunk(model: str, **fields: Any) -> dict[str, Any]:
+    return {"model": model, "created_at": datetime.now(UTC).isoformat(), **fields}
+
+
+def _ndjson(chunk: dict[str, Any]) -> bytes:
+    return json.dumps(chunk, ensure_ascii=False).encode() + b"\n"
+
+
+def create_app(profile: OllamaProfile | None = None) -> FastAPI:
+    profile = profile or OllamaProfile()
+    rng = random.Random(profile.seed)
+    app = FastAPI(title="Ollama stand-in")
+    app.state.profile = profile
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": profile.model, "model": profile.model}]}
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        profile.requests.append(body)
+        limit = (body.get("options") or {}).get("num_predict")
+        think = profile.reasoning == "inline" or (
+            profile.reasoning == "field" and body.get("think")
+        )
+
+        # (字段, token)：thinking 在前，content 在后
+        size = profile.chars_per_token
+        parts: list[tuple[str, str]] = []
+        if think and profile.reasoning == "field":
+            parts += [("thinking", t) for t in _tokens(profile.reasoning_text, size)]
+        elif think:
+            inline = f"<think>{profile.reasoning_text}</think>"
+            parts += [("content", t) for t in _tokens(inline, size)]
+        answer = _tokens(profile.reply, size)
+        if limit and limit > 0:
+            answer = answer[:limit]
+        parts += [("content", t) for t in answer]
+
+        if not body.get("stream", True):
+            await asyncio.sleep(profile.ttft + _interval(profile, rng) * max(0, len(parts) - 1))
+            message = {"role": "assistant", "content": ""}
+            for key, token in parts:
+                message[key] = message.get(key, "") + token
+            return _chunk(profile.model, message=message, done=True, done_reason="stop")
+
+        async def stream() -> AsyncIterator[bytes]:
+            await asyncio.sleep(profile.ttft)
+            for i, (key, token) in enumerate(parts):
+                if i:
+                    await asyncio.sleep(_interval(profile, rng))
+                message = {"role": "assistant", "content": ""}
+                message[key] = token
+                yield _ndjson(_chunk(profile.model, message=message, done=False))
+            yield _ndjson(_chunk(
+                profile.model,
+                message={"role": "assistant", "content": ""},
+                done=True,
+                done_reason="stop" if not limit or len(answer) < limit else "length",
+                eval_count=len(parts),
+            ))
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+def _interval(profile: OllamaProfile, rng: random.Random) -> float:
+    if profile.tokens_per_second <= 0:
+        return 0.0
+    base = 1 / profile.tokens_per_second
+    return base * (1 + rng.uniform(-profile.jitter, profile.jitter)) if profile.jitter else base
@@ -0,0 +1,28 @@
+"""在当前事件循环中运行 ASGI 应用（测试 / 基准内嵌使用），端口 0 时自动分配。"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import uvicorn
+
+
+@asynccontextmanager
+async def serve_app(app, host: str = "127.0.0.1", port: int = 0) -> AsyncIterator[str]:
+    """启动 uvicorn 并返回 http://host:port，退出时关闭。"""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()  # 启动失败（如端口占用）时抛出
+        await asyncio.sleep(0.01)
+    bound = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://{host}:{bound}"
+    finally:
+        server.should_exit = True
+        await task
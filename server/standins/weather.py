@@ -0,0 +1,53 @@
+"""心知天气替身 — GET /v3/weather/now.json，响应格式与真实 API 一致。"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class WeatherProfile:
+    """各城市的天气与响应延迟。"""
+
+    cities: dict[str, tuple[str, int]] = field(
+        default_factory=lambda: {"beijing": ("晴", 25), "shanghai": ("多云", 28)}
+    )
+    latency: float = 0.05
+    fail_status: int = 0  # 非 0 时直接返回该 HTTP 状态码（测试降级）
+    requests: int = 0
+
+
+def create_app(profile: WeatherProfile | None = None) -> FastAPI:
+    profile = profile or WeatherProfile()
+    app = FastAPI(title="Weather stand-in")
+    app.state.profile = profile
+
+    @app.get("/v3/weather/now.json")
+    async def now(key: str = "", location: str = ""):
+        profile.requests += 1
+        await asyncio.sleep(profile.latency)
+        if profile.fail_status:
+            return JSONResponse({"status": "injected failure"}, profile.fail_status)
+        if not key:
+            return JSONResponse(
+                {"status": "The API key is invalid.", "status_code": "AP010003"}, 403
+            )
+        weather = profile.cities.get(location.lower())
+        if weather is None:
+            return JSONResponse(
+                {"status": "The location can not be found.", "status_code": "AP010010"}, 404
+            )
+        text, temperature = weather
+        return {
+            "results": [{
+                "location": {"id": location, "name": location, "country": "CN"},
+                "now": {"text": text, "code": "0", "temperature": str(temperature)},
+                "last_update": "2024-01-01T08:00:00+08:00",
+            }]
+        }
+
+    return app
@@ -28,9 +28,11 @@ class MockWebSocket:
         self.sent_bytes: list[bytes] = []
         self._receive_queue: asyncio.Queue = asyncio.Queue()
         self.closed = False
+        self.scope: dict[str, Any] = {"subprotocols": []}
+        self.subprotocol: str | None = None
 
-    async def accept(self) -> None:
-        pass
+    async def accept(self, subprotocol: str | None = None) -> None:
+        self.subprotocol = subprotocol
 
     async def send_text(self, data: str) -> None:
         self.sent_text.append(data)
@@ -69,9 +71,12 @@ class MockWebSocket:
 
 
 @pytest.fixture
-def test_config() -> Settings:
-    """加载测试专用配置。"""
-    return load_settings(FIXTURES_DIR / "test_config.toml")
+def test_config(tmp_path) -> Settings:
+    """加载测试专用配置（记忆写入临时目录）。"""
+    settings = load_settings(FIXTURES_DIR / "test_config.toml")
+    settings.memory.data_dir = str(tmp_path / "memory")
+    settings.longterm.data_dir = str(tmp_path / "longterm")
+    return settings
 
 
 @pytest.fixture
@@ -118,7 +123,7 @@ def mock_llm() -> MagicMock:
         ]
     )
 
-    async def _fake_stream(messages):
+    async def _fake_stream(messages, **options):
         for token in ["你好", "呀！", "[mood:happy]"]:
             yield token
 
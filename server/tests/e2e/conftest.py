@@ -251,9 +251,12 @@ def assert_message_contains(msg: dict, **expected_fields) -> None:
 
 
 @pytest.fixture
-def e2e_settings() -> Settings:
-    """加载 E2E 测试配置。"""
-    return load_settings(FIXTURES_DIR / "test_config.toml")
+def e2e_settings(tmp_path) -> Settings:
+    """加载 E2E 测试配置（记忆写入临时目录）。"""
+    settings = load_settings(FIXTURES_DIR / "test_config.toml")
+    settings.memory.data_dir = str(tmp_path / "memory")
+    settings.longterm.data_dir = str(tmp_path / "longterm")
+    return settings
 
 
 @pytest.fixture
@@ -33,6 +33,22 @@ class TestHeartbeat:
 class TestConnection:
     """连接测试。"""
 
+    def test_binary_protocol_v2(self, client):
+        """请求子协议 wallace.v2 后，遥测可走二进制通道帧。"""
+        from wallace.ws.binary import SUBPROTOCOL, encode_telemetry
+        from wallace.ws.protocol import SensorMessage
+
+        from .conftest import E2EWebSocketClient
+
+        with client.websocket_connect("/ws/v2user", subprotocols=[SUBPROTOCOL]) as raw:
+            assert raw.accepted_subprotocol == SUBPROTOCOL
+            ws = E2EWebSocketClient(raw)
+            ws.send_bytes(encode_telemetry(
+                SensorMessage(temp=26.5, humidity=60.0, light=300.0, air_quality=50.0)
+            ))
+            ws.send_ping()
+            assert ws.wait_for_message_type("pong", timeout=2.0) is not None
+
     def test_websocket_connect(self, ws_client):
         """WebSocket 应能正常连接。"""
         with ws_client() as ws:
@@ -0,0 +1,55 @@
+"""集成测试：模拟设备经真实 WebSocket 连接假后端服务端，完成对话与打断。"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+import uvicorn
+
+from loadtest.device import DeviceProfile, load_utterances
+from loadtest.fakes import FakeProfile
+from loadtest.runner import run_devices, summarize
+from loadtest.server import fake_components
+from wallace.app import create_app
+
+
+@pytest.fixture
+async def server_url(test_config, monkeypatch):
+    """本机随机端口上运行的服务端（ASR / LLM / TTS 为零延迟假后端）。"""
+    profile = FakeProfile(asr=0.01, llm_ttft=0.01, llm_tps=0, tts_first=0.01, tts_rtf=0)
+    for name, factory in fake_components(profile).items():
+        monkeypatch.setattr(f"wallace.app.{name}", factory)
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(test_config), host="127.0.0.1", port=0, log_level="warning")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"ws://127.0.0.1:{port}"
+    server.should_exit = True
+    await task
+
+
+class TestLoadGenerator:
+    """端到端跑通一次小规模压测。"""
+
+    @pytest.mark.parametrize("protocol_v2", [False, True])
+    async def test_devices_converse(self, server_url, protocol_v2):
+        (frames,) = load_utterances()
+        profile = DeviceProfile(
+            think_time=0.05,
+            barge_rate=0.5,
+            sensor_interval=0.2,
+            proximity_interval=0.1,
+            reply_timeout=5,
+            protocol_v2=protocol_v2,
+        )
+        # 0.3 秒的短语音，缩短测试时长
+        stats = await run_devices(server_url, 2, 3.0, profile, [frames[:10]], seed=1)
+        summary = summarize(stats)
+        assert summary["errors"] == 0
+        assert summary["timeouts"] == 0
+        assert summary["first_frame"]["count"] >= 2
+        assert summary["frames"] > 0
@@ -8,9 +8,25 @@ from unittest.mock import AsyncMock, MagicMock
 import numpy as np
 import pytest
 
-from wallace.config import SensorConfig
+from wallace.config import (
+    DeadlineConfig,
+    DuplexConfig,
+    FillerConfig,
+    GovernorConfig,
+    LongTermConfig,
+    PipelineConfig,
+    SensorConfig,
+    StageConfig,
+)
+from wallace.memory.longterm import LongTermMemory
+from wallace.metrics import metrics
+from wallace.pipeline.bargein import BargeInDetector
+from wallace.pipeline.codec import ADPCM_BLOCK_BYTES
+from wallace.pipeline.governor import PipelineGovernor
 from wallace.pipeline.orchestrator import Orchestrator
+from wallace.pipeline.stages import StageGraph
 from wallace.sensor import SensorProcessor
+from wallace.tracing import STAGES
 from wallace.ws.session import PipelineState
 
 
@@ -203,6 +219,102 @@ class TestSentenceSplitting:
         assert len(tts_texts) >= 2, \
             f"Token-by-token should trigger splits, got {len(tts_texts)}: {tts_texts}"
 
+    async def test_burst_token_flushes_all_sentences(self, orchestrator, session, mock_ws):
+        """一个 token 含两句时，两句都在下一个 token 到达前送入 TTS。"""
+        tts_texts = []
+        seen_before_next_token = []
+
+        async def track_tts(text):
+            tts_texts.append(text)
+            yield b"\x00" * 1024
+
+        orchestrator.tts.synthesize = track_tts
+
+        async def burst_stream(messages):
+            yield "第一句。第二句！"
+            seen_before_next_token.append(list(tts_texts))
+            yield "[mood:happy]"
+
+        orchestrator.llm.chat_stream = burst_stream
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        session.transition_to(PipelineState.PROCESSING)
+
+        await orchestrator._run_pipeline(session)
+
+        assert seen_before_next_token == [["第一句。", "第二句！"]]
+
+
+class TestAudioEncoding:
+    """下行音频编码。"""
+
+    async def test_adpcm_frames_and_bandwidth_stats(self, orchestrator, session, mock_ws):
+        session.set_audio_codec("adpcm")
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        session.transition_to(PipelineState.PROCESSING)
+
+        await orchestrator._run_pipeline(session)
+
+        assert len(mock_ws.sent_bytes) > 0
+        assert all(len(b) == ADPCM_BLOCK_BYTES * 4 for b in mock_ws.sent_bytes)
+        stats = session.stats()
+        assert stats["audio_bytes_raw"] == 1024 * len(mock_ws.sent_bytes)
+        assert stats["audio_bytes_saved"] > 0
+
+    async def test_pcm_passthrough(self, orchestrator, session, mock_ws):
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        session.transition_to(PipelineState.PROCESSING)
+
+        await orchestrator._run_pipeline(session)
+
+        assert all(len(b) == 1024 for b in mock_ws.sent_bytes)
+        assert session.stats()["audio_bytes_saved"] == 0
+
+
+class TestTracing:
+    """单轮时延追踪。"""
+
+    async def test_all_stages_recorded(self, orchestrator, session, mock_ws):
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+
+        await orchestrator.handle_audio_end(session)
+        await session.pipeline_task
+
+        trace = session.last_trace
+        assert session.trace is None
+        assert trace.outcome == "ok"
+        assert list(trace.elapsed_ms()) == list(STAGES)
+        assert mock_ws.get_sent_messages_by_type("trace") == []
+
+    async def test_trace_sent_to_device(self, orchestrator, session, mock_ws):
+        session.trace_to_device = True
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+
+        await orchestrator.handle_audio_end(session)
+        await session.pipeline_task
+
+        msgs = mock_ws.get_sent_messages_by_type("trace")
+        assert len(msgs) == 1
+        assert msgs[0]["turn"] == session.turn_count
+        assert list(msgs[0]["stages"]) == list(STAGES)
+        # trace 在 tts_end 之后
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types.index("trace") > types.index("tts_end")
+
+    async def test_no_speech_outcome(self, orchestrator, session, mock_asr):
+        mock_asr.vad_has_speech.return_value = False
+        session.state = PipelineState.RECORDING
+
+        await orchestrator.handle_audio_end(session)
+        await session.pipeline_task
+
+        assert session.last_trace.outcome == "no_speech"
+        assert list(session.last_trace.elapsed_ms()) == ["audio_end", "vad"]
+
 
 class TestInterruption:
     """打断处理。"""
@@ -347,6 +459,43 @@ class TestTreehouseMode:
         assert session.state == PipelineState.IDLE
 
 
+class TestLongTermMemory:
+    """长期记忆：对话历史窗口之外的往事按相关性召回。"""
+
+    async def _turn(self, orchestrator, session, text: str) -> None:
+        orchestrator.asr.transcribe = AsyncMock(return_value=text)
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        session.transition_to(PipelineState.PROCESSING)
+        await orchestrator._run_pipeline(session)
+
+    async def test_recall_beyond_history_window(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, tmp_path
+    ):
+        mock_llm.config.max_history_turns = 1
+        longterm = LongTermMemory(LongTermConfig(data_dir=str(tmp_path)))
+        orchestrator = Orchestrator(mock_asr, mock_llm, mock_tts, sensor, longterm=longterm)
+
+        await self._turn(orchestrator, session, "我最喜欢的恐龙是霸王龙")
+        await self._turn(orchestrator, session, "你知道我喜欢什么恐龙吗")
+        # 上一轮原话仍在历史窗口内，不重复注入
+        assert session.recalled == []
+        await self._turn(orchestrator, session, "今天天气真好")
+        await self._turn(orchestrator, session, "再说说我喜欢的恐龙")
+        assert "主人最喜欢的恐龙是霸王龙" in session.recalled
+        longterm.close()
+
+    async def test_treehouse_not_remembered(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, tmp_path
+    ):
+        longterm = LongTermMemory(LongTermConfig(data_dir=str(tmp_path)))
+        orchestrator = Orchestrator(mock_asr, mock_llm, mock_tts, sensor, longterm=longterm)
+        session.treehouse_mode = True
+        await self._turn(orchestrator, session, "我喜欢恐龙")
+        assert not (tmp_path / session.user_id).exists()
+        longterm.close()
+
+
 class TestEmptyResults:
     """空结果处理。"""
 
@@ -450,6 +599,29 @@ class TestRandomFact:
         assert len(mock_ws.get_sent_json_messages()) == 0
         assert len(mock_ws.sent_bytes) == 0
 
+    async def test_push_random_fact_interrupted_by_audio_start(
+        self, orchestrator, session, mock_ws
+    ):
+        """冷知识播报中用户开口 → tts_cancel，进入录音。"""
+        started = asyncio.Event()
+
+        async def slow_fact(messages):
+            yield "蜂蜜永远不会变质！"
+            started.set()
+            await asyncio.sleep(10)
+            yield "[mood:surprised]"
+
+        orchestrator.llm.chat_stream = slow_fact
+        push = asyncio.create_task(orchestrator.push_random_fact(session))
+        await started.wait()
+
+        await orchestrator.handle_audio_start(session)
+        await asyncio.wait_for(push, 1)
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "tts_cancel"]
+        assert session.state == PipelineState.RECORDING
+
     async def test_push_random_fact_no_punct(self, orchestrator, session, mock_ws):
         """无标点冷知识也应正常处理。"""
 
@@ -469,3 +641,446 @@ class TestRandomFact:
         types = [m["type"] for m in sent]
         assert "tts_start" in types
         assert "tts_end" in types
+
+
+class TestFullDuplex:
+    """全双工：播报期间服务端检测打断。"""
+
+    @staticmethod
+    def _speech(ms: int = 32) -> bytes:
+        n = 16 * ms
+        return (np.where(np.arange(n) % 2 == 0, 1, -1) * 8000).astype(np.int16).tobytes()
+
+    async def _start_speaking(self, orchestrator, session) -> asyncio.Event:
+        started = asyncio.Event()
+
+        async def slow_tts(text):
+            started.set()
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                yield b"\x00" * 1024
+
+        orchestrator.tts.synthesize = slow_tts
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        await orchestrator.handle_audio_end(session)
+        await started.wait()
+        await asyncio.sleep(0.02)
+        assert session.state == PipelineState.SPEAKING
+
+    async def test_half_duplex_frames_buffered(self, orchestrator, session):
+        await orchestrator.handle_audio_frame(session, self._speech())
+        assert len(session.audio_buffer) == 1024
+
+    async def test_barge_in_cancels_and_records(self, orchestrator, session, mock_ws):
+        session.barge_in = BargeInDetector(DuplexConfig(), echo_window=0.7)
+        await self._start_speaking(orchestrator, session)
+        task = session.pipeline_task
+
+        # 播报期间的上行音频不进入录音缓冲
+        await orchestrator.handle_audio_frame(session, b"\x00" * 1024)
+        for _ in range(3):
+            await orchestrator.handle_audio_frame(session, self._speech())
+
+        assert task.done()
+        assert session.state == PipelineState.RECORDING
+        assert mock_ws.get_sent_messages_by_type("tts_cancel")
+        # 预录音频（含触发前的静音帧）并入新一轮录音
+        assert len(session.audio_buffer) == 4 * 1024
+
+        # 设备随后补发的 audio_start 不清空已录音频
+        await orchestrator.handle_audio_start(session)
+        assert len(session.audio_buffer) == 4 * 1024
+
+    async def test_tts_cancel_sent_before_teardown(self, orchestrator, session, mock_ws):
+        """tts_cancel 先于 LLM / TTS 任务收尾发出。"""
+        session.barge_in = BargeInDetector(DuplexConfig(), echo_window=0.7)
+        await self._start_speaking(orchestrator, session)
+        task = session.pipeline_task
+        done_at_cancel = []
+
+        original = mock_ws.send_text
+
+        async def send_text(data):
+            if '"tts_cancel"' in data:
+                done_at_cancel.append(task.done())
+            await original(data)
+
+        mock_ws.send_text = send_text
+        await orchestrator.cancel_pipeline(session)
+        assert done_at_cancel == [False]
+        assert task.done()
+
+    async def test_endpoint_starts_next_turn(self, orchestrator, session, mock_ws):
+        session.barge_in = BargeInDetector(DuplexConfig(), echo_window=0.7)
+        await self._start_speaking(orchestrator, session)
+        for _ in range(3):
+            await orchestrator.handle_audio_frame(session, self._speech())
+        assert session.state == PipelineState.RECORDING
+
+        # 尾部静音 700ms → 自动 audio_end
+        for _ in range(22):
+            await orchestrator.handle_audio_frame(session, b"\x00" * 1024)
+        assert session.state in (PipelineState.PROCESSING, PipelineState.SPEAKING)
+        assert session.pipeline_task is not None
+        await orchestrator.cancel_pipeline(session)
+
+
+class TestGovernor:
+    """全局准入控制与降级。"""
+
+    async def test_degraded_turn_limits_asr_and_llm(
+        self, mock_asr, mock_llm, mock_tts, sensor, session
+    ):
+        governor = PipelineGovernor(
+            GovernorConfig(short_reply_load=0, fast_asr_load=0, short_reply_max_tokens=32)
+        )
+        orchestrator = Orchestrator(mock_asr, mock_llm, mock_tts, sensor, governor=governor)
+        seen = {}
+
+        async def stream(messages, **options):
+            seen.update(options)
+            yield "好的。"
+
+        mock_llm.chat_stream = stream
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        await orchestrator.handle_audio_end(session)
+        await session.pipeline_task
+
+        assert seen == {"max_tokens": 32}
+        assert mock_asr.transcribe.call_args.kwargs == {"beam_size": 1}
+        assert session.last_trace.outcome == "ok"
+
+    async def test_overload_plays_cached_busy_reply(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, mock_ws
+    ):
+        governor = PipelineGovernor(
+            GovernorConfig(max_concurrent_turns=1, max_queue=0, busy_reply="忙")
+        )
+        orchestrator = Orchestrator(mock_asr, mock_llm, mock_tts, sensor, governor=governor)
+
+        async with governor.admit():  # 占满名额
+            session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+            session.state = PipelineState.RECORDING
+            await orchestrator.handle_audio_end(session)
+            await session.pipeline_task
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "text", "tts_end"]
+        assert mock_ws.get_sent_messages_by_type("text")[0]["content"] == "忙"
+        assert len(mock_ws.sent_bytes) > 0
+        mock_asr.transcribe.assert_not_called()
+        assert session.state == PipelineState.IDLE
+        assert session.last_trace.outcome == "shed"
+
+    async def test_busy_reply_after_tts_outage_at_warm(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, mock_ws
+    ):
+        """启动预合成时 TTS 全部失败（无音频），恢复后过载提示仍应有声音。"""
+        governor = PipelineGovernor(
+            GovernorConfig(max_concurrent_turns=1, max_queue=0, busy_reply="忙")
+        )
+        orchestrator = Orchestrator(mock_asr, mock_llm, mock_tts, sensor, governor=governor)
+        working = mock_tts.synthesize
+
+        async def outage(text):
+            return
+            yield b""
+
+        mock_tts.synthesize = outage
+        await orchestrator.warm()
+        mock_tts.synthesize = working
+
+        async with governor.admit():
+            session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+            session.state = PipelineState.RECORDING
+            await orchestrator.handle_audio_end(session)
+            await session.pipeline_task
+
+        assert mock_ws.get_sent_messages_by_type("text")[0]["content"] == "忙"
+        assert len(mock_ws.sent_bytes) > 0
+        assert session.last_trace.outcome == "shed"
+
+
+class TestDeadline:
+    """单轮预算：超时改播致歉提示。"""
+
+    @pytest.fixture
+    def tight(self, mock_asr, mock_llm, mock_tts, sensor):
+        return Orchestrator(
+            mock_asr,
+            mock_llm,
+            mock_tts,
+            sensor,
+            deadline_config=DeadlineConfig(turn_budget=0.1, short_reply_budget=0, apology="抱歉"),
+        )
+
+    async def _run(self, orchestrator, session):
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        await orchestrator.handle_audio_end(session)
+        await session.pipeline_task
+
+    async def test_slow_asr_plays_apology(self, tight, session, mock_ws):
+        async def slow_transcribe(_audio, **_):
+            await asyncio.sleep(1)
+            return "你好"
+
+        tight.asr.transcribe = slow_transcribe
+        await self._run(tight, session)
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "text", "tts_end"]
+        assert mock_ws.get_sent_messages_by_type("text")[0]["content"] == "抱歉"
+        assert session.last_trace.outcome == "deadline"
+        assert session.state == PipelineState.IDLE
+        assert session.chat_history == []
+
+    async def test_slow_tts_first_frame_apologizes(self, tight, session, mock_ws):
+        async def slow_synthesize(text):
+            if text == "抱歉":
+                yield b"\x00" * 1024
+                return
+            await asyncio.sleep(1)
+            yield b"\x00" * 1024
+
+        tight.tts.synthesize = slow_synthesize
+        await self._run(tight, session)
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "text", "tts_end"]
+        assert session.last_trace.outcome == "deadline"
+
+    async def test_budget_spent_in_governor_queue(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, mock_ws
+    ):
+        """排队等待准入期间预算耗尽：按超时处理（致歉），而非过载（忙碌提示）。"""
+        governor = PipelineGovernor(
+            GovernorConfig(max_concurrent_turns=1, queue_timeout=10, busy_reply="忙")
+        )
+        orchestrator = Orchestrator(
+            mock_asr,
+            mock_llm,
+            mock_tts,
+            sensor,
+            governor=governor,
+            deadline_config=DeadlineConfig(turn_budget=0.1, short_reply_budget=0, apology="抱歉"),
+        )
+        before = metrics.counter("turn_deadline_exceeded_total", stage="queue")
+
+        async with governor.admit():  # 占满名额
+            await self._run(orchestrator, session)
+
+        assert mock_ws.get_sent_messages_by_type("text")[0]["content"] == "抱歉"
+        assert session.last_trace.outcome == "deadline"
+        assert metrics.counter("turn_deadline_exceeded_total", stage="queue") == before + 1
+        mock_asr.transcribe.assert_not_called()
+
+    async def test_apology_after_filler_no_duplicate_start(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, mock_ws
+    ):
+        """填充提示已发出 tts_start 后超时：致歉接在同一段播报内。"""
+        orchestrator = Orchestrator(
+            mock_asr,
+            mock_llm,
+            mock_tts,
+            sensor,
+            deadline_config=DeadlineConfig(turn_budget=0.1, short_reply_budget=0, apology="抱歉"),
+            filler_config=FillerConfig(delay_ms=0),
+        )
+
+        async def stuck(messages, **options):
+            await asyncio.sleep(1)
+            yield "太慢了。"
+
+        orchestrator.llm.chat_stream = stuck
+        await self._run(orchestrator, session)
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "text", "tts_end"]
+        assert mock_ws.get_sent_messages_by_type("text")[0]["content"] == "抱歉"
+
+    async def test_budget_only_covers_first_audio(self, tight, session, mock_ws):
+        """开口之后 LLM 变慢不再触发超时。"""
+        async def stream(messages, **options):
+            yield "你好。"
+            await asyncio.sleep(0.2)
+            yield "再见。"
+
+        tight.llm.chat_stream = stream
+        await self._run(tight, session)
+        assert session.last_trace.outcome == "ok"
+        assert mock_ws.get_sent_messages_by_type("text")[0]["content"] == "你好。再见。"
+
+    async def test_low_budget_shortens_reply(self, mock_asr, mock_llm, mock_tts, sensor, session):
+        orchestrator = Orchestrator(
+            mock_asr,
+            mock_llm,
+            mock_tts,
+            sensor,
+            governor=PipelineGovernor(GovernorConfig(short_reply_max_tokens=16)),
+            deadline_config=DeadlineConfig(turn_budget=5, short_reply_budget=10),
+        )
+        seen = {}
+
+        async def stream(messages, **options):
+            seen.update(options)
+            yield "好。"
+
+        orchestrator.llm.chat_stream = stream
+        await self._run(orchestrator, session)
+        assert seen == {"max_tokens": 16}
+
+
+class TestFiller:
+    """LLM 思考期间的填充提示。"""
+
+    CUE = b"\x07" * 1024
+
+    @pytest.fixture
+    def filling(self, mock_asr, mock_llm, mock_tts, sensor):
+        async def synthesize(text):
+            yield self.CUE if text in ("嗯……", "让我想想。") else b"\x00" * 1024
+
+        mock_tts.synthesize = synthesize
+        return Orchestrator(
+            mock_asr, mock_llm, mock_tts, sensor, filler_config=FillerConfig(delay_ms=20)
+        )
+
+    async def _run(self, orchestrator, session):
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        await orchestrator.handle_audio_end(session)
+        await session.pipeline_task
+
+    async def test_fast_answer_no_filler(self, filling, session, mock_ws):
+        await self._run(filling, session)
+        assert self.CUE not in mock_ws.sent_bytes
+
+    async def test_slow_llm_spliced_after_filler(self, filling, session, mock_ws):
+        async def slow(messages, **options):
+            await asyncio.sleep(0.1)
+            yield "你好。[mood:happy]"
+
+        filling.llm.chat_stream = slow
+        await self._run(filling, session)
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "text", "tts_end"]
+        assert mock_ws.sent_bytes[0] == self.CUE
+        assert len(mock_ws.sent_bytes) > 1
+        assert session.last_trace.outcome == "ok"
+        assert session.mood == "happy"
+
+    async def test_filler_then_no_speech_closes(self, filling, session, mock_ws):
+        async def slow_empty(_audio, **_):
+            await asyncio.sleep(0.1)
+            return ""
+
+        filling.asr.transcribe = slow_empty
+        await self._run(filling, session)
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "tts_end"]
+        assert session.state == PipelineState.IDLE
+
+    async def test_treehouse_no_filler(self, filling, session, mock_ws):
+        session.treehouse_mode = True
+
+        async def slow(_audio, **_):
+            await asyncio.sleep(0.1)
+            return "秘密"
+
+        filling.asr.transcribe = slow
+        await self._run(filling, session)
+        assert mock_ws.sent_text == []
+
+    async def test_interrupt_during_filler(self, filling, session, mock_ws):
+        async def slow(messages, **options):
+            await asyncio.sleep(10)
+            yield "never"
+
+        filling.llm.chat_stream = slow
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        await filling.handle_audio_end(session)
+        await asyncio.sleep(0.1)
+        assert session.state == PipelineState.SPEAKING
+
+        await filling.handle_audio_start(session)
+        assert mock_ws.get_sent_messages_by_type("tts_cancel")
+        assert session.state == PipelineState.RECORDING
+
+
+class TestStageGraph:
+    """阶段图：文本阶段与阶段排队上限。"""
+
+    async def _run(self, orchestrator, session):
+        session.append_audio(np.zeros(16000, dtype=np.int16).tobytes())
+        session.state = PipelineState.RECORDING
+        await orchestrator.handle_audio_end(session)
+        await session.pipeline_task
+
+    async def test_hallucination_filtered(self, orchestrator, session, mock_ws, mock_asr, mock_llm):
+        mock_asr.transcribe.return_value = "谢谢观看！"
+        mock_llm.chat_stream = MagicMock()
+        await self._run(orchestrator, session)
+        mock_llm.chat_stream.assert_not_called()
+        assert mock_ws.sent_text == []
+        assert session.last_trace.outcome == "filtered"
+        assert session.state == PipelineState.IDLE
+
+    async def test_stop_intent_skips_llm(self, orchestrator, session, mock_ws, mock_asr, mock_llm):
+        mock_asr.transcribe.return_value = "别说了。"
+        mock_llm.chat_stream = MagicMock()
+        await self._run(orchestrator, session)
+        mock_llm.chat_stream.assert_not_called()
+        assert session.last_trace.outcome == "stopped"
+        assert session.chat_history == []
+
+    async def test_text_stages_can_be_disabled(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, mock_ws
+    ):
+        stages = StageGraph(PipelineConfig(
+            stages=["vad", "asr", "llm", "segment", "tts", "encode", "send"]
+        ))
+        orchestrator = Orchestrator(mock_asr, mock_llm, mock_tts, sensor, stages=stages)
+        mock_asr.transcribe.return_value = "别说了。"
+        await self._run(orchestrator, session)
+        assert session.last_trace.outcome == "ok"
+
+    async def test_asr_queue_full_plays_busy_reply(
+        self, mock_asr, mock_llm, mock_tts, sensor, session, mock_ws
+    ):
+        stages = StageGraph(PipelineConfig(
+            asr=StageConfig(executor="thread", concurrency=1, queue=0)
+        ))
+        orchestrator = Orchestrator(
+            mock_asr,
+            mock_llm,
+            mock_tts,
+            sensor,
+            governor=PipelineGovernor(GovernorConfig(busy_reply="忙")),
+            stages=stages,
+        )
+        release = asyncio.Event()
+        holder = asyncio.create_task(stages["asr"].run(release.wait))
+        await asyncio.sleep(0)
+        try:
+            await self._run(orchestrator, session)
+        finally:
+            release.set()
+            await holder
+            stages.close()
+
+        mock_asr.transcribe.assert_not_called()
+        assert mock_ws.get_sent_messages_by_type("text")[0]["content"] == "忙"
+        assert session.last_trace.outcome == "shed"
+
+    async def test_stage_metrics_recorded(self, orchestrator, session):
+        before = metrics.counter("stage_items_total", stage="llm")
+        await self._run(orchestrator, session)
+        assert metrics.counter("stage_items_total", stage="llm") > before
+        for name in ("vad", "asr", "filter", "intent", "segment", "tts", "encode", "send"):
+            assert metrics.histogram("stage_seconds", stage=name) is not None
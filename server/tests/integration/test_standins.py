@@ -0,0 +1,147 @@
+"""集成测试：真实客户端代码经网络访问本地替身服务（Ollama / CosyVoice / 天气 / MQTT）。"""
+
+from __future__ import annotations
+
+import json
+import time
+
+import aiomqtt
+import httpx
+import pytest
+
+from standins import cosyvoice, ollama, weather
+from standins.mqtt import MQTTBroker, topic_matches
+from standins.serve import serve_app
+from wallace.care.scheduler import CareScheduler
+from wallace.config import CareConfig, LLMConfig, WeatherConfig
+from wallace.pipeline.llm import LLMClient
+from wallace.pipeline.tts import FRAME_SIZE, CosyVoiceBackend
+
+
+class TestOllama:
+    """LLMClient ↔ Ollama 替身。"""
+
+    async def test_stream_and_health(self):
+        profile = ollama.OllamaProfile(reply="你好呀[mood:happy]", tokens_per_second=0)
+        async with serve_app(ollama.create_app(profile)) as url:
+            client = LLMClient(LLMConfig(base_url=url, max_tokens=50))
+            await client.start()
+            assert client.is_healthy
+            tokens = [t async for t in client.chat_stream([{"role": "user", "content": "hi"}])]
+            await client.close()
+        assert "".join(tokens) == "你好呀[mood:happy]"
+        assert profile.requests[0]["options"]["num_predict"] == 50
+
+    async def test_ttft_and_rate(self):
+        profile = ollama.OllamaProfile(reply="一二三四五六七八", ttft=0.2, tokens_per_second=20)
+        async with serve_app(ollama.create_app(profile)) as url:
+            client = LLMClient(LLMConfig(base_url=url))
+            await client.start()
+            start = time.monotonic()
+            stamps = [time.monotonic() async for _ in client.chat_stream([])]
+            await client.close()
+        assert len(stamps) == 4
+        assert 0.2 <= stamps[0] - start < 0.4
+        assert stamps[-1] - stamps[0] == pytest.approx(3 / 20, abs=0.05)
+
+    async def test_max_tokens_truncates(self):
+        profile = ollama.OllamaProfile(reply="一二三四五六", tokens_per_second=0, ttft=0)
+        async with serve_app(ollama.create_app(profile)) as url:
+            client = LLMClient(LLMConfig(base_url=url))
+            await client.start()
+            tokens = [t async for t in client.chat_stream([], max_tokens=2)]
+            await client.close()
+        assert tokens == ["一二", "三四"]
+
+    async def test_inline_reasoning(self):
+        profile = ollama.OllamaProfile(
+            reply="好", reasoning="inline", reasoning_text="想", tokens_per_second=0, ttft=0
+        )
+        async with serve_app(ollama.create_app(profile)) as url:
+            client = LLMClient(LLMConfig(base_url=url))
+            await client.start()
+            text = "".join([t async for t in client.chat_stream([])])
+            await client.close()
+        assert text == "<think>想</think>好"
+
+    async def test_field_reasoning_ndjson(self):
+        profile = ollama.OllamaProfile(
+            reply="好", reasoning="field", reasoning_text="想想", tokens_per_second=0, ttft=0
+        )
+        async with serve_app(ollama.create_app(profile)) as url, httpx.AsyncClient() as http:
+            body = {"model": "m", "messages": [], "think": True}
+            resp = await http.post(f"{url}/api/chat", json=body)
+        chunks = [json.loads(line) for line in resp.text.splitlines()]
+        assert chunks[0]["message"]["thinking"] == "想想"
+        assert chunks[1]["message"]["content"] == "好"
+        assert chunks[-1]["done"] is True
+
+
+class TestCosyVoice:
+    """CosyVoiceBackend ↔ CosyVoice 替身。"""
+
+    async def test_chunked_pcm(self):
+        profile = cosyvoice.CosyVoiceProfile(first_chunk=0, rtf=0, chunk_ms=100)
+        async with serve_app(cosyvoice.create_app(profile)) as url:
+            backend = CosyVoiceBackend(url, voice="v1")
+            frames = [bytes(f) async for f in backend.synthesize("你好世界")]
+        expected = len(cosyvoice.synthesize_pcm("你好世界", profile))
+        assert len(frames) == -(-expected // FRAME_SIZE)
+        assert profile.requests == [{"text": "你好世界", "voice": "v1"}]
+
+    async def test_failure_raises(self):
+        profile = cosyvoice.CosyVoiceProfile(fail_status=503)
+        async with serve_app(cosyvoice.create_app(profile)) as url:
+            backend = CosyVoiceBackend(url)
+            with pytest.raises(httpx.HTTPStatusError):
+                [f async for f in backend.synthesize("你好")]
+
+
+class TestWeather:
+    """CareScheduler 天气获取 ↔ 天气替身。"""
+
+    @staticmethod
+    def _scheduler(url: str, **kwargs) -> CareScheduler:
+        config = WeatherConfig(api_url=f"{url}/v3/weather/now.json", api_key="k", **kwargs)
+        return CareScheduler(CareConfig(), config, {}, None, None)
+
+    async def test_fetch(self):
+        async with serve_app(weather.create_app(weather.WeatherProfile(latency=0))) as url:
+            assert await self._scheduler(url, city="shanghai")._fetch_weather() == "多云，28°C"
+
+    async def test_unknown_city_degrades(self):
+        async with serve_app(weather.create_app(weather.WeatherProfile(latency=0))) as url:
+            assert await self._scheduler(url, city="atlantis")._fetch_weather() == ""
+
+
+class TestMQTTBroker:
+    """aiomqtt 客户端 ↔ MQTT 替身。"""
+
+    def test_topic_matches(self):
+        assert topic_matches("wallace/#", "wallace/light/on")
+        assert topic_matches("wallace/+/on", "wallace/light/on")
+        assert not topic_matches("wallace/+", "wallace/light/on")
+        assert not topic_matches("wallace/light", "wallace")
+
+    async def test_publish_subscribe(self):
+        async with (
+            MQTTBroker() as broker,
+            aiomqtt.Client("127.0.0.1", broker.port) as sub,
+            aiomqtt.Client("127.0.0.1", broker.port) as pub,
+        ):
+            await sub.subscribe("wallace/#")
+            await pub.publish("wallace/light/on", b'{"brightness": 50}', qos=1)
+            assert await broker.next_message() == ("wallace/light/on", b'{"brightness": 50}')
+            message = await anext(aiter(sub.messages))
+            assert str(message.topic) == "wallace/light/on"
+            assert message.payload == b'{"brightness": 50}'
+
+    async def test_retained(self):
+        async with MQTTBroker() as broker:
+            async with aiomqtt.Client("127.0.0.1", broker.port) as pub:
+                await pub.publish("wallace/ac/state", b"cool", retain=True)
+                await broker.next_message()
+            async with aiomqtt.Client("127.0.0.1", broker.port) as sub:
+                await sub.subscribe("wallace/ac/+")
+                message = await anext(aiter(sub.messages))
+                assert message.payload == b"cool"
@@ -2,19 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from wallace.config import SensorConfig
+from wallace.config import MemoryConfig, ResumeConfig, SensorConfig
+from wallace.memory.persister import MemoryPersister
+from wallace.memory.store import MemoryStore
 from wallace.pipeline.orchestrator import Orchestrator
 from wallace.sensor import SensorProcessor
 from wallace.config import MQTTConfig
 from wallace.smarthome.mqtt import MQTTManager
 from wallace.wakeword import WakewordVerifier
+from wallace.ws.binary import SUBPROTOCOL, encode_audio_in, encode_telemetry
 from wallace.ws.handler import WebSocketHandler
-from wallace.ws.session import Session
+from wallace.ws.protocol import ProximityMessage, SensorMessage
+from wallace.ws.resume import ResumeManager
+from wallace.ws.session import Session, UserMemory
+from tests.conftest import MockWebSocket
 
 
 @pytest.fixture
@@ -98,6 +105,21 @@ class TestInvalidMessages:
 
         await handler.handle_connection(mock_ws, "u1")
 
+    async def test_invalid_message_skipped_and_loop_continues(self, handler, mock_ws):
+        """字段不合法的消息被丢弃，后续消息照常处理。"""
+        mock_ws.inject_text(json.dumps({"type": "sensor", "temp": "hot"}))
+        mock_ws.inject_text(json.dumps({"type": "ping"}))
+        mock_ws.inject_disconnect()
+
+        await handler.handle_connection(mock_ws, "u1")
+        assert len(mock_ws.get_sent_messages_by_type("pong")) == 1
+
+    async def test_unrouted_type_ignored(self, handler, mock_ws):
+        """已定义但无处理器的类型（image）校验后忽略。"""
+        session = Session("u1", mock_ws)
+        await handler._route_json(session, json.dumps({"type": "image", "data": "AAAA"}))
+        assert mock_ws.sent_text == []
+
 
 class TestConnectionLifecycle:
     """连接生命周期。"""
@@ -131,6 +153,78 @@ class TestConnectionLifecycle:
         assert restore_msgs[0]["treehouse"] is True
 
 
+class TestRegistryRestore:
+    """注册表保存的状态在重连（上次连接已结束或在其他 worker）时恢复。"""
+
+    async def test_restore_after_disconnect(self, handler, sessions):
+        first = MockWebSocket()
+        first.inject_text(json.dumps(
+            {"type": "event", "event": "personality_switch", "value": "cool"}
+        ))
+        first.inject_text(json.dumps({"type": "config", "tts_backend": "piper"}))
+        first.inject_disconnect()
+        await handler.handle_connection(first, "u1")
+        assert first.get_sent_messages_by_type("session_restore") == []
+        assert "u1" not in sessions
+
+        second = MockWebSocket()
+        second.inject_disconnect()
+        await handler.handle_connection(second, "u1")
+        restore = second.get_sent_messages_by_type("session_restore")
+        assert len(restore) == 1
+        assert restore[0]["personality"] == "cool"
+        assert restore[0]["tts_backend"] == "piper"
+
+
+class TestMemoryPersistence:
+    """连接时加载用户记忆，断开时强制写回。"""
+
+    @pytest.fixture
+    async def persister(self, tmp_path):
+        p = MemoryPersister(MemoryConfig(data_dir=str(tmp_path), sync_interval=3600))
+        yield p
+        await p.close()
+
+    async def test_load_and_flush_on_disconnect(
+        self, sessions, orchestrator, sensor, wakeword, mqtt, persister, tmp_path
+    ):
+        MemoryStore("u1", tmp_path).save(UserMemory(nickname="小明"))
+        handler = WebSocketHandler(
+            sessions, orchestrator, sensor, wakeword, mqtt, memory=persister
+        )
+        ws = MockWebSocket()
+        task = asyncio.create_task(handler.handle_connection(ws, "u1"))
+        while "u1" not in sessions:
+            await asyncio.sleep(0.01)
+        memory = sessions["u1"].memory
+        assert memory.nickname == "小明"
+        memory.record_interaction()
+
+        ws.inject_disconnect()
+        await task
+        data = json.loads((tmp_path / "u1.json").read_text(encoding="utf-8"))
+        assert data["nickname"] == "小明"
+        assert data["interaction_count"] == 1
+        assert not persister.is_dirty("u1")
+
+    async def test_reconnect_reuses_cached_memory(
+        self, sessions, orchestrator, sensor, wakeword, mqtt, persister
+    ):
+        handler = WebSocketHandler(
+            sessions, orchestrator, sensor, wakeword, mqtt, memory=persister
+        )
+        seen = []
+        for _ in range(2):
+            ws = MockWebSocket()
+            task = asyncio.create_task(handler.handle_connection(ws, "u1"))
+            while "u1" not in sessions:
+                await asyncio.sleep(0.01)
+            seen.append(sessions["u1"].memory)
+            ws.inject_disconnect()
+            await task
+        assert seen[0] is seen[1]
+
+
 class TestHeartbeat:
     """心跳处理。"""
 
@@ -164,6 +258,63 @@ class TestEventRouting:
         await handler.handle_connection(mock_ws, "u1")
 
 
+class TestAudioCodecNegotiation:
+    """config 消息协商下行音频编码。"""
+
+    async def test_negotiates_first_supported_codec(self, handler, sessions, mock_ws):
+        mock_ws.inject_text(json.dumps({"type": "config", "audio_codecs": ["opus", "adpcm"]}))
+        mock_ws.inject_disconnect()
+
+        await handler.handle_connection(mock_ws, "u1")
+
+        acks = mock_ws.get_sent_messages_by_type("audio_config")
+        assert acks == [{"type": "audio_config", "codec": "adpcm", "frames_per_message": 1}]
+
+    async def test_unsupported_codecs_fall_back_to_pcm(self, handler, sessions, mock_ws):
+        mock_ws.inject_text(json.dumps({"type": "config", "audio_codecs": ["opus"]}))
+        mock_ws.inject_disconnect()
+
+        await handler.handle_connection(mock_ws, "u1")
+
+        acks = mock_ws.get_sent_messages_by_type("audio_config")
+        assert acks[0]["codec"] == "pcm"
+
+    async def test_frames_per_message_capped_by_server(self, handler, sessions, mock_ws):
+        mock_ws.inject_text(json.dumps({"type": "config", "frames_per_message": 64}))
+        mock_ws.inject_disconnect()
+
+        await handler.handle_connection(mock_ws, "u1")
+
+        acks = mock_ws.get_sent_messages_by_type("audio_config")
+        assert acks[0] == {"type": "audio_config", "codec": "pcm", "frames_per_message": 8}
+
+    async def test_audio_credits_enable_flow_control(self, handler, mock_ws):
+        session = Session("u1", mock_ws)
+        await handler._route_json(session, json.dumps({"type": "config", "audio_credits": 16}))
+        assert session.audio_pacer.credits_enabled
+        assert session.audio_pacer.credits == 16
+
+        session.audio_pacer.on_sent(10)
+        await handler._route_json(session, json.dumps({"type": "audio_credit", "frames": 4}))
+        assert session.audio_pacer.credits == 10
+
+    async def test_trace_opt_in(self, handler, mock_ws):
+        session = Session("u1", mock_ws)
+        await handler._route_json(session, json.dumps({"type": "config", "trace": True}))
+        assert session.trace_to_device
+        assert mock_ws.get_sent_messages_by_type("audio_config") == []
+
+    async def test_full_duplex_toggle(self, handler, mock_ws):
+        session = Session("u1", mock_ws)
+        await handler._route_json(session, json.dumps({"type": "config", "full_duplex": True}))
+        assert session.barge_in is not None
+        # 回声窗口 = 抖动缓冲 400ms + 回声拖尾 300ms
+        assert session.barge_in.echo_window == pytest.approx(0.7)
+
+        await handler._route_json(session, json.dumps({"type": "config", "full_duplex": False}))
+        assert session.barge_in is None
+
+
 class TestLocalCmd:
     """智能家居本地命令。"""
 
@@ -177,3 +328,265 @@ class TestLocalCmd:
         assert len(result_msgs) == 1
         assert result_msgs[0]["action"] == "light_on"
         assert result_msgs[0]["success"] is True
+
+
+class TestBinaryProtocol:
+    """子协议 wallace.v2：二进制帧按通道分发。"""
+
+    async def test_negotiated_via_subprotocol(self, handler, mock_ws):
+        mock_ws.scope["subprotocols"] = ["wallace.v1", SUBPROTOCOL]
+        handler._orchestrator.handle_audio_frame = AsyncMock()
+        mock_ws.inject_bytes(encode_audio_in(b"\x01" * 1024))
+        mock_ws.inject_text(json.dumps({"type": "ping"}))  # 控制消息仍为 JSON
+        mock_ws.inject_disconnect()
+
+        await handler.handle_connection(mock_ws, "u1")
+
+        assert mock_ws.subprotocol == SUBPROTOCOL
+        session, pcm = handler._orchestrator.handle_audio_frame.call_args.args
+        assert session.protocol == 2
+        assert pcm == b"\x01" * 1024
+        assert len(mock_ws.get_sent_messages_by_type("pong")) == 1
+
+    async def test_v1_by_default(self, handler, mock_ws):
+        handler._orchestrator.handle_audio_frame = AsyncMock()
+        mock_ws.inject_bytes(b"\x01" * 1024)
+        mock_ws.inject_disconnect()
+
+        await handler.handle_connection(mock_ws, "u1")
+
+        assert mock_ws.subprotocol is None
+        session, pcm = handler._orchestrator.handle_audio_frame.call_args.args
+        assert session.protocol == 1
+        assert pcm == b"\x01" * 1024
+
+    async def test_disabled_by_config(
+        self, sessions, orchestrator, sensor, wakeword, mqtt, mock_ws
+    ):
+        handler = WebSocketHandler(
+            sessions, orchestrator, sensor, wakeword, mqtt, protocol_v2=False
+        )
+        mock_ws.scope["subprotocols"] = [SUBPROTOCOL]
+        mock_ws.inject_disconnect()
+        await handler.handle_connection(mock_ws, "u1")
+        assert mock_ws.subprotocol is None
+
+    async def test_telemetry_frames_routed(self, handler, mock_ws):
+        session = Session("u1", mock_ws)
+        session.protocol = 2
+        await handler._route_binary(session, encode_telemetry(
+            SensorMessage(temp=26.5, humidity=60.0, light=300.0, air_quality=50.0)
+        ))
+        await handler._route_binary(session, encode_telemetry(
+            ProximityMessage(distance=120.0, user_present=False)
+        ))
+        assert session.sensor_cache.temp == 26.5
+        assert session.sensor_cache.air_quality == 50.0
+        assert session.proximity_present is False
+
+    async def test_invalid_frame_skipped(self, handler, mock_ws):
+        mock_ws.scope["subprotocols"] = [SUBPROTOCOL]
+        mock_ws.inject_bytes(b"\x7f\x00")
+        mock_ws.inject_bytes(b"\x10\x00")  # sensor 负载长度不符
+        mock_ws.inject_text(json.dumps({"type": "ping"}))
+        mock_ws.inject_disconnect()
+
+        await handler.handle_connection(mock_ws, "u1")
+        assert len(mock_ws.get_sent_messages_by_type("pong")) == 1
+
+
+class TestResume:
+    """断线续连：流水线在后台继续，带 token 重连后补发。"""
+
+    @pytest.fixture
+    def resume(self):
+        manager = ResumeManager(ResumeConfig(grace_seconds=5))
+        yield manager
+        manager.close()
+
+    @pytest.fixture
+    def resumable(self, sessions, orchestrator, sensor, wakeword, mqtt, resume):
+        return WebSocketHandler(sessions, orchestrator, sensor, wakeword, mqtt, resume=resume)
+
+    @staticmethod
+    async def _connect(handler, ws, sessions, **kwargs) -> asyncio.Task:
+        task = asyncio.create_task(handler.handle_connection(ws, "u1", **kwargs))
+        while sessions.get("u1") is None or sessions["u1"].ws is not ws:
+            await asyncio.sleep(0)
+        return task
+
+    @staticmethod
+    async def _opt_in(ws) -> dict:
+        """设备以 config.resume 开启续连，返回 resume_token 消息。"""
+        ws.inject_text(json.dumps({"type": "config", "resume": True}))
+        while not ws.get_sent_messages_by_type("resume_token"):
+            await asyncio.sleep(0)
+        return ws.get_sent_messages_by_type("resume_token")[0]
+
+    @staticmethod
+    def _start_turn(session: Session, n: int) -> asyncio.Event:
+        """模拟进行中的一轮：依次发送 n 条文本。"""
+        step = asyncio.Event()
+
+        async def turn():
+            for i in range(n):
+                await step.wait()
+                step.clear()
+                await session.outbox.send_text(json.dumps({"type": "text", "content": str(i)}))
+
+        session.pipeline_task = asyncio.create_task(turn())
+        return step
+
+    @staticmethod
+    async def _advance(step: asyncio.Event, times: int = 1) -> None:
+        for _ in range(times):
+            step.set()
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+    async def test_resume_replays_missed_messages(self, resumable, sessions, resume, mock_ws):
+        conn = await self._connect(resumable, mock_ws, sessions)
+        token_msg = await self._opt_in(mock_ws)
+        assert token_msg["resumed"] is False
+        session = sessions["u1"]
+        step = self._start_turn(session, 5)
+        await self._advance(step, 2)
+
+        # 设备只收到了 resume_token + 第一条文本，随后断网
+        ack = 2
+        mock_ws.inject_disconnect()
+        await conn
+        assert len(resume) == 1
+        assert not session.pipeline_task.done()  # 流水线未被取消
+        await self._advance(step, 3)
+        await session.pipeline_task
+
+        ws2 = MockWebSocket()
+        conn2 = await self._connect(
+            resumable, ws2, sessions, resume_token=token_msg["token"], ack=ack
+        )
+        await session.outbox.drain()
+        assert sessions["u1"] is session
+        contents = [m.get("content") for m in ws2.get_sent_json_messages()]
+        assert contents == ["1", "2", "3", "4", None]
+        new_token = ws2.get_sent_json_messages()[-1]
+        assert new_token["type"] == "resume_token"
+        assert new_token["resumed"] is True
+        assert new_token["token"] != token_msg["token"]
+
+        ws2.inject_disconnect()
+        await conn2
+        assert "u1" not in sessions  # 流水线已结束，断开即清理
+
+    async def test_resume_replays_audio_within_jitter_window(
+        self, resumable, sessions, resume, mock_ws
+    ):
+        """断线期间积压的音频不一次性补发：只补发抖动缓冲内的部分并计入播放时钟。"""
+        conn = await self._connect(resumable, mock_ws, sessions)
+        token = (await self._opt_in(mock_ws))["token"]
+        session = sessions["u1"]
+        mock_ws.inject_disconnect()
+        session.pipeline_task = asyncio.create_task(asyncio.sleep(10))  # 进行中的一轮
+        await conn
+        for _ in range(250):  # 约 8 秒音频，每条 1 帧
+            await session.outbox.send_bytes(b"\x00" * 1024, frames=1)
+
+        ws2 = MockWebSocket()
+        conn2 = await self._connect(resumable, ws2, sessions, resume_token=token, ack=1)
+        await session.outbox.drain()
+        capacity = session.audio_pacer.capacity()
+        assert capacity == 12  # 默认 400ms
+        assert len(ws2.sent_bytes) == capacity
+        assert session.audio_pacer.buffered() == pytest.approx(capacity * 0.032, abs=0.02)
+
+        session.pipeline_task.cancel()
+        ws2.inject_disconnect()
+        await conn2
+
+    async def test_resume_cancels_grace_timer(
+        self, sessions, orchestrator, sensor, wakeword, mqtt, mock_ws
+    ):
+        """续连后原脱离计时不再触发，会话与进行中的一轮不被清理。"""
+        resume = ResumeManager(ResumeConfig(grace_seconds=0.05))
+        handler = WebSocketHandler(sessions, orchestrator, sensor, wakeword, mqtt, resume=resume)
+        conn = await self._connect(handler, mock_ws, sessions)
+        token = (await self._opt_in(mock_ws))["token"]
+        session = sessions["u1"]
+        self._start_turn(session, 5)
+        mock_ws.inject_disconnect()
+        await conn
+        assert len(resume) == 1
+
+        ws2 = MockWebSocket()
+        conn2 = await self._connect(handler, ws2, sessions, resume_token=token, ack=1)
+        assert len(resume) == 0
+        await asyncio.sleep(0.15)
+        assert sessions["u1"] is session
+        assert not session.outbox._closed
+        assert not session.pipeline_task.done()
+
+        ws2.inject_disconnect()
+        await conn2
+        resume.close()
+        session.pipeline_task.cancel()
+
+    async def test_takeover_half_open_connection(self, resumable, sessions, mock_ws):
+        """原连接尚未判定断开时，带 token 的新连接直接接管。"""
+        conn = await self._connect(resumable, mock_ws, sessions)
+        token = (await self._opt_in(mock_ws))["token"]
+        session = sessions["u1"]
+
+        ws2 = MockWebSocket()
+        conn2 = await self._connect(resumable, ws2, sessions, resume_token=token, ack=1)
+        assert mock_ws.closed
+        mock_ws.inject_disconnect()
+        await conn
+        assert sessions["u1"] is session  # 旧连接结束不影响接管后的会话
+
+        ws2.inject_disconnect()
+        await conn2
+        assert "u1" not in sessions
+
+    async def test_unknown_token_starts_new_session(self, resumable, sessions, mock_ws):
+        mock_ws.inject_disconnect()
+        await resumable.handle_connection(mock_ws, "u1", resume_token="bogus", ack=3)
+        msgs = mock_ws.get_sent_messages_by_type("resume_token")
+        assert msgs[0]["resumed"] is False
+
+    async def test_idle_disconnect_not_detached(self, resumable, sessions, resume, mock_ws):
+        mock_ws.inject_text(json.dumps({"type": "config", "resume": True}))
+        mock_ws.inject_disconnect()
+        await resumable.handle_connection(mock_ws, "u1")
+        assert len(mock_ws.get_sent_messages_by_type("resume_token")) == 1
+        assert len(resume) == 0
+        assert "u1" not in sessions
+
+    async def test_not_detached_without_opt_in(self, resumable, sessions, resume, mock_ws):
+        conn = await self._connect(resumable, mock_ws, sessions)
+        session = sessions["u1"]
+        self._start_turn(session, 5)
+        mock_ws.inject_disconnect()
+        await conn
+        assert mock_ws.get_sent_messages_by_type("resume_token") == []
+        assert len(resume) == 0
+        assert session.pipeline_task is None  # 按原行为取消
+
+    async def test_grace_expiry_cancels_turn(
+        self, sessions, orchestrator, sensor, wakeword, mqtt, mock_ws
+    ):
+        resume = ResumeManager(ResumeConfig(grace_seconds=0.01))
+        handler = WebSocketHandler(sessions, orchestrator, sensor, wakeword, mqtt, resume=resume)
+        conn = await self._connect(handler, mock_ws, sessions)
+        await self._opt_in(mock_ws)
+        session = sessions["u1"]
+        self._start_turn(session, 5)
+        mock_ws.inject_disconnect()
+        await conn
+
+        task = session.pipeline_task
+        for _ in range(100):
+            if "u1" not in sessions:
+                break
+            await asyncio.sleep(0.01)
+        assert "u1" not in sessions
+        assert task.cancelled()
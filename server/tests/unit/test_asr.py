@@ -57,6 +57,23 @@ class TestASREngine:
             await engine.transcribe(audio)
             mock_thread.assert_called_once()
 
+    async def test_transcribe_uses_given_executor(self, asr_config):
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        engine = ASREngine(asr_config, executor=executor)
+        mock_segment = MagicMock()
+        mock_segment.text = "你好"
+        engine._model = MagicMock()
+        engine._model.transcribe.return_value = ([mock_segment], None)
+
+        try:
+            with patch("asyncio.to_thread", new_callable=AsyncMock) as mock_thread:
+                assert await engine.transcribe(np.zeros(16000, dtype=np.float32)) == "你好"
+                mock_thread.assert_not_called()
+        finally:
+            executor.shutdown()
+
     async def test_transcribe_not_loaded_raises(self, asr_config):
         engine = ASREngine(asr_config)
         # _model is None
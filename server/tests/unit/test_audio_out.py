@@ -0,0 +1,59 @@
+"""测试 pipeline/audio_out.py — 编码、多帧打包、流量统计。"""
+
+from __future__ import annotations
+
+import pytest
+
+from wallace.pipeline.audio_out import send_audio
+from wallace.pipeline.codec import ADPCM_BLOCK_BYTES
+from wallace.ws.binary import AUDIO_OUT_HEADER
+
+
+async def _frames(n: int, size: int = 1024):
+    for i in range(n):
+        yield bytes([i]) * size
+
+
+class TestPacking:
+    """多帧打包为一条 WebSocket 消息。"""
+
+    async def test_one_frame_per_message_by_default(self, session, mock_ws):
+        sent = await send_audio(session, _frames(3))
+        assert sent == 3
+        assert [bytes(b) for b in mock_ws.sent_bytes] == [bytes([i]) * 1024 for i in range(3)]
+
+    @pytest.mark.parametrize("n,per_message,expected", [
+        (8, 4, [4096, 4096]),
+        (5, 4, [4096, 1024]),
+        (3, 8, [3072]),
+    ])
+    async def test_pack_frames(self, session, mock_ws, n, per_message, expected):
+        session.frames_per_message = per_message
+        sent = await send_audio(session, _frames(n))
+        assert sent == n
+        assert [len(b) for b in mock_ws.sent_bytes] == expected
+        assert b"".join(mock_ws.sent_bytes) == b"".join(bytes([i]) * 1024 for i in range(n))
+        assert session.audio_messages_sent == len(expected)
+
+    async def test_adpcm_packed(self, session, mock_ws):
+        session.set_audio_codec("adpcm")
+        session.frames_per_message = 4
+        await send_audio(session, _frames(20))
+        assert [len(b) for b in mock_ws.sent_bytes] == [4 * 4 * ADPCM_BLOCK_BYTES] * 5
+        assert session.audio_bytes_raw == 20 * 1024
+        assert session.audio_bytes_wire == 20 * 4 * ADPCM_BLOCK_BYTES
+
+    async def test_v2_channel_header(self, session, mock_ws):
+        """wallace.v2 连接每条消息前置 audio-out 通道头。"""
+        session.protocol = 2
+        session.frames_per_message = 2
+        await send_audio(session, _frames(3))
+        assert [bytes(b) for b in mock_ws.sent_bytes] == [
+            AUDIO_OUT_HEADER + bytes([0]) * 1024 + bytes([1]) * 1024,
+            AUDIO_OUT_HEADER + bytes([2]) * 1024,
+        ]
+        assert session.audio_bytes_raw == 3 * 1024
+
+    async def test_empty_stream(self, session, mock_ws):
+        assert await send_audio(session, _frames(0)) == 0
+        assert mock_ws.sent_bytes == []
@@ -0,0 +1,112 @@
+"""测试 pipeline/bargein.py — 回声感知阈值、打断判定、预录、端点检测。"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pytest
+
+from wallace.config import DuplexConfig
+from wallace.pipeline.bargein import BargeInDetector
+
+
+def _tone(amplitude: float, ms: int = 32) -> bytes:
+    """指定幅度（0~1）的方波 PCM，RMS 约等于幅度。"""
+    n = 16 * ms
+    samples = np.where(np.arange(n) % 2 == 0, 1, -1) * int(amplitude * 32767)
+    return samples.astype(np.int16).tobytes()
+
+
+def _silence(ms: int = 32) -> bytes:
+    return b"\x00\x00" * 16 * ms
+
+
+async def _drain(detector: BargeInDetector, frames: list[bytes]) -> None:
+    async def source():
+        for f in frames:
+            yield f
+
+    async for _ in detector.observe_playback(source()):
+        pass
+
+
+@pytest.fixture
+def detector() -> BargeInDetector:
+    return BargeInDetector(DuplexConfig(), echo_window=0.7)
+
+
+class TestThreshold:
+    """回声感知阈值。"""
+
+    def test_base_threshold_without_playback(self, detector):
+        assert detector.threshold(time.monotonic()) == pytest.approx(0.02)
+
+    async def test_playback_raises_threshold(self, detector):
+        await _drain(detector, [_tone(0.5)])
+        assert detector.threshold(time.monotonic()) == pytest.approx(0.3, abs=0.01)
+
+    async def test_echo_expires_after_window(self, detector):
+        await _drain(detector, [_tone(0.5)])
+        assert detector.threshold(time.monotonic() + 1.0) == pytest.approx(0.02)
+
+
+class TestBargeIn:
+    """打断判定。"""
+
+    def test_triggers_after_min_speech(self, detector):
+        # min_speech_ms=96 → 3 帧 32ms
+        assert not detector.feed(_tone(0.2))
+        assert not detector.feed(_tone(0.2))
+        assert detector.feed(_tone(0.2))
+        assert detector.speech_started_at is not None
+
+    def test_silence_resets_run(self, detector):
+        detector.feed(_tone(0.2))
+        detector.feed(_tone(0.2))
+        assert not detector.feed(_silence())
+        assert detector.speech_started_at is None
+        assert not detector.feed(_tone(0.2))
+
+    async def test_echo_does_not_trigger(self, detector):
+        """扬声器回声（低于下行能量 × echo_ratio）不判定为打断。"""
+        await _drain(detector, [_tone(0.5)])
+        for _ in range(10):
+            assert not detector.feed(_tone(0.2))
+
+    async def test_speech_over_echo_triggers(self, detector):
+        await _drain(detector, [_tone(0.5)])
+        results = [detector.feed(_tone(0.6)) for _ in range(3)]
+        assert results == [False, False, True]
+
+    def test_preroll_bounded(self, detector):
+        for _ in range(20):
+            detector.feed(_silence())
+        chunks = detector.take_preroll()
+        # preroll_ms=320 → 10 帧
+        assert sum(map(len, chunks)) == 320 * 32
+        assert detector.take_preroll() == []
+
+
+class TestEndpoint:
+    """打断后的端点检测。"""
+
+    def test_trailing_silence_ends_recording(self, detector):
+        assert not detector.feed_recording(_tone(0.2))
+        # endpoint_silence_ms=700 → 22 帧 32ms
+        results = [detector.feed_recording(_silence()) for _ in range(22)]
+        assert results[-1]
+        assert not any(results[:-1])
+
+    def test_speech_resets_silence(self, detector):
+        for _ in range(20):
+            detector.feed_recording(_silence())
+        detector.feed_recording(_tone(0.2))
+        assert not detector.feed_recording(_silence())
+
+    def test_reset(self, detector):
+        detector.feed(_tone(0.2))
+        detector.recording = True
+        detector.reset()
+        assert not detector.recording
+        assert detector.take_preroll() == []
@@ -0,0 +1,70 @@
+"""测试 ws/binary.py — v2 二进制帧编解码。"""
+
+from __future__ import annotations
+
+import pytest
+
+from wallace.ws.binary import (
+    AUDIO_OUT_HEADER,
+    Channel,
+    FrameError,
+    decode_frame,
+    encode_audio_in,
+    encode_telemetry,
+)
+from wallace.ws.protocol import ImuMessage, ProximityMessage, SensorMessage, TextMessage
+
+
+class TestRoundTrip:
+    """编码后解码得到相同的消息。"""
+
+    @pytest.mark.parametrize("msg,channel,size", [
+        (SensorMessage(temp=26.5, humidity=60.0, light=300.0, air_quality=50.0),
+         Channel.SENSOR, 17),
+        (ProximityMessage(distance=80.25, user_present=True), Channel.PROXIMITY, 6),
+        (ProximityMessage(distance=0.0, user_present=False), Channel.PROXIMITY, 6),
+        (ImuMessage(ax=0.0, ay=-1.0, az=0.5, gx=12.5, gy=-3.25, gz=0.0), Channel.IMU, 25),
+    ])
+    def test_telemetry(self, msg, channel, size):
+        frame = encode_telemetry(msg)
+        assert frame[0] == channel
+        assert len(frame) == size
+        decoded_channel, decoded = decode_frame(frame)
+        assert decoded_channel is channel
+        # 字段与 JSON 消息 model_dump() 去掉 type 一致
+        assert decoded == msg.model_dump(exclude={"type"})
+        assert type(msg)(**decoded) == msg
+
+    def test_float32_precision(self):
+        msg = SensorMessage(temp=26.3, humidity=61.7, light=321.9, air_quality=48.1)
+        _, decoded = decode_frame(encode_telemetry(msg))
+        assert decoded["temp"] == pytest.approx(26.3, abs=1e-5)
+        assert decoded["light"] == pytest.approx(321.9, abs=1e-4)
+
+    def test_audio_in(self):
+        pcm = bytes(range(256)) * 4
+        channel, payload = decode_frame(encode_audio_in(pcm))
+        assert channel is Channel.AUDIO_IN
+        assert payload == pcm
+
+    def test_audio_out_header(self):
+        assert AUDIO_OUT_HEADER == bytes([Channel.AUDIO_OUT])
+
+
+class TestErrors:
+    """非法帧抛出 FrameError。"""
+
+    @pytest.mark.parametrize("frame", [
+        b"",
+        b"\x7f\x00\x00",
+        bytes([Channel.AUDIO_OUT]) + b"\x00" * 16,  # 下行通道不接受上行
+        bytes([Channel.SENSOR]) + b"\x00" * 15,
+        bytes([Channel.PROXIMITY]) + b"\x00" * 6,
+    ])
+    def test_invalid_frame(self, frame):
+        with pytest.raises(FrameError):
+            decode_frame(frame)
+
+    def test_encode_without_channel(self):
+        with pytest.raises(FrameError):
+            encode_telemetry(TextMessage(content="hi"))
@@ -0,0 +1,51 @@
+"""测试 pipeline/canned.py — 固定提示语只合成一次。"""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from wallace.pipeline.canned import CannedAudio
+
+
+class TestCannedAudio:
+    async def test_rendered_once(self):
+        calls = []
+
+        async def synthesize(text):
+            calls.append(text)
+            yield b"\x01" * 1024
+
+        tts = MagicMock()
+        tts.synthesize = synthesize
+        canned = CannedAudio(tts)
+        await canned.warm("忙")
+        assert await canned.get("忙") == [b"\x01" * 1024]
+        assert calls == ["忙"]
+
+    async def test_warm_failure_retried_later(self):
+        async def broken(text):
+            raise RuntimeError("tts down")
+            yield b""
+
+        tts = MagicMock()
+        tts.synthesize = broken
+        canned = CannedAudio(tts)
+        await canned.warm("忙")  # 不抛出
+        assert canned._cache == {}
+
+    async def test_empty_result_not_cached(self):
+        """TTS 全部失败时不产出帧（不抛出），恢复后应重新合成。"""
+        outputs = [[], [b"\x02" * 1024]]
+
+        async def flaky(text):
+            for frame in outputs.pop(0):
+                yield frame
+
+        tts = MagicMock()
+        tts.synthesize = flaky
+        canned = CannedAudio(tts)
+        await canned.warm("忙")
+        assert canned._cache == {}
+        assert await canned.get("忙") == [b"\x02" * 1024]
+        assert await canned.get("忙") == [b"\x02" * 1024]
+        assert outputs == []
@@ -9,6 +9,8 @@ import pytest
 
 from wallace.config import CareConfig, WeatherConfig
 from wallace.care.scheduler import CareScheduler
+from wallace.registry import LocalRegistry
+from wallace.ws.session import PipelineState
 
 
 @pytest.fixture
@@ -39,6 +41,20 @@ class TestPushToSession:
         assert care_msgs[0]["mood"] == "happy"
         assert len(mock_ws.sent_bytes) > 0  # TTS 帧
 
+    async def test_push_streams_like_conversation(self, care_scheduler, session, mock_ws):
+        """关怀与对话一样流式播报：tts_start → 音频 → care → tts_end。"""
+        await care_scheduler._push_to_session(session, "test prompt", "caring")
+        sent = mock_ws.get_sent_json_messages()
+        assert [m["type"] for m in sent] == ["tts_start", "care", "tts_end"]
+        assert sent[0]["mood"] == "caring"
+        assert sent[1]["content"] == "你好呀！"
+        assert session.state == PipelineState.IDLE
+
+    async def test_skip_when_session_busy(self, care_scheduler, session, mock_ws):
+        session.state = PipelineState.SPEAKING
+        await care_scheduler._push_to_session(session, "test", "happy")
+        assert len(mock_ws.sent_text) == 0
+
     async def test_skip_when_user_not_present(self, care_scheduler, session, mock_ws):
         session.proximity_present = False
         await care_scheduler._push_to_session(session, "test", "happy")
@@ -79,6 +95,34 @@ class TestPushAll:
         scheduler = CareScheduler(care_config, weather_config, {}, mock_llm, mock_tts)
         await scheduler._push_all("test", "happy")  # should not raise
 
+    async def test_push_via_registry(
+        self, care_config, weather_config, session, mock_llm, mock_tts, mock_ws
+    ):
+        """经注册表投递给本 worker 持有的在线用户。"""
+        registry = LocalRegistry()
+        scheduler = CareScheduler(
+            care_config, weather_config, {session.user_id: session}, mock_llm, mock_tts,
+            registry=registry,
+        )
+        await scheduler._push_all("test", "happy")
+        assert mock_ws.sent_text == []  # 尚未登记归属
+        await registry.claim(session.user_id)
+        await scheduler._push_all("test", "happy")
+        assert len(mock_ws.get_sent_messages_by_type("care")) == 1
+
+    async def test_follower_skips(
+        self, care_config, weather_config, session, mock_llm, mock_tts, mock_ws
+    ):
+        """非领导者 worker 不执行定时推送。"""
+        registry = MagicMock(is_leader=False, broadcast=AsyncMock())
+        scheduler = CareScheduler(
+            care_config, weather_config, {session.user_id: session}, mock_llm, mock_tts,
+            registry=registry,
+        )
+        await scheduler._push_all("test", "happy")
+        registry.broadcast.assert_not_called()
+        assert mock_ws.sent_text == []
+
 
 class TestWeatherFetch:
     """天气 API。"""
@@ -0,0 +1,87 @@
+"""测试 pipeline/codec.py — IMA-ADPCM 编解码、编码协商。"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from wallace.pipeline.codec import (
+    ADPCM_BLOCK_BYTES,
+    IMAADPCMEncoder,
+    PCMEncoder,
+    create_encoder,
+    decode_adpcm,
+    negotiate_codec,
+)
+from wallace.pipeline.tts import FRAME_SIZE
+
+
+def _speech_like(seconds: float = 1.0) -> np.ndarray:
+    t = np.arange(int(16000 * seconds)) / 16000
+    wave = np.sin(2 * np.pi * 440 * t) * 12000 + np.sin(2 * np.pi * 1300 * t) * 4000
+    return wave.astype(np.int16)
+
+
+def _snr_db(ref: np.ndarray, out: np.ndarray) -> float:
+    err = ref.astype(np.float64) - out.astype(np.float64)
+    return 10 * np.log10(np.mean(ref.astype(np.float64) ** 2) / np.mean(err**2))
+
+
+class TestIMAADPCM:
+    """IMA-ADPCM 编解码。"""
+
+    def test_compression_ratio(self):
+        pcm = _speech_like().tobytes()
+        encoded = IMAADPCMEncoder().encode(pcm)
+        assert len(pcm) / len(encoded) > 3.7
+
+    def test_frame_encodes_to_whole_blocks(self):
+        encoded = IMAADPCMEncoder().encode(b"\x00" * FRAME_SIZE)
+        assert len(encoded) == 4 * ADPCM_BLOCK_BYTES
+
+    def test_roundtrip_quality(self):
+        ref = _speech_like()
+        decoded = np.frombuffer(decode_adpcm(IMAADPCMEncoder().encode(ref.tobytes())), np.int16)
+        assert _snr_db(ref, decoded[: ref.size]) > 25
+
+    def test_silence_roundtrip(self):
+        decoded = decode_adpcm(IMAADPCMEncoder().encode(b"\x00" * FRAME_SIZE))
+        assert np.abs(np.frombuffer(decoded, np.int16)).max() < 16
+
+    def test_blocks_independent(self):
+        """批量编码与逐帧编码结果一致（块间无状态）。"""
+        pcm = _speech_like(0.256).tobytes()
+        encoder = IMAADPCMEncoder()
+        batch = encoder.encode(pcm)
+        per_frame = b"".join(
+            encoder.encode(pcm[i : i + FRAME_SIZE]) for i in range(0, len(pcm), FRAME_SIZE)
+        )
+        assert batch == per_frame
+
+    def test_partial_block_padded(self):
+        encoded = IMAADPCMEncoder().encode(b"\x10\x00" * 100)
+        assert len(encoded) == ADPCM_BLOCK_BYTES
+
+    def test_empty(self):
+        assert IMAADPCMEncoder().encode(b"") == b""
+
+    def test_decode_rejects_truncated(self):
+        with pytest.raises(ValueError):
+            decode_adpcm(b"\x00" * (ADPCM_BLOCK_BYTES - 1))
+
+
+class TestNegotiation:
+    """编码协商。"""
+
+    def test_first_supported_wins(self):
+        assert negotiate_codec(["opus", "adpcm", "pcm"]) == "adpcm"
+
+    def test_fallback_to_pcm(self):
+        assert negotiate_codec(["opus"]) == "pcm"
+        assert negotiate_codec([]) == "pcm"
+
+    def test_create_encoder(self):
+        assert isinstance(create_encoder("pcm"), PCMEncoder)
+        assert isinstance(create_encoder("adpcm"), IMAADPCMEncoder)
+        with pytest.raises(ValueError, match="Unknown audio codec"):
+            create_encoder("mp3")
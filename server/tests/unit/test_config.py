@@ -32,6 +32,7 @@ class TestLoadSettings:
         assert settings.server.host == "0.0.0.0"
         assert settings.server.port == 8000
         assert settings.asr.model == "large-v3-turbo"
+        assert not settings.longterm.enabled
 
     def test_test_config_toml_loads_successfully(self):
         settings = load_settings(FIXTURES / "test_config.toml")
@@ -65,6 +66,16 @@ class TestValidation:
         with pytest.raises(ValidationError):
             Settings(server={"log_level": "TRACE"})
 
+    def test_invalid_stage_executor(self):
+        with pytest.raises(ValidationError):
+            Settings(pipeline={"vad": {"executor": "gpu"}})
+
+    def test_pipeline_stage_tables_merge_with_defaults(self):
+        settings = Settings(pipeline={"encode": {"executor": "thread", "concurrency": 2}})
+        assert settings.pipeline.encode.concurrency == 2
+        assert settings.pipeline.asr.executor == "thread"
+        assert settings.pipeline.stages[0] == "vad"
+
     def test_invalid_tts_backend(self):
         with pytest.raises(ValidationError):
             Settings(tts={"default_backend": "unknown"})
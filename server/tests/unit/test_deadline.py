@@ -0,0 +1,92 @@
+"""测试 pipeline/deadline.py — 阶段预算、耗时记录、流式约束。"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from wallace.metrics import metrics
+from wallace.pipeline.deadline import Deadline, DeadlineExceeded, within
+
+
+async def _slow(delays: list[float]):
+    for i, delay in enumerate(delays):
+        await asyncio.sleep(delay)
+        yield i
+
+
+class TestStage:
+    """阶段预算。"""
+
+    async def test_within_budget(self):
+        deadline = Deadline(1.0)
+        async with deadline.stage("asr"):
+            await asyncio.sleep(0.01)
+        assert 0.005 < deadline.spent["asr"] < 0.5
+        assert not deadline.expired
+
+    async def test_exceeded_names_stage(self, caplog):
+        deadline = Deadline(0.05)
+        before = metrics.counter("turn_deadline_exceeded_total", stage="llm")
+        async with deadline.stage("asr"):
+            await asyncio.sleep(0.01)
+        with pytest.raises(DeadlineExceeded) as exc:
+            async with deadline.stage("llm"):
+                await asyncio.sleep(1)
+        assert exc.value.stage == "llm"
+        assert deadline.spent["llm"] > deadline.spent["asr"]
+        assert metrics.counter("turn_deadline_exceeded_total", stage="llm") == before + 1
+        assert "most time spent in llm" in caplog.text
+
+    async def test_expired_skips_stage(self):
+        deadline = Deadline(0)
+        ran = False
+        with pytest.raises(DeadlineExceeded):
+            async with deadline.stage("tts"):
+                ran = True
+        assert not ran
+
+    async def test_inner_timeout_not_mistaken(self):
+        """阶段内部自身的 TimeoutError 原样抛出。"""
+        deadline = Deadline(1.0)
+        with pytest.raises(TimeoutError):
+            async with deadline.stage("llm"):
+                raise TimeoutError
+
+    async def test_unbounded(self):
+        deadline = Deadline(None)
+        assert deadline.remaining() is None
+        async with deadline.stage("asr"):
+            pass
+        assert "asr" in deadline.spent
+
+
+class TestWithin:
+    """流式约束。"""
+
+    async def test_only_first_item_bounded(self):
+        deadline = Deadline(0.05)
+        items = [i async for i in within(_slow([0, 0.03, 0.03]), deadline, "tts")]
+        assert items == [0, 1, 2]
+
+    async def test_first_item_timeout(self):
+        deadline = Deadline(0.02)
+        with pytest.raises(DeadlineExceeded):
+            async for _ in within(_slow([1]), deadline, "tts"):
+                pass
+
+    async def test_bounded_until_condition(self):
+        deadline = Deadline(0.05)
+        done = False
+        seen = []
+        with pytest.raises(DeadlineExceeded):
+            async for item in within(_slow([0, 0, 0.1]), deadline, "llm", until=lambda: done):
+                seen.append(item)
+        assert seen == [0, 1]
+
+        deadline = Deadline(0.05)
+        seen = []
+        async for item in within(_slow([0, 0.1]), deadline, "llm", until=lambda: bool(seen)):
+            seen.append(item)
+        assert seen == [0, 1]
@@ -0,0 +1,85 @@
+"""测试 pipeline/filler.py — 提示挑选、延迟播放、应答接管。"""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from wallace.pipeline.canned import CannedAudio
+from wallace.pipeline.filler import Filler, FillerStore, cues_for
+from wallace.ws.session import PipelineState
+
+CUE = b"\x07" * 1024
+
+
+@pytest.fixture
+def store(mock_tts) -> FillerStore:
+    async def synthesize(text):
+        yield CUE
+
+    mock_tts.synthesize = synthesize
+    return FillerStore(CannedAudio(mock_tts))
+
+
+class TestCues:
+    """按性格 / 情绪挑选。"""
+
+    def test_mood_specific_and_fallback(self):
+        assert cues_for("normal", "sad") == ("唔……",)
+        assert cues_for("normal", "angry") == cues_for("normal", "neutral")
+        assert cues_for("unknown", "neutral") == cues_for("normal", "neutral")
+
+    def test_rotates(self, store):
+        first = store.pick("tsundere", "neutral")
+        second = store.pick("tsundere", "neutral")
+        assert first != second
+        assert store.pick("tsundere", "neutral") == first
+
+
+class TestFiller:
+    """单轮填充提示。"""
+
+    async def test_claim_before_delay_cancels(self, store, session, mock_ws):
+        session.state = PipelineState.PROCESSING
+        filler = Filler(session, store, delay=0.05)
+        filler.start()
+        assert not await filler.claim()
+        await asyncio.sleep(0.08)
+        assert mock_ws.sent_text == []
+        assert session.state == PipelineState.PROCESSING
+
+    async def test_plays_after_delay(self, store, session, mock_ws):
+        session.state = PipelineState.PROCESSING
+        filler = Filler(session, store, delay=0)
+        filler.start()
+        await asyncio.sleep(0.01)
+        assert filler.started
+        assert session.state == PipelineState.SPEAKING
+        assert await filler.claim()
+        assert mock_ws.get_sent_messages_by_type("tts_start")[0]["mood"] == "thinking"
+        assert mock_ws.sent_bytes == [CUE]
+        # 已被接管，无需补发 tts_end
+        assert not await filler.close()
+
+    async def test_close_unclaimed(self, store, session):
+        session.state = PipelineState.PROCESSING
+        filler = Filler(session, store, delay=0)
+        filler.start()
+        await asyncio.sleep(0.01)
+        assert await filler.close()
+
+    async def test_missing_cue_skipped(self, session, mock_ws):
+        tts = MagicMock()
+
+        async def broken(text):
+            raise RuntimeError("tts down")
+            yield b""
+
+        tts.synthesize = broken
+        session.state = PipelineState.PROCESSING
+        filler = Filler(session, FillerStore(CannedAudio(tts)), delay=0)
+        filler.start()
+        assert not await filler.close()
+        assert mock_ws.sent_text == []
@@ -0,0 +1,131 @@
+"""测试 pipeline/governor.py — 并发上限、有界排队、降级阶梯。"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from wallace.config import GovernorConfig
+from wallace.metrics import metrics
+from wallace.pipeline.governor import DegradeLevel, GovernorOverloaded, PipelineGovernor
+
+
+def _governor(**overrides) -> PipelineGovernor:
+    return PipelineGovernor(GovernorConfig(**overrides))
+
+
+async def _hold(governor: PipelineGovernor, release: asyncio.Event, admitted: list) -> None:
+    async with governor.admit() as admission:
+        admitted.append(admission)
+        await release.wait()
+
+
+class TestAdmission:
+    """并发上限与排队。"""
+
+    async def test_single_turn_not_degraded(self):
+        governor = _governor()
+        async with governor.admit() as admission:
+            assert admission.level == DegradeLevel.NORMAL
+            assert admission.llm_options() == {}
+            assert admission.asr_options() == {}
+            assert governor.active == 1
+        assert governor.active == 0
+
+    async def test_waits_for_free_slot(self):
+        governor = _governor(max_concurrent_turns=1)
+        release = asyncio.Event()
+        admitted: list = []
+        first = asyncio.create_task(_hold(governor, release, admitted))
+        second = asyncio.create_task(_hold(governor, release, admitted))
+        await asyncio.sleep(0.01)
+        assert len(admitted) == 1
+        assert governor.waiting == 1
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert len(admitted) == 2
+        assert admitted[1].waited > 0
+        assert governor.active == governor.waiting == 0
+
+    async def test_queue_full_sheds(self):
+        governor = _governor(max_concurrent_turns=1, max_queue=1)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(_hold(governor, release, [])) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        before = metrics.counter("governor_shed_total", reason="queue_full")
+
+        with pytest.raises(GovernorOverloaded) as exc:
+            async with governor.admit():
+                pass
+        assert exc.value.reason == "queue_full"
+        assert metrics.counter("governor_shed_total", reason="queue_full") == before + 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_queue_timeout_sheds(self):
+        governor = _governor(max_concurrent_turns=1, queue_timeout=0.02)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(governor, release, []))
+        await asyncio.sleep(0)
+
+        with pytest.raises(GovernorOverloaded) as exc:
+            async with governor.admit():
+                pass
+        assert exc.value.reason == "timeout"
+        assert governor.waiting == 0
+
+        release.set()
+        await holder
+        # 超时的等待者不占用名额
+        async with governor.admit():
+            assert governor.active == 1
+
+    async def test_timeout_bounded_by_remaining_budget(self):
+        governor = _governor(max_concurrent_turns=1, queue_timeout=10)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(governor, release, []))
+        await asyncio.sleep(0)
+
+        with pytest.raises(GovernorOverloaded):
+            async with governor.admit(timeout=0.02):
+                pass
+        release.set()
+        await holder
+
+
+class TestDegradeLadder:
+    """负载越高降级越多。"""
+
+    async def test_ladder(self):
+        governor = _governor(
+            max_concurrent_turns=4,
+            short_reply_load=0.5,
+            fast_asr_load=1.0,
+            short_reply_max_tokens=64,
+        )
+        release = asyncio.Event()
+        admitted: list = []
+        tasks = []
+        for _ in range(4):
+            tasks.append(asyncio.create_task(_hold(governor, release, admitted)))
+            await asyncio.sleep(0)
+
+        levels = [a.level for a in admitted]
+        assert levels == [
+            DegradeLevel.NORMAL,
+            DegradeLevel.SHORT_REPLY,
+            DegradeLevel.SHORT_REPLY,
+            DegradeLevel.FAST_ASR,
+        ]
+        assert admitted[1].llm_options() == {"max_tokens": 64}
+        assert admitted[1].asr_options() == {}
+        assert admitted[3].asr_options() == {"beam_size": 1}
+        assert metrics.gauge("governor_degrade_level") == DegradeLevel.FAST_ASR
+        assert metrics.gauge("governor_active_turns") == 4
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert metrics.gauge("governor_degrade_level") == DegradeLevel.NORMAL
@@ -0,0 +1,93 @@
+"""测试 ws/heartbeat.py — 时间轮到期、心跳续期、批量关闭。"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from wallace.metrics import metrics
+from wallace.ws.heartbeat import HeartbeatSupervisor
+from wallace.ws.session import Session
+
+
+def _session(mock_ws, user_id: str, last_heartbeat: float) -> Session:
+    s = Session(user_id, mock_ws)
+    s.last_heartbeat = last_heartbeat
+    return s
+
+
+class TestWheel:
+    """advance() 按刻度检查到期会话。"""
+
+    def test_expires_after_timeout(self, mock_ws):
+        sup = HeartbeatSupervisor(timeout=10, resolution=1)
+        s = _session(mock_ws, "u1", 100.0)
+        sup._schedule(s)
+        assert sup.advance(100.0) == []
+        assert sup.advance(109.0) == []
+        assert sup.advance(111.0) == [s]
+        assert len(sup) == 0
+
+    def test_ping_extends_deadline(self, mock_ws):
+        sup = HeartbeatSupervisor(timeout=10, resolution=1)
+        s = _session(mock_ws, "u1", 100.0)
+        sup._schedule(s)
+        sup.advance(100.0)
+        s.last_heartbeat = 108.0  # update_heartbeat 只改时间戳
+        assert sup.advance(111.0) == []
+        assert len(sup) == 1
+        assert sup.advance(117.0) == []
+        assert sup.advance(119.0) == [s]
+
+    def test_unregister(self, mock_ws):
+        sup = HeartbeatSupervisor(timeout=10, resolution=1)
+        s = _session(mock_ws, "u1", 100.0)
+        sup._schedule(s)
+        sup.unregister(s)
+        assert sup.advance(200.0) == []
+        assert len(sup) == 0
+
+    def test_batch_and_long_stall(self, mock_ws):
+        """监控停顿超过一圈后，一次 advance 取出所有到期会话。"""
+        sup = HeartbeatSupervisor(timeout=10, resolution=1)
+        sup.advance(100.0)
+        sessions = [_session(mock_ws, f"u{i}", 100.0 + i) for i in range(5)]
+        for s in sessions:
+            sup._schedule(s)
+        alive = _session(mock_ws, "alive", 100.0)
+        sup._schedule(alive)
+        alive.last_heartbeat = 495.0
+        assert set(sup.advance(500.0)) == set(sessions)
+        assert len(sup) == 1
+
+
+class TestSupervisorTask:
+    """监控任务：批量关闭超时连接，计数导出。"""
+
+    async def test_closes_expired_sessions(self, mock_ws):
+        closed: list[str] = []
+
+        class ClosingWS:
+            def __init__(self, name: str) -> None:
+                self.name = name
+
+            async def close(self, code: int = 1000) -> None:
+                closed.append(self.name)
+
+        sup = HeartbeatSupervisor(timeout=0.05, resolution=0.01)
+        before = metrics.counter("heartbeat_timeouts_total")
+        stale = [Session(f"u{i}", ClosingWS(f"u{i}")) for i in range(3)]
+        fresh = Session("fresh", ClosingWS("fresh"))
+        for s in stale + [fresh]:
+            sup.register(s)
+
+        deadline = time.monotonic() + 1
+        while len(closed) < 3 and time.monotonic() < deadline:
+            fresh.update_heartbeat()
+            await asyncio.sleep(0.01)
+
+        assert sorted(closed) == ["u0", "u1", "u2"]
+        assert metrics.counter("heartbeat_timeouts_total") == before + 3
+        sup.unregister(fresh)
+        await asyncio.sleep(0.03)
+        assert sup._task is None  # 无会话后监控任务退出
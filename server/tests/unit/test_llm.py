@@ -34,6 +34,12 @@ class TestSystemPrompt:
         assert "小明" in system
         assert "编程" in system
 
+    def test_contains_recalled_memories(self, llm_client, session):
+        assert "你记得" not in llm_client.build_messages(session, "你好")[0]["content"]
+        session.recalled = ["主人喜欢恐龙", "主人说过：明天要去公园"]
+        system = llm_client.build_messages(session, "你好")[0]["content"]
+        assert "\n- 主人喜欢恐龙\n- 主人说过：明天要去公园" in system
+
     def test_contains_sensor_context(self, llm_client, session):
         messages = llm_client.build_messages(session, "你好", "当前环境：室温26°C")
         system = messages[0]["content"]
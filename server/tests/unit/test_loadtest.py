@@ -0,0 +1,122 @@
+"""测试 loadtest — 时延模型、假后端、设备播放时钟、报告汇总。"""
+
+from __future__ import annotations
+
+import argparse
+import random
+
+import numpy as np
+
+from loadtest.device import DeviceStats, Playback, load_utterances
+from loadtest.fakes import REPLIES, FakeASR, FakeLLM, FakeProfile, FakeTTS, LatencyModel
+from loadtest.runner import percentile, summarize
+from wallace.config import ASRConfig, LLMConfig, TTSConfig
+from wallace.pipeline.tts import FRAME_SIZE
+
+
+class TestLatencyModel:
+    """对数正态时延采样。"""
+
+    def test_reproducible(self):
+        model = LatencyModel(0.2, sigma=0.5)
+        a = [model.sample(random.Random(1)) for _ in range(3)]
+        b = [model.sample(random.Random(1)) for _ in range(3)]
+        assert a == b
+
+    def test_median(self):
+        model = LatencyModel(0.2, sigma=0.5)
+        rng = random.Random(0)
+        samples = [model.sample(rng) for _ in range(2000)]
+        assert abs(np.median(samples) - 0.2) < 0.02
+
+    def test_degenerate(self):
+        rng = random.Random(0)
+        assert LatencyModel(0.0).sample(rng) == 0.0
+        assert LatencyModel(0.3, sigma=0).sample(rng) == 0.3
+
+    def test_profile_argv_roundtrip(self):
+        profile = FakeProfile(llm_ttft=0.8, tts_rtf=0.5, seed=7)
+        parser = argparse.ArgumentParser()
+        FakeProfile.add_arguments(parser)
+        assert FakeProfile.from_args(parser.parse_args(profile.to_argv())) == profile
+
+
+class TestFakes:
+    """假后端沿用真实接口。"""
+
+    async def test_asr(self):
+        asr = FakeASR(ASRConfig(), profile=FakeProfile(asr=0))
+        await asr.load_model()
+        speech = np.full(1600, 0.1, dtype=np.float32)
+        assert asr.vad_has_speech(speech)
+        assert not asr.vad_has_speech(np.zeros(1600, dtype=np.float32))
+        assert await asr.transcribe(speech)
+
+    async def test_llm_stream(self):
+        llm = FakeLLM(LLMConfig(), profile=FakeProfile(llm_ttft=0, llm_tps=0))
+        await llm.start()
+        assert llm.is_healthy
+        tokens = [t async for t in llm.chat_stream([])]
+        assert tokens[-1] == "[mood:happy]"
+        assert "".join(tokens[:-1]) in REPLIES
+
+    async def test_llm_max_tokens(self):
+        llm = FakeLLM(LLMConfig(), profile=FakeProfile(llm_ttft=0, llm_tps=0))
+        tokens = [t async for t in llm.chat_stream([], max_tokens=2)]
+        assert len(tokens) == 3
+
+    async def test_tts_duration_follows_text(self):
+        tts = FakeTTS(TTSConfig(), profile=FakeProfile(tts_first=0, tts_rtf=0))
+        short = [f async for f in tts.synthesize("你好")]
+        long = [f async for f in tts.synthesize("你好" * 10)]
+        assert len(long) > len(short) > 0
+        assert all(len(f) == FRAME_SIZE for f in long)
+        assert [f async for f in tts.synthesize("  ")] == []
+
+
+class TestPlayback:
+    """设备播放时钟与迟到判定。"""
+
+    def test_continuous_stream_not_late(self):
+        playback = Playback()
+        assert not playback.feed(0.032, now=10.0)
+        assert not playback.feed(0.032, now=10.03)
+        assert playback.play_end == 10.064
+
+    def test_gap_is_late(self):
+        playback = Playback()
+        playback.feed(0.032, now=10.0)
+        assert playback.feed(0.032, now=10.2)
+
+    def test_reset_first_frame_not_late(self):
+        playback = Playback()
+        playback.feed(0.032, now=10.0)
+        playback.reset()
+        assert not playback.feed(0.032, now=20.0)
+
+
+class TestReport:
+    """分位数与汇总。"""
+
+    def test_percentile(self):
+        assert percentile([], 0.5) is None
+        assert percentile([3.0], 0.99) == 3.0
+        assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 0.5) == 3.0
+        assert percentile([0.0, 10.0], 0.95) == 9.5
+
+    def test_summarize(self):
+        a = DeviceStats(first_frame=[0.5, 0.7], turns=2, frames=100, late_frames=1)
+        b = DeviceStats(first_frame=[0.6], turns=2, timeouts=1, errors=1)
+        metrics = {"counters": {"outbox_dropped_total{reason=overflow}": 3.0, "other": 9.0}}
+        summary = summarize([a, b], server_metrics=metrics)
+        assert summary["turns"] == 4
+        assert summary["first_frame"]["count"] == 3
+        assert summary["first_frame"]["p50"] == 0.6
+        assert summary["late_frames"] == 1
+        assert summary["server_telemetry_dropped"] == 3.0
+        assert summary["server_rss"] is None
+
+    def test_synthetic_utterance(self):
+        (frames,) = load_utterances()
+        assert all(len(f) == FRAME_SIZE for f in frames)
+        assert len(frames) * 0.032 > 1.0
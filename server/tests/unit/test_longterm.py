@@ -0,0 +1,209 @@
+"""测试 memory/longterm.py — 哈希嵌入、事实抽取、内存映射索引、召回预算与去重。"""
+
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+from wallace.config import LongTermConfig
+from wallace.memory.longterm import (
+    HashingEmbedder,
+    LongTermMemory,
+    VectorIndex,
+    create_embedder,
+    estimate_tokens,
+    extract_facts,
+    user_dir_name,
+)
+
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(256)
+
+
+@pytest.fixture
+async def longterm(tmp_path):
+    lt = LongTermMemory(LongTermConfig(data_dir=str(tmp_path), dim=256))
+    await lt.start()
+    yield lt
+    lt.close()
+
+
+class TestHashingEmbedder:
+    """字符 n-gram 哈希嵌入。"""
+
+    def test_unit_vectors(self, embedder):
+        vectors = embedder.embed(["我喜欢恐龙", "hello world", ""])
+        assert vectors.shape == (3, 256)
+        assert vectors.dtype == np.float32
+        np.testing.assert_allclose(np.linalg.norm(vectors[:2], axis=1), 1.0, rtol=1e-5)
+
+    def test_deterministic(self, embedder):
+        np.testing.assert_array_equal(
+            embedder.embed(["霸王龙"]), HashingEmbedder(256).embed(["霸王龙"])
+        )
+
+    def test_overlap_scores_higher(self, embedder):
+        query, related, unrelated = embedder.embed(["恐龙叫什么", "主人喜欢恐龙", "今天下雨了"])
+        assert query @ related > query @ unrelated
+
+    def test_fallback_without_model(self, tmp_path):
+        config = LongTermConfig(model_dir=str(tmp_path / "missing"), dim=128)
+        assert create_embedder(config).name == "hash-ngram-128"
+
+
+class TestExtractFacts:
+    """第一人称陈述抽取。"""
+
+    @pytest.mark.parametrize(
+        "text, facts",
+        [
+            ("我喜欢恐龙", ["主人喜欢恐龙"]),
+            ("你好呀，我最喜欢的颜色是蓝色！", ["主人最喜欢的颜色是蓝色"]),
+            ("我养了一只猫，它叫咪咪", ["主人养了一只猫"]),
+            ("今天天气怎么样", []),
+            ("你知道我喜欢什么恐龙吗", []),
+            ("我是", []),
+        ],
+    )
+    def test_extract(self, text, facts):
+        assert extract_facts(text) == facts
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("主人喜欢恐龙") == 6
+        assert estimate_tokens("lego") == 1
+
+
+class TestVectorIndex:
+    """内存映射索引。"""
+
+    def test_search_top_k(self, tmp_path, embedder):
+        index = VectorIndex(tmp_path / "u1", embedder)
+        texts = ["主人喜欢恐龙", "主人养了一只猫", "主人住在上海"]
+        for text, vector in zip(texts, embedder.embed(texts)):
+            index.add(text, vector)
+        hits = index.search(embedder.embed(["猫叫什么名字"])[0], 2)
+        assert len(hits) == 2
+        assert hits[0][1]["text"] == "主人养了一只猫"
+        assert hits[0][0] >= hits[1][0]
+        index.close()
+
+    def test_grows_and_reopens(self, tmp_path, embedder):
+        index = VectorIndex(tmp_path / "u1", embedder, initial_capacity=2)
+        texts = [f"第{i}件事" for i in range(5)]
+        for text, vector in zip(texts, embedder.embed(texts)):
+            index.add(text, vector)
+        index.close()
+
+        reopened = VectorIndex(tmp_path / "u1", embedder)
+        assert reopened.count == 5
+        assert isinstance(reopened._vectors, np.memmap)
+        assert reopened._vectors.shape[0] >= 5
+        assert reopened.search(embedder.embed(["第3件事"])[0], 1)[0][1]["text"] == "第3件事"
+        reopened.close()
+
+    def test_rebuild_on_embedder_change(self, tmp_path, embedder):
+        index = VectorIndex(tmp_path / "u1", embedder)
+        index.add("主人喜欢恐龙", embedder.embed(["主人喜欢恐龙"])[0])
+        index.close()
+
+        other = HashingEmbedder(64)
+        rebuilt = VectorIndex(tmp_path / "u1", other)
+        assert rebuilt._vectors.shape[1] == 64
+        score, entry = rebuilt.search(other.embed(["主人喜欢恐龙"])[0], 1)[0]
+        assert entry["text"] == "主人喜欢恐龙"
+        assert score == pytest.approx(1.0, abs=1e-5)
+        rebuilt.close()
+
+    def test_corrupt_line_rebuilds(self, tmp_path, embedder):
+        index = VectorIndex(tmp_path / "u1", embedder)
+        for text in ("第一件事", "第二件事"):
+            index.add(text, embedder.embed([text])[0])
+        index.close()
+        entries = tmp_path / "u1" / "entries.jsonl"
+        lines = entries.read_text(encoding="utf-8").splitlines()
+        entries.write_text("{broken\n" + "\n".join(lines) + "\n", encoding="utf-8")
+
+        reopened = VectorIndex(tmp_path / "u1", embedder)
+        assert reopened.count == 2
+        assert reopened.search(embedder.embed(["第二件事"])[0], 1)[0][1]["text"] == "第二件事"
+        assert len(entries.read_text(encoding="utf-8").splitlines()) == 2
+        reopened.close()
+
+    def test_two_writers_stay_aligned(self, tmp_path, embedder):
+        """两个 worker 各自打开同一索引交替追加（跨过扩容）：条目与向量行一一对应。"""
+        a = VectorIndex(tmp_path / "u1", embedder, initial_capacity=2)
+        b = VectorIndex(tmp_path / "u1", embedder, initial_capacity=2)
+        texts = [f"第{i}件事" for i in range(6)]
+        for i, (text, vector) in enumerate(zip(texts, embedder.embed(texts))):
+            (b if i % 2 else a).add(text, vector)
+        for index in (a, b):
+            for text in texts:
+                assert index.search(embedder.embed([text])[0], 1)[0][1]["text"] == text
+            assert index.count == 6
+        a.close()
+        b.close()
+        entries = tmp_path / "u1" / "entries.jsonl"
+        assert len(entries.read_text(encoding="utf-8").splitlines()) == 6
+
+
+class TestLongTermMemory:
+    """写入与召回。"""
+
+    async def test_remember_fact_and_recall(self, longterm):
+        assert await longterm.remember("u1", "我最喜欢的恐龙是霸王龙") == 1
+        await longterm.remember("u1", "明天要去公园放风筝")
+        recalled = await longterm.recall("u1", "你还记得我喜欢什么恐龙吗")
+        assert recalled[0] == "主人最喜欢的恐龙是霸王龙"
+
+    async def test_turn_stored_when_no_fact(self, longterm, tmp_path):
+        await longterm.remember("u1", "明天要去公园放风筝")
+        entries = (tmp_path / "u1" / "entries.jsonl").read_text(encoding="utf-8").splitlines()
+        entry = json.loads(entries[0])
+        assert entry["kind"] == "turn"
+        assert await longterm.recall("u1", "去公园放风筝") == ["主人说过：明天要去公园放风筝"]
+
+    async def test_short_and_duplicate_skipped(self, longterm):
+        assert await longterm.remember("u1", "嗯") == 0
+        assert await longterm.remember("u1", "我喜欢恐龙") == 1
+        assert await longterm.remember("u1", "我喜欢恐龙！") == 0
+
+    async def test_exclude_history_window(self, longterm):
+        await longterm.remember("u1", "我喜欢恐龙")
+        assert await longterm.recall("u1", "恐龙", exclude=["我喜欢恐龙"]) == []
+
+    async def test_min_score(self, longterm):
+        await longterm.remember("u1", "我喜欢恐龙")
+        assert await longterm.recall("u1", "今天下雨了") == []
+
+    async def test_token_budget(self, tmp_path):
+        config = LongTermConfig(data_dir=str(tmp_path), dim=256, token_budget=12, min_score=0.0)
+        lt = LongTermMemory(config)
+        for text in ("我喜欢恐龙", "我喜欢霸王龙和三角龙", "我喜欢翼龙"):
+            await lt.remember("u1", text)
+        recalled = await lt.recall("u1", "恐龙")
+        assert sum(estimate_tokens(t) for t in recalled) <= 12
+        assert 0 < len(recalled) < 3
+        lt.close()
+
+    async def test_unknown_user_empty(self, longterm):
+        assert await longterm.recall("nobody", "恐龙") == []
+
+    async def test_unsafe_user_id_hashed(self, longterm, tmp_path):
+        """WS 路径中的 user_id 不拼进文件路径。"""
+        assert user_dir_name("esp32-A1_b2") == "esp32-A1_b2"
+        assert await longterm.remember("../escape", "我喜欢恐龙") == 1
+        assert not (tmp_path.parent / "escape").exists()
+        assert [p.name for p in tmp_path.iterdir()] == [user_dir_name("../escape")]
+        assert await longterm.recall("../escape", "恐龙") == ["主人喜欢恐龙"]
+
+    async def test_open_indexes_bounded(self, tmp_path):
+        lt = LongTermMemory(LongTermConfig(data_dir=str(tmp_path), dim=64, open_indexes=2))
+        for user_id in ("u1", "u2", "u3"):
+            await lt.remember(user_id, "我喜欢恐龙")
+        assert list(lt._indexes) == ["u2", "u3"]
+        assert await lt.recall("u1", "恐龙") == ["主人喜欢恐龙"]
+        lt.close()
@@ -0,0 +1,136 @@
+"""测试 memory/backends.py 与 memory/migrate.py — SQLite 后端、批量事务、JSON 导入。"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+
+import pytest
+
+from wallace.config import MemoryConfig
+from wallace.memory import migrate
+from wallace.memory.backends import (
+    JSONMemoryBackend,
+    SQLiteMemoryBackend,
+    create_backend,
+    import_records,
+    read_json_dir,
+)
+from wallace.memory.persister import MemoryPersister
+from wallace.memory.store import MemoryStore
+from wallace.ws.session import UserMemory
+
+
+@pytest.fixture
+def db(tmp_path):
+    backend = SQLiteMemoryBackend(tmp_path / "memory.db")
+    yield backend
+    backend.close()
+
+
+def _write_json(data_dir, user_id: str, **fields) -> None:
+    MemoryStore(user_id, data_dir).save(UserMemory(**fields))
+
+
+class TestCreate:
+    """按配置选择后端。"""
+
+    def test_default_json(self):
+        assert isinstance(create_backend(MemoryConfig()), JSONMemoryBackend)
+
+    def test_sqlite(self, tmp_path):
+        config = MemoryConfig(backend="sqlite", path=str(tmp_path / "m.db"))
+        assert isinstance(create_backend(config), SQLiteMemoryBackend)
+
+
+class TestSQLiteBackend:
+    """SQLite 后端读写。"""
+
+    def test_roundtrip(self, db):
+        db.write_many([("u1", UserMemory(nickname="小明", interests=["乐高"]).to_dict())])
+        mem = db.load("u1")
+        assert mem.nickname == "小明"
+        assert mem.interests == ["乐高"]
+
+    def test_missing_user_default(self, db):
+        assert db.load("nobody") == UserMemory()
+
+    def test_upsert_overwrites(self, db):
+        db.write_many([("u1", UserMemory(interaction_count=1).to_dict())])
+        db.write_many([("u1", UserMemory(interaction_count=2).to_dict())])
+        assert db.load("u1").interaction_count == 2
+        assert db.count() == 1
+
+    def test_wal_mode(self, db, tmp_path):
+        db.open()
+        with sqlite3.connect(tmp_path / "memory.db") as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_batch_is_one_transaction(self, db):
+        db.write_many([("u1", {"nickname": "a"})])
+        with pytest.raises(sqlite3.Error):
+            # 第二条的 user_id 为 NULL，整批回滚
+            db.write_many([("u1", {"nickname": "b"}), (None, {})])
+        assert db.load("u1").nickname == "a"
+
+    def test_corrupt_row_default(self, db):
+        db.open()
+        db._db.execute("INSERT INTO memories VALUES ('u1', 'not json', 0)")
+        assert db.load("u1") == UserMemory()
+
+    async def test_persister_batches_flush(self, tmp_path, monkeypatch):
+        backend = SQLiteMemoryBackend(tmp_path / "memory.db")
+        batches = []
+        original = backend.write_many
+        monkeypatch.setattr(
+            backend, "write_many", lambda records: (batches.append(records), original(records))[1]
+        )
+        persister = MemoryPersister(MemoryConfig(sync_interval=3600), backend=backend)
+        await persister.start()
+        for user_id in ("u1", "u2", "u3"):
+            (await persister.load(user_id)).record_interaction()
+        assert await persister.flush() == 3
+        await persister.close()
+        assert len(batches) == 1
+        check = SQLiteMemoryBackend(tmp_path / "memory.db")
+        assert check.load("u2").interaction_count == 1
+        check.close()
+
+
+class TestImport:
+    """JSON 目录导入。"""
+
+    def test_import_all(self, db, tmp_path):
+        json_dir = tmp_path / "json"
+        for i in range(7):
+            _write_json(json_dir, f"u{i}", interaction_count=i)
+        written, skipped = import_records(db, read_json_dir(json_dir), batch_size=3)
+        assert (written, skipped) == (7, 0)
+        assert db.load("u5").interaction_count == 5
+
+    def test_keeps_existing_unless_overwrite(self, db, tmp_path):
+        json_dir = tmp_path / "json"
+        _write_json(json_dir, "u1", nickname="旧")
+        db.write_many([("u1", UserMemory(nickname="新").to_dict())])
+        assert import_records(db, read_json_dir(json_dir)) == (0, 1)
+        assert db.load("u1").nickname == "新"
+        assert import_records(db, read_json_dir(json_dir), overwrite=True) == (1, 0)
+        assert db.load("u1").nickname == "旧"
+
+    def test_skips_corrupt_files(self, tmp_path):
+        json_dir = tmp_path / "json"
+        _write_json(json_dir, "good", nickname="好")
+        (json_dir / "bad.json").write_text("{broken", encoding="utf-8")
+        (json_dir / "list.json").write_text("[]", encoding="utf-8")
+        assert [uid for uid, _ in read_json_dir(json_dir)] == ["good"]
+
+    def test_cli(self, tmp_path, capsys):
+        json_dir = tmp_path / "json"
+        _write_json(json_dir, "u1", nickname="小明")
+        db_path = tmp_path / "out.db"
+        assert migrate.main(["--json-dir", str(json_dir), "--db", str(db_path)]) == 0
+        assert "imported 1" in capsys.readouterr().out
+        backend = SQLiteMemoryBackend(db_path)
+        assert backend.load("u1").nickname == "小明"
+        backend.close()
+        assert json.loads((json_dir / "u1.json").read_text(encoding="utf-8"))["nickname"] == "小明"
@@ -0,0 +1,52 @@
+"""测试 metrics.py — 计数器、仪表、直方图。"""
+
+from __future__ import annotations
+
+from wallace.metrics import Histogram, MetricsRegistry
+
+
+class TestMetricsRegistry:
+    def test_counter_with_labels(self):
+        reg = MetricsRegistry()
+        reg.inc("frames", codec="pcm")
+        reg.inc("frames", 2, codec="pcm")
+        reg.inc("frames", codec="adpcm")
+        assert reg.counter("frames", codec="pcm") == 3
+        assert reg.counter("frames", codec="adpcm") == 1
+        assert reg.counter("frames") == 0
+
+    def test_gauge(self):
+        reg = MetricsRegistry()
+        reg.set_gauge("depth", 5)
+        reg.set_gauge("depth", 2)
+        assert reg.gauge("depth") == 2
+
+    def test_snapshot_and_reset(self):
+        reg = MetricsRegistry()
+        reg.inc("a")
+        reg.observe("lat", 0.1, stage="asr")
+        snap = reg.snapshot()
+        assert snap["counters"] == {"a": 1}
+        assert snap["histograms"]["lat{stage=asr}"]["count"] == 1
+        reg.reset()
+        assert reg.snapshot() == {"counters": {}, "gauges": {}, "histograms": {}}
+
+
+class TestHistogram:
+    def test_quantiles(self):
+        hist = Histogram()
+        for v in range(1, 101):
+            hist.observe(float(v))
+        assert hist.count == 100
+        assert hist.quantile(0.5) == 51
+        assert hist.quantile(0.99) == 100
+
+    def test_window_bounds_memory(self):
+        hist = Histogram(window=10)
+        for v in range(100):
+            hist.observe(float(v))
+        assert hist.count == 100
+        assert hist.quantile(0.0) == 90
+
+    def test_empty(self):
+        assert Histogram().snapshot()["p95"] == 0.0
@@ -0,0 +1,157 @@
+"""测试 ws/outbox.py — 单写任务、优先级、遥测合并 / 丢弃、取消。"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from wallace.metrics import metrics
+from wallace.ws.outbox import Outbox, Priority
+
+
+class SlowWebSocket:
+    """每次发送需等待放行的 WebSocket，记录写出顺序与并发数。"""
+
+    def __init__(self) -> None:
+        self.sent: list[str | bytes] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.writing = 0
+        self.max_writing = 0
+
+    async def _write(self, data: str | bytes) -> None:
+        self.writing += 1
+        self.max_writing = max(self.max_writing, self.writing)
+        try:
+            await self.gate.wait()
+            self.sent.append(data)
+        finally:
+            self.writing -= 1
+
+    async def send_text(self, data: str) -> None:
+        await self._write(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._write(data)
+
+
+def _msg(name: str) -> str:
+    return json.dumps({"type": name})
+
+
+class TestOrdering:
+    """串行写出与优先级。"""
+
+    async def test_idle_send_writes_directly(self):
+        ws = SlowWebSocket()
+        outbox = Outbox(ws)
+        await outbox.send_text(_msg("pong"))
+        assert ws.sent == [_msg("pong")]
+        assert outbox.depth() == 0
+
+    async def test_priority_while_blocked(self):
+        ws = SlowWebSocket()
+        ws.gate.clear()
+        outbox = Outbox(ws)
+        first = asyncio.create_task(outbox.send_bytes(b"a1"))
+        await asyncio.sleep(0)  # a1 正在写出
+        outbox.post_telemetry(_msg("trace"))
+        audio = asyncio.create_task(outbox.send_bytes(b"a2"))
+        control = asyncio.create_task(outbox.send_text(_msg("tts_end")))
+        await asyncio.sleep(0)
+        assert outbox.depth() == 3
+
+        ws.gate.set()
+        await asyncio.gather(first, audio, control)
+        await outbox.drain()
+        assert ws.sent == [b"a1", _msg("tts_end"), b"a2", _msg("trace")]
+        assert ws.max_writing == 1
+
+    async def test_same_priority_fifo(self):
+        ws = SlowWebSocket()
+        ws.gate.clear()
+        outbox = Outbox(ws)
+        tasks = [asyncio.create_task(outbox.send_bytes(bytes([i]))) for i in range(5)]
+        await asyncio.sleep(0)
+        ws.gate.set()
+        await asyncio.gather(*tasks)
+        assert ws.sent == [bytes([i]) for i in range(5)]
+
+
+class TestTelemetry:
+    """遥测有界：同 key 合并，超限丢弃最旧。"""
+
+    async def test_merge_by_key(self):
+        ws = SlowWebSocket()
+        ws.gate.clear()
+        outbox = Outbox(ws)
+        blocker = asyncio.create_task(outbox.send_text(_msg("pong")))
+        await asyncio.sleep(0)
+        before = metrics.counter("outbox_dropped_total", reason="merged")
+
+        outbox.post_telemetry('{"v": 1}', key="sensor_alert:air")
+        outbox.post_telemetry('{"v": 2}', key="sensor_alert:air")
+        assert outbox.depth(Priority.TELEMETRY) == 1
+        assert metrics.counter("outbox_dropped_total", reason="merged") == before + 1
+
+        ws.gate.set()
+        await blocker
+        await outbox.drain()
+        assert ws.sent[-1] == '{"v": 2}'
+
+    async def test_overflow_drops_oldest(self):
+        ws = SlowWebSocket()
+        ws.gate.clear()
+        outbox = Outbox(ws, max_telemetry=2)
+        for i in range(4):
+            outbox.post_telemetry(str(i))
+        await asyncio.sleep(0)
+        ws.gate.set()
+        await outbox.drain()
+        assert ws.sent == ["2", "3"]
+        assert outbox.depth() == 0
+
+
+class TestCancellation:
+    """生产者取消与连接关闭。"""
+
+    async def test_cancelled_producer_skipped(self):
+        ws = SlowWebSocket()
+        ws.gate.clear()
+        outbox = Outbox(ws)
+        first = asyncio.create_task(outbox.send_bytes(b"a1"))
+        await asyncio.sleep(0)
+        stale = asyncio.create_task(outbox.send_bytes(b"stale"))
+        await asyncio.sleep(0)
+        stale.cancel()
+        ws.gate.set()
+        await first
+        await outbox.drain()
+        assert ws.sent == [b"a1"]
+
+    async def test_send_error_reaches_producer(self):
+        class BrokenWebSocket:
+            async def send_text(self, data: str) -> None:
+                raise RuntimeError("closed")
+
+        outbox = Outbox(BrokenWebSocket())
+        with pytest.raises(RuntimeError, match="closed"):
+            await outbox.send_text(_msg("pong"))
+
+    async def test_close_drops_pending(self):
+        ws = SlowWebSocket()
+        ws.gate.clear()
+        outbox = Outbox(ws)
+        first = asyncio.create_task(outbox.send_bytes(b"a1"))
+        await asyncio.sleep(0)
+        pending = asyncio.create_task(outbox.send_bytes(b"a2"))
+        await asyncio.sleep(0)
+        outbox.close()
+        ws.gate.set()
+        await asyncio.gather(first, pending, return_exceptions=True)
+        assert pending.cancelled()
+        assert ws.sent == [b"a1"]  # 已在写出的一条不受影响
+        await outbox.send_text(_msg("tts_cancel"))  # 关闭后静默丢弃
+        assert ws.sent == [b"a1"]
@@ -0,0 +1,107 @@
+"""测试 pipeline/pacer.py — 播放时钟节流与 credit 流控。"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from wallace.pipeline.pacer import FRAME_DURATION, AudioPacer
+
+
+class TestPlaybackClock:
+    """按播放时钟限制设备端缓冲深度。"""
+
+    async def test_first_messages_not_delayed(self):
+        pacer = AudioPacer(jitter_buffer=0.1)
+        start = time.monotonic()
+        for _ in range(3):  # 3 帧 = 96ms < 100ms
+            await pacer.wait()
+            pacer.on_sent(1)
+        assert time.monotonic() - start < 0.05
+
+    async def test_waits_when_buffer_full(self):
+        pacer = AudioPacer(jitter_buffer=0.05)
+        pacer.on_sent(4)  # 128ms 已在设备缓冲中
+        start = time.monotonic()
+        await pacer.wait()
+        # 需等缓冲降到 50ms 以下：约 78ms
+        assert time.monotonic() - start == pytest.approx(4 * FRAME_DURATION - 0.05, abs=0.03)
+
+    async def test_zero_jitter_disables_pacing(self):
+        pacer = AudioPacer(jitter_buffer=0)
+        pacer.on_sent(100)
+        start = time.monotonic()
+        await pacer.wait()
+        assert time.monotonic() - start < 0.01
+
+    def test_capacity(self):
+        pacer = AudioPacer(jitter_buffer=0.4)
+        assert pacer.capacity() == 12
+        pacer.enable_credits(8)
+        assert pacer.capacity() == 8
+        assert AudioPacer(jitter_buffer=0).capacity() is None
+
+    def test_buffered_tracks_sent_audio(self):
+        pacer = AudioPacer()
+        assert pacer.buffered() == 0
+        pacer.on_sent(10)
+        assert pacer.buffered() == pytest.approx(10 * FRAME_DURATION, abs=0.01)
+
+    def test_reset_clears_buffer(self):
+        pacer = AudioPacer()
+        pacer.on_sent(10)
+        pacer.reset()
+        assert pacer.buffered() == 0
+
+
+class TestCredits:
+    """设备授予额度的流控。"""
+
+    async def test_blocks_until_granted(self):
+        pacer = AudioPacer(jitter_buffer=0)
+        pacer.enable_credits(2)
+        pacer.on_sent(2)
+        assert pacer.credits == 0
+
+        waiter = asyncio.create_task(pacer.wait())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        pacer.grant(1)
+        await asyncio.wait_for(waiter, 1)
+        assert pacer.credits == 1
+
+    def test_grant_capped_at_window(self):
+        pacer = AudioPacer()
+        pacer.enable_credits(4)
+        pacer.on_sent(1)
+        pacer.grant(10)
+        assert pacer.credits == 4
+
+    def test_grant_ignored_when_disabled(self):
+        pacer = AudioPacer()
+        pacer.grant(5)
+        assert not pacer.credits_enabled
+        assert pacer.credits == 0
+
+    def test_reset_restores_window(self):
+        pacer = AudioPacer()
+        pacer.enable_credits(8)
+        pacer.on_sent(8)
+        pacer.reset()
+        assert pacer.credits == 8
+
+    async def test_multi_frame_message_overdraws(self):
+        """多帧消息可透支额度，需补足到正数才继续发送。"""
+        pacer = AudioPacer(jitter_buffer=0)
+        pacer.enable_credits(2)
+        pacer.on_sent(4)
+        assert pacer.credits == -2
+        pacer.grant(2)
+        waiter = asyncio.create_task(pacer.wait())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        pacer.grant(1)
+        await asyncio.wait_for(waiter, 1)
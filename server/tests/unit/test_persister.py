@@ -0,0 +1,286 @@
+"""测试 memory/persister.py — 版本脏检测、合并写入、写线程隔离、失败重试、强制刷写。"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from wallace.config import MemoryConfig
+from wallace.memory.persister import MemoryPersister
+from wallace.memory.store import MemoryStore
+from wallace.metrics import metrics
+from wallace.ws.session import UserMemory
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return tmp_path / "memory"
+
+
+@pytest.fixture
+async def persister(data_dir):
+    p = MemoryPersister(MemoryConfig(data_dir=str(data_dir), sync_interval=3600))
+    yield p
+    await p.close()
+
+
+def _read(data_dir, user_id: str) -> dict:
+    return json.loads((data_dir / f"{user_id}.json").read_text(encoding="utf-8"))
+
+
+class TestUserMemoryVersion:
+    """UserMemory 变更计数。"""
+
+    def test_record_interaction(self):
+        mem = UserMemory()
+        mem.record_interaction()
+        mem.record_interaction()
+        assert mem.interaction_count == 2
+        assert mem.first_met != ""
+        assert mem.version == 2
+
+    def test_version_not_persisted(self):
+        mem = UserMemory()
+        mem.touch()
+        assert "version" not in mem.to_dict()
+        assert UserMemory.from_dict(mem.to_dict()) == mem
+
+
+class TestLoad:
+    """加载与跟踪。"""
+
+    async def test_load_from_disk(self, persister, data_dir):
+        MemoryStore("u1", data_dir).save(UserMemory(nickname="小明"))
+        mem = await persister.load("u1")
+        assert mem.nickname == "小明"
+        assert not persister.is_dirty("u1")
+
+    async def test_load_returns_tracked_object(self, persister):
+        first = await persister.load("u1")
+        first.touch()
+        assert await persister.load("u1") is first
+
+
+class TestCache:
+    """断开后的空闲缓存、LRU 淘汰与并发加载合并。"""
+
+    @staticmethod
+    def _persister(data_dir, cache_size: int) -> MemoryPersister:
+        config = MemoryConfig(data_dir=str(data_dir), sync_interval=3600, cache_size=cache_size)
+        return MemoryPersister(config)
+
+    async def test_reconnect_hits_cache(self, data_dir, monkeypatch):
+        p = self._persister(data_dir, cache_size=10)
+        reads = []
+        original = MemoryStore.load
+        monkeypatch.setattr(MemoryStore, "load", lambda self: (reads.append(1), original(self))[1])
+        first = await p.load("u1")
+        first.record_interaction()
+        await p.release("u1")
+        assert _read(data_dir, "u1")["interaction_count"] == 1  # 断开即写回
+        hits = metrics.snapshot()["counters"].get("memory_cache_hits_total", 0)
+        assert await p.load("u1") is first
+        assert len(reads) == 1
+        assert metrics.snapshot()["counters"]["memory_cache_hits_total"] == hits + 1
+        await p.close()
+
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    async def test_revalidates_shared_backend(self, tmp_path, backend):
+        """两个 worker 共享存储：空闲缓存命中时读到对方的修改，写回不覆盖对方。"""
+        config = MemoryConfig(
+            backend=backend,
+            data_dir=str(tmp_path / "memory"),
+            path=str(tmp_path / "memory.db"),
+            sync_interval=3600,
+            cache_size=10,
+        )
+        a, b = MemoryPersister(config), MemoryPersister(config)
+        first = await a.load("u1")
+        first.record_interaction()
+        await a.release("u1")
+        (await b.load("u1")).record_interaction()
+        await b.release("u1")
+
+        stale = metrics.snapshot()["counters"].get("memory_cache_stale_total", 0)
+        mem = await a.load("u1")
+        assert mem is not first
+        assert mem.interaction_count == 2
+        assert metrics.snapshot()["counters"]["memory_cache_stale_total"] == stale + 1
+        mem.record_interaction()
+        await a.release("u1")
+        assert await a.load("u1") is mem  # 自己的写回不使缓存失效
+        assert (await b.load("u1")).interaction_count == 3
+        await a.close()
+        await b.close()
+
+    async def test_evicts_least_recently_used(self, data_dir):
+        p = self._persister(data_dir, cache_size=2)
+        for user_id in ("u1", "u2", "u3"):
+            (await p.load(user_id)).record_interaction()
+            await p.release(user_id)
+        online = await p.load("u4")  # 在线用户不计入容量、不被淘汰
+        assert set(p._tracked) == {"u2", "u3", "u4"}
+        reloaded = await p.load("u1")
+        assert reloaded.interaction_count == 1  # 淘汰前已落盘
+        assert p._tracked["u4"] is online
+        await p.close()
+
+    async def test_zero_cache_releases_immediately(self, data_dir):
+        p = self._persister(data_dir, cache_size=0)
+        await p.load("u1")
+        await p.release("u1")
+        assert p._tracked == {}
+        await p.close()
+
+    async def test_dirty_user_not_evicted(self, data_dir, monkeypatch):
+        p = self._persister(data_dir, cache_size=0)
+        monkeypatch.setattr(MemoryStore, "write", lambda self, data: (_ for _ in ()).throw(
+            OSError("disk full")
+        ))
+        (await p.load("u1")).record_interaction()
+        await p.release("u1")
+        assert "u1" in p._tracked
+        monkeypatch.undo()
+        await p.flush()
+        p._evict()
+        assert p._tracked == {}
+        assert _read(data_dir, "u1")["interaction_count"] == 1
+        await p.close()
+
+    async def test_concurrent_loads_read_once(self, data_dir, monkeypatch):
+        """重连风暴：同一用户的多条连接同时加载只读一次。"""
+        p = self._persister(data_dir, cache_size=10)
+        reads = []
+        original = MemoryStore.load
+
+        def slow_load(self):
+            reads.append(1)
+            time.sleep(0.05)
+            return original(self)
+
+        monkeypatch.setattr(MemoryStore, "load", slow_load)
+        results = await asyncio.gather(*(p.load("u1") for _ in range(5)))
+        assert len(reads) == 1
+        assert all(r is results[0] for r in results)
+        assert "u1" not in p._idle
+        await p.close()
+
+    async def test_cancelled_load_stays_evictable(self, data_dir, monkeypatch):
+        p = self._persister(data_dir, cache_size=0)
+        original = MemoryStore.load
+        monkeypatch.setattr(MemoryStore, "load", lambda self: (time.sleep(0.05), original(self))[1])
+        task = asyncio.create_task(p.load("u1"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.1)
+        assert "u1" in p._idle
+        p._evict()
+        assert p._tracked == {}
+        await p.close()
+
+
+class TestFlush:
+    """刷写与合并。"""
+
+    async def test_clean_memory_not_written(self, persister, data_dir):
+        await persister.load("u1")
+        assert await persister.flush() == 0
+        assert not (data_dir / "u1.json").exists()
+
+    async def test_coalesces_changes(self, persister, data_dir, monkeypatch):
+        writes = []
+        original = MemoryStore.write
+        monkeypatch.setattr(
+            MemoryStore, "write", lambda self, data: (writes.append(data), original(self, data))
+        )
+        mem = await persister.load("u1")
+        for _ in range(10):
+            mem.record_interaction()
+        assert await persister.flush() == 1
+        assert await persister.flush() == 0
+        assert len(writes) == 1
+        assert _read(data_dir, "u1")["interaction_count"] == 10
+
+    async def test_write_off_event_loop(self, persister, monkeypatch):
+        """慢磁盘只阻塞写线程，事件循环照常调度。"""
+        threads = []
+
+        def slow_write(self, data):
+            threads.append(threading.current_thread())
+            time.sleep(0.2)
+
+        monkeypatch.setattr(MemoryStore, "write", slow_write)
+        mem = await persister.load("u1")
+        mem.touch()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await persister.flush("u1")
+        task.cancel()
+        assert threads[0] is not threading.main_thread()
+        assert ticks >= 10
+
+    async def test_change_during_write_stays_dirty(self, persister, data_dir, monkeypatch):
+        started = threading.Event()
+        release = threading.Event()
+        original = MemoryStore.write
+
+        def blocking_write(self, data):
+            started.set()
+            release.wait(5)
+            original(self, data)
+
+        monkeypatch.setattr(MemoryStore, "write", blocking_write)
+        mem = await persister.load("u1")
+        mem.record_interaction()
+        flush = asyncio.create_task(persister.flush("u1"))
+        await asyncio.to_thread(started.wait, 5)
+        mem.record_interaction()  # 写入进行中的修改
+        release.set()
+        await flush
+        assert _read(data_dir, "u1")["interaction_count"] == 1
+        assert persister.is_dirty("u1")
+        await persister.flush("u1")
+        assert _read(data_dir, "u1")["interaction_count"] == 2
+
+    async def test_write_error_retried(self, persister, data_dir, monkeypatch):
+        original = MemoryStore.write
+        monkeypatch.setattr(MemoryStore, "write", lambda self, data: (_ for _ in ()).throw(
+            OSError("disk full")
+        ))
+        mem = await persister.load("u1")
+        mem.touch()
+        assert await persister.flush() == 0
+        assert persister.is_dirty("u1")
+
+        monkeypatch.setattr(MemoryStore, "write", original)
+        assert await persister.flush() == 1
+        assert not persister.is_dirty("u1")
+
+    async def test_background_interval(self, data_dir):
+        p = MemoryPersister(MemoryConfig(data_dir=str(data_dir), sync_interval=0.05))
+        await p.start()
+        mem = await p.load("u1")
+        mem.record_interaction()
+        await asyncio.sleep(0.2)
+        assert _read(data_dir, "u1")["interaction_count"] == 1
+        await p.close()
+
+    async def test_close_flushes_all(self, data_dir):
+        p = MemoryPersister(MemoryConfig(data_dir=str(data_dir), sync_interval=3600))
+        await p.start()
+        for user_id in ("u1", "u2"):
+            (await p.load(user_id)).record_interaction()
+        await p.close()
+        assert _read(data_dir, "u1")["interaction_count"] == 1
+        assert _read(data_dir, "u2")["interaction_count"] == 1
@@ -2,9 +2,16 @@
 
 from __future__ import annotations
 
+import json
+
 import pytest
+from pydantic import ValidationError
 
 from wallace.ws.protocol import (
+    PONG,
+    TTS_CANCEL,
+    TTS_END,
+    AudioCreditMessage,
     AudioEndMessage,
     AudioStartMessage,
     CareMessage,
@@ -27,8 +34,10 @@ from wallace.ws.protocol import (
     TextMessage,
     WakewordResultMessage,
     WakewordVerifyMessage,
+    decode_esp32_message,
     parse_esp32_message,
     parse_server_message,
+    tts_start,
 )
 
 
@@ -81,6 +90,7 @@ class TestESP32Messages:
             (LocalCmdMessage, {"type": "local_cmd", "action": "light_on"}),
             (ImageMessage, {"type": "image", "data": "base64data"}),
             (ConfigMessage, {"type": "config", "tts_backend": "cosyvoice"}),
+            (AudioCreditMessage, {"type": "audio_credit", "frames": 16}),
         ],
     )
     def test_roundtrip(self, cls, data):
@@ -196,3 +206,50 @@ class TestEventSubtypes:
     def test_invalid_event_type(self):
         with pytest.raises(Exception):
             parse_esp32_message({"type": "event", "event": "invalid_event"})
+
+
+class TestDecode:
+    """JSON 文本单次解析为具体消息类型。"""
+
+    @pytest.mark.parametrize(
+        "raw,cls",
+        [
+            ('{"type": "ping"}', PingMessage),
+            (b'{"type": "audio_credit", "frames": 4}', AudioCreditMessage),
+            ('{"type": "config", "audio_codecs": ["adpcm"]}', ConfigMessage),
+            (
+                '{"type": "sensor", "temp": 1, "humidity": 2, "light": 3, "air_quality": 4}',
+                SensorMessage,
+            ),
+        ],
+    )
+    def test_decode(self, raw, cls):
+        assert isinstance(decode_esp32_message(raw), cls)
+
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            "not json{{{",
+            '{"type": "nonexistent"}',
+            '{"temp": 1}',
+            '{"type": "sensor", "temp": 26.5}',
+            '{"type": "tts_end"}',  # 服务端消息不接受
+        ],
+    )
+    def test_invalid_raises_validation_error(self, raw):
+        with pytest.raises(ValidationError):
+            decode_esp32_message(raw)
+
+
+class TestPreserialized:
+    """预序列化常量与即时序列化结果一致。"""
+
+    def test_constants(self):
+        assert PONG == PongMessage().model_dump_json()
+        assert TTS_END == TTSEndMessage().model_dump_json()
+        assert TTS_CANCEL == TTSCancelMessage().model_dump_json()
+
+    def test_tts_start_cached_per_mood(self):
+        assert json.loads(tts_start("happy")) == {"type": "tts_start", "mood": "happy"}
+        assert tts_start("happy") is tts_start("happy")
+        assert tts_start() == TTSStartMessage().model_dump_json()
@@ -0,0 +1,123 @@
+"""测试 registry.py — 会话归属、重连状态、领导者租约、按归属投递。"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from wallace.config import RegistryConfig
+from wallace.registry import LocalRegistry, SQLiteRegistry, create_registry
+
+
+def _collector(received: list):
+    async def handler(user_id: str, payload: dict) -> None:
+        received.append((user_id, payload))
+
+    return handler
+
+
+class TestLocalRegistry:
+    """单进程注册表。"""
+
+    async def test_state_survives_release(self):
+        registry = LocalRegistry()
+        assert await registry.claim("u1") is None
+        await registry.save("u1", {"personality": "cool"})
+        await registry.release("u1")
+        assert await registry.owner("u1") is None
+        assert await registry.claim("u1") == {"personality": "cool"}
+        assert await registry.owner("u1") == registry.worker_id
+
+    async def test_broadcast_to_online(self):
+        registry = LocalRegistry()
+        received: list = []
+        registry.subscribe("care", _collector(received))
+        await registry.claim("u1")
+        await registry.claim("u2")
+        await registry.release("u2")
+        assert await registry.broadcast("care", {"mood": "happy"}) == 1
+        assert received == [("u1", {"mood": "happy"})]
+        assert registry.is_leader
+
+    def test_factory(self, tmp_path):
+        assert isinstance(create_registry(), LocalRegistry)
+        config = RegistryConfig(backend="sqlite", path=str(tmp_path / "r.db"))
+        assert isinstance(create_registry(config), SQLiteRegistry)
+
+
+@pytest.fixture
+def config(tmp_path):
+    return RegistryConfig(
+        backend="sqlite", path=str(tmp_path / "registry.db"), lease_seconds=30, poll_interval=0.01
+    )
+
+
+@pytest.fixture
+async def workers(config):
+    a = SQLiteRegistry(config, worker_id="a")
+    b = SQLiteRegistry(config, worker_id="b")
+    await a.start()
+    await b.start()
+    yield a, b
+    await a.close()
+    await b.close()
+
+
+class TestSQLiteRegistry:
+    """同主机多 worker 共享的 SQLite 注册表。"""
+
+    async def test_single_leader(self, workers):
+        a, b = workers
+        assert a.is_leader
+        assert not b.is_leader
+        await b._renew()
+        assert not b.is_leader
+
+    async def test_leadership_handover(self, workers):
+        a, b = workers
+        await a.close()  # 主动交出租约
+        await b._renew()
+        assert b.is_leader
+
+    async def test_state_shared_across_workers(self, workers):
+        a, b = workers
+        assert await a.claim("u1") is None
+        await a.save("u1", {"personality": "tsundere", "treehouse_mode": True})
+        # 重连落到另一个 worker
+        assert await b.claim("u1") == {"personality": "tsundere", "treehouse_mode": True}
+        assert await a.owner("u1") == "b"
+
+    async def test_stale_release_ignored(self, workers):
+        a, b = workers
+        await a.claim("u1")
+        await b.claim("u1")
+        await a.release("u1")  # 旧连接在 a 上迟到的断开
+        assert await b.owner("u1") == "b"
+        await b.release("u1")
+        assert await a.owner("u1") is None
+
+    async def test_broadcast_delivered_by_owner(self, workers):
+        a, b = workers
+        got_a: list = []
+        got_b: list = []
+        a.subscribe("care", _collector(got_a))
+        b.subscribe("care", _collector(got_b))
+        await a.claim("u1")
+        await b.claim("u2")
+        await b.claim("u3")
+        await b.release("u3")
+
+        assert await a.broadcast("care", {"prompt": "hi"}) == 2
+        for _ in range(100):
+            if got_a and got_b:
+                break
+            await asyncio.sleep(0.01)
+        assert got_a == [("u1", {"prompt": "hi"})]
+        assert got_b == [("u2", {"prompt": "hi"})]
+
+    async def test_dead_worker_skipped(self, workers):
+        a, b = workers
+        await b.claim("u1")
+        await b.close()  # b 退出，租约移除
+        assert await a.broadcast("care", {}) == 0
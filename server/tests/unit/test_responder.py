@@ -0,0 +1,142 @@
+"""测试 pipeline/responder.py — 流式应答、收尾消息、打断。"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from wallace.metrics import metrics
+from wallace.pipeline.responder import StreamingResponder
+from wallace.ws.protocol import CareMessage, TextMessage
+from wallace.ws.session import PipelineState
+
+
+def _text_final(r):
+    return TextMessage(content=r.text, mood=r.mood.value)
+
+
+@pytest.fixture
+def responder(mock_llm, mock_tts):
+    return StreamingResponder(mock_llm, mock_tts)
+
+
+def _stream(*tokens):
+    async def chat_stream(messages):
+        for token in tokens:
+            yield token
+
+    return chat_stream
+
+
+class TestRespond:
+    """逐句播报与收尾。"""
+
+    async def test_message_order(self, responder, session, mock_ws):
+        response = await responder.respond(
+            session, [], kind="conversation", start_mood="thinking", final=_text_final
+        )
+
+        types = [m["type"] for m in mock_ws.get_sent_json_messages()]
+        assert types == ["tts_start", "text", "tts_end"]
+        assert response.text == "你好呀！"
+        assert response.mood.value == "happy"
+        assert response.spoke
+
+    async def test_mood_tag_not_synthesized(self, responder, mock_tts, session):
+        texts = []
+
+        async def track(text):
+            texts.append(text)
+            yield b"\x00" * 1024
+
+        mock_tts.synthesize = track
+        responder.llm.chat_stream = _stream("你好。[mood:happy]再见。")
+
+        await responder.respond(
+            session, [], kind="conversation", start_mood="thinking", final=_text_final
+        )
+        assert texts == ["你好。", "再见。"]
+
+    async def test_empty_response_no_tts(self, responder, session, mock_ws):
+        responder.llm.chat_stream = _stream()
+
+        response = await responder.respond(
+            session, [], kind="care", start_mood="happy",
+            final=lambda r: CareMessage(content=r.text, mood="happy") if r.text else None,
+        )
+        assert not response.spoke
+        assert mock_ws.sent_text == []
+        assert mock_ws.sent_bytes == []
+
+    async def test_first_audio_metric(self, responder, session):
+        hist = metrics.histogram("response_first_audio_seconds", kind="metric_test")
+        before = hist.count if hist else 0
+
+        await responder.respond(
+            session, [], kind="metric_test", start_mood="thinking", final=_text_final
+        )
+        hist = metrics.histogram("response_first_audio_seconds", kind="metric_test")
+        assert hist.count == before + 1
+
+    async def test_no_gap_between_sentences(self, responder, mock_tts, session):
+        """TTS 时延超过抖动缓冲时，下一句在上一句节流发送期间合成，句间不断音。"""
+        session.audio_pacer.jitter_buffer = 0.05
+
+        async def slow_tts(text):
+            await asyncio.sleep(0.15)
+            for _ in range(8):  # 256ms
+                yield b"\x00" * 1024
+
+        mock_tts.synthesize = slow_tts
+        responder.llm.chat_stream = _stream("第一句话。", "第二句话。", "第三句话。")
+        pacer = session.audio_pacer
+        on_sent = pacer.on_sent
+        gaps = []
+
+        def track(frames):
+            # 上一段已播完才送达的时长即设备端的断音
+            if pacer._play_end:
+                gaps.append(max(0.0, time.monotonic() - pacer._play_end))
+            on_sent(frames)
+
+        pacer.on_sent = track
+        await responder.respond(
+            session, [], kind="conversation", start_mood="thinking", final=_text_final
+        )
+        assert len(gaps) == 23
+        assert sum(gaps) < 0.03
+
+
+class TestPush:
+    """主动推送登记为可打断的流水线任务。"""
+
+    async def test_push_restores_idle(self, responder, session):
+        response = await responder.push(
+            session, [], kind="shake", start_mood="surprised", final=_text_final
+        )
+        assert response is not None
+        assert session.state == PipelineState.IDLE
+        assert session.pipeline_task is None
+
+    async def test_push_interrupted(self, responder, session, mock_ws):
+        started = asyncio.Event()
+
+        async def slow_stream(messages):
+            yield "第一句。"
+            started.set()
+            await asyncio.sleep(10)
+            yield "第二句。"
+
+        responder.llm.chat_stream = slow_stream
+        push = asyncio.create_task(
+            responder.push(session, [], kind="care", start_mood="happy", final=_text_final)
+        )
+        await started.wait()
+        assert session.state == PipelineState.SPEAKING
+
+        # 模拟 cancel_pipeline 打断
+        session.pipeline_task.cancel()
+        assert await asyncio.wait_for(push, 1) is None
+        assert mock_ws.get_sent_messages_by_type("tts_end") == []
@@ -0,0 +1,162 @@
+"""测试 ws/resume.py — 重放缓冲、发送队列脱离 / 补发、token 托管与过期。"""
+
+from __future__ import annotations
+
+import asyncio
+
+from tests.conftest import MockWebSocket
+from wallace.config import ResumeConfig
+from wallace.metrics import metrics
+from wallace.ws.outbox import Outbox
+from wallace.ws.resume import ReplayBuffer, ResumeManager
+from wallace.ws.session import Session
+
+
+class BrokenWebSocket(MockWebSocket):
+    """连接已断：发送即抛异常。"""
+
+    async def send_text(self, data: str) -> None:
+        raise RuntimeError("closed")
+
+    async def send_bytes(self, data: bytes) -> None:
+        raise RuntimeError("closed")
+
+
+class TestReplayBuffer:
+    """按序号记录，按 ack 取出待补发消息。"""
+
+    def test_since_ack(self):
+        buf = ReplayBuffer()
+        for i in range(5):
+            assert buf.append(str(i)) == i + 1
+        assert buf.since(2) == ["2", "3", "4"]
+        assert buf.since(5) == []
+
+    def test_acked_messages_trimmed(self):
+        buf = ReplayBuffer()
+        for i in range(5):
+            buf.append(str(i))
+        buf.since(3)
+        assert len(buf) == 2
+        assert buf.since(1) is None  # 已确认部分不再保留
+
+    def test_evicts_oldest_by_bytes(self):
+        buf = ReplayBuffer(max_bytes=2048)
+        for i in range(4):
+            buf.append(bytes([i]) * 1024)
+        assert len(buf) == 2
+        assert buf.since(1) is None  # 第 2 条已淘汰，缺口无法补齐
+        assert buf.since(2) == [bytes([2]) * 1024, bytes([3]) * 1024]
+
+    def test_ack_ahead_rejected(self):
+        buf = ReplayBuffer()
+        buf.append("a")
+        assert buf.since(2) is None
+
+
+class TestOutboxReplay:
+    """发送队列：记录写出顺序、断线后继续、重连补发。"""
+
+    async def test_send_failure_detaches(self):
+        outbox = Outbox(BrokenWebSocket())
+        outbox.replay = ReplayBuffer()
+        await outbox.send_text("a")  # 不向生产者抛出
+        await outbox.send_bytes(b"b")
+        assert outbox.ws is None
+        assert outbox.replay.since(0) == ["a", b"b"]
+
+    async def test_attach_replays_before_new_messages(self):
+        ws = MockWebSocket()
+        outbox = Outbox(ws)
+        outbox.replay = ReplayBuffer()
+        for i in range(3):
+            await outbox.send_text(str(i))
+        outbox.detach()
+        await outbox.send_text("3")
+        assert ws.sent_text == ["0", "1", "2"]
+
+        new_ws = MockWebSocket()
+        assert outbox.attach(new_ws, ack=2) == 0  # 无音频
+        await outbox.send_text("4")
+        await outbox.drain()
+        assert new_ws.sent_text == ["2", "3", "4"]
+        assert outbox.replay.seq == 5
+
+    async def test_attach_limits_replayed_audio(self):
+        """断线期间积压的音频只补发设备缓冲容量内最新的部分，序号随之重排。"""
+        outbox = Outbox(MockWebSocket())
+        outbox.replay = ReplayBuffer()
+        outbox.detach()
+        await outbox.send_text("tts_start")
+        for i in range(10):
+            await outbox.send_bytes(bytes([i]) * 8, frames=4)
+        await outbox.send_text("tts_end")
+
+        new_ws = MockWebSocket()
+        assert outbox.attach(new_ws, ack=0, max_audio_frames=12) == 12
+        await outbox.drain()
+        assert new_ws.sent_text == ["tts_start", "tts_end"]
+        assert new_ws.sent_bytes == [bytes([i]) * 8 for i in (7, 8, 9)]
+        assert outbox.replay.seq == 5  # 设备收到 5 条，下次续连的 ack 与序号一致
+
+    async def test_attach_gap_rejected(self):
+        outbox = Outbox(MockWebSocket())
+        outbox.replay = ReplayBuffer(max_bytes=1)
+        for i in range(3):
+            await outbox.send_text(str(i))
+        new_ws = MockWebSocket()
+        assert outbox.attach(new_ws, ack=0) is None
+        assert outbox.ws is not new_ws
+
+    async def test_attach_without_replay(self):
+        outbox = Outbox(MockWebSocket())
+        assert outbox.attach(MockWebSocket(), ack=0) is None
+
+
+class TestResumeManager:
+    """token 签发、托管、取回与过期。"""
+
+    async def test_claim_detached(self, mock_ws):
+        manager = ResumeManager(ResumeConfig(grace_seconds=5))
+        session = Session("u1", mock_ws)
+        token = manager.issue(session)
+        assert session.outbox.replay is not None
+        manager.detach(session, on_expire=None)
+        assert manager.claim(token, "u2") is None  # 不属于该用户
+        assert manager.claim(token, "u1") is session
+        assert len(manager) == 0
+
+    async def test_token_rotates(self, mock_ws):
+        manager = ResumeManager()
+        session = Session("u1", mock_ws)
+        first = manager.issue(session)
+        replay = session.outbox.replay
+        assert manager.issue(session, reset=False) != first
+        assert session.outbox.replay is replay  # 续连时序号跨连接连续
+        manager.issue(session)
+        assert session.outbox.replay is not replay
+
+    async def test_expire_calls_cleanup(self, mock_ws):
+        manager = ResumeManager(ResumeConfig(grace_seconds=0.01))
+        session = Session("u1", mock_ws)
+        token = manager.issue(session)
+        dropped = asyncio.Event()
+
+        async def on_expire(s: Session) -> None:
+            assert s is session
+            dropped.set()
+
+        before = metrics.counter("session_resume_total", outcome="expired")
+        manager.detach(session, on_expire)
+        await asyncio.wait_for(dropped.wait(), 1)
+        assert manager.claim(token, "u1") is None
+        assert metrics.counter("session_resume_total", outcome="expired") == before + 1
+
+    async def test_discard(self, mock_ws):
+        manager = ResumeManager()
+        session = Session("u1", mock_ws)
+        manager.issue(session)
+        assert not manager.discard(session)
+        manager.detach(session, on_expire=None)
+        assert manager.discard(session)
+        assert len(manager) == 0
@@ -0,0 +1,72 @@
+"""测试 pipeline/segmenter.py — 流式分句。"""
+
+from __future__ import annotations
+
+import pytest
+
+from wallace.pipeline.segmenter import SentenceSegmenter
+
+
+def _segment(tokens: list[str], **kwargs) -> list[str]:
+    seg = SentenceSegmenter(**kwargs)
+    chunks = [c for t in tokens for c in seg.feed(t)]
+    rest = seg.flush()
+    return chunks + ([rest] if rest else [])
+
+
+class TestSentenceEndings:
+    """句末标点切分。"""
+
+    @pytest.mark.parametrize("punct", ["。", "！", "？", "；", "\n"])
+    def test_split_on_ending(self, punct):
+        assert _segment([f"第一句{punct}第二句"]) == [f"第一句{punct}".strip(), "第二句"]
+
+    def test_one_token_many_sentences(self):
+        seg = SentenceSegmenter()
+        assert seg.feed("你好。世界！再见？") == ["你好。", "世界！", "再见？"]
+        assert seg.flush() == ""
+
+    def test_char_by_char(self):
+        assert _segment(list("你好。世界！")) == ["你好。", "世界！"]
+
+    def test_short_sentence_merged(self):
+        assert _segment(["嗯。", "好的。"], min_chars=3) == ["嗯。好的。"]
+
+    def test_whitespace_only_dropped(self):
+        assert _segment(["你好。", "\n", "\n", "世界。"]) == ["你好。", "世界。"]
+
+    def test_flush_resets(self):
+        seg = SentenceSegmenter()
+        seg.feed("没有标点")
+        assert seg.flush() == "没有标点"
+        assert seg.flush() == ""
+
+
+class TestEarlyFlush:
+    """首块在停顿标点处提前切出。"""
+
+    def test_first_clause_flushed(self):
+        chunks = _segment(["今天天气很好，", "适合出去走走，", "我们去公园吧。"])
+        assert chunks == ["今天天气很好，", "适合出去走走，我们去公园吧。"]
+
+    def test_short_first_clause_not_flushed(self):
+        assert _segment(["你好，我是瓦力。"]) == ["你好，我是瓦力。"]
+
+    def test_only_first_chunk(self):
+        seg = SentenceSegmenter(first_chunk_min_chars=2)
+        assert seg.feed("第一句。") == ["第一句。"]
+        assert seg.feed("然后，") == []
+
+
+class TestMaxChars:
+    """无句末标点的长句切分。"""
+
+    def test_split_at_last_clause(self):
+        text = "一二三四，五六七八，九十"
+        assert _segment([text], max_chars=11, first_chunk_min_chars=100) == [
+            "一二三四，五六七八，",
+            "九十",
+        ]
+
+    def test_hard_cut_without_clause(self):
+        assert _segment(["一二三四五六七"], max_chars=3) == ["一二三", "四五六", "七"]
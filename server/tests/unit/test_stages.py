@@ -0,0 +1,149 @@
+"""测试 pipeline/stages.py — 阶段顺序校验、执行器、并发 / 排队上限、指标。"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from wallace.config import PipelineConfig, StageConfig
+from wallace.metrics import metrics
+from wallace.pipeline.codec import IMAADPCMEncoder
+from wallace.pipeline.stages import StageBusy, StageGraph, validate_order
+
+
+def _graph(**stages: StageConfig) -> StageGraph:
+    return StageGraph(PipelineConfig(**stages))
+
+
+async def _items(n: int):
+    for i in range(n):
+        yield i
+
+
+class TestOrder:
+    """阶段列表校验。"""
+
+    def test_default_order(self):
+        graph = StageGraph()
+        assert graph.text_stages() == ["filter", "intent"]
+        assert "filter" in graph
+
+    def test_optional_stages_can_be_dropped_or_swapped(self):
+        graph = StageGraph(PipelineConfig(stages=[
+            "vad", "asr", "intent", "filter", "llm", "segment", "tts", "encode", "send",
+        ]))
+        assert graph.text_stages() == ["intent", "filter"]
+        validate_order(["vad", "asr", "llm", "segment", "tts", "encode", "send"])
+
+    @pytest.mark.parametrize(
+        "stages",
+        [
+            ["vad", "asr", "llm", "segment", "tts", "encode"],  # 缺 send
+            ["asr", "vad", "llm", "segment", "tts", "encode", "send"],  # 顺序错
+            ["vad", "filter", "asr", "llm", "segment", "tts", "encode", "send"],
+            ["vad", "asr", "rerank", "llm", "segment", "tts", "encode", "send"],
+            ["vad", "asr", "filter", "filter", "llm", "segment", "tts", "encode", "send"],
+        ],
+    )
+    def test_invalid_order_rejected(self, stages):
+        with pytest.raises(ValueError):
+            validate_order(stages)
+
+    def test_executor_must_fit_stage(self):
+        with pytest.raises(ValueError, match="llm"):
+            _graph(llm=StageConfig(executor="thread"))
+        with pytest.raises(ValueError, match="asr"):
+            _graph(asr=StageConfig(executor="process"))
+
+
+class TestExecutors:
+    """同步工作按执行器调度。"""
+
+    async def test_loop_runs_inline(self):
+        graph = _graph()
+        assert graph["vad"].executor is None
+        assert await graph["vad"].call(threading.get_ident) == threading.get_ident()
+
+    async def test_thread_runs_off_loop(self):
+        graph = _graph(vad=StageConfig(executor="thread", concurrency=1))
+        try:
+            assert await graph["vad"].call(threading.get_ident) != threading.get_ident()
+        finally:
+            graph.close()
+
+    async def test_process_pool_encodes(self):
+        graph = _graph(encode=StageConfig(executor="process"))
+        encoder = IMAADPCMEncoder()
+        pcm = bytes(range(256)) * 8
+        try:
+            assert await graph["encode"].call(encoder.encode, pcm) == encoder.encode(pcm)
+        finally:
+            graph.close()
+
+
+class TestLimits:
+    """并发上限与有界排队。"""
+
+    async def test_concurrency_and_queue_bound(self):
+        graph = _graph(vad=StageConfig(concurrency=1, queue=1))
+        stage = graph["vad"]
+        release = asyncio.Event()
+        before = metrics.counter("stage_rejected_total", stage="vad")
+
+        first = asyncio.create_task(stage.run(release.wait))
+        second = asyncio.create_task(stage.run(release.wait))
+        await asyncio.sleep(0)
+        assert stage.inflight == 1
+        assert stage.waiting == 1
+        assert metrics.gauge("stage_waiting", stage="vad") == 1
+
+        with pytest.raises(StageBusy):
+            await stage.run(release.wait)
+        assert metrics.counter("stage_rejected_total", stage="vad") == before + 1
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert stage.inflight == 0
+        assert stage.waiting == 0
+
+    async def test_unbounded_by_default(self):
+        stage = _graph()["segment"]
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(stage.run(release.wait)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert stage.inflight == 5
+        release.set()
+        await asyncio.gather(*tasks)
+
+
+class TestStream:
+    """流式阶段占用一个名额直到流结束。"""
+
+    async def test_stream_counts_items(self):
+        stage = _graph(tts=StageConfig(concurrency=1))["tts"]
+        before = metrics.counter("stage_items_total", stage="tts")
+        assert [i async for i in stage.stream(_items(3))] == [0, 1, 2]
+        assert metrics.counter("stage_items_total", stage="tts") == before + 3
+        assert metrics.histogram("stage_first_item_seconds", stage="tts") is not None
+        assert stage.inflight == 0
+
+    async def test_early_close_releases_slot_and_upstream(self):
+        stage = _graph(llm=StageConfig(concurrency=1))["llm"]
+        closed = False
+
+        async def upstream():
+            nonlocal closed
+            try:
+                for i in range(10):
+                    yield i
+            finally:
+                closed = True
+
+        stream = stage.stream(upstream())
+        assert await anext(stream) == 0
+        assert stage.inflight == 1
+        await stream.aclose()
+        assert closed
+        assert stage.inflight == 0
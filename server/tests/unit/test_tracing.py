@@ -0,0 +1,74 @@
+"""测试 tracing.py — 阶段时间点、直方图导出、调试订阅。"""
+
+from __future__ import annotations
+
+import json
+
+from wallace.metrics import metrics
+from wallace.tracing import STAGES, TraceHub, TurnTrace
+
+
+class TestTurnTrace:
+    def test_mark_keeps_first(self):
+        trace = TurnTrace(1)
+        trace.mark("asr")
+        first = trace.marks["asr"]
+        trace.mark("asr")
+        assert trace.marks["asr"] == first
+
+    def test_mark_last_overwrites(self):
+        trace = TurnTrace(1)
+        trace.mark_last("last_frame_sent")
+        first = trace.marks["last_frame_sent"]
+        trace.mark_last("last_frame_sent")
+        assert trace.marks["last_frame_sent"] >= first
+
+    def test_elapsed_in_stage_order(self):
+        trace = TurnTrace(3, kind="shake")
+        trace.mark("first_frame_sent")
+        trace.mark("llm_first_token")
+        trace.mark("audio_end")
+        stages = trace.elapsed_ms()
+        assert list(stages) == [s for s in STAGES if s in stages]
+        assert all(isinstance(v, int) and v >= 0 for v in stages.values())
+        assert trace.to_dict()["kind"] == "shake"
+
+
+class TestTraceHub:
+    def test_publish_observes_histograms(self):
+        hub = TraceHub()
+        trace = TurnTrace(1, kind="hub_test")
+        trace.mark("asr")
+        hub.publish("u1", trace)
+
+        hist = metrics.histogram("turn_stage_seconds", kind="hub_test", stage="asr")
+        assert hist is not None and hist.count >= 1
+        assert hub.recent[-1]["user_id"] == "u1"
+
+    def test_failed_turn_not_observed(self):
+        hub = TraceHub()
+        trace = TurnTrace(1, kind="hub_cancel_test")
+        trace.mark("asr")
+        trace.outcome = "cancelled"
+        hub.publish("u1", trace)
+
+        assert metrics.histogram("turn_stage_seconds", kind="hub_cancel_test", stage="asr") is None
+        assert metrics.counter("turns_total", kind="hub_cancel_test", outcome="cancelled") == 1
+
+    async def test_subscriber_receives_json(self):
+        hub = TraceHub()
+        queue = hub.subscribe()
+        hub.publish("u1", TurnTrace(7))
+        record = json.loads(queue.get_nowait())
+        assert record["turn"] == 7
+
+        hub.unsubscribe(queue)
+        hub.publish("u1", TurnTrace(8))
+        assert queue.empty()
+
+    async def test_slow_subscriber_drops(self):
+        hub = TraceHub()
+        queue = hub.subscribe()
+        for i in range(queue.maxsize + 5):
+            hub.publish("u1", TurnTrace(i))
+        assert queue.qsize() == queue.maxsize
@@ -0,0 +1,30 @@
+"""测试 pipeline/transcript.py — 幻听过滤、叫停识别。"""
+
+from __future__ import annotations
+
+import pytest
+
+from wallace.pipeline.transcript import Intent, clean_transcript, detect_intent
+
+
+class TestCleanTranscript:
+    """幻听与纯标点文本视为无语音。"""
+
+    def test_keeps_normal_text(self):
+        assert clean_transcript(" 今天天气怎么样？ ") == "今天天气怎么样？"
+
+    @pytest.mark.parametrize("text", ["", "。。。", "……", "谢谢观看！", "字幕由Amara.org社区提供"])
+    def test_drops_noise(self, text):
+        assert clean_transcript(text) == ""
+
+
+class TestDetectIntent:
+    """整句仅为叫停词时识别为 STOP。"""
+
+    @pytest.mark.parametrize("text", ["停！", "别说了。", "闭嘴", "安静 "])
+    def test_stop_words(self, text):
+        assert detect_intent(text) is Intent.STOP
+
+    @pytest.mark.parametrize("text", ["你好", "别说了，讲个笑话吧", "停车场在哪"])
+    def test_chat(self, text):
+        assert detect_intent(text) is Intent.CHAT
@@ -2,12 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from wallace.config import TTSConfig
-from wallace.pipeline.tts import FRAME_SIZE, CosyVoiceBackend, EdgeTTSBackend, TTSManager
+from wallace.pipeline.tts import (
+    FRAME_SIZE,
+    CosyVoiceBackend,
+    EdgeTTSBackend,
+    PiperBackend,
+    TTSManager,
+    _resample,
+    iter_frames,
+)
 
 
 @pytest.fixture
@@ -99,6 +108,44 @@ class TestCosyVoiceBackend:
         assert all(len(f) == FRAME_SIZE for f in frames)
 
 
+class TestPiperBackend:
+    """Piper 本地后端：进程池推理 + 重采样。"""
+
+    async def test_synthesize_in_executor(self, tmp_path):
+        from concurrent.futures import ThreadPoolExecutor
+
+        backend = PiperBackend(str(tmp_path / "voice.onnx"))
+        backend._pool = ThreadPoolExecutor(1)
+        calls = []
+
+        def fake_synthesize(model_path, text):
+            calls.append((model_path, text))
+            return b"\x01\x00" * 1000
+
+        with patch("wallace.pipeline.tts._piper_synthesize", fake_synthesize):
+            frames = [f async for f in backend.synthesize("你好")]
+        backend.close()
+
+        assert calls == [(str(tmp_path / "voice.onnx"), "你好")]
+        assert len(frames) == 2
+        assert all(len(f) == FRAME_SIZE for f in frames)
+
+    async def test_missing_model_raises(self, tmp_path):
+        backend = PiperBackend(str(tmp_path / "missing.onnx"))
+        with pytest.raises(RuntimeError, match="Piper model not found"):
+            [f async for f in backend.synthesize("你好")]
+
+    async def test_empty_text(self, tmp_path):
+        backend = PiperBackend(str(tmp_path / "missing.onnx"))
+        assert [f async for f in backend.synthesize("  ")] == []
+
+    def test_resample_to_16k(self):
+        pcm = b"\x00\x10" * 22050  # 1 秒 @ 22050Hz
+        out = _resample(pcm, 22050)
+        assert len(out) // 2 == pytest.approx(16000, abs=16)
+        assert _resample(pcm, 16000) is pcm
+
+
 class TestTTSManager:
     """TTSManager 后端切换和降级。"""
 
@@ -115,6 +162,24 @@ class TestTTSManager:
         with pytest.raises(ValueError, match="Unknown TTS"):
             tts_manager.switch_backend("unknown")
 
+    def test_piper_not_configured(self, tts_manager):
+        with pytest.raises(ValueError, match="Unknown TTS"):
+            tts_manager.switch_backend("piper")
+        assert [name for name, _ in tts_manager._chain()] == ["edge", "cosyvoice"]
+
+    def test_piper_in_fallback_chain(self):
+        with patch.object(PiperBackend, "available", return_value=True):
+            manager = TTSManager(TTSConfig(piper_model="voice.onnx"))
+        assert [name for name, _ in manager._chain()] == ["edge", "cosyvoice", "piper"]
+        manager.switch_backend("piper")
+        assert [name for name, _ in manager._chain()] == ["piper", "edge", "cosyvoice"]
+        manager.close()
+
+    def test_piper_not_installed(self):
+        with patch.object(PiperBackend, "available", return_value=False):
+            manager = TTSManager(TTSConfig(piper_model="voice.onnx"))
+        assert "piper" not in [name for name, _ in manager._chain()]
+
     async def test_fallback_on_primary_failure(self, tts_manager):
         """主后端失败时降级到备用后端。"""
         call_log = []
@@ -149,6 +214,173 @@ class TestTTSManager:
         frames = [f async for f in tts_manager.synthesize("test")]
         assert frames == []
 
+    async def test_fast_primary_does_not_hedge(self, tts_manager):
+        """主后端首帧在 hedge_delay 内到达 → 不启动备用后端。"""
+        call_log = []
+
+        async def fast(text, voice=""):
+            call_log.append("primary")
+            yield b"\x01" * FRAME_SIZE
+
+        async def fallback(text, voice=""):
+            call_log.append("fallback")
+            yield b"\x02" * FRAME_SIZE
+
+        tts_manager._edge.synthesize = fast
+        tts_manager._cosyvoice.synthesize = fallback
+
+        frames = [f async for f in tts_manager.synthesize("test")]
+        assert call_log == ["primary"]
+        assert frames == [b"\x01" * FRAME_SIZE]
+
+
+class TestHedging:
+    """对冲请求：主后端慢时并行启动备用后端。"""
+
+    @pytest.fixture
+    def hedged_manager(self) -> TTSManager:
+        return TTSManager(TTSConfig(hedge_delay=0.05))
+
+    async def test_slow_primary_loses_to_fallback(self, hedged_manager):
+        primary_cancelled = asyncio.Event()
+
+        async def slow(text, voice=""):
+            try:
+                await asyncio.sleep(5)
+                yield b"\x01" * FRAME_SIZE
+            except asyncio.CancelledError:
+                primary_cancelled.set()
+                raise
+
+        async def fallback(text, voice=""):
+            yield b"\x02" * FRAME_SIZE
+            yield b"\x02" * FRAME_SIZE
+
+        hedged_manager._edge.synthesize = slow
+        hedged_manager._cosyvoice.synthesize = fallback
+
+        frames = await asyncio.wait_for(
+            _collect(hedged_manager.synthesize("test")), timeout=1.0
+        )
+        assert frames == [b"\x02" * FRAME_SIZE] * 2
+        assert primary_cancelled.is_set()
+
+    async def test_primary_wins_race_after_hedge(self, hedged_manager):
+        """备用后端已启动，但主后端先出首帧 → 使用主后端，取消备用。"""
+        fallback_cancelled = asyncio.Event()
+
+        async def primary(text, voice=""):
+            await asyncio.sleep(0.1)
+            yield b"\x01" * FRAME_SIZE
+
+        async def slower_fallback(text, voice=""):
+            try:
+                await asyncio.sleep(5)
+                yield b"\x02" * FRAME_SIZE
+            except asyncio.CancelledError:
+                fallback_cancelled.set()
+                raise
+
+        hedged_manager._edge.synthesize = primary
+        hedged_manager._cosyvoice.synthesize = slower_fallback
+
+        frames = await _collect(hedged_manager.synthesize("test"))
+        assert frames == [b"\x01" * FRAME_SIZE]
+        assert fallback_cancelled.is_set()
+
+    async def test_hedge_log_names_stalled_backend(self, caplog):
+        """主后端已失败、降级后的后端卡住时，日志报告实际未出首帧的后端。"""
+        with patch.object(PiperBackend, "available", return_value=True):
+            manager = TTSManager(TTSConfig(hedge_delay=0.05, piper_model="voice.onnx"))
+
+        async def broken(text, voice=""):
+            raise ConnectionResetError("edge down")
+            yield b""
+
+        async def stalled(text, voice=""):
+            await asyncio.sleep(5)
+            yield b"\x02" * FRAME_SIZE
+
+        async def piper(text, voice=""):
+            yield b"\x03" * FRAME_SIZE
+
+        manager._edge.synthesize = broken
+        manager._cosyvoice.synthesize = stalled
+        manager._piper.synthesize = piper
+
+        with caplog.at_level("INFO", logger="wallace.pipeline.tts"):
+            frames = await asyncio.wait_for(_collect(manager.synthesize("test")), timeout=1.0)
+        assert frames == [b"\x03" * FRAME_SIZE]
+        hedges = [r.getMessage() for r in caplog.records if "hedging" in r.getMessage()]
+        assert hedges == ["TTS (cosyvoice) no first frame in 0.05s, hedging with piper"]
+        manager.close()
+
+    async def test_partial_failure_does_not_replay(self, hedged_manager):
+        """主后端产出部分帧后失败 → 截断，不用备用后端从头重放。"""
+        call_log = []
+
+        async def partial(text, voice=""):
+            yield b"\x01" * FRAME_SIZE
+            raise ConnectionResetError("connection reset")
+
+        async def fallback(text, voice=""):
+            call_log.append("fallback")
+            yield b"\x02" * FRAME_SIZE
+
+        hedged_manager._edge.synthesize = partial
+        hedged_manager._cosyvoice.synthesize = fallback
+
+        frames = await _collect(hedged_manager.synthesize("test"))
+        assert frames == [b"\x01" * FRAME_SIZE]
+        assert call_log == []
+
+    async def test_hedging_disabled(self):
+        """hedge_delay=0 → 只在失败时降级，慢后端不触发对冲。"""
+        manager = TTSManager(TTSConfig(hedge_delay=0))
+        call_log = []
+
+        async def slow(text, voice=""):
+            await asyncio.sleep(0.1)
+            yield b"\x01" * FRAME_SIZE
+
+        async def fallback(text, voice=""):
+            call_log.append("fallback")
+            yield b"\x02" * FRAME_SIZE
+
+        manager._edge.synthesize = slow
+        manager._cosyvoice.synthesize = fallback
+
+        frames = await _collect(manager.synthesize("test"))
+        assert frames == [b"\x01" * FRAME_SIZE]
+        assert call_log == []
+
+
+async def _collect(stream) -> list[bytes]:
+    return [f async for f in stream]
+
+
+class TestFramePadding:
+    """帧补零。"""
+
+    def test_iter_frames_zero_copy(self):
+        """整帧为原缓冲的 memoryview 切片，不复制。"""
+        pcm = bytes(range(256)) * 8  # 2 帧
+        frames = list(iter_frames(pcm))
+        assert len(frames) == 2
+        assert all(isinstance(f, memoryview) for f in frames)
+        assert frames[0].obj is pcm
+        assert b"".join(frames) == pcm
+
+    def test_iter_frames_pads_only_tail(self):
+        pcm = b"\x01" * (FRAME_SIZE + 500)
+        frames = list(iter_frames(pcm))
+        assert [len(f) for f in frames] == [FRAME_SIZE, FRAME_SIZE]
+        assert frames[0].obj is pcm
+        assert bytes(frames[1]) == b"\x01" * 500 + b"\x00" * (FRAME_SIZE - 500)
+
+    def test_iter_frames_empty(self):
+        assert list(iter_frames(b"")) == []
+
     def test_frame_padding(self):
         """最后一帧不足 1024 时补零。"""
         # 验证补零逻辑是否在合成中实现
@@ -2,21 +2,32 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 
 from wallace.config import Settings, load_settings
+from wallace.memory.longterm import LongTermMemory
+from wallace.memory.persister import MemoryPersister
+from wallace.metrics import metrics
 from wallace.pipeline.asr import ASREngine
+from wallace.pipeline.governor import PipelineGovernor
 from wallace.pipeline.llm import LLMClient
 from wallace.pipeline.tts import TTSManager
 from wallace.pipeline.orchestrator import Orchestrator
+from wallace.pipeline.stages import StageGraph
+from wallace.registry import create_registry
 from wallace.sensor import SensorProcessor
 from wallace.wakeword import WakewordVerifier
 from wallace.smarthome.mqtt import MQTTManager
 from wallace.care.scheduler import CareScheduler
+from wallace.tracing import trace_hub
 from wallace.ws.handler import WebSocketHandler
+from wallace.ws.heartbeat import HeartbeatSupervisor
+from wallace.ws.resume import ResumeManager
 from wallace.ws.session import Session
 
 logger = logging.getLogger(__name__)
@@ -33,8 +44,9 @@ async def lifespan(app: FastAPI):
         format="%(asctime)s %(name)s %(levelname)s %(message)s",
     )
 
-    # 2. ASR
-    asr = ASREngine(settings.asr)
+    # 2. 阶段图（各阶段执行器 / 并发上限）+ ASR（转写使用 asr 阶段的线程池）
+    stages = StageGraph(settings.pipeline)
+    asr = ASREngine(settings.asr, executor=stages["asr"].executor)
     await asr.load_model()
 
     # 3. LLM
@@ -57,15 +69,61 @@ async def lifespan(app: FastAPI):
     # 8. Sessions
     sessions: dict[str, Session] = {}
 
-    # 9. Orchestrator
-    orchestrator = Orchestrator(asr, llm, tts, sensor)
-
-    # 10. Care scheduler
-    care = CareScheduler(settings.care, settings.weather, sessions, llm, tts)
+    # 9. 长期记忆 + Orchestrator（全局准入控制 + 单轮预算，后台预合成忙碌 / 致歉 / 填充提示）
+    longterm = None
+    if settings.longterm.enabled:
+        longterm = LongTermMemory(settings.longterm)
+        await longterm.start()
+    orchestrator = Orchestrator(
+        asr,
+        llm,
+        tts,
+        sensor,
+        tts_config=settings.tts,
+        governor=PipelineGovernor(settings.governor),
+        deadline_config=settings.deadline,
+        filler_config=settings.filler,
+        stages=stages,
+        longterm=longterm,
+    )
+    warm_task = asyncio.create_task(orchestrator.warm())
+
+    # 10. 会话注册表（多 worker 共享归属 / 领导者）+ Care scheduler（仅领导者执行定时任务）
+    registry = create_registry(settings.registry)
+    await registry.start()
+    care = CareScheduler(
+        settings.care,
+        settings.weather,
+        sessions,
+        llm,
+        tts,
+        responder=orchestrator.responder,
+        registry=registry,
+    )
     await care.start()
 
-    # 11. Handler
-    handler = WebSocketHandler(sessions, orchestrator, sensor, wakeword, mqtt)
+    # 11. 用户记忆写回 + Handler（全局心跳时间轮、会话续连）
+    memory = MemoryPersister(settings.memory)
+    await memory.start()
+    heartbeat = HeartbeatSupervisor(
+        settings.server.heartbeat_timeout, settings.server.heartbeat_resolution
+    )
+    resume = ResumeManager(settings.resume) if settings.resume.enabled else None
+    handler = WebSocketHandler(
+        sessions,
+        orchestrator,
+        sensor,
+        wakeword,
+        mqtt,
+        tts_config=settings.tts,
+        duplex_config=settings.duplex,
+        outbox_config=settings.outbox,
+        heartbeat=heartbeat,
+        protocol_v2=settings.server.protocol_v2,
+        resume=resume,
+        registry=registry,
+        memory=memory,
+    )
 
     # Store on app state
     app.state.handler = handler
@@ -77,11 +135,22 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown (reverse order)
+    warm_task.cancel()
+    heartbeat.close()
+    if resume is not None:
+        resume.close()
     await care.stop()
     for session in list(sessions.values()):
         await orchestrator.cancel_pipeline(session)
+        await registry.release(session.user_id)
+    await registry.close()
+    await memory.close()
     await mqtt.disconnect()
     await llm.close()
+    tts.close()
+    stages.close()
+    if longterm is not None:
+        longterm.close()
 
 
 def create_app(settings: Settings | None = None) -> FastAPI:
@@ -93,9 +162,9 @@ def create_app(settings: Settings | None = None) -> FastAPI:
     app.state.settings = settings
 
     @app.websocket("/ws/{user_id}")
-    async def ws_endpoint(ws: WebSocket, user_id: str):
+    async def ws_endpoint(ws: WebSocket, user_id: str, resume: str | None = None, ack: int = 0):
         handler: WebSocketHandler = app.state.handler
-        await handler.handle_connection(ws, user_id)
+        await handler.handle_connection(ws, user_id, resume_token=resume, ack=ack)
 
     @app.get("/health")
     async def health():
@@ -105,4 +174,31 @@ def create_app(settings: Settings | None = None) -> FastAPI:
             "mqtt": app.state.mqtt.is_connected if hasattr(app.state, "mqtt") else False,
         }
 
+    @app.websocket("/ws/debug/traces")
+    async def traces_endpoint(ws: WebSocket):
+        """调试用：实时推送每轮 trace（JSON 文本帧），连接时先补发最近记录。"""
+        if not settings.server.debug_traces:
+            await ws.close(code=1008)
+            return
+        await ws.accept()
+        queue = trace_hub.subscribe()
+        try:
+            for record in list(trace_hub.recent):
+                await ws.send_text(json.dumps(record, ensure_ascii=False))
+            while True:
+                await ws.send_text(await queue.get())
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            # 调试端断开后下一次发送才会报错
+            pass
+        finally:
+            trace_hub.unsubscribe(queue)
+
+    @app.get("/metrics")
+    async def metrics_view():
+        sessions = getattr(app.state, "sessions", {})
+        return {
+            **metrics.snapshot(),
+            "sessions": {uid: s.stats() for uid, s in sessions.items()},
+        }
+
     return app
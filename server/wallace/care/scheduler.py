@@ -1,4 +1,8 @@
-"""主动关怀 — APScheduler 定时任务。"""
+"""主动关怀 — APScheduler 定时任务。
+
+多 worker 部署时每个 worker 都启动调度器，但只有注册表领导者执行定时任务：
+生成的关怀经 registry.broadcast 按用户归属投递，由持有该连接的 worker 推送。
+"""
 
 from __future__ import annotations
 
@@ -8,10 +12,15 @@ from typing import TYPE_CHECKING
 
 import httpx
 
+from wallace.pipeline.responder import StreamingResponder
+from wallace.ws.protocol import CareMessage
+from wallace.ws.session import PipelineState
+
 if TYPE_CHECKING:
     from wallace.config import CareConfig, WeatherConfig
     from wallace.pipeline.llm import LLMClient
     from wallace.pipeline.tts import TTSManager
+    from wallace.registry import SessionRegistry
     from wallace.ws.session import Session
 
 logger = logging.getLogger(__name__)
@@ -27,12 +36,19 @@ class CareScheduler:
         sessions: dict[str, Session],
         llm: LLMClient,
         tts: TTSManager,
+        responder: StreamingResponder | None = None,
+        registry: SessionRegistry | None = None,
     ) -> None:
         self.config = config
         self.weather_config = weather_config
         self._sessions = sessions
         self._llm = llm
         self._tts = tts
+        self._responder = responder or StreamingResponder(llm, tts)
+        # None = 单进程，直接推送给本地 sessions
+        self._registry = registry
+        if registry is not None:
+            registry.subscribe("care", self._deliver)
         self._scheduler = None
 
     async def start(self) -> None:
@@ -94,37 +110,47 @@ class CareScheduler:
             return
 
         try:
-            # LLM 生成
+            # 拿到锁时对话可能正在进行（对话流水线不持锁），不插话
+            if session.state != PipelineState.IDLE:
+                logger.debug("Skipping care push: session busy (%s)", session.user_id)
+                return
+
+            # LLM 流式生成 + 分句 TTS，首句就绪即开口
             messages = [
                 {"role": "system", "content": "你是 Wallace，生成一句简短的关怀语句。"},
                 {"role": "user", "content": prompt},
             ]
-            text = ""
-            async for token in self._llm.chat_stream(messages):
-                text += token
-
-            if not text.strip():
-                return
-
-            # TTS + 推送
-            from wallace.ws.protocol import CareMessage
-
-            await session.ws.send_text(
-                CareMessage(content=text.strip(), mood=mood).model_dump_json()
+            await self._responder.push(
+                session,
+                messages,
+                kind="care",
+                start_mood=mood,
+                final=lambda r: CareMessage(content=r.text, mood=mood) if r.text else None,
             )
-            async for frame in self._tts.synthesize(text.strip()):
-                await session.ws.send_bytes(frame)
 
         finally:
             session.pipeline_lock.release()
 
     async def _push_all(self, prompt: str, mood: str) -> None:
-        """向所有在线 session 推送。"""
-        for session in list(self._sessions.values()):
-            try:
-                await self._push_to_session(session, prompt, mood)
-            except Exception:
-                logger.exception("Care push failed for %s", session.user_id)
+        """向所有在线用户推送（仅领导者执行，各 worker 推送给自己持有的连接）。"""
+        payload = {"prompt": prompt, "mood": mood}
+        if self._registry is None:
+            for user_id in list(self._sessions):
+                await self._deliver(user_id, payload)
+            return
+        if not self._registry.is_leader:
+            logger.debug("Skipping care push: not the registry leader")
+            return
+        await self._registry.broadcast("care", payload)
+
+    async def _deliver(self, user_id: str, payload: dict) -> None:
+        session = self._sessions.get(user_id)
+        if session is None:
+            return
+        try:
+            await self._push_to_session(session, payload["prompt"], payload["mood"])
+        except Exception:
+            logger.exception("Care push failed for %s", session.user_id)
 
     async def _sedentary_reminder(self) -> None:
         await self._push_all("主人已经坐了很久了，提醒他活动一下", "caring")
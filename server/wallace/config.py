@@ -15,6 +15,10 @@ class ServerConfig(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
     log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    debug_traces: bool = False
+    heartbeat_timeout: int = 90
+    heartbeat_resolution: float = 1.0
+    protocol_v2: bool = True
 
 
 class ASRConfig(BaseModel):
@@ -23,6 +27,7 @@ class ASRConfig(BaseModel):
     compute_type: Literal["float16", "int8", "float32"] = "float16"
     language: str = "zh"
     vad_threshold: float = 0.5
+    beam_size: int = 5
 
 
 class LLMConfig(BaseModel):
@@ -35,10 +40,115 @@ class LLMConfig(BaseModel):
 
 
 class TTSConfig(BaseModel):
-    default_backend: Literal["edge", "cosyvoice"] = "edge"
+    default_backend: Literal["edge", "cosyvoice", "piper"] = "edge"
     edge_voice: str = "zh-CN-XiaoxiaoNeural"
     cosyvoice_url: str = "http://localhost:9880"
     cosyvoice_voice: str = "default"
+    piper_model: str = ""
+    piper_workers: int = 2
+    hedge_delay: float = 1.5
+    min_chunk_chars: int = 2
+    max_chunk_chars: int = 80
+    first_chunk_min_chars: int = 6
+    max_frames_per_message: int = 8
+    jitter_buffer_ms: int = 400
+    lookahead_frames: int = 256
+
+
+class DuplexConfig(BaseModel):
+    speech_threshold: float = 0.02
+    echo_ratio: float = 0.6
+    echo_tail_ms: int = 300
+    min_speech_ms: int = 96
+    preroll_ms: int = 320
+    endpoint_silence_ms: int = 700
+
+
+class OutboxConfig(BaseModel):
+    telemetry_queue: int = 16
+
+
+class ResumeConfig(BaseModel):
+    enabled: bool = True
+    grace_seconds: float = 20.0
+    replay_kb: int = 256
+
+
+class RegistryConfig(BaseModel):
+    backend: Literal["local", "sqlite"] = "local"
+    path: str = "data/registry.db"
+    lease_seconds: float = 15.0
+    poll_interval: float = 0.5
+    busy_timeout: float = 5.0
+
+
+class MemoryConfig(BaseModel):
+    backend: Literal["json", "sqlite"] = "json"
+    data_dir: str = "data/memory"
+    path: str = "data/memory.db"
+    busy_timeout: float = 5.0
+    sync_interval: float = 30.0
+    cache_size: int = 1000
+
+
+class LongTermConfig(BaseModel):
+    enabled: bool = False
+    data_dir: str = "data/longterm"
+    model_dir: str = ""
+    threads: int = 1
+    dim: int = 512
+    top_k: int = 4
+    min_score: float = 0.15
+    token_budget: int = 120
+    min_chars: int = 4
+    dedup_threshold: float = 0.95
+    open_indexes: int = 256
+
+
+class GovernorConfig(BaseModel):
+    max_concurrent_turns: int = 4
+    max_queue: int = 8
+    queue_timeout: float = 3.0
+    short_reply_load: float = 0.75
+    short_reply_max_tokens: int = 128
+    fast_asr_load: float = 1.0
+    busy_reply: str = "我现在有点忙不过来，等一下再跟我说吧。"
+
+
+class FillerConfig(BaseModel):
+    enabled: bool = True
+    delay_ms: int = 800
+
+
+class DeadlineConfig(BaseModel):
+    turn_budget: float = 8.0
+    short_reply_budget: float = 4.0
+    apology: str = "抱歉，我刚才走神了，能再说一遍吗？"
+
+
+class StageConfig(BaseModel):
+    executor: Literal["loop", "thread", "process"] = "loop"
+    concurrency: int = 0  # 0 = 不限
+    queue: int | None = None  # 并发占满时允许排队的数量，缺省不限
+
+
+class PipelineConfig(BaseModel):
+    stages: list[str] = [
+        "vad", "asr", "filter", "intent", "llm", "segment", "tts", "encode", "send",
+    ]
+    process_workers: int = 2
+    vad: StageConfig = StageConfig()
+    asr: StageConfig = StageConfig(executor="thread", concurrency=2, queue=8)
+    filter: StageConfig = StageConfig()
+    intent: StageConfig = StageConfig()
+    llm: StageConfig = StageConfig()
+    segment: StageConfig = StageConfig()
+    tts: StageConfig = StageConfig()
+    encode: StageConfig = StageConfig()
+    send: StageConfig = StageConfig()
+
+    def stage_config(self, name: str) -> StageConfig:
+        return getattr(self, name)
 
 
 class MQTTConfig(BaseModel):
@@ -78,6 +188,16 @@ class Settings(BaseSettings):
     asr: ASRConfig = ASRConfig()
     llm: LLMConfig = LLMConfig()
     tts: TTSConfig = TTSConfig()
+    duplex: DuplexConfig = DuplexConfig()
+    outbox: OutboxConfig = OutboxConfig()
+    resume: ResumeConfig = ResumeConfig()
+    registry: RegistryConfig = RegistryConfig()
+    memory: MemoryConfig = MemoryConfig()
+    longterm: LongTermConfig = LongTermConfig()
+    governor: GovernorConfig = GovernorConfig()
+    deadline: DeadlineConfig = DeadlineConfig()
+    filler: FillerConfig = FillerConfig()
+    pipeline: PipelineConfig = PipelineConfig()
     mqtt: MQTTConfig = MQTTConfig()
     care: CareConfig = CareConfig()
     sensor: SensorConfig = SensorConfig()
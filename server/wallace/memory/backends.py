@@ -0,0 +1,206 @@
+"""用户记忆存储后端 — 由 MemoryPersister 在写回线程中调用（同步接口）。
+
+两种实现：
+- JSONMemoryBackend：每用户一个 JSON 文件（默认，与原先一致）
+- SQLiteMemoryBackend：单个 SQLite 文件（WAL），一次刷写的所有用户在同一事务中批量写入，
+  用户多时避免大量小文件整写，并可跨用户查询
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from wallace.config import MemoryConfig
+from wallace.memory.store import MemoryStore
+from wallace.ws.session import UserMemory
+
+logger = logging.getLogger(__name__)
+
+# (user_id, UserMemory.to_dict())
+MemoryRecord = tuple[str, dict[str, Any]]
+# 存储中一条记录的修改标记，只比较是否相等；记录不存在时为 None
+Stamp = object
+
+
+class MemoryBackend(ABC):
+    """记忆存储接口。方法均为阻塞调用，只在同一个线程中使用。"""
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def load(self, user_id: str) -> UserMemory:
+        """读取用户记忆，不存在或损坏时返回默认空记忆。"""
+
+    @abstractmethod
+    def write_many(self, records: list[MemoryRecord]) -> dict[str, Stamp]:
+        """写入一批用户记忆（覆盖已有内容），返回写入后各用户的修改标记。"""
+
+    @abstractmethod
+    def stamp(self, user_id: str) -> Stamp:
+        """当前存储中该用户的修改标记（比读取整份记忆便宜），其他 worker 写入后会变化。"""
+
+
+class JSONMemoryBackend(MemoryBackend):
+    """每用户一个 JSON 文件（原子写入）。"""
+
+    def __init__(self, data_dir: Path) -> None:
+        self.data_dir = data_dir
+
+    def load(self, user_id: str) -> UserMemory:
+        return MemoryStore(user_id, self.data_dir).load()
+
+    def write_many(self, records: list[MemoryRecord]) -> dict[str, Stamp]:
+        for user_id, data in records:
+            MemoryStore(user_id, self.data_dir).write(data)
+        return {user_id: self.stamp(user_id) for user_id, _ in records}
+
+    def stamp(self, user_id: str) -> Stamp:
+        # 原子写入每次替换为新文件：inode 与 mtime 一起比较，不受 mtime 精度影响
+        try:
+            st = (self.data_dir / f"{user_id}.json").stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    user_id TEXT PRIMARY KEY NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# 语句文本固定，sqlite3 模块按文本缓存已编译语句，重复执行不再解析
+_SELECT = "SELECT data FROM memories WHERE user_id = ?"
+_SELECT_STAMP = "SELECT updated_at FROM memories WHERE user_id = ?"
+_UPSERT = """
+INSERT INTO memories (user_id, data, updated_at) VALUES (?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+"""
+_INSERT_NEW = "INSERT OR IGNORE INTO memories (user_id, data, updated_at) VALUES (?, ?, ?)"
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """单文件 SQLite（WAL）。同主机多 worker 可共享同一文件。"""
+
+    def __init__(self, path: Path, busy_timeout: float = 5.0) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._db: sqlite3.Connection | None = None
+
+    def open(self) -> None:
+        if self._db is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        db.executescript(_SCHEMA)
+        self._db = db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def load(self, user_id: str) -> UserMemory:
+        self.open()
+        row = self._db.execute(_SELECT, (user_id,)).fetchone()
+        if row is None:
+            return UserMemory()
+        try:
+            return UserMemory.from_dict(json.loads(row[0]))
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning("Failed to load memory for %s: %s, using defaults", user_id, e)
+            return UserMemory()
+
+    def write_many(self, records: list[MemoryRecord]) -> dict[str, Stamp]:
+        now = time.time()
+        self._write(_UPSERT, records, now)
+        return {user_id: now for user_id, _ in records}
+
+    def stamp(self, user_id: str) -> Stamp:
+        self.open()
+        row = self._db.execute(_SELECT_STAMP, (user_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def insert_new(self, records: list[MemoryRecord]) -> int:
+        """只写入库中尚不存在的用户，返回实际写入数（导入时不覆盖较新的数据）。"""
+        return self._write(_INSERT_NEW, records, time.time())
+
+    def count(self) -> int:
+        self.open()
+        return self._db.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+    def _write(self, sql: str, records: list[MemoryRecord], now: float) -> int:
+        self.open()
+        rows = [(uid, json.dumps(data, ensure_ascii=False), now) for uid, data in records]
+        before = self._db.total_changes
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.executemany(sql, rows)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return self._db.total_changes - before
+
+
+def create_backend(config: MemoryConfig | None = None) -> MemoryBackend:
+    """按配置创建记忆存储后端。"""
+    config = config or MemoryConfig()
+    if config.backend == "sqlite":
+        return SQLiteMemoryBackend(Path(config.path), config.busy_timeout)
+    return JSONMemoryBackend(Path(config.data_dir))
+
+
+def read_json_dir(data_dir: Path) -> Iterator[MemoryRecord]:
+    """遍历 JSON 记忆目录（文件名即 user_id），跳过无法解析的文件。"""
+    for file in sorted(data_dir.glob("*.json")):
+        try:
+            data = json.loads(file.read_text(encoding="utf-8"))
+            memory = UserMemory.from_dict(data)
+        except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("Skipping %s: %s", file.name, e)
+            continue
+        yield file.stem, memory.to_dict()
+
+
+def import_records(
+    backend: SQLiteMemoryBackend,
+    records: Iterable[MemoryRecord],
+    overwrite: bool = False,
+    batch_size: int = 500,
+) -> tuple[int, int]:
+    """分批导入记忆，返回 (写入数, 跳过数)。默认不覆盖库中已有的用户。"""
+    written = total = 0
+    batch: list[MemoryRecord] = []
+
+    def commit() -> int:
+        if overwrite:
+            backend.write_many(batch)
+            return len(batch)
+        return backend.insert_new(batch)
+
+    for record in records:
+        batch.append(record)
+        total += 1
+        if len(batch) >= batch_size:
+            written += commit()
+            batch = []
+    if batch:
+        written += commit()
+    return written, total - written
@@ -0,0 +1,461 @@
+"""长期记忆 — 把用户说过的话与从中抽取的事实向量化，按相关性召回，在 token 预算内注入 prompt。
+
+- 嵌入：默认内置字符 n-gram 哈希嵌入（纯 numpy，无需模型文件，按字面重合度衡量相关性）；
+  配置 model_dir 时使用本地 ONNX 句向量模型（onnxruntime + tokenizers，CPU 推理）
+- 索引：每用户一个目录，vectors.npy（内存映射，容量按倍数增长）+ entries.jsonl（文本与来源）；
+  更换嵌入模型后打开索引时按保存的文本重新嵌入。目录名只用安全字符的 user_id，其余取哈希
+- 多 worker 共享数据目录：追加与检索持有索引目录的文件锁，先读入其他 worker 追加的条目
+  （及扩容后替换的向量文件）再写，行号不会错位
+- 检索：余弦相似度 = 单位向量点积，argpartition 取 top-k；已在对话历史窗口内的话语不重复召回
+- 所有嵌入与索引读写在专用单线程中执行，不占用事件循环；同一用户的写入按提交顺序执行
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+
+from wallace.config import LongTermConfig
+from wallace.metrics import metrics
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder(Protocol):
+    name: str  # 写入索引元数据，变化时重建向量
+    dim: int
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """返回 (len(texts), dim) float32 单位向量。"""
+
+
+# ── 嵌入 ──
+
+_CJK = re.compile(r"[一-鿿]")
+_TOKEN = re.compile(r"[一-鿿]+|[a-z0-9]+")
+# 单独出现时不携带语义的虚字
+_STOP_CHARS = frozenset("的了吗呢吧啊呀哦嗯是在我你他她它们这那就也都和跟")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """字符 n-gram 哈希嵌入：汉字单字 + 双字、拉丁词，带符号哈希到固定维度。"""
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+        self.name = f"hash-ngram-{dim}"
+
+    def _features(self, text: str) -> Iterable[tuple[str, float]]:
+        for token in _TOKEN.findall(text.lower()):
+            if not _CJK.match(token):
+                yield token, 1.0
+                continue
+            for i, char in enumerate(token):
+                if char not in _STOP_CHARS:
+                    yield char, 0.5
+                if i + 1 < len(token):
+                    yield token[i : i + 2], 1.0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode())
+                out[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        return _normalize(out)
+
+
+class OnnxEmbedder:
+    """本地 ONNX 句向量模型（目录含 model.onnx 与 tokenizer.json），均值池化后归一化。"""
+
+    def __init__(self, model_dir: str, threads: int = 1, max_length: int = 128) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = Path(model_dir)
+        self._tokenizer = Tokenizer.from_file(str(path / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length)
+        self._tokenizer.enable_padding()
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(
+            str(path / "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {i.name for i in self._session.get_inputs()}
+        self.name = f"onnx-{path.name}"
+        self.dim = int(self.embed(["你好"]).shape[1])
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask, "token_type_ids": np.zeros_like(ids)}
+        output = self._session.run(None, {k: v for k, v in feeds.items() if k in self._inputs})[0]
+        if output.ndim == 3:
+            weights = mask[..., None].astype(np.float32)
+            output = (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1.0)
+        return _normalize(output.astype(np.float32))
+
+
+def create_embedder(config: LongTermConfig) -> Embedder:
+    """按配置创建嵌入器；模型不可用时退回哈希嵌入。"""
+    if config.model_dir:
+        try:
+            return OnnxEmbedder(config.model_dir, config.threads)
+        except ImportError:
+            logger.warning("onnxruntime / tokenizers not installed, using hashing embedder")
+        except Exception:
+            logger.exception("Failed to load embedding model %s, using hashing embedder",
+                             config.model_dir)
+    return HashingEmbedder(config.dim)
+
+
+# ── 事实抽取 ──
+
+_CLAUSE_SPLIT = re.compile(r"[，。！？；、,.!?;\s]+")
+# 第一人称陈述：偏好、身份、拥有、计划等
+_FACT = re.compile(
+    r"我(?:最|很|也|还|特别|一直|不)?"
+    r"(?:喜欢|爱|讨厌|害怕|怕|叫|是|有|养了|住在|在|想要|想|要|会|属|今年|明天|下周|的)"
+)
+# 疑问句（"你知道我喜欢什么吗"）不是陈述
+_QUESTION = re.compile(r"[吗呢么]$|什么|哪|谁|几|怎么|多少|是不是")
+
+
+def extract_facts(text: str) -> list[str]:
+    """从一句话中抽取第一人称陈述，改写为第三人称（"我喜欢恐龙" → "主人喜欢恐龙"）。"""
+    facts = []
+    for clause in _CLAUSE_SPLIT.split(text):
+        match = _FACT.search(clause)
+        if match and len(clause) - match.start() >= 4 and not _QUESTION.search(clause):
+            facts.append(clause[match.start() :].replace("我", "主人"))
+    return facts
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略 token 数：汉字按 1 个，其余按 4 字符 1 个。"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+# ── 索引 ──
+
+# 可直接用作目录名的 user_id（来自 WS 路径，不可信）；其余按哈希命名，"~" 前缀与之不会重名
+_SAFE_USER_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def user_dir_name(user_id: str) -> str:
+    """user_id 对应的索引目录名，不含路径分隔符与 ".."。"""
+    if _SAFE_USER_ID.fullmatch(user_id):
+        return user_id
+    return "~" + hashlib.sha256(user_id.encode()).hexdigest()[:32]
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """跨进程独占锁，关闭文件即释放。"""
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+class VectorIndex:
+    """单个用户的向量索引。只在写线程中使用；其他进程可同时读写同一目录。"""
+
+    def __init__(self, path: Path, embedder: Embedder, initial_capacity: int = 64) -> None:
+        self.path = path
+        self.embedder = embedder
+        self._initial = initial_capacity
+        self._vectors_file = path / "vectors.npy"
+        self._entries_file = path / "entries.jsonl"
+        self._meta_file = path / "meta.json"
+        self._lock_file = path / "lock"
+        path.mkdir(parents=True, exist_ok=True)
+        self._corrupt = False
+        self.entries: list[dict[str, Any]] = []
+        self._entries_pos: tuple[int, int] | None = None  # entries.jsonl 已读到的 (inode, 偏移)
+        with _file_lock(self._lock_file):
+            self._read_entries()
+            meta = self._read_meta()
+            if (
+                self._corrupt
+                or meta.get("embedder") != embedder.name
+                or not self._vectors_file.exists()
+                or self._capacity_on_disk() < len(self.entries)
+            ):
+                self._rebuild()
+            self._open_vectors()
+
+    @property
+    def count(self) -> int:
+        return len(self.entries)
+
+    def add(self, text: str, vector: np.ndarray, **fields: Any) -> None:
+        with _file_lock(self._lock_file):
+            self._sync()
+            n = self.count
+            if n >= self._vectors.shape[0]:
+                self._grow(self._vectors.shape[0] * 2)
+            # 先写向量再追加文本：崩溃时多出的向量行不计入（条数以 entries.jsonl 为准）
+            self._vectors[n] = vector
+            self._vectors.flush()
+            entry = {"text": text, "ts": time.time(), **fields}
+            with open(self._entries_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries.append(entry)
+            st = self._entries_file.stat()
+            self._entries_pos = (st.st_ino, st.st_size)
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[float, dict[str, Any]]]:
+        if k <= 0:
+            return []
+        with _file_lock(self._lock_file):
+            self._sync()
+        n = self.count
+        if n == 0:
+            return []
+        scores = self._vectors[:n] @ query
+        if n > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.entries[i]) for i in top]
+
+    def close(self) -> None:
+        self._vectors.flush()
+        del self._vectors
+
+    def _sync(self) -> None:
+        """（持锁）读入其他进程追加的条目；向量文件被扩容 / 重建替换时重新映射。"""
+        if self._read_entries() and (self._corrupt or self._capacity_on_disk() < self.count):
+            self.close()
+            self._rebuild()
+            self._open_vectors()
+        if self._vectors_file.stat().st_ino != self._vectors_ino:
+            self.close()
+            self._open_vectors()
+
+    def _read_entries(self) -> bool:
+        """从上次读到的位置续读 entries.jsonl（文件被替换时从头读），返回是否有变化。"""
+        try:
+            st = self._entries_file.stat()
+        except FileNotFoundError:
+            return False
+        pos = self._entries_pos
+        if pos is not None and pos == (st.st_ino, st.st_size):
+            return False
+        if pos is None or pos[0] != st.st_ino or pos[1] > st.st_size:
+            self.entries = []
+            pos = (st.st_ino, 0)
+        with open(self._entries_file, "rb") as f:
+            f.seek(pos[1])
+            for line in f:
+                try:
+                    self.entries.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # 跳过后行号与向量行错位，需重建
+                    logger.warning("Skipping corrupt long-term entry in %s", self.path)
+                    self._corrupt = True
+            self._entries_pos = (st.st_ino, f.tell())
+        return True
+
+    def _read_meta(self) -> dict[str, Any]:
+        try:
+            return json.loads(self._meta_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _capacity_on_disk(self) -> int:
+        return np.load(self._vectors_file, mmap_mode="r").shape[0]
+
+    def _open_vectors(self) -> None:
+        self._vectors = np.load(self._vectors_file, mmap_mode="r+")
+        self._vectors_ino = self._vectors_file.stat().st_ino
+
+    def _rebuild(self) -> None:
+        """（重新）嵌入全部已保存文本，写入新的向量文件。"""
+        n = len(self.entries)
+        capacity = max(self._initial, 1 << max(n - 1, 0).bit_length())
+        vectors = self._new_file(capacity)
+        for start in range(0, n, 256):
+            texts = [e["text"] for e in self.entries[start : start + 256]]
+            vectors[start : start + len(texts)] = self.embedder.embed(texts)
+        vectors.flush()
+        del vectors
+        self._commit_file()
+        if self._corrupt:
+            tmp = self._entries_file.with_suffix(".tmp")
+            tmp.write_text(
+                "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self.entries),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self._entries_file)
+            st = self._entries_file.stat()
+            self._entries_pos = (st.st_ino, st.st_size)
+            self._corrupt = False
+        self._meta_file.write_text(
+            json.dumps({"embedder": self.embedder.name, "dim": self.embedder.dim}),
+            encoding="utf-8",
+        )
+        if n:
+            logger.info("Re-embedded %d long-term entries in %s", n, self.path)
+
+    def _grow(self, capacity: int) -> None:
+        vectors = self._new_file(capacity)
+        vectors[: self.count] = self._vectors[: self.count]
+        vectors.flush()
+        del vectors
+        self.close()
+        self._commit_file()
+        self._open_vectors()
+
+    def _new_file(self, capacity: int) -> np.memmap:
+        return np.lib.format.open_memmap(
+            self._vectors_file.with_suffix(".tmp"),
+            mode="w+",
+            dtype=np.float32,
+            shape=(capacity, self.embedder.dim),
+        )
+
+    def _commit_file(self) -> None:
+        os.replace(self._vectors_file.with_suffix(".tmp"), self._vectors_file)
+
+
+class LongTermMemory:
+    """所有用户的长期记忆：写入话语 / 事实，按本轮话语召回。"""
+
+    def __init__(self, config: LongTermConfig | None = None, embedder: Embedder | None = None):
+        self.config = config or LongTermConfig()
+        self._dir = Path(self.config.data_dir)
+        self._embedder = embedder
+        self._indexes: OrderedDict[str, VectorIndex] = OrderedDict()
+        # 单线程：索引只在该线程中读写
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="longterm")
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder(self.config)
+        return self._embedder
+
+    async def start(self) -> None:
+        """在后台线程中加载嵌入模型。"""
+        await self._run(lambda: self.embedder)
+
+    def close(self) -> None:
+        self._executor.submit(self._close_all)
+        self._executor.shutdown(wait=True)
+
+    async def remember(self, user_id: str, utterance: str) -> int:
+        """记下一句用户话语：抽取到事实则存事实，否则存原话。返回新增条数。"""
+        if len(utterance) < self.config.min_chars:
+            return 0
+        try:
+            return await self._run(self._remember, user_id, utterance)
+        except (OSError, ValueError) as e:
+            logger.warning("Long-term memory write failed for %s: %s", user_id, e)
+            return 0
+
+    async def recall(
+        self, user_id: str, query: str, exclude: Iterable[str] = ()
+    ) -> list[str]:
+        """召回与本轮话语相关的记忆，按相关性排序，总长不超过 token 预算。
+
+        exclude 为仍在对话历史窗口内的原话，来源于这些话语的记忆不再重复注入。
+        """
+        start = time.perf_counter()
+        try:
+            hits = await self._run(self._search, user_id, query)
+        except (OSError, ValueError) as e:
+            logger.warning("Long-term memory recall failed for %s: %s", user_id, e)
+            return []
+        excluded = set(exclude)
+        recalled: list[str] = []
+        budget = self.config.token_budget
+        for score, entry in hits:
+            if score < self.config.min_score or entry.get("source") in excluded:
+                continue
+            text = entry["text"] if entry.get("kind") == "fact" else f"主人说过：{entry['text']}"
+            cost = estimate_tokens(text)
+            if cost > budget:
+                continue
+            budget -= cost
+            recalled.append(text)
+            if len(recalled) >= self.config.top_k:
+                break
+        metrics.observe("longterm_recall_seconds", time.perf_counter() - start)
+        metrics.inc("longterm_recalled_total", len(recalled))
+        return recalled
+
+    # ── 线程中执行的同步部分 ──
+
+    def _index(self, user_id: str) -> VectorIndex:
+        index = self._indexes.get(user_id)
+        if index is None:
+            path = self._dir / user_dir_name(user_id)
+            index = self._indexes[user_id] = VectorIndex(path, self.embedder)
+            while len(self._indexes) > self.config.open_indexes:
+                self._indexes.popitem(last=False)[1].close()
+        self._indexes.move_to_end(user_id)
+        return index
+
+    def _remember(self, user_id: str, utterance: str) -> int:
+        facts = extract_facts(utterance)
+        kind = "fact" if facts else "turn"
+        texts = facts or [utterance]
+        index = self._index(user_id)
+        added = 0
+        for text, vector in zip(texts, self.embedder.embed(texts)):
+            # 近似重复（同一件事反复提起）只保留一条
+            best = index.search(vector, 1)
+            if best and best[0][0] >= self.config.dedup_threshold:
+                continue
+            index.add(text, vector, kind=kind, source=utterance)
+            added += 1
+        return added
+
+    def _search(self, user_id: str, query: str) -> list[tuple[float, dict[str, Any]]]:
+        if user_id not in self._indexes and not (self._dir / user_dir_name(user_id)).exists():
+            return []
+        index = self._index(user_id)
+        if index.count == 0:
+            return []
+        # 多取一些，留给排除与预算筛选
+        return index.search(self.embedder.embed([query])[0], self.config.top_k * 2)
+
+    def _close_all(self) -> None:
+        while self._indexes:
+            self._indexes.popitem()[1].close()
+
+    async def _run(self, fn: Any, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
@@ -0,0 +1,46 @@
+"""一次性导入：把 JSON 记忆目录迁移到 SQLite 记忆库。
+
+用法（在 server/ 目录下，导入完成后将 [memory].backend 改为 "sqlite"）:
+    python -m wallace.memory.migrate --json-dir data/memory --db data/memory.db
+
+库中已有的用户默认保留（可能比 JSON 文件新），--overwrite 时以 JSON 为准。
+JSON 文件不会被删除。
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+from wallace.config import MemoryConfig
+from wallace.memory.backends import SQLiteMemoryBackend, import_records, read_json_dir
+
+
+def main(argv: list[str] | None = None) -> int:
+    defaults = MemoryConfig()
+    parser = argparse.ArgumentParser(
+        prog="python -m wallace.memory.migrate", description="JSON 记忆目录 → SQLite 记忆库"
+    )
+    parser.add_argument("--json-dir", type=Path, default=Path(defaults.data_dir))
+    parser.add_argument("--db", type=Path, default=Path(defaults.path))
+    parser.add_argument("--overwrite", action="store_true", help="覆盖库中已有的用户")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    if not args.json_dir.is_dir():
+        parser.error(f"not a directory: {args.json_dir}")
+    backend = SQLiteMemoryBackend(args.db)
+    try:
+        written, skipped = import_records(
+            backend, read_json_dir(args.json_dir), overwrite=args.overwrite
+        )
+        total = backend.count()
+    finally:
+        backend.close()
+    print(f"imported {written}, kept existing {skipped}, {total} users in {args.db}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
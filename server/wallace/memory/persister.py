@@ -0,0 +1,190 @@
+"""用户记忆缓存与写回（write-behind）— 修改只在内存中计数，后台合并写盘。
+
+- 缓存：连接时按需加载；断开后记忆留在有界 LRU 中，重连（如路由器重启后的重连风暴）
+  直接命中而不重新读盘；同一用户的并发加载只读一次；超出容量时淘汰最久未用的空闲用户
+- 多 worker 共享存储：空闲缓存命中时先比较存储中的修改标记（backend.stamp），
+  其他 worker 在此期间写过该用户则丢弃缓存重新读取，不会用旧对象覆盖对方的修改
+
+- 脏检测：比较 UserMemory.version 与上次落盘的版本，不序列化整份记忆
+- 合并：两次刷写之间同一用户的多次修改只写一次（写当时的最新内容）
+- 读写存储后端（memory/backends.py）在专用单线程中执行，磁盘延迟不进入事件循环；
+  快照在事件循环中复制，写线程不接触正在使用的 UserMemory 对象
+- 一次刷写的所有脏用户作为一批交给后端（SQLite 后端在同一事务中写入）
+- 断开连接时强制刷写该用户，关闭时刷写全部；写失败保持脏状态（不淘汰），下个周期重试
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from wallace.config import MemoryConfig
+from wallace.memory.backends import MemoryBackend, MemoryRecord, Stamp, create_backend
+from wallace.metrics import metrics
+from wallace.ws.session import UserMemory
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryPersister:
+    """在线与最近在线用户记忆的加载、缓存与异步写回。"""
+
+    def __init__(
+        self, config: MemoryConfig | None = None, backend: MemoryBackend | None = None
+    ) -> None:
+        self.config = config or MemoryConfig()
+        self.backend = backend or create_backend(self.config)
+        self._tracked: dict[str, UserMemory] = {}  # 在线 + 空闲缓存
+        self._persisted: dict[str, int] = {}  # user_id → 已落盘的版本
+        self._stamps: dict[str, Stamp] = {}  # user_id → 读取 / 写入时存储中的修改标记
+        self._idle: OrderedDict[str, None] = OrderedDict()  # 已断开的用户，最久未用在前
+        self._loading: dict[str, asyncio.Task[UserMemory]] = {}
+        # 单线程：读写按提交顺序执行，后端连接只在该线程中使用
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-writer")
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        await self._run(self.backend.open)
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        """停止后台刷写，写完所有脏记忆后释放写线程。"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await self._run(self.backend.close)
+        self._executor.shutdown(wait=True)
+
+    async def load(self, user_id: str) -> UserMemory:
+        """用户连接：缓存命中直接返回内存中的对象，否则从存储读取。用户在释放前不会被淘汰。"""
+        idle = user_id in self._idle
+        self._idle.pop(user_id, None)
+        memory = self._tracked.get(user_id)
+        if memory is not None and idle:
+            memory = await self._revalidate(user_id, memory)
+        if memory is not None:
+            metrics.inc("memory_cache_hits_total")
+            return memory
+        metrics.inc("memory_cache_misses_total")
+        # 同一用户的读取只进行一次（重连风暴中的重复连接共享结果），单个连接取消不影响其他等待者
+        task = self._loading.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._read(user_id))
+            self._loading[user_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        memory = await asyncio.shield(task)
+        self._idle.pop(user_id, None)
+        return memory
+
+    async def _revalidate(self, user_id: str, memory: UserMemory) -> UserMemory | None:
+        """空闲缓存命中：存储中的修改标记变了（其他 worker 写过）则丢弃缓存，返回 None 重新读取。"""
+        stamp = await self._run(self.backend.stamp, user_id)
+        if self._tracked.get(user_id) is not memory:  # 等待期间已被淘汰
+            return None
+        # 本地有未写出的修改（上次写失败）时保留本地，与原先一致由下次刷写覆盖
+        if stamp == self._stamps.get(user_id) or self.is_dirty(user_id):
+            return memory
+        metrics.inc("memory_cache_stale_total")
+        self._forget(user_id)
+        return None
+
+    async def _read(self, user_id: str) -> UserMemory:
+        stamp, memory = await self._run(self._load_stamped, user_id)
+        self._tracked[user_id] = memory
+        self._persisted[user_id] = memory.version
+        self._stamps[user_id] = stamp
+        # 先记为空闲：等待的连接全部取消时仍可被淘汰，取到结果的连接会将其移出
+        self._idle[user_id] = None
+        metrics.set_gauge("memory_cache_users", len(self._tracked))
+        return memory
+
+    def _load_stamped(self, user_id: str) -> tuple[Stamp, UserMemory]:
+        # 先取标记再读：两者之间其他 worker 的写入只会让下次命中多读一次，不会漏掉
+        return self.backend.stamp(user_id), self.backend.load(user_id)
+
+    async def release(self, user_id: str) -> None:
+        """用户已无在线会话：强制写回，转入空闲缓存，超出容量时淘汰。"""
+        await self.flush(user_id)
+        if user_id in self._tracked:
+            self._idle[user_id] = None
+            self._idle.move_to_end(user_id)
+        self._evict()
+
+    def is_dirty(self, user_id: str) -> bool:
+        memory = self._tracked.get(user_id)
+        return memory is not None and memory.version != self._persisted.get(user_id)
+
+    def dirty_users(self) -> list[str]:
+        return [user_id for user_id in self._tracked if self.is_dirty(user_id)]
+
+    async def flush(self, user_id: str | None = None) -> int:
+        """写回指定用户（或全部脏用户），返回实际写入的用户数。"""
+        users = [user_id] if user_id is not None else list(self._tracked)
+        users = [uid for uid in users if self.is_dirty(uid)]
+        if not users:
+            return 0
+        versions = {uid: self._tracked[uid].version for uid in users}
+        records: list[MemoryRecord] = [
+            (uid, copy.deepcopy(self._tracked[uid].to_dict())) for uid in users
+        ]
+        start = time.perf_counter()
+        try:
+            stamps = await self._run(self.backend.write_many, records)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Memory write failed for %d user(s): %s, will retry", len(users), e)
+            metrics.inc("memory_write_errors_total")
+            return 0
+        # 写线程按提交顺序执行，后完成的批次版本不会更旧
+        self._persisted.update(versions)
+        self._stamps.update(stamps)
+        metrics.inc("memory_writes_total", len(users))
+        metrics.observe("memory_write_seconds", time.perf_counter() - start)
+        return len(users)
+
+    def _evict(self) -> None:
+        """淘汰超出容量的空闲用户（已落盘的才淘汰，写失败的留待重试）。"""
+        excess = len(self._idle) - self.config.cache_size
+        if excess <= 0:
+            return
+        for user_id in list(self._idle):
+            if excess <= 0:
+                break
+            if self.is_dirty(user_id):
+                continue
+            self._forget(user_id)
+            metrics.inc("memory_cache_evictions_total")
+            excess -= 1
+        metrics.set_gauge("memory_cache_users", len(self._tracked))
+
+    def _forget(self, user_id: str) -> None:
+        self._idle.pop(user_id, None)
+        del self._tracked[user_id]
+        del self._persisted[user_id]
+        self._stamps.pop(user_id, None)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.sync_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Memory flush failed")
+            self._evict()
+            metrics.set_gauge("memory_dirty_users", len(self.dirty_users()))
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
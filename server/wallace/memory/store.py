@@ -46,8 +46,11 @@ class MemoryStore:
 
     def save(self, memory: UserMemory) -> None:
         """保存记忆到 JSON 文件（原子写入：临时文件 + rename）。线程安全。"""
+        self.write(memory.to_dict())
+
+    def write(self, data: dict[str, Any]) -> None:
+        """写入已序列化的记忆字典（写回线程使用，不接触 UserMemory 对象）。"""
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        data = memory.to_dict()
         # 使用线程锁保证并发安全（Windows 上 rename 可能因文件被占用而失败）
         with self._lock:
             # 原子写入
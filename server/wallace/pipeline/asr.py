@@ -3,12 +3,15 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 from typing import TYPE_CHECKING
 
 import numpy as np
 
 if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
     from wallace.config import ASRConfig
 
 logger = logging.getLogger(__name__)
@@ -17,8 +20,10 @@ logger = logging.getLogger(__name__)
 class ASREngine:
     """封装 Faster-Whisper 模型。"""
 
-    def __init__(self, config: ASRConfig) -> None:
+    def __init__(self, config: ASRConfig, executor: Executor | None = None) -> None:
         self.config = config
+        # 转写所用线程池（阶段图 asr 阶段提供），缺省用 asyncio 默认线程池
+        self.executor = executor
         self._model = None
 
     async def load_model(self) -> None:
@@ -35,16 +40,27 @@ class ASREngine:
             compute_type=self.config.compute_type,
         )
 
-    async def transcribe(self, audio: np.ndarray) -> str:
-        """转录 PCM float32 数组为文本。在线程中执行避免阻塞事件循环。"""
+    async def transcribe(self, audio: np.ndarray, *, beam_size: int | None = None) -> str:
+        """转录 PCM float32 数组为文本。在线程中执行避免阻塞事件循环。
+
+        beam_size 覆盖配置值（高负载降级时传 1）。
+        """
         if audio.size == 0:
             return ""
         if self._model is None:
             raise RuntimeError("ASR model not loaded")
-        return await asyncio.to_thread(self._transcribe_sync, audio)
+        beam_size = beam_size or self.config.beam_size
+        if self.executor is None:
+            return await asyncio.to_thread(self._transcribe_sync, audio, beam_size)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(self._transcribe_sync, audio, beam_size)
+        )
 
-    def _transcribe_sync(self, audio: np.ndarray) -> str:
-        segments, _ = self._model.transcribe(audio, language=self.config.language)
+    def _transcribe_sync(self, audio: np.ndarray, beam_size: int) -> str:
+        segments, _ = self._model.transcribe(
+            audio, language=self.config.language, beam_size=beam_size
+        )
         return "".join(seg.text for seg in segments).strip()
 
     def vad_has_speech(self, audio: np.ndarray) -> bool:
@@ -0,0 +1,113 @@
+"""TTS 音频下行 — 编码、多帧打包、发送，统计带宽。"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import TYPE_CHECKING
+
+from wallace.metrics import metrics
+from wallace.pipeline.tts import FRAME_SIZE
+from wallace.ws.binary import AUDIO_OUT_HEADER
+
+if TYPE_CHECKING:
+    from wallace.pipeline.stages import StageGraph
+    from wallace.pipeline.tts import PCMFrame
+    from wallace.ws.session import Session
+
+
+async def send_audio(
+    session: Session, frames: AsyncIterator[PCMFrame], stages: StageGraph | None = None
+) -> int:
+    """编码并发送 TTS 帧，返回发送的帧数。
+
+    编码器按 batch_frames 合并多帧一次编码；发送时每 session.frames_per_message
+    帧拼成一条 WebSocket 消息（与固件协商），流结束时发送不足数的尾包。
+    每条消息发送前经 session.audio_pacer 按播放时钟 / credit 节流。
+    给定 stages 时编码在 encode 阶段的执行器中进行，发送计入 send 阶段。
+    """
+    encoder = session.audio_encoder
+    encode_stage = stages["encode"] if stages is not None else None
+    send_stage = stages["send"] if stages is not None else None
+
+    async def encode(pcm: bytes) -> bytes:
+        if encode_stage is None:
+            return encoder.encode(pcm)
+        return await encode_stage.call(encoder.encode, pcm)
+
+    async def send(payloads: list[PCMFrame], raw_len: int) -> None:
+        if send_stage is None:
+            await _send_message(session, payloads, raw_len)
+        else:
+            await send_stage.run(_send_message, session, payloads, raw_len)
+
+    per_message = session.frames_per_message
+    if session.barge_in is not None:
+        frames = session.barge_in.observe_playback(frames)
+    pending: list[PCMFrame] = []
+    pending_raw = 0
+    sent = 0
+
+    async for payloads in _encode_batches(frames, encoder.batch_frames, encode):
+        for raw_len, payload in payloads:
+            pending.append(payload)
+            pending_raw += raw_len
+            sent += 1
+            if len(pending) >= per_message:
+                await send(pending, pending_raw)
+                pending = []
+                pending_raw = 0
+
+    if pending:
+        await send(pending, pending_raw)
+    return sent
+
+
+async def _send_message(session: Session, payloads: list[PCMFrame], raw_len: int) -> None:
+    # 单帧直接发送切片，多帧一次拼接；v2 连接在拼接时前置通道头
+    if session.protocol == 2:
+        data = b"".join((AUDIO_OUT_HEADER, *payloads))
+    else:
+        data = payloads[0] if len(payloads) == 1 else b"".join(payloads)
+    await session.audio_pacer.wait()
+    await session.outbox.send_bytes(data, len(payloads))
+    session.audio_pacer.on_sent(len(payloads))
+    if (trace := session.trace) is not None:
+        trace.mark("first_frame_sent")
+        trace.mark_last("last_frame_sent")
+
+    codec = session.audio_encoder.name
+    session.audio_bytes_raw += raw_len
+    session.audio_bytes_wire += len(data)
+    session.audio_messages_sent += 1
+    metrics.inc("audio_out_raw_bytes_total", raw_len, codec=codec)
+    metrics.inc("audio_out_wire_bytes_total", len(data), codec=codec)
+    metrics.inc("audio_out_frames_total", len(payloads))
+    metrics.inc("audio_out_messages_total")
+
+
+async def _encode_batches(
+    frames: AsyncIterator[PCMFrame],
+    batch_frames: int,
+    encode: Callable[[bytes], Awaitable[bytes]],
+) -> AsyncIterator[list[tuple[int, PCMFrame]]]:
+    """按 batch_frames 攒帧编码，产出 [(原始字节数, 编码后帧)]。"""
+    if batch_frames <= 1:
+        async for frame in frames:
+            yield [(len(frame), await encode(frame))]
+        return
+
+    batch: list[PCMFrame] = []
+    async for frame in frames:
+        batch.append(frame)
+        if len(batch) >= batch_frames:
+            yield _split_batch(await encode(b"".join(batch)), len(batch))
+            batch = []
+    if batch:
+        yield _split_batch(await encode(b"".join(batch)), len(batch))
+
+
+def _split_batch(encoded: bytes, count: int) -> list[tuple[int, PCMFrame]]:
+    view = memoryview(encoded)
+    # 帧长固定且为编码块的整数倍，编码结果可等长切回每帧
+    step = len(view) // count
+    return [(FRAME_SIZE, view[i * step : (i + 1) * step]) for i in range(count)]
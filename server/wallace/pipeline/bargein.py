@@ -0,0 +1,117 @@
+"""全双工打断 — 播报期间对上行麦克风音频做服务端 VAD。
+
+设备开启全双工后在播报时持续上传麦克风音频。麦克风会拾取扬声器回声，
+阈值取 max(speech_threshold, 近期下行音频 RMS × echo_ratio)：
+播报越响，判定为用户说话所需的能量越高。连续 min_speech_ms 超过阈值即判定打断。
+打断后进入服务端端点检测：尾部静音达到 endpoint_silence_ms 视为说完。
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from wallace.config import DuplexConfig
+    from wallace.pipeline.tts import PCMFrame
+
+# 16kHz 16bit mono
+_BYTES_PER_SECOND = 32000
+
+
+def _rms(pcm: bytes | memoryview) -> float:
+    """int16 PCM 的归一化 RMS（0~1）。"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(samples, dtype=np.float32)))) / 32768.0
+
+
+class BargeInDetector:
+    """单个会话的打断检测器（存在即表示会话已开启全双工）。"""
+
+    def __init__(self, config: DuplexConfig, echo_window: float) -> None:
+        self.config = config
+        # 下行音频发送后仍在设备缓冲中播放，回声窗口 = 抖动缓冲 + 回声拖尾
+        self.echo_window = echo_window
+        self._playback: deque[tuple[float, float]] = deque()
+        self._preroll: deque[bytes] = deque()
+        self._preroll_bytes = 0
+        self._speech_seconds = 0.0
+        self._silence_seconds = 0.0
+        self.speech_started_at: float | None = None
+        # 打断后由服务端端点检测结束录音
+        self.recording = False
+
+    # ── 下行 ──
+
+    async def observe_playback(
+        self, frames: AsyncIterator[PCMFrame]
+    ) -> AsyncIterator[PCMFrame]:
+        """透传下行 PCM 帧，记录其能量用于估计回声。"""
+        async for frame in frames:
+            self._playback.append((time.monotonic(), _rms(frame)))
+            yield frame
+
+    def echo_level(self, now: float) -> float:
+        """回声窗口内下行音频的最大 RMS。"""
+        horizon = now - self.echo_window
+        while self._playback and self._playback[0][0] < horizon:
+            self._playback.popleft()
+        return max((rms for _, rms in self._playback), default=0.0)
+
+    def threshold(self, now: float) -> float:
+        return max(self.config.speech_threshold, self.echo_level(now) * self.config.echo_ratio)
+
+    # ── 上行 ──
+
+    def feed(self, pcm: bytes) -> bool:
+        """播报期间的麦克风音频，返回是否判定为用户打断。"""
+        now = time.monotonic()
+        self._keep_preroll(pcm)
+        duration = len(pcm) / _BYTES_PER_SECOND
+        if _rms(pcm) > self.threshold(now):
+            if self._speech_seconds == 0.0:
+                self.speech_started_at = now - duration
+            self._speech_seconds += duration
+        else:
+            self._speech_seconds = 0.0
+            self.speech_started_at = None
+        return self._speech_seconds * 1000 >= self.config.min_speech_ms
+
+    def take_preroll(self) -> list[bytes]:
+        """取出触发打断前缓存的麦克风音频（并入录音，避免丢掉句首）。"""
+        chunks = list(self._preroll)
+        self._preroll.clear()
+        self._preroll_bytes = 0
+        return chunks
+
+    def feed_recording(self, pcm: bytes) -> bool:
+        """打断后录音中的麦克风音频，返回是否检测到说完（尾部静音足够长）。"""
+        duration = len(pcm) / _BYTES_PER_SECOND
+        # 打断时已停止播放，回声很快消失，此处只用基础阈值
+        if _rms(pcm) > self.config.speech_threshold:
+            self._silence_seconds = 0.0
+        else:
+            self._silence_seconds += duration
+        return self._silence_seconds * 1000 >= self.config.endpoint_silence_ms
+
+    def reset(self) -> None:
+        """一轮结束或设备显式开始 / 结束录音时重置检测状态。"""
+        self._preroll.clear()
+        self._preroll_bytes = 0
+        self._speech_seconds = 0.0
+        self._silence_seconds = 0.0
+        self.speech_started_at = None
+        self.recording = False
+
+    def _keep_preroll(self, pcm: bytes) -> None:
+        self._preroll.append(pcm)
+        self._preroll_bytes += len(pcm)
+        limit = self.config.preroll_ms * _BYTES_PER_SECOND // 1000
+        while len(self._preroll) > 1 and self._preroll_bytes - len(self._preroll[0]) >= limit:
+            self._preroll_bytes -= len(self._preroll.popleft())
@@ -0,0 +1,52 @@
+"""预合成音频缓存 — 固定提示语只合成一次，之后直接复用 PCM 帧。"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from wallace.pipeline.tts import PCMFrame, TTSManager
+
+logger = logging.getLogger(__name__)
+
+
+class CannedAudio:
+    """按文本缓存整句 TTS 音频（忙碌提示、超时致歉等），过载或超时时不再占用 TTS。"""
+
+    def __init__(self, tts: TTSManager) -> None:
+        self._tts = tts
+        self._cache: dict[str, list[bytes]] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, text: str) -> list[bytes]:
+        """取缓存的 PCM 帧，未命中则合成并缓存。
+
+        TTS 全部失败时 synthesize 不抛出而是不产出帧，空结果不缓存，下次调用重新合成。
+        """
+        frames = self._cache.get(text)
+        if frames is not None:
+            return frames
+        async with self._lock:
+            frames = self._cache.get(text)
+            if frames is None:
+                frames = [bytes(f) async for f in self._tts.synthesize(text)]
+                if frames:
+                    self._cache[text] = frames
+        return frames
+
+    async def warm(self, *texts: str) -> None:
+        """启动时预先合成，失败或无音频则留待首次使用时重试。"""
+        for text in texts:
+            try:
+                await self.get(text)
+            except Exception:
+                logger.warning("Pre-render failed: %s", text, exc_info=True)
+
+
+async def iter_cached(frames: list[bytes]) -> AsyncIterator[PCMFrame]:
+    """把缓存的帧列表转为 send_audio 所需的异步帧流。"""
+    for frame in frames:
+        yield frame
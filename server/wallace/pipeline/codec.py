@@ -0,0 +1,161 @@
+"""下行音频编码 — PCM 直通 / IMA-ADPCM (约 4:1)。
+
+ADPCM 码流按块独立编码，每块 128 samples：
+
+    [predictor: int16 LE][step_index: uint8][reserved: uint8][64 bytes nibbles]
+
+块头直接携带首个 sample，其后 127 个 sample 各 4 bit（低半字节在前，末尾补 1 个空半字节）。
+块间无状态依赖，丢包只影响单块；编码可在块维度上向量化，一帧 (512 samples) = 4 块 = 272 bytes。
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# ────────────────────── IMA-ADPCM 表 ──────────────────────
+
+_STEP_TABLE = np.array(
+    [
+        7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+        50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+        253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+        1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+        3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+        11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+        32767,
+    ],
+    dtype=np.int32,
+)
+
+_INDEX_TABLE = np.array([-1, -1, -1, -1, 2, 4, 6, 8] * 2, dtype=np.int32)
+
+ADPCM_BLOCK_SAMPLES = 128
+_HEADER_BYTES = 4
+ADPCM_BLOCK_BYTES = _HEADER_BYTES + ADPCM_BLOCK_SAMPLES // 2
+
+
+class AudioEncoder(ABC):
+    """下行音频编码器：输入 PCM 16kHz 16bit mono，输出线上字节。"""
+
+    name: str
+    # 每次 encode 调用合并的帧数（向量化编码器批量越大单帧成本越低）
+    batch_frames: int = 1
+
+    @abstractmethod
+    def encode(self, pcm: bytes) -> bytes:
+        ...  # pragma: no cover
+
+
+class PCMEncoder(AudioEncoder):
+    """直通，不压缩。"""
+
+    name = "pcm"
+
+    def encode(self, pcm: bytes) -> bytes:
+        return pcm
+
+
+class IMAADPCMEncoder(AudioEncoder):
+    """IMA-ADPCM 编码器，numpy 在块维度上向量化。"""
+
+    name = "adpcm"
+    batch_frames = 16
+
+    def encode(self, pcm: bytes) -> bytes:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if samples.size == 0:
+            return b""
+        n_blocks = -(-samples.size // ADPCM_BLOCK_SAMPLES)
+        blocks = np.zeros((n_blocks, ADPCM_BLOCK_SAMPLES), dtype=np.int32)
+        blocks.reshape(-1)[: samples.size] = samples
+
+        predictor = blocks[:, 0].copy()
+        index = _initial_step_index(blocks)
+
+        header = np.zeros((n_blocks, _HEADER_BYTES), dtype=np.uint8)
+        header[:, 0:2] = predictor.astype("<i2").view(np.uint8).reshape(n_blocks, 2)
+        header[:, 2] = index
+
+        codes = np.zeros((n_blocks, ADPCM_BLOCK_SAMPLES), dtype=np.uint8)
+        for i in range(1, ADPCM_BLOCK_SAMPLES):
+            step = _STEP_TABLE[index]
+            diff = blocks[:, i] - predictor
+            code = np.where(diff < 0, 8, 0)
+            diff = np.abs(diff)
+
+            # 量化：取 floor(4·diff/step) 的 3 bit，近似标准实现的逐位比较
+            mag = np.minimum((diff << 2) // step, 7)
+            vpdiff = (step >> 3) + ((mag & 4) != 0) * step
+            vpdiff += ((mag & 2) != 0) * (step >> 1) + ((mag & 1) != 0) * (step >> 2)
+
+            predictor = np.clip(
+                np.where(code, predictor - vpdiff, predictor + vpdiff), -32768, 32767
+            )
+            code |= mag
+            index = np.clip(index + _INDEX_TABLE[code], 0, 88)
+            codes[:, i - 1] = code
+
+        packed = codes[:, 0::2] | (codes[:, 1::2] << 4)
+        return np.concatenate([header, packed], axis=1).tobytes()
+
+
+def decode_adpcm(data: bytes) -> bytes:
+    """IMA-ADPCM 解码为 PCM int16 LE（固件参考实现 / 测试用）。"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if raw.size % ADPCM_BLOCK_BYTES:
+        raise ValueError(f"ADPCM data length {raw.size} not a multiple of {ADPCM_BLOCK_BYTES}")
+    blocks = raw.reshape(-1, ADPCM_BLOCK_BYTES)
+    n_blocks = blocks.shape[0]
+
+    predictor = blocks[:, 0:2].copy().view("<i2").reshape(n_blocks).astype(np.int32)
+    index = blocks[:, 2].astype(np.int32)
+    nibbles = blocks[:, _HEADER_BYTES:]
+    codes = np.empty((n_blocks, ADPCM_BLOCK_SAMPLES), dtype=np.int32)
+    codes[:, 0::2] = nibbles & 0x0F
+    codes[:, 1::2] = nibbles >> 4
+
+    out = np.empty((n_blocks, ADPCM_BLOCK_SAMPLES), dtype=np.int16)
+    out[:, 0] = predictor
+    for i in range(1, ADPCM_BLOCK_SAMPLES):
+        step = _STEP_TABLE[index]
+        code = codes[:, i - 1]
+        vpdiff = (step >> 3) + ((code & 4) != 0) * step
+        vpdiff += ((code & 2) != 0) * (step >> 1) + ((code & 1) != 0) * (step >> 2)
+        predictor = np.clip(
+            np.where(code & 8, predictor - vpdiff, predictor + vpdiff), -32768, 32767
+        )
+        index = np.clip(index + _INDEX_TABLE[code], 0, 88)
+        out[:, i] = predictor
+    return out.tobytes()
+
+
+def _initial_step_index(blocks: np.ndarray) -> np.ndarray:
+    """按块内平均相邻差估计初始 step index，块间无需传递编码状态。"""
+    mean_diff = np.abs(np.diff(blocks[:, :8], axis=1)).mean(axis=1)
+    return np.clip(np.searchsorted(_STEP_TABLE, mean_diff), 0, 88).astype(np.int32)
+
+
+_ENCODERS: dict[str, type[AudioEncoder]] = {
+    "pcm": PCMEncoder,
+    "adpcm": IMAADPCMEncoder,
+}
+
+SUPPORTED_CODECS: tuple[str, ...] = tuple(_ENCODERS)
+
+
+def negotiate_codec(offered: list[str]) -> str:
+    """按设备给出的偏好顺序选择第一个服务端支持的编码，均不支持则回退 pcm。"""
+    for codec in offered:
+        if codec in _ENCODERS:
+            return codec
+    return "pcm"
+
+
+def create_encoder(codec: str) -> AudioEncoder:
+    """按名称创建编码器。"""
+    cls = _ENCODERS.get(codec)
+    if cls is None:
+        raise ValueError(f"Unknown audio codec: {codec}")
+    return cls()
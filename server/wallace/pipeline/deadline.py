@@ -0,0 +1,114 @@
+"""单轮时间预算 — audio_end 时创建，贯穿 ASR / LLM / TTS，直到首帧音频发出。
+
+各阶段在 Deadline.stage() 中执行：剩余预算耗尽即抛出 DeadlineExceeded 并记录
+耗时最多的阶段；进入阶段前可按剩余预算缩减工作量（如截断 max_tokens）。
+首帧音频发出后本轮视为按时应答，后续播报不再受预算约束。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from typing import TypeVar
+
+from wallace.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """本轮预算在某阶段内耗尽。"""
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(stage)
+        self.stage = stage
+        # 由 StreamingResponder 填写：超时前是否已发送 tts_start
+        self.spoke = False
+
+
+class Deadline:
+    """单轮预算，记录各阶段耗时。budget 为 None 表示不限时（仅记录耗时）。"""
+
+    def __init__(self, budget: float | None) -> None:
+        self.budget = budget
+        self.start = time.monotonic()
+        self.expires_at = None if budget is None else self.start + budget
+        self.spent: dict[str, float] = {}
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @asynccontextmanager
+    async def stage(self, name: str) -> AsyncIterator[None]:
+        """在剩余预算内执行一个阶段，超时抛出 DeadlineExceeded(name)。同名阶段耗时累加。"""
+        start = time.monotonic()
+        exceeded = self.expired
+        try:
+            if exceeded:
+                raise DeadlineExceeded(name)
+            async with asyncio.timeout(self.remaining()) as cm:
+                yield
+        except TimeoutError:
+            if not cm.expired():
+                raise
+            exceeded = True
+            raise DeadlineExceeded(name) from None
+        finally:
+            self.spent[name] = self.spent.get(name, 0.0) + time.monotonic() - start
+            if exceeded:
+                self._report(name)
+
+    def exceeded(self, name: str, spent: float) -> DeadlineExceeded:
+        """在 stage() 之外的等待（如 governor 排队）中耗尽预算：记入耗时，返回待抛出的异常。"""
+        self.spent[name] = self.spent.get(name, 0.0) + spent
+        self._report(name)
+        return DeadlineExceeded(name)
+
+    def _report(self, stage: str) -> None:
+        """记录超时：耗尽预算的阶段与耗时最多的阶段。"""
+        heaviest = max(self.spent, key=self.spent.__getitem__)
+        metrics.inc("turn_deadline_exceeded_total", stage=stage)
+        logger.warning(
+            "Turn over budget (%ss) in stage %s, most time spent in %s: %s",
+            self.budget,
+            stage,
+            heaviest,
+            ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in self.spent.items()),
+        )
+
+
+async def within(
+    items: AsyncIterator[T],
+    deadline: Deadline,
+    stage: str,
+    until: Callable[[], bool] | None = None,
+) -> AsyncIterator[T]:
+    """对流中元素的等待施加预算，直到 until() 为真（缺省为只约束首个元素）。"""
+    it = aiter(items)
+    try:
+        first = True
+        while first if until is None else not until():
+            first = False
+            async with deadline.stage(stage):
+                try:
+                    item = await anext(it)
+                except StopAsyncIteration:
+                    return
+            yield item
+        async for item in it:
+            yield item
+    finally:
+        aclose = getattr(it, "aclose", None)
+        if aclose is not None:
+            await aclose()
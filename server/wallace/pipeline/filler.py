@@ -0,0 +1,130 @@
+"""填充提示 — LLM 思考期间先播一声「嗯……」，掩盖 ASR + 首 token + 首句 TTS 的静默。
+
+audio_end 后 delay 内仍未开口，则从预合成的 PCM 缓存播放一句按性格 / 情绪挑选的短提示，
+并代发 tts_start；真正的应答就绪时等提示播完再接上，不重复 tts_start。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from wallace.metrics import metrics
+from wallace.pipeline.audio_out import send_audio
+from wallace.pipeline.canned import iter_cached
+from wallace.ws.protocol import tts_start
+from wallace.ws.session import PipelineState
+
+if TYPE_CHECKING:
+    from wallace.pipeline.canned import CannedAudio
+    from wallace.ws.session import Session
+
+logger = logging.getLogger(__name__)
+
+# 性格 → 最近一次应答的情绪 → 候选提示（default 为缺省情绪）
+_CUES: dict[str, dict[str, tuple[str, ...]]] = {
+    "normal": {
+        "default": ("嗯……", "让我想想。"),
+        "happy": ("嗯嗯！", "我想想哦！"),
+        "sad": ("唔……",),
+    },
+    "cool": {
+        "default": ("嗯。", "我想想。"),
+    },
+    "talkative": {
+        "default": ("哎呀这个问题好，让我想想！", "嗯嗯，我想一下哈！"),
+    },
+    "tsundere": {
+        "default": ("哼，让我想想。", "才、才不是不知道呢……"),
+    },
+}
+
+
+def cues_for(personality: str, mood: str) -> tuple[str, ...]:
+    by_mood = _CUES.get(personality, _CUES["normal"])
+    return by_mood.get(mood, by_mood["default"])
+
+
+class FillerStore:
+    """全部提示语的预合成缓存，按会话性格 / 情绪轮换挑选。"""
+
+    def __init__(self, canned: CannedAudio) -> None:
+        self._canned = canned
+        self._turns: dict[tuple[str, str], int] = {}
+
+    def pick(self, personality: str, mood: str) -> str:
+        cues = cues_for(personality, mood)
+        key = (personality, mood)
+        index = self._turns.get(key, 0)
+        self._turns[key] = index + 1
+        return cues[index % len(cues)]
+
+    async def frames(self, text: str) -> list[bytes]:
+        return await self._canned.get(text)
+
+    async def warm(self) -> None:
+        """启动时预合成全部提示语。"""
+        texts = {cue for by_mood in _CUES.values() for cues in by_mood.values() for cue in cues}
+        await self._canned.warm(*sorted(texts))
+
+
+class Filler:
+    """单轮的填充提示。start() 后 delay 秒内未被 claim() 则开始播放。"""
+
+    def __init__(self, session: Session, store: FillerStore, delay: float) -> None:
+        self.session = session
+        self.store = store
+        self.delay = delay
+        self.started = False
+        self._claimed = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._play())
+
+    async def _play(self) -> None:
+        await asyncio.sleep(self.delay)
+        session = self.session
+        cue = self.store.pick(session.personality, session.mood)
+        try:
+            frames = await self.store.frames(cue)
+        except Exception:
+            logger.warning("Filler cue unavailable: %s", cue, exc_info=True)
+            return
+        if not frames or self._claimed:
+            return
+        # 提示开始即进入播报状态，可被打断
+        self.started = True
+        if session.state == PipelineState.PROCESSING:
+            session.transition_to(PipelineState.SPEAKING)
+        metrics.inc("filler_played_total", personality=session.personality)
+        await session.outbox.send_text(tts_start("thinking"))
+        await send_audio(session, iter_cached(frames))
+
+    async def claim(self) -> bool:
+        """应答就绪：提示未开始则取消，已开始则等它播完。返回是否已代发 tts_start。"""
+        self._claimed = True
+        task = self._task
+        if task is None:
+            return False
+        if not self.started:
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if self.started or (current is not None and current.cancelling()):
+                raise
+            return False
+        return self.started
+
+    async def close(self) -> bool:
+        """本轮结束且无应答接管：返回是否需要补发 tts_end。"""
+        if self._claimed:
+            return False
+        return await self.claim()
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,150 @@
+"""全局准入控制 — 限制并发对话轮数，按负载逐级降级。
+
+所有会话共享一个 PipelineGovernor：
+- 同时执行的轮数不超过 max_concurrent_turns，其余进入有界等待队列
+- 队列已满或排队超时的轮次被放弃，由编排器改播缓存的忙碌提示
+- 负载 =（执行中 + 排队）/ max_concurrent_turns，越高降级越多：
+  缩短回复（max_tokens）→ ASR 快速档（beam_size=1）→ 放弃
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any
+
+from wallace.config import GovernorConfig
+from wallace.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DegradeLevel(IntEnum):
+    """降级阶梯，数值越大降级越多。"""
+
+    NORMAL = 0
+    SHORT_REPLY = 1
+    FAST_ASR = 2
+    SHED = 3
+
+
+class GovernorOverloaded(Exception):
+    """本轮未获准入（队列已满或排队超时）。"""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class Admission:
+    """一轮获准执行时的降级参数。"""
+
+    level: DegradeLevel
+    waited: float  # 排队秒数
+    max_tokens: int | None = None
+    asr_beam_size: int | None = None
+
+    def llm_options(self) -> dict[str, Any]:
+        """传给 LLMClient.chat_stream 的覆盖参数，未降级时为空。"""
+        return {} if self.max_tokens is None else {"max_tokens": self.max_tokens}
+
+    def asr_options(self) -> dict[str, Any]:
+        """传给 ASREngine.transcribe 的覆盖参数，未降级时为空。"""
+        return {} if self.asr_beam_size is None else {"beam_size": self.asr_beam_size}
+
+
+class PipelineGovernor:
+    """服务端全局的对话轮准入控制器。"""
+
+    def __init__(self, config: GovernorConfig | None = None) -> None:
+        self.config = config or GovernorConfig()
+        self._slots = asyncio.Semaphore(self.config.max_concurrent_turns)
+        self.active = 0
+        self.waiting = 0
+
+    @property
+    def load(self) -> float:
+        return (self.active + self.waiting) / self.config.max_concurrent_turns
+
+    def level_for(self, load: float) -> DegradeLevel:
+        cfg = self.config
+        if self.waiting >= cfg.max_queue:
+            return DegradeLevel.SHED
+        if load >= cfg.fast_asr_load:
+            return DegradeLevel.FAST_ASR
+        if load >= cfg.short_reply_load:
+            return DegradeLevel.SHORT_REPLY
+        return DegradeLevel.NORMAL
+
+    @property
+    def level(self) -> DegradeLevel:
+        """下一轮到达时将适用的降级级别。"""
+        return self.level_for(self.load)
+
+    @asynccontextmanager
+    async def admit(self, timeout: float | None = None) -> AsyncIterator[Admission]:
+        """获取执行名额，退出时归还。未获准入时抛出 GovernorOverloaded。
+
+        timeout 为本轮剩余预算，排队时间取其与 queue_timeout 的较小者。
+        """
+        queue_timeout = self.config.queue_timeout
+        if timeout is not None:
+            queue_timeout = min(queue_timeout, timeout)
+        if self.waiting >= self.config.max_queue and self._slots.locked():
+            self._shed("queue_full")
+
+        start = time.monotonic()
+        self.waiting += 1
+        self._publish()
+        timed_out = False
+        try:
+            async with asyncio.timeout(queue_timeout):
+                await self._slots.acquire()
+        except TimeoutError:
+            timed_out = True
+        finally:
+            self.waiting -= 1
+        if timed_out:
+            self._shed("timeout")
+
+        self.active += 1
+        waited = time.monotonic() - start
+        admission = self._admission(waited)
+        self._publish()
+        metrics.observe("governor_queue_wait_seconds", waited)
+        metrics.inc("governor_turns_total", level=admission.level.name.lower())
+        try:
+            yield admission
+        finally:
+            self.active -= 1
+            self._slots.release()
+            self._publish()
+
+    def _admission(self, waited: float) -> Admission:
+        # 计入本轮自身：执行中（含本轮）+ 仍在排队
+        level = min(self.level_for(self.load), DegradeLevel.FAST_ASR)
+        admission = Admission(level=level, waited=waited)
+        if level >= DegradeLevel.SHORT_REPLY:
+            admission.max_tokens = self.config.short_reply_max_tokens
+        if level >= DegradeLevel.FAST_ASR:
+            admission.asr_beam_size = 1
+        return admission
+
+    def _shed(self, reason: str) -> None:
+        metrics.inc("governor_shed_total", reason=reason)
+        self._publish()
+        logger.warning(
+            "Turn shed (%s): active=%d waiting=%d", reason, self.active, self.waiting
+        )
+        raise GovernorOverloaded(reason)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("governor_active_turns", self.active)
+        metrics.set_gauge("governor_queued_turns", self.waiting)
+        metrics.set_gauge("governor_degrade_level", self.level)
@@ -77,6 +77,8 @@ class LLMClient:
             system_prompt += f"\n主人叫{mem.nickname}。"
         if mem.interests:
             system_prompt += f"\n主人的兴趣：{'、'.join(mem.interests)}。"
+        if session.recalled:
+            system_prompt += "\n你记得：" + "".join(f"\n- {m}" for m in session.recalled)
 
         # 传感器上下文
         if sensor_context:
@@ -88,9 +90,9 @@ class LLMClient:
         return messages
 
     async def chat_stream(
-        self, messages: list[dict[str, str]]
+        self, messages: list[dict[str, str]], *, max_tokens: int | None = None
     ) -> AsyncIterator[str]:
-        """流式调用 Ollama /api/chat，逐 token yield。"""
+        """流式调用 Ollama /api/chat，逐 token yield。max_tokens 覆盖配置值（降级时缩短回复）。"""
         if not self._client:
             raise RuntimeError("LLM client not started")
 
@@ -100,7 +102,7 @@ class LLMClient:
             "stream": True,
             "options": {
                 "temperature": self.config.temperature,
-                "num_predict": self.config.max_tokens,
+                "num_predict": max_tokens or self.config.max_tokens,
             },
         }
 
@@ -1,32 +1,38 @@
-"""流水线编排 — ASR → LLM → TTS 串联。"""
+"""流水线编排 — 按阶段图串联 VAD → ASR → 文本阶段 → LLM → TTS。"""
 
 from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import TYPE_CHECKING
 
-from wallace.emotion import extract_mood
-from wallace.ws.protocol import (
-    TTSCancelMessage,
-    TTSEndMessage,
-    TTSStartMessage,
-    TextMessage,
-)
+from wallace.config import DeadlineConfig, FillerConfig
+from wallace.metrics import metrics
+from wallace.pipeline.deadline import Deadline, DeadlineExceeded
+from wallace.pipeline.filler import Filler, FillerStore
+from wallace.pipeline.governor import GovernorOverloaded, PipelineGovernor
+from wallace.pipeline.responder import StreamingResponder
+from wallace.pipeline.stages import StageBusy, StageGraph
+from wallace.pipeline.transcript import Intent, clean_transcript, detect_intent
+from wallace.ws.protocol import TTS_CANCEL, TTS_END, TextMessage
 from wallace.ws.session import PipelineState
 
 if TYPE_CHECKING:
+    from wallace.config import TTSConfig
+    from wallace.memory.longterm import LongTermMemory
     from wallace.pipeline.asr import ASREngine
+    from wallace.pipeline.governor import Admission
     from wallace.pipeline.llm import LLMClient
     from wallace.pipeline.tts import TTSManager
     from wallace.sensor import SensorProcessor
+    from wallace.tracing import TurnTrace
     from wallace.ws.session import Session
 
 logger = logging.getLogger(__name__)
 
-# 分句标点
-_SENTENCE_ENDINGS = set("。！？；\n")
-
 
 class Orchestrator:
     """ASR → LLM → TTS 流水线编排器。"""
@@ -37,137 +43,301 @@ class Orchestrator:
         llm: LLMClient,
         tts: TTSManager,
         sensor: SensorProcessor,
+        tts_config: TTSConfig | None = None,
+        governor: PipelineGovernor | None = None,
+        deadline_config: DeadlineConfig | None = None,
+        filler_config: FillerConfig | None = None,
+        stages: StageGraph | None = None,
+        longterm: LongTermMemory | None = None,
     ) -> None:
         self.asr = asr
         self.llm = llm
         self.tts = tts
         self.sensor = sensor
+        # 各阶段的执行器 / 并发上限，所有会话共享
+        self.stages = stages or StageGraph()
+        self.responder = StreamingResponder(llm, tts, tts_config, self.stages)
+        # 所有会话共享的准入控制
+        self.governor = governor or PipelineGovernor()
+        self.deadline_config = deadline_config or DeadlineConfig()
+        self.filler_config = filler_config or FillerConfig()
+        self.fillers = FillerStore(self.responder.canned)
+        # 长期记忆召回 / 写入，None = 只用对话历史窗口
+        self.longterm = longterm
+
+    async def warm(self) -> None:
+        """预合成忙碌 / 致歉 / 填充提示，过载或超时时直接播放。"""
+        await self.responder.canned.warm(
+            self.governor.config.busy_reply, self.deadline_config.apology
+        )
+        if self.filler_config.enabled:
+            await self.fillers.warm()
 
     async def handle_audio_start(self, session: Session) -> None:
         """处理 audio_start：打断 + 开始录音。"""
+        detector = session.barge_in
+        if detector is not None:
+            if detector.recording and session.state == PipelineState.RECORDING:
+                # 服务端已因打断开始录音，设备随后的 audio_start 不清空已录音频
+                return
+            detector.reset()
         await self.cancel_pipeline(session)
         session.clear_audio()
         session.transition_to(PipelineState.RECORDING)
 
+    async def handle_audio_frame(self, session: Session, data: bytes) -> None:
+        """处理上行音频帧。全双工会话在播报期间检测打断，打断后由服务端判定说完。"""
+        detector = session.barge_in
+        if detector is not None:
+            if session.state == PipelineState.SPEAKING:
+                if detector.feed(data):
+                    await self._barge_in(session)
+                return
+            if detector.recording and session.state == PipelineState.RECORDING:
+                session.append_audio(data)
+                if detector.feed_recording(data):
+                    await self.handle_audio_end(session)
+                return
+        session.append_audio(data)
+
+    async def _barge_in(self, session: Session) -> None:
+        """用户在播报中开口：立即停播，预录音频并入新一轮录音。"""
+        detector = session.barge_in
+        assert detector is not None
+        started_at = detector.speech_started_at
+        preroll = detector.take_preroll()
+        await self.cancel_pipeline(session)
+        session.clear_audio()
+        for chunk in preroll:
+            session.append_audio(chunk)
+        session.transition_to(PipelineState.RECORDING)
+        detector.recording = True
+        metrics.inc("barge_in_total")
+        if started_at is not None:
+            metrics.observe("barge_in_latency_seconds", time.monotonic() - started_at)
+        logger.info("Barge-in detected for session %s", session.user_id)
+
     async def handle_audio_end(self, session: Session) -> None:
         """处理 audio_end：启动流水线。"""
+        if session.barge_in is not None:
+            if session.state != PipelineState.RECORDING:
+                # 服务端端点检测已提交本轮，忽略设备迟到的 audio_end
+                return
+            session.barge_in.reset()
         session.transition_to(PipelineState.PROCESSING)
-        task = asyncio.create_task(self._run_pipeline(session))
+        session.start_trace().mark("audio_end")
+        task = asyncio.create_task(self._run_pipeline(session, self._new_deadline()))
         session.pipeline_task = task
 
     async def cancel_pipeline(self, session: Session) -> None:
-        """取消当前流水线并通知 ESP32。"""
+        """取消当前流水线并通知 ESP32。
+
+        先发 tts_cancel 让设备立即停播，再等待 LLM / TTS 任务收尾。
+        """
         # 先保存状态，因为 await 后任务的 except 处理可能改变状态
         was_speaking = session.state == PipelineState.SPEAKING
+        task = session.pipeline_task
+        if task is not None and not task.done():
+            task.cancel()
 
-        if session.pipeline_task and not session.pipeline_task.done():
-            session.pipeline_task.cancel()
+        # 如果取消前正在说话，发送 tts_cancel 通知 ESP32 停止播放
+        if was_speaking:
+            await session.outbox.send_text(TTS_CANCEL)
+            session.audio_pacer.reset()
+
+        if task is not None and not task.done():
             try:
-                await session.pipeline_task
+                await task
             except asyncio.CancelledError:
                 pass
 
-        # 如果取消前正在说话，发送 tts_cancel 通知 ESP32 停止播放
-        if was_speaking:
-            await session.ws.send_text(TTSCancelMessage().model_dump_json())
-
         session.state = PipelineState.IDLE
         session.pipeline_task = None
 
-    async def _run_pipeline(self, session: Session) -> None:
-        """完整流水线：ASR → LLM → TTS。"""
+    def _new_deadline(self) -> Deadline:
+        budget = self.deadline_config.turn_budget
+        return Deadline(budget if budget > 0 else None)
+
+    async def _run_pipeline(self, session: Session, deadline: Deadline | None = None) -> None:
+        """完整流水线：ASR → LLM → TTS。
+
+        VAD 之后需经 governor 准入；过载（含阶段排队已满）时放弃本轮，播放缓存的忙碌提示。
+        deadline（始于 audio_end）约束排队到首帧音频的各阶段，耗尽时改播致歉提示。
+        迟迟未开口时先播填充提示，应答就绪后接上。
+        各阶段时间点记入 session.trace（在 handle_audio_end 开始），结束时汇总。
+        """
+        deadline = deadline or self._new_deadline()
+        trace = session.trace or session.start_trace()
+        outcome = "error"
+        filler: Filler | None = None
         try:
             # 1. ASR
             audio = session.get_audio_array()
             session.clear_audio()
 
-            if not self.asr.vad_has_speech(audio):
-                session.transition_to(PipelineState.IDLE)
-                return
-
-            text = await self.asr.transcribe(audio)
-            if not text:
-                session.transition_to(PipelineState.IDLE)
-                return
-
-            # 树洞模式：只做 ASR
-            if session.treehouse_mode:
-                logger.info("[treehouse] ASR: %s", text)
+            has_speech = await self.stages["vad"].call(self.asr.vad_has_speech, audio)
+            trace.mark("vad")
+            if not has_speech:
+                outcome = "no_speech"
                 session.transition_to(PipelineState.IDLE)
                 return
 
-            # 2. 组装 LLM 消息
-            sensor_ctx = self.sensor.build_llm_context(session)
-            messages = self.llm.build_messages(session, text, sensor_ctx)
-
-            # 3. LLM 流式生成 + 4. 分句 TTS
-            full_response = ""
-            sentence_buffer = ""
-            first_sentence = True
-
-            session.transition_to(PipelineState.SPEAKING)
-
-            async for token in self.llm.chat_stream(messages):
-                full_response += token
-                sentence_buffer += token
-
-                # 检查是否有完整句子
-                for i, ch in enumerate(sentence_buffer):
-                    if ch in _SENTENCE_ENDINGS:
-                        sentence = sentence_buffer[: i + 1].strip()
-                        sentence_buffer = sentence_buffer[i + 1 :]
-
-                        if sentence:
-                            if first_sentence:
-                                await session.ws.send_text(
-                                    TTSStartMessage(mood="thinking").model_dump_json()
-                                )
-                                first_sentence = True  # will be set to False below
-                                first_sentence = False
-
-                            async for frame in self.tts.synthesize(sentence):
-                                await session.ws.send_bytes(frame)
-                        break
-
-            # 处理剩余 buffer（无标点结尾的情况）
-            remaining = sentence_buffer.strip()
-            if remaining:
-                # 去掉 mood 标签
-                _, cleaned = extract_mood(remaining)
-                if cleaned:
-                    if first_sentence:
-                        await session.ws.send_text(
-                            TTSStartMessage(mood="thinking").model_dump_json()
-                        )
-                        first_sentence = False
-                    async for frame in self.tts.synthesize(cleaned):
-                        await session.ws.send_bytes(frame)
-
-            # 5. 情绪提取
-            mood, cleaned_full = extract_mood(full_response)
-
-            # 发送最终文本 + mood
-            await session.ws.send_text(
-                TextMessage(content=cleaned_full, partial=False, mood=mood.value).model_dump_json()
-            )
-
-            # 6. tts_end
-            if not first_sentence:  # 至少发送过一句 TTS
-                await session.ws.send_text(TTSEndMessage().model_dump_json())
-
-            # 7. 更新对话历史
-            session.chat_history.append({"role": "user", "content": text})
-            session.chat_history.append({"role": "assistant", "content": cleaned_full})
-
+            filler = self._start_filler(session, deadline)
+            try:
+                async with self._admit(deadline) as admission:
+                    trace.mark("admitted")
+                    outcome = await self._converse(
+                        session, audio, trace, admission, deadline, filler
+                    )
+            except (GovernorOverloaded, StageBusy):
+                outcome = "shed"
+                started = filler is not None and await filler.claim()
+                await self._reply_canned(
+                    session, self.governor.config.busy_reply, started=started
+                )
+            except DeadlineExceeded as exc:
+                outcome = "deadline"
+                started = exc.spoke or (filler is not None and await filler.claim())
+                await self._reply_canned(session, self.deadline_config.apology, started=started)
+
+            # 只播了填充提示就结束（无语音 / 树洞），补发 tts_end
+            if filler is not None and await filler.close():
+                await session.outbox.send_text(TTS_END)
             session.state = PipelineState.IDLE
 
         except asyncio.CancelledError:
             logger.info("Pipeline cancelled for session %s", session.user_id)
+            outcome = "cancelled"
             session.state = PipelineState.IDLE
             raise
         except Exception:
             logger.exception("Pipeline error for session %s", session.user_id)
             session.state = PipelineState.IDLE
+        finally:
+            if filler is not None:
+                filler.cancel()
+            # respond() 已结束的 trace 此处为空操作
+            session.end_trace(outcome)
+
+    @asynccontextmanager
+    async def _admit(self, deadline: Deadline) -> AsyncIterator[Admission]:
+        """经 governor 准入，排队不超过本轮剩余预算。
+
+        因预算耗尽（而非 queue_timeout）排队超时时抛出 DeadlineExceeded("queue")，改播致歉。
+        """
+        budget = deadline.remaining()
+        start = time.monotonic()
+        admitted = False
+        try:
+            async with self.governor.admit(timeout=budget) as admission:
+                admitted = True
+                yield admission
+        except GovernorOverloaded as exc:
+            if admitted or exc.reason != "timeout" or budget is None:
+                raise
+            if budget > self.governor.config.queue_timeout:
+                raise
+            raise deadline.exceeded("queue", time.monotonic() - start) from exc
+
+    def _start_filler(self, session: Session, deadline: Deadline) -> Filler | None:
+        """树洞模式不回复，无需填充。延迟从 audio_end 起算。"""
+        cfg = self.filler_config
+        if not cfg.enabled or session.treehouse_mode:
+            return None
+        delay = max(0.0, cfg.delay_ms / 1000 - (time.monotonic() - deadline.start))
+        filler = Filler(session, self.fillers, delay)
+        filler.start()
+        return filler
+
+    async def _converse(
+        self,
+        session: Session,
+        audio,
+        trace: TurnTrace,
+        admission: Admission,
+        deadline: Deadline,
+        filler: Filler | None,
+    ) -> str:
+        """获准入后的 ASR → 文本阶段 → LLM → TTS，返回本轮 outcome。"""
+        async with deadline.stage("asr"):
+            text = await self.stages["asr"].run(
+                self.asr.transcribe, audio, **admission.asr_options()
+            )
+        trace.mark("asr")
+        if not text:
+            return "no_speech"
+
+        # 按阶段图配置的顺序执行 asr 与 llm 之间的文本阶段
+        for name in self.stages.text_stages():
+            stage = self.stages[name]
+            if name == "filter":
+                text = await stage.call(clean_transcript, text)
+                if not text:
+                    return "filtered"
+            elif name == "intent":
+                if await stage.call(detect_intent, text) is Intent.STOP:
+                    logger.info("Stop intent from session %s: %s", session.user_id, text)
+                    return "stopped"
+
+        # 树洞模式：只做 ASR
+        if session.treehouse_mode:
+            logger.info("[treehouse] ASR: %s", text)
+            return "treehouse"
+
+        # 2. 组装 LLM 消息（含按本轮话语召回的长期记忆，对话历史窗口内的原话不重复召回）
+        if self.longterm is not None:
+            window = session.chat_history[-self.llm.config.max_history_turns * 2 :]
+            session.recalled = await self.longterm.recall(
+                session.user_id, text, exclude=[m["content"] for m in window if m["role"] == "user"]
+            )
+        sensor_ctx = self.sensor.build_llm_context(session)
+        messages = self.llm.build_messages(session, text, sensor_ctx)
+        trace.mark("prompt")
+
+        # 剩余预算不多时缩短回复
+        llm_options = admission.llm_options()
+        remaining = deadline.remaining()
+        if remaining is not None and remaining < self.deadline_config.short_reply_budget:
+            cap = self.governor.config.short_reply_max_tokens
+            llm_options["max_tokens"] = min(llm_options.get("max_tokens", cap), cap)
+
+        # 3. LLM 流式生成 + 4. 分句 TTS + 5. 情绪提取
+        if session.state != PipelineState.SPEAKING:  # 填充提示可能已在播放
+            session.transition_to(PipelineState.SPEAKING)
+        response = await self.responder.respond(
+            session,
+            messages,
+            kind="conversation",
+            start_mood="thinking",
+            final=lambda r: TextMessage(content=r.text, partial=False, mood=r.mood.value),
+            llm_options=llm_options,
+            deadline=deadline,
+            filler=filler,
+        )
+        session.mood = response.mood.value
+
+        # 6. 更新对话历史
+        session.chat_history.append({"role": "user", "content": text})
+        session.chat_history.append({"role": "assistant", "content": response.text})
+
+        # 7. 更新记忆（只在内存中计数，由写回任务落盘）与长期记忆
+        session.memory.record_interaction()
+        if self.longterm is not None:
+            await self.longterm.remember(session.user_id, text)
+        return "ok"
+
+    async def _reply_canned(self, session: Session, text: str, *, started: bool = False) -> None:
+        """播放缓存的提示语（忙碌 / 超时致歉），不占用 ASR / LLM。"""
+        frames = await self.responder.canned.get(text)
+        if session.state != PipelineState.SPEAKING:
+            session.transition_to(PipelineState.SPEAKING)
+        await self.responder.play(
+            session,
+            frames,
+            mood="sad",
+            final=TextMessage(content=text, mood="sad"),
+            started=started,
+        )
 
     async def push_random_fact(self, session: Session) -> None:
         """摇一摇触发：生成随机冷知识并通过 TTS 推送。
@@ -178,6 +348,8 @@ class Orchestrator:
         3. 调用 LLM 流式生成
         4. 分句 TTS 合成
         5. 发送 tts_start → PCM帧 → text → tts_end
+
+        播报期间登记为 session.pipeline_task，可被 audio_start 打断。
         """
         async with session.pipeline_lock:
             if session.state != PipelineState.IDLE:
@@ -195,62 +367,16 @@ class Orchestrator:
                 )
                 messages = [{"role": "user", "content": fact_prompt}]
 
-                # LLM 流式生成
-                full_response = ""
-                sentence_buffer = ""
-                first_sentence = True
-
-                session.state = PipelineState.SPEAKING
-
-                async for token in self.llm.chat_stream(messages):
-                    full_response += token
-                    sentence_buffer += token
-
-                    # 检查是否有完整句子
-                    for i, ch in enumerate(sentence_buffer):
-                        if ch in _SENTENCE_ENDINGS:
-                            sentence = sentence_buffer[: i + 1].strip()
-                            sentence_buffer = sentence_buffer[i + 1 :]
-
-                            if sentence:
-                                if first_sentence:
-                                    await session.ws.send_text(
-                                        TTSStartMessage(mood="surprised").model_dump_json()
-                                    )
-                                    first_sentence = False
-
-                                async for frame in self.tts.synthesize(sentence):
-                                    await session.ws.send_bytes(frame)
-                            break
-
-                # 处理剩余 buffer
-                remaining = sentence_buffer.strip()
-                if remaining:
-                    _, cleaned = extract_mood(remaining)
-                    if cleaned:
-                        if first_sentence:
-                            await session.ws.send_text(
-                                TTSStartMessage(mood="surprised").model_dump_json()
-                            )
-                            first_sentence = False
-                        async for frame in self.tts.synthesize(cleaned):
-                            await session.ws.send_bytes(frame)
-
-                # 情绪提取
-                mood, cleaned_full = extract_mood(full_response)
-
-                # 发送最终文本 + mood
-                await session.ws.send_text(
-                    TextMessage(
-                        content=cleaned_full, partial=False, mood=mood.value
-                    ).model_dump_json()
+                response = await self.responder.push(
+                    session,
+                    messages,
+                    kind="shake",
+                    start_mood="surprised",
+                    final=lambda r: TextMessage(content=r.text, partial=False, mood=r.mood.value),
                 )
+                if response is None:
+                    return
 
-                # tts_end
-                if not first_sentence:
-                    await session.ws.send_text(TTSEndMessage().model_dump_json())
-
-                session.state = PipelineState.IDLE
                 logger.info("Random fact pushed to session %s", session.user_id)
 
             except asyncio.CancelledError:
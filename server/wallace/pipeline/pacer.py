@@ -0,0 +1,95 @@
+"""下行音频节流 — 按设备播放时钟 + 抖动缓冲目标发送，可选 credit 流控。
+
+服务端估计设备「播完已发送音频」的时刻 play_end，发送前等待直到
+设备缓冲（play_end - now）不超过 jitter_buffer，使设备端积压有界，
+打断时 tts_cancel 需要丢弃的音频也随之有界。
+启用 credit 流控后，设备通过 audio_credit 消息按实际播放进度授予帧额度，
+服务端额度耗尽即暂停发送。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from wallace.metrics import metrics
+
+# 每帧播放时长：512 samples @ 16kHz
+FRAME_DURATION = 0.032
+
+
+class AudioPacer:
+    """单个会话的下行音频节流器。"""
+
+    def __init__(self, jitter_buffer: float = 0.4) -> None:
+        self.jitter_buffer = jitter_buffer
+        self._play_end: float = 0.0
+        self._credit_window: int | None = None
+        self._credits: int = 0
+        self._credit_available = asyncio.Event()
+
+    @property
+    def credits_enabled(self) -> bool:
+        return self._credit_window is not None
+
+    @property
+    def credits(self) -> int:
+        return self._credits
+
+    def buffered(self) -> float:
+        """估计设备端尚未播放的音频时长（秒）。"""
+        return max(0.0, self._play_end - time.monotonic())
+
+    def capacity(self) -> int | None:
+        """设备端最多积压的帧数（抖动缓冲与 credit 窗口取小），不节流时返回 None。"""
+        limits = [self._credit_window] if self._credit_window is not None else []
+        if self.jitter_buffer > 0:
+            limits.append(int(self.jitter_buffer / FRAME_DURATION))
+        return min(limits) if limits else None
+
+    def enable_credits(self, window: int) -> None:
+        """启用 credit 流控，初始额度为设备缓冲容量（帧）。"""
+        self._credit_window = window
+        self._set_credits(window)
+
+    def grant(self, frames: int) -> None:
+        """设备授予额度（通常为刚播放完的帧数）。"""
+        if self._credit_window is None:
+            return
+        self._set_credits(min(self._credits + frames, self._credit_window))
+
+    async def wait(self) -> None:
+        """发送下一条音频消息前等待，直到设备缓冲低于目标且有剩余额度。"""
+        start = time.monotonic()
+        if self.jitter_buffer > 0:
+            ahead = self._play_end - start - self.jitter_buffer
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+        if self._credit_window is not None:
+            await self._credit_available.wait()
+        waited = time.monotonic() - start
+        if waited > 0:
+            metrics.inc("audio_pacing_wait_seconds_total", waited)
+
+    def on_sent(self, frames: int) -> None:
+        """记录已发送 frames 帧：推进播放时钟，扣减额度。"""
+        now = time.monotonic()
+        depth = self.buffered()
+        metrics.observe("audio_buffer_depth_seconds", depth)
+        self._play_end = max(self._play_end, now) + frames * FRAME_DURATION
+        if self._credit_window is not None:
+            self._set_credits(self._credits - frames)
+
+    def reset(self) -> None:
+        """设备已清空播放缓冲（tts_cancel）：重置时钟与额度。"""
+        self._play_end = 0.0
+        if self._credit_window is not None:
+            self._set_credits(self._credit_window)
+
+    def _set_credits(self, credits: int) -> None:
+        self._credits = credits
+        # 额度可因多帧消息透支为负，需等设备补足后再发
+        if credits > 0:
+            self._credit_available.set()
+        else:
+            self._credit_available.clear()
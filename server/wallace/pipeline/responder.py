@@ -0,0 +1,313 @@
+"""流式应答 — LLM 流 → 分句 → TTS → 下行，对话 / 摇一摇 / 关怀共用。"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+from wallace.config import TTSConfig
+from wallace.emotion import Mood, extract_mood
+from wallace.metrics import metrics
+from wallace.pipeline.audio_out import send_audio
+from wallace.pipeline.canned import CannedAudio, iter_cached
+from wallace.pipeline.deadline import DeadlineExceeded, within
+from wallace.pipeline.segmenter import SentenceSegmenter
+from wallace.pipeline.stages import StageGraph
+from wallace.ws.protocol import TTS_END, TraceMessage, tts_start
+from wallace.ws.session import PipelineState
+
+if TYPE_CHECKING:
+    from wallace.pipeline.deadline import Deadline
+    from wallace.pipeline.filler import Filler
+    from wallace.pipeline.llm import LLMClient
+    from wallace.pipeline.tts import PCMFrame, TTSManager
+    from wallace.tracing import TurnTrace
+    from wallace.ws.protocol import BaseMessage
+    from wallace.ws.session import Session
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class Response:
+    """一次应答的结果。"""
+
+    text: str  # 去掉 mood 标签的完整回复
+    mood: Mood
+    spoke: bool  # 是否发送过 tts_start
+
+
+# 由应答结果生成收尾消息（text / care），返回 None 则不发送
+FinalMessage = Callable[[Response], "BaseMessage | None"]
+
+
+class StreamingResponder:
+    """流式应答引擎：边生成边分句合成，首句就绪即开口。
+
+    发送顺序：tts_start → 逐句音频 → 收尾消息 → tts_end。
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        tts: TTSManager,
+        tts_config: TTSConfig | None = None,
+        stages: StageGraph | None = None,
+    ) -> None:
+        self.llm = llm
+        self.tts = tts
+        self._tts_config = tts_config or TTSConfig()
+        # llm / segment / tts / encode / send 阶段的执行器与指标
+        self.stages = stages or StageGraph()
+        # 固定提示语（忙碌 / 致歉）的预合成音频
+        self.canned = CannedAudio(tts)
+
+    def _new_segmenter(self) -> SentenceSegmenter:
+        cfg = self._tts_config
+        return SentenceSegmenter(
+            min_chars=cfg.min_chunk_chars,
+            max_chars=cfg.max_chunk_chars,
+            first_chunk_min_chars=cfg.first_chunk_min_chars,
+        )
+
+    async def respond(
+        self,
+        session: Session,
+        messages: list[dict[str, str]],
+        *,
+        kind: str,
+        start_mood: str,
+        final: FinalMessage,
+        llm_options: dict[str, Any] | None = None,
+        deadline: Deadline | None = None,
+        filler: Filler | None = None,
+    ) -> Response:
+        """流式生成并播报一次应答。kind 为指标标签（conversation / shake / care）。
+
+        沿用会话上进行中的 trace（对话始于 audio_end），没有则新开一轮，结束时汇总。
+        llm_options 透传给 chat_stream（如降级时的 max_tokens）。
+        给定 deadline 时，首帧音频发出前的 LLM 等待与 TTS 首帧受其约束，
+        超时抛出 DeadlineExceeded（spoke 标明是否已发送 tts_start）。
+        filler 为本轮的填充提示：首句就绪时接管，已播放则不再重复 tts_start。
+        """
+        start = time.monotonic()
+        trace = session.trace or session.start_trace(kind)
+        response_parts: list[str] = []
+        segmenter = self._new_segmenter()
+        stages = self.stages
+        spoke = False
+        lookahead = self._tts_config.lookahead_frames
+        synthesizing: list[_ReadAhead[PCMFrame]] = []
+
+        def synthesize(chunk: str) -> _ReadAhead[PCMFrame] | None:
+            # 句中的 mood 标签不送 TTS
+            _, cleaned = extract_mood(chunk)
+            if not cleaned:
+                return None
+            frames = stages["tts"].stream(self.tts.synthesize(cleaned))
+            ahead = _ReadAhead(_trace_first_frame(frames, trace), lookahead)
+            synthesizing.append(ahead)
+            return ahead
+
+        async def sentences() -> AsyncIterator[_ReadAhead[PCMFrame]]:
+            """LLM → 分句 → 开始合成，在后台任务中执行，不向设备发送。"""
+            async for token in tokens:
+                if not response_parts:
+                    trace.mark("llm_first_token")
+                response_parts.append(token)
+                for chunk in await stages["segment"].call(segmenter.feed, token):
+                    trace.mark("first_sentence")
+                    if (ahead := synthesize(chunk)) is not None:
+                        yield ahead
+
+            # 剩余 buffer（无标点结尾的情况）
+            remaining = segmenter.flush()
+            if remaining:
+                trace.mark("first_sentence")
+                if (ahead := synthesize(remaining)) is not None:
+                    yield ahead
+
+        async def speak(frames: AsyncIterator[PCMFrame]) -> None:
+            nonlocal spoke
+            if not spoke:
+                if deadline is not None:
+                    frames = within(frames, deadline, "tts")
+                if filler is not None and filler.started:
+                    # 填充提示播放期间合成首句，首帧就绪后接在提示之后
+                    frames = await _prefetch(frames)
+                    if frames is None:
+                        return
+                    await filler.claim()
+                elif filler is None or not await filler.claim():
+                    await session.outbox.send_text(tts_start(start_mood))
+                metrics.observe("response_first_audio_seconds", time.monotonic() - start, kind=kind)
+                spoke = True
+            metrics.inc("response_chunks_total", kind=kind)
+            await send_audio(session, frames, stages)
+
+        tokens = stages["llm"].stream(self.llm.chat_stream(messages, **(llm_options or {})))
+        if deadline is not None:
+            # 首句开始合成后 LLM 不再受预算约束（其余预算留给 TTS 首帧）
+            tokens = within(tokens, deadline, "llm", until=lambda: bool(synthesizing))
+
+        # 节流使每句的发送持续到设备缓冲将尽，下一句须在此期间合成：
+        # 生成与合成在后台提前一句进行，发送留在本任务中（打断时随之取消）
+        upcoming = _ReadAhead(sentences(), 1)
+        try:
+            async for frames in upcoming:
+                await speak(frames)
+
+            mood, cleaned_full = extract_mood("".join(response_parts))
+            response = Response(text=cleaned_full, mood=mood, spoke=spoke)
+
+            msg = final(response)
+            if msg is not None:
+                await session.outbox.send_text(msg.model_dump_json())
+            if spoke:
+                await session.outbox.send_text(TTS_END)
+        except asyncio.CancelledError:
+            metrics.inc("responses_total", kind=kind, outcome="cancelled")
+            session.end_trace("cancelled")
+            raise
+        except DeadlineExceeded as exc:
+            exc.spoke = spoke
+            metrics.inc("responses_total", kind=kind, outcome="deadline")
+            raise
+        except Exception:
+            metrics.inc("responses_total", kind=kind, outcome="error")
+            session.end_trace("error")
+            raise
+        finally:
+            await upcoming.aclose()
+            for ahead in synthesizing:
+                await ahead.aclose()
+
+        metrics.inc("responses_total", kind=kind, outcome="ok")
+        metrics.observe("response_total_seconds", time.monotonic() - start, kind=kind)
+        if session.end_trace() is not None and session.trace_to_device:
+            session.outbox.post_telemetry(
+                TraceMessage(
+                    turn=trace.turn, kind=trace.kind, stages=trace.elapsed_ms()
+                ).model_dump_json()
+            )
+        return response
+
+    async def play(
+        self,
+        session: Session,
+        frames: list[bytes],
+        *,
+        mood: str,
+        final: BaseMessage | None,
+        started: bool = False,
+    ) -> None:
+        """播放预先合成的音频（如忙碌提示），发送顺序与 respond 相同。
+
+        started 表示本轮已发送过 tts_start（应答中途超时改播致歉）。
+        """
+        if not started:
+            await session.outbox.send_text(tts_start(mood))
+        await send_audio(session, iter_cached(frames), self.stages)
+        if final is not None:
+            await session.outbox.send_text(final.model_dump_json())
+        await session.outbox.send_text(TTS_END)
+
+    async def push(
+        self,
+        session: Session,
+        messages: list[dict[str, str]],
+        *,
+        kind: str,
+        start_mood: str,
+        final: FinalMessage,
+    ) -> Response | None:
+        """主动推送（摇一摇 / 关怀）。调用方需持有 pipeline_lock 并确认会话空闲。
+
+        应答在子任务中执行并登记为 session.pipeline_task，用户开口（audio_start）
+        时与对话一样被 cancel_pipeline 打断，此时返回 None。
+        """
+        session.state = PipelineState.SPEAKING
+        task = asyncio.create_task(
+            self.respond(session, messages, kind=kind, start_mood=start_mood, final=final)
+        )
+        session.pipeline_task = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if current is not None and current.cancelling():
+                # 外层被取消（如服务关闭），继续向上传播
+                raise
+            logger.info("%s push interrupted for session %s", kind, session.user_id)
+            return None
+        finally:
+            # 被打断时由 cancel_pipeline 接管状态
+            if session.pipeline_task is task:
+                session.pipeline_task = None
+                session.state = PipelineState.IDLE
+
+
+async def _trace_first_frame(
+    frames: AsyncIterator[PCMFrame], trace: TurnTrace
+) -> AsyncIterator[PCMFrame]:
+    async for frame in frames:
+        trace.mark("tts_first_frame")
+        yield frame
+
+
+class _ReadAhead(Generic[T]):
+    """预读：后台任务把异步流读入有界队列，消费方依序取出；上游异常在取出时抛出。"""
+
+    def __init__(self, items: AsyncIterator[T], maxsize: int) -> None:
+        self._queue: asyncio.Queue[T] = asyncio.Queue(maxsize)
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._fill(items))
+        self._task.add_done_callback(lambda _: self._ready.set())
+
+    async def _fill(self, items: AsyncIterator[T]) -> None:
+        try:
+            async for item in items:
+                await self._queue.put(item)
+                self._ready.set()
+        finally:
+            aclose = getattr(items, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def __aiter__(self) -> _ReadAhead[T]:
+        return self
+
+    async def __anext__(self) -> T:
+        while self._queue.empty():
+            if self._task.done():
+                self._task.result()
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.get_nowait()
+
+    async def aclose(self) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def _prefetch(frames: AsyncIterator[PCMFrame]) -> AsyncIterator[PCMFrame] | None:
+    """等待首帧就绪，返回含首帧的完整帧流；无音频返回 None。"""
+    it = aiter(frames)
+    try:
+        first = await anext(it)
+    except StopAsyncIteration:
+        return None
+
+    async def chained() -> AsyncIterator[PCMFrame]:
+        yield first
+        async for frame in it:
+            yield frame
+
+    return chained()
@@ -0,0 +1,80 @@
+"""流式分句 — LLM token 流切分为 TTS 合成单元。"""
+
+from __future__ import annotations
+
+import re
+
+# 分句标点
+SENTENCE_ENDINGS = "。！？；\n"
+# 停顿标点：仅用于首块提前切分与超长句切分
+CLAUSE_BREAKS = "，、："
+
+_BREAK_RE = re.compile(f"[{re.escape(SENTENCE_ENDINGS + CLAUSE_BREAKS)}]")
+
+
+class SentenceSegmenter:
+    """流式分句器：逐 token 输入，每个字符只扫描一次，一个 token 可切出多句。
+
+    - 遇到句末标点切分，不足 min_chars 的短句并入下一句
+    - 首块在停顿标点处提前切出（累计达到 first_chunk_min_chars），缩短首音延迟
+    - 无句末标点的长句达到 max_chars 时，在最后一个停顿处切分（没有则硬切）
+    """
+
+    def __init__(
+        self,
+        min_chars: int = 2,
+        max_chars: int = 80,
+        first_chunk_min_chars: int = 6,
+    ) -> None:
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.first_chunk_min_chars = first_chunk_min_chars
+        self._pending: list[str] = []
+        self._pending_len = 0
+        self._last_clause = 0  # pending 中最后一个停顿标点之后的偏移，0 = 无
+        self._emitted = False
+
+    def feed(self, token: str) -> list[str]:
+        """输入一个 token，返回本次切出的完整块（可能为空）。"""
+        chunks: list[str] = []
+        start = 0
+        for m in _BREAK_RE.finditer(token):
+            self._append(token[start : m.end()])
+            start = m.end()
+            if m.group() in CLAUSE_BREAKS:
+                self._last_clause = self._pending_len
+                if self._emitted or self._pending_len < self.first_chunk_min_chars:
+                    continue
+            elif self._pending_len < self.min_chars:
+                continue
+            self._cut(self._pending_len, chunks)
+        self._append(token[start:])
+
+        while self._pending_len >= self.max_chars:
+            self._cut(self._last_clause or self.max_chars, chunks)
+        return chunks
+
+    def flush(self) -> str:
+        """流结束：返回剩余文本（已 strip，可能为空）并重置。"""
+        rest = "".join(self._pending).strip()
+        self._pending = []
+        self._pending_len = 0
+        self._last_clause = 0
+        self._emitted = False
+        return rest
+
+    def _append(self, text: str) -> None:
+        if text:
+            self._pending.append(text)
+            self._pending_len += len(text)
+
+    def _cut(self, pos: int, chunks: list[str]) -> None:
+        text = "".join(self._pending)
+        chunk, rest = text[:pos].strip(), text[pos:]
+        self._pending = [rest] if rest else []
+        self._pending_len = len(rest)
+        # 在停顿处或整句切分时 rest 中不含停顿；硬切时 pending 本就没有停顿
+        self._last_clause = 0
+        if chunk:
+            chunks.append(chunk)
+            self._emitted = True
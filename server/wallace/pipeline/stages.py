@@ -0,0 +1,229 @@
+"""声明式流水线阶段图 — 每个阶段声明执行器、并发上限与排队上限，统一计量。
+
+阶段按数据流顺序排列（见 STAGES）：
+    vad → asr → [filter] → [intent] → llm → segment → tts → encode → send
+filter / intent 为可选文本阶段，可在 asr 与 llm 之间增删、调换；其余阶段必选且顺序固定。
+
+执行器：
+- loop：在事件循环中直接执行（异步 I/O 或极轻的计算）
+- thread：阶段独占的线程池，worker 数 = concurrency
+- process：全局共享的进程池（spawn），要求函数及参数可 pickle
+
+每次执行记入 stage_seconds{stage}，并维护 stage_inflight / stage_waiting 仪表；
+排队已满时拒绝并计入 stage_rejected_total，抛出 StageBusy。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from wallace.metrics import metrics
+
+if TYPE_CHECKING:
+    from wallace.config import PipelineConfig, StageConfig
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 全部阶段按数据流顺序
+STAGES: tuple[str, ...] = (
+    "vad", "asr", "filter", "intent", "llm", "segment", "tts", "encode", "send",
+)
+# 可省略 / 在 asr 与 llm 之间调换顺序的文本阶段
+OPTIONAL_STAGES = frozenset({"filter", "intent"})
+# 各阶段可用的执行器：异步 I/O 与流式阶段只能在事件循环中执行，
+# ASR 模型不可 pickle 只能用线程，进程池仅适合参数可 pickle 的纯计算（encode）
+EXECUTORS: dict[str, frozenset[str]] = {
+    "vad": frozenset({"loop", "thread"}),
+    "asr": frozenset({"thread"}),
+    "filter": frozenset({"loop", "thread"}),
+    "intent": frozenset({"loop", "thread"}),
+    "llm": frozenset({"loop"}),
+    "segment": frozenset({"loop"}),
+    "tts": frozenset({"loop"}),
+    "encode": frozenset({"loop", "thread", "process"}),
+    "send": frozenset({"loop"}),
+}
+
+
+def validate_order(stages: list[str]) -> None:
+    """校验阶段列表：必选阶段齐全且顺序固定，可选阶段位于 asr 与 llm 之间。"""
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {unknown}")
+    if len(set(stages)) != len(stages):
+        raise ValueError(f"Duplicate pipeline stages: {stages}")
+    required = [s for s in STAGES if s not in OPTIONAL_STAGES]
+    if [s for s in stages if s not in OPTIONAL_STAGES] != required:
+        raise ValueError(f"Pipeline stages must include {required} in this order")
+    asr, llm = stages.index("asr"), stages.index("llm")
+    for name in OPTIONAL_STAGES & set(stages):
+        if not asr < stages.index(name) < llm:
+            raise ValueError(f"Stage {name} must sit between asr and llm")
+
+
+class StageBusy(Exception):
+    """阶段排队已满，本次执行被拒绝。"""
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(stage)
+        self.stage = stage
+
+
+class Stage:
+    """一个阶段：执行器 + 并发 / 排队上限 + 指标。"""
+
+    def __init__(
+        self, name: str, config: StageConfig, process_pool: Callable[[], Executor]
+    ) -> None:
+        self.name = name
+        self.config = config
+        self._process_pool = process_pool
+        self._slots = asyncio.Semaphore(config.concurrency) if config.concurrency > 0 else None
+        self._thread_pool: ThreadPoolExecutor | None = None
+        self.inflight = 0
+        self.waiting = 0
+
+    @property
+    def executor(self) -> Executor | None:
+        """同步工作的执行器，loop 执行器为 None。"""
+        kind = self.config.executor
+        if kind == "thread":
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.config.concurrency or None,
+                    thread_name_prefix=f"stage-{self.name}",
+                )
+            return self._thread_pool
+        if kind == "process":
+            return self._process_pool()
+        return None
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """占用一个并发名额（不限并发时仅计量）。"""
+        if self._slots is not None and self._slots.locked():
+            if self.config.queue is not None and self.waiting >= self.config.queue:
+                metrics.inc("stage_rejected_total", stage=self.name)
+                raise StageBusy(self.name)
+            self.waiting += 1
+            metrics.set_gauge("stage_waiting", self.waiting, stage=self.name)
+            try:
+                await self._slots.acquire()
+            finally:
+                self.waiting -= 1
+                metrics.set_gauge("stage_waiting", self.waiting, stage=self.name)
+        elif self._slots is not None:
+            await self._slots.acquire()
+
+        self.inflight += 1
+        metrics.set_gauge("stage_inflight", self.inflight, stage=self.name)
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            metrics.set_gauge("stage_inflight", self.inflight, stage=self.name)
+            if self._slots is not None:
+                self._slots.release()
+
+    async def call(self, fn: Callable[..., T], *args: Any) -> T:
+        """在阶段执行器中执行同步函数。"""
+        async with self.slot():
+            start = time.monotonic()
+            try:
+                executor = self.executor
+                if executor is None:
+                    return fn(*args)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(executor, functools.partial(fn, *args))
+            finally:
+                metrics.observe("stage_seconds", time.monotonic() - start, stage=self.name)
+
+    async def run(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """在阶段名额内执行异步函数（自身负责调度的阶段，如 asr）。"""
+        async with self.slot():
+            start = time.monotonic()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                metrics.observe("stage_seconds", time.monotonic() - start, stage=self.name)
+
+    async def stream(self, items: AsyncIterator[T]) -> AsyncIterator[T]:
+        """流式阶段（llm / tts）：整个流占用一个名额，记录首项时延与总时长。"""
+        async with self.slot():
+            start = time.monotonic()
+            first = True
+            try:
+                async for item in items:
+                    if first:
+                        metrics.observe(
+                            "stage_first_item_seconds", time.monotonic() - start, stage=self.name
+                        )
+                        first = False
+                    metrics.inc("stage_items_total", stage=self.name)
+                    yield item
+            finally:
+                metrics.observe("stage_seconds", time.monotonic() - start, stage=self.name)
+                # 提前结束时关闭上游（如取消 LLM 请求）
+                aclose = getattr(items, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+    def close(self) -> None:
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+
+class StageGraph:
+    """按配置构建的阶段图，所有会话共享。"""
+
+    def __init__(self, config: PipelineConfig | None = None) -> None:
+        from wallace.config import PipelineConfig
+
+        self.config = config or PipelineConfig()
+        self.order = list(self.config.stages)
+        validate_order(self.order)
+        for name in STAGES:
+            executor = self.config.stage_config(name).executor
+            if executor not in EXECUTORS[name]:
+                raise ValueError(f"Stage {name} cannot run on executor {executor!r}")
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._stages = {
+            name: Stage(name, self.config.stage_config(name), self._get_process_pool)
+            for name in STAGES
+        }
+
+    def __getitem__(self, name: str) -> Stage:
+        return self._stages[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.order
+
+    def text_stages(self) -> list[str]:
+        """asr 与 llm 之间按配置顺序执行的文本阶段。"""
+        return self.order[self.order.index("asr") + 1 : self.order.index("llm")]
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.config.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._process_pool
+
+    def close(self) -> None:
+        for stage in self._stages.values():
+            stage.close()
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
@@ -0,0 +1,53 @@
+"""ASR 文本后处理 — 过滤幻听文本、识别无需 LLM 的指令。
+
+两者都是阶段图中 asr 与 llm 之间的可选文本阶段（filter / intent）。
+"""
+
+from __future__ import annotations
+
+import re
+from enum import Enum
+
+# Whisper 在静音 / 噪声上常见的幻听（多来自视频字幕训练数据）
+_HALLUCINATIONS = (
+    "谢谢观看",
+    "谢谢大家观看",
+    "感谢观看",
+    "请不吝点赞",
+    "订阅转发",
+    "字幕由",
+    "Amara.org",
+    "YoYo Television Series",
+    "明镜与点点栏目",
+)
+
+_PUNCT = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    return _PUNCT.sub("", text)
+
+
+def clean_transcript(text: str) -> str:
+    """过滤幻听与纯标点文本，返回空串表示本轮视为无语音。"""
+    text = text.strip()
+    if not _normalize(text):
+        return ""
+    if any(marker in text for marker in _HALLUCINATIONS):
+        return ""
+    return text
+
+
+class Intent(str, Enum):
+    CHAT = "chat"  # 正常对话，交给 LLM
+    STOP = "stop"  # 叫停：不回复
+
+
+_STOP_WORDS = frozenset({"停", "停下", "停停", "别说了", "不要说了", "闭嘴", "安静", "好了好了"})
+
+
+def detect_intent(text: str) -> Intent:
+    """整句仅为叫停词时不再调用 LLM。"""
+    if _normalize(text) in _STOP_WORDS:
+        return Intent.STOP
+    return Intent.CHAT
@@ -1,11 +1,16 @@
-"""语音合成 — 双 TTS 后端 (Edge-TTS + CosyVoice)。"""
+"""语音合成 — TTS 后端 (Edge-TTS + CosyVoice + 本地 Piper)。"""
 
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import logging
+import multiprocessing
 from abc import ABC, abstractmethod
-from collections.abc import AsyncIterator
-from typing import TYPE_CHECKING
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import edge_tts
 import httpx
@@ -18,13 +23,29 @@ logger = logging.getLogger(__name__)
 
 # PCM 帧大小：512 samples × 2 bytes = 1024 bytes
 FRAME_SIZE = 1024
+SAMPLE_RATE = 16000
+
+# PCM 帧：整帧为底层缓冲的 memoryview 切片（零拷贝），mock / 补零帧可为 bytes
+PCMFrame = bytes | memoryview
+
+
+def iter_frames(pcm: bytes) -> Iterator[memoryview]:
+    """按 FRAME_SIZE 零拷贝切帧，仅末尾不足一帧时复制补零。"""
+    view = memoryview(pcm)
+    full = len(view) - len(view) % FRAME_SIZE
+    for i in range(0, full, FRAME_SIZE):
+        yield view[i : i + FRAME_SIZE]
+    if full < len(view):
+        tail = bytearray(FRAME_SIZE)
+        tail[: len(view) - full] = view[full:]
+        yield memoryview(tail)
 
 
 class TTSBackend(ABC):
     """TTS 后端协议。"""
 
     @abstractmethod
-    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[bytes]:
+    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[PCMFrame]:
         """合成文本为 PCM 16kHz 16bit mono 帧。"""
         ...  # pragma: no cover
 
@@ -35,7 +56,7 @@ class EdgeTTSBackend(TTSBackend):
     def __init__(self, voice: str = "zh-CN-XiaoxiaoNeural") -> None:
         self.default_voice = voice
 
-    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[bytes]:
+    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[PCMFrame]:
         if not text.strip():
             return
 
@@ -55,11 +76,7 @@ class EdgeTTSBackend(TTSBackend):
         decoded = miniaudio.decode(mp3_data, sample_rate=16000, nchannels=1)
         pcm_bytes = decoded.samples.tobytes()
 
-        # 按 FRAME_SIZE 切割
-        for i in range(0, len(pcm_bytes), FRAME_SIZE):
-            frame = pcm_bytes[i : i + FRAME_SIZE]
-            if len(frame) < FRAME_SIZE:
-                frame = frame + b"\x00" * (FRAME_SIZE - len(frame))
+        for frame in iter_frames(pcm_bytes):
             yield frame
 
 
@@ -70,7 +87,7 @@ class CosyVoiceBackend(TTSBackend):
         self.url = url
         self.default_voice = voice
 
-    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[bytes]:
+    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[PCMFrame]:
         if not text.strip():
             return
 
@@ -83,20 +100,101 @@ class CosyVoiceBackend(TTSBackend):
             resp.raise_for_status()
             pcm_bytes = resp.content
 
-        for i in range(0, len(pcm_bytes), FRAME_SIZE):
-            frame = pcm_bytes[i : i + FRAME_SIZE]
-            if len(frame) < FRAME_SIZE:
-                frame = frame + b"\x00" * (FRAME_SIZE - len(frame))
+        for frame in iter_frames(pcm_bytes):
             yield frame
 
 
+# ────────────────────── Piper (本地 CPU) ──────────────────────
+
+# 工作进程内的模型缓存：model_path → PiperVoice
+_piper_voices: dict[str, Any] = {}
+
+
+def _piper_synthesize(model_path: str, text: str) -> bytes:
+    """在工作进程中合成整句，返回 16kHz int16 PCM。首次调用加载模型。"""
+    voice = _piper_voices.get(model_path)
+    if voice is None:
+        from piper import PiperVoice
+
+        voice = _piper_voices[model_path] = PiperVoice.load(model_path)
+
+    chunks = [
+        _resample(chunk.audio_int16_bytes, chunk.sample_rate)
+        for chunk in voice.synthesize(text)
+    ]
+    return b"".join(chunks)
+
+
+def _resample(pcm: bytes, sample_rate: int) -> bytes:
+    """int16 mono 重采样到 16kHz（Piper 模型多为 22050Hz）。"""
+    if sample_rate == SAMPLE_RATE:
+        return pcm
+    return bytes(
+        miniaudio.convert_frames(
+            miniaudio.SampleFormat.SIGNED16, 1, sample_rate, pcm,
+            miniaudio.SampleFormat.SIGNED16, 1, SAMPLE_RATE,
+        )
+    )
+
+
+class PiperBackend(TTSBackend):
+    """Piper 后端 — 本地 ONNX 模型 CPU 合成，断网且 GPU 不可用时兜底。
+
+    推理是 CPU 密集的同步调用，放在独立进程池中执行，不阻塞事件循环；
+    每个工作进程各自加载一份模型。
+    """
+
+    def __init__(self, model_path: str, workers: int = 2) -> None:
+        self.model_path = model_path
+        self.workers = workers
+        self._pool: Executor | None = None
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("piper") is not None
+
+    def _ensure_pool(self) -> Executor:
+        if self._pool is None:
+            if not Path(self.model_path).is_file():
+                raise RuntimeError(f"Piper model not found: {self.model_path}")
+            # spawn：不继承事件循环线程与已打开的连接
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def synthesize(self, text: str, voice: str = "") -> AsyncIterator[PCMFrame]:
+        if not text.strip():
+            return
+
+        loop = asyncio.get_running_loop()
+        pcm_bytes = await loop.run_in_executor(
+            self._ensure_pool(), _piper_synthesize, self.model_path, text
+        )
+
+        for frame in iter_frames(pcm_bytes):
+            yield frame
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
 class TTSManager:
-    """管理双 TTS 后端 + 降级逻辑。"""
+    """管理 TTS 后端 + 对冲请求 + 降级逻辑。"""
 
     def __init__(self, config: TTSConfig) -> None:
         self.config = config
         self._edge = EdgeTTSBackend(config.edge_voice)
         self._cosyvoice = CosyVoiceBackend(config.cosyvoice_url, config.cosyvoice_voice)
+        self._piper: PiperBackend | None = None
+        if config.piper_model:
+            if PiperBackend.available():
+                self._piper = PiperBackend(config.piper_model, config.piper_workers)
+            else:
+                logger.warning("piper-tts not installed, local TTS disabled")
         self._current: str = config.default_backend
 
     @property
@@ -104,25 +202,105 @@ class TTSManager:
         return self._current
 
     def switch_backend(self, backend: str) -> None:
-        if backend not in ("edge", "cosyvoice"):
+        if backend not in dict(self._backends()):
             raise ValueError(f"Unknown TTS backend: {backend}")
         self._current = backend
 
-    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
-        """合成文本，自动降级。"""
-        primary = self._edge if self._current == "edge" else self._cosyvoice
-        fallback = self._cosyvoice if self._current == "edge" else self._edge
+    def _backends(self) -> list[tuple[str, TTSBackend]]:
+        backends: list[tuple[str, TTSBackend]] = [
+            ("edge", self._edge),
+            ("cosyvoice", self._cosyvoice),
+        ]
+        if self._piper is not None:
+            backends.append(("piper", self._piper))
+        return backends
+
+    def _chain(self) -> list[tuple[str, TTSBackend]]:
+        """按优先级排列的后端链：当前后端在前，其余按 edge → cosyvoice → piper 降级。"""
+        backends = self._backends()
+        return sorted(backends, key=lambda b: b[0] != self._current)
+
+    def close(self) -> None:
+        if self._piper is not None:
+            self._piper.close()
+
+    async def synthesize(self, text: str) -> AsyncIterator[PCMFrame]:
+        """合成文本，对冲请求 + 自动降级。
+
+        主后端在 hedge_delay 秒内未产出首帧时并行启动下一个后端，
+        先产出首帧者胜出，其余取消。一旦有帧发出就不再切换后端，
+        中途失败只截断本句，避免重复播放。
+        """
+        won = await self._race_first_frame(text)
+        if won is None:
+            return
+        name, stream, first = won
 
         try:
-            async for frame in primary.synthesize(text):
+            yield first
+            async for frame in stream:
                 yield frame
-            return
         except Exception as e:
-            logger.warning("Primary TTS (%s) failed: %s, falling back", self._current, e)
+            # 已有音频发出，不能再从头降级重放
+            logger.warning("TTS (%s) failed mid-sentence: %s, truncating", name, e)
+        finally:
+            await stream.aclose()
+
+    async def _race_first_frame(
+        self, text: str
+    ) -> tuple[str, AsyncIterator[PCMFrame], PCMFrame] | None:
+        """按后端链竞速首帧，返回 (后端名, 剩余帧流, 首帧)；全部失败或无音频返回 None。"""
+        chain = self._chain()
+        hedge_delay = self.config.hedge_delay
+        pending: dict[asyncio.Task, tuple[str, AsyncIterator[PCMFrame]]] = {}
+        next_idx = 0
+
+        def launch() -> None:
+            nonlocal next_idx
+            name, backend = chain[next_idx]
+            next_idx += 1
+            stream = backend.synthesize(text)
+            pending[asyncio.ensure_future(anext(stream))] = (name, stream)
 
         try:
-            async for frame in fallback.synthesize(text):
-                yield frame
-        except Exception as e2:
-            logger.error("Both TTS backends failed: %s", e2)
-            # 不产出音频，调用方应处理空结果
+            launch()
+            while pending:
+                can_hedge = next_idx < len(chain) and hedge_delay > 0
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    logger.info(
+                        "TTS (%s) no first frame in %.2fs, hedging with %s",
+                        ", ".join(name for name, _ in pending.values()),
+                        hedge_delay,
+                        chain[next_idx][0],
+                    )
+                    launch()
+                    continue
+
+                for task in done:
+                    name, stream = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        return name, stream, task.result()
+                    if isinstance(exc, StopAsyncIteration):
+                        # 后端正常结束但无音频（如空文本），视为完成
+                        return None
+                    logger.warning("TTS (%s) failed: %s, falling back", name, exc)
+                    await stream.aclose()
+
+                if not pending and next_idx < len(chain):
+                    launch()
+
+            logger.error("All TTS backends failed")
+            return None
+        finally:
+            # 取消落败者
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for _, stream in pending.values():
+                await stream.aclose()
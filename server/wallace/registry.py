@@ -0,0 +1,348 @@
+"""会话注册表 — 多 worker 部署时共享会话归属、重连状态与单例任务的领导者。
+
+每个 uvicorn worker 各自持有本进程内的 WebSocket 连接（`sessions` 字典），注册表负责跨进程的部分：
+- 归属：用户连接到哪个 worker（`claim` / `release`），重连落到其他 worker 时可取回上次的会话状态
+- 领导者：全局只需执行一次的任务（关怀定时推送）只在持有租约的 worker 上运行，租约定期续期，
+  领导者退出后由其他 worker 在租约过期后接替
+- 投递：领导者 `broadcast` 的消息按用户当前归属投递，由持有该连接的 worker 处理，不重复推送
+
+两种实现：
+- LocalRegistry：进程内字典，单 worker（默认，行为与原先一致）
+- SQLiteRegistry：同一主机上的多个 worker 共享一个 SQLite 文件（WAL），投递经邮箱表轮询
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from wallace.config import RegistryConfig
+from wallace.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 投递处理器：(user_id, payload)
+Subscriber = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+LEADER_LEASE = "leader"
+
+
+class SessionRegistry(ABC):
+    """注册表接口。所有方法在事件循环中调用。"""
+
+    def __init__(self, worker_id: str | None = None) -> None:
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._subscribers: dict[str, Subscriber] = {}
+
+    @property
+    @abstractmethod
+    def is_leader(self) -> bool:
+        """本 worker 当前是否持有领导者租约。"""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def subscribe(self, kind: str, handler: Subscriber) -> None:
+        """登记本 worker 对某类投递的处理器。"""
+        self._subscribers[kind] = handler
+
+    @abstractmethod
+    async def claim(self, user_id: str) -> dict[str, Any] | None:
+        """用户连接到本 worker：登记归属，返回上次保存的会话状态（没有则 None）。"""
+
+    @abstractmethod
+    async def save(self, user_id: str, state: dict[str, Any]) -> None:
+        """保存会话状态（人格、树洞模式、TTS 后端等），供重连时恢复。"""
+
+    @abstractmethod
+    async def release(self, user_id: str) -> None:
+        """连接结束：归属仍为本 worker 时标记离线。"""
+
+    @abstractmethod
+    async def owner(self, user_id: str) -> str | None:
+        """在线用户所属的 worker，离线为 None。"""
+
+    @abstractmethod
+    async def broadcast(self, kind: str, payload: dict[str, Any]) -> int:
+        """投递给所有在线用户（由各自所属 worker 处理），返回投递数。"""
+
+    async def _dispatch(self, user_id: str, kind: str, payload: dict[str, Any]) -> None:
+        handler = self._subscribers.get(kind)
+        if handler is None:
+            return
+        try:
+            await handler(user_id, payload)
+        except Exception:
+            logger.exception("Registry delivery %s failed for %s", kind, user_id)
+
+
+class LocalRegistry(SessionRegistry):
+    """单进程注册表：本 worker 即领导者，投递直接调用处理器。"""
+
+    def __init__(self, worker_id: str | None = None) -> None:
+        super().__init__(worker_id)
+        self._states: dict[str, dict[str, Any]] = {}
+        self._online: set[str] = set()
+
+    @property
+    def is_leader(self) -> bool:
+        return True
+
+    async def claim(self, user_id: str) -> dict[str, Any] | None:
+        self._online.add(user_id)
+        return self._states.get(user_id)
+
+    async def save(self, user_id: str, state: dict[str, Any]) -> None:
+        self._states[user_id] = dict(state)
+
+    async def release(self, user_id: str) -> None:
+        self._online.discard(user_id)
+
+    async def owner(self, user_id: str) -> str | None:
+        return self.worker_id if user_id in self._online else None
+
+    async def broadcast(self, kind: str, payload: dict[str, Any]) -> int:
+        users = list(self._online)
+        for user_id in users:
+            await self._dispatch(user_id, kind, payload)
+        return len(users)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    online INTEGER NOT NULL,
+    state TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mailbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    worker TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mailbox_worker ON mailbox (worker);
+"""
+
+
+class SQLiteRegistry(SessionRegistry):
+    """同主机多 worker 共享的 SQLite 注册表。
+
+    每个 worker 续期两份租约：`worker:<id>`（存活，投递只发给存活 worker 上的用户）
+    与 `leader`（抢占式，过期前由持有者续期）。SQLite 调用在线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, config: RegistryConfig, worker_id: str | None = None) -> None:
+        super().__init__(worker_id)
+        self.config = config
+        self._path = Path(config.path)
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._leader = False
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._open)
+        await self._renew()
+        self._tasks = [
+            asyncio.create_task(self._renew_loop()),
+            asyncio.create_task(self._poll_loop()),
+        ]
+        logger.info(
+            "Session registry %s as worker %s (leader=%s)", self._path, self.worker_id, self._leader
+        )
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            # 主动交出租约，其他 worker 无需等待过期
+            await asyncio.to_thread(
+                self._execute,
+                "DELETE FROM leases WHERE holder = ?",
+                (self.worker_id,),
+            )
+            self._db.close()
+            self._db = None
+        self._leader = False
+
+    async def claim(self, user_id: str) -> dict[str, Any] | None:
+        row = await asyncio.to_thread(self._claim, user_id)
+        return json.loads(row) if row else None
+
+    async def save(self, user_id: str, state: dict[str, Any]) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE sessions SET state = ?, updated_at = ? WHERE user_id = ?",
+            (json.dumps(state, ensure_ascii=False), time.time(), user_id),
+        )
+
+    async def release(self, user_id: str) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE sessions SET online = 0, updated_at = ? WHERE user_id = ? AND worker = ?",
+            (time.time(), user_id, self.worker_id),
+        )
+
+    async def owner(self, user_id: str) -> str | None:
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT worker FROM sessions WHERE user_id = ? AND online = 1",
+            (user_id,),
+        )
+        return rows[0][0] if rows else None
+
+    async def broadcast(self, kind: str, payload: dict[str, Any]) -> int:
+        now = time.time()
+        return await asyncio.to_thread(
+            self._execute,
+            """
+            INSERT INTO mailbox (worker, user_id, kind, payload, created_at)
+            SELECT s.worker, s.user_id, ?, ?, ? FROM sessions s
+            JOIN leases l ON l.name = 'worker:' || s.worker
+            WHERE s.online = 1 AND l.expires_at > ?
+            """,
+            (kind, json.dumps(payload, ensure_ascii=False), now, now),
+        )
+
+    # ── 线程中执行的同步部分 ──
+
+    def _open(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(f"PRAGMA busy_timeout={int(self.config.busy_timeout * 1000)}")
+        db.executescript(_SCHEMA)
+        self._db = db
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _claim(self, user_id: str) -> str | None:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT state FROM sessions WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                self._db.execute(
+                    """
+                    INSERT INTO sessions (user_id, worker, online, updated_at) VALUES (?, ?, 1, ?)
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET worker = excluded.worker, online = 1, updated_at = excluded.updated_at
+                    """,
+                    (user_id, self.worker_id, time.time()),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return row[0] if row else None
+
+    def _acquire(self, name: str, now: float) -> bool:
+        """续期或抢占租约（仅当无人持有、已过期或本 worker 持有时成功）。"""
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE
+                SET holder = excluded.holder, expires_at = excluded.expires_at
+                WHERE leases.holder = excluded.holder OR leases.expires_at <= ?
+                """,
+                (name, self.worker_id, now + self.config.lease_seconds, now),
+            )
+            row = self._db.execute("SELECT holder FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == self.worker_id
+
+    def _renew_sync(self) -> bool:
+        now = time.time()
+        self._acquire(f"worker:{self.worker_id}", now)
+        leader = self._acquire(LEADER_LEASE, now)
+        if leader:
+            # 清理已退出 worker 的过期数据
+            with self._lock:
+                self._db.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM mailbox WHERE created_at <= ?",
+                    (now - self.config.lease_seconds,),
+                )
+        return leader
+
+    def _take_mail(self) -> list[tuple[str, str, str]]:
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM mailbox WHERE worker = ? RETURNING user_id, kind, payload",
+                (self.worker_id,),
+            ).fetchall()
+
+    # ── 后台任务 ──
+
+    async def _renew(self) -> None:
+        leader = await asyncio.to_thread(self._renew_sync)
+        if leader != self._leader:
+            logger.info("Worker %s %s leadership", self.worker_id, "took" if leader else "lost")
+        self._leader = leader
+        metrics.set_gauge("registry_leader", int(leader))
+
+    async def _renew_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.lease_seconds / 3)
+            try:
+                await self._renew()
+            except sqlite3.Error as e:
+                # 无法续期时不再自认领导者，避免与接替者重复执行
+                logger.warning("Registry lease renewal failed: %s", e)
+                self._leader = False
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.poll_interval)
+            try:
+                mail = await asyncio.to_thread(self._take_mail)
+            except sqlite3.Error as e:
+                logger.warning("Registry mailbox poll failed: %s", e)
+                continue
+            for user_id, kind, payload in mail:
+                metrics.inc("registry_delivered_total", kind=kind)
+                await self._dispatch(user_id, kind, json.loads(payload))
+
+
+def create_registry(config: RegistryConfig | None = None) -> SessionRegistry:
+    """按配置创建注册表。"""
+    config = config or RegistryConfig()
+    if config.backend == "sqlite":
+        return SQLiteRegistry(config)
+    return LocalRegistry()
@@ -0,0 +1,104 @@
+"""单轮时延追踪 — 记录一轮应答各阶段时间点，导出直方图并推送给调试订阅者。"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any
+
+from wallace.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 阶段按流水线顺序排列；时间点均为相对本轮起点（对话为 audio_end）的偏移
+STAGES: tuple[str, ...] = (
+    "audio_end",
+    "vad",
+    "admitted",
+    "asr",
+    "prompt",
+    "llm_first_token",
+    "first_sentence",
+    "tts_first_frame",
+    "first_frame_sent",
+    "last_frame_sent",
+)
+
+# 调试订阅者队列长度，消费过慢时丢弃新 trace
+_SUBSCRIBER_QUEUE = 64
+
+
+class TurnTrace:
+    """一轮应答的阶段时间点。"""
+
+    def __init__(self, turn: int, kind: str = "conversation") -> None:
+        self.turn = turn
+        self.kind = kind
+        self.start = time.monotonic()
+        self.marks: dict[str, float] = {}
+        self.outcome = "ok"
+
+    def mark(self, stage: str) -> None:
+        """记录阶段首次到达的时间点，重复调用保留第一次。"""
+        if stage not in self.marks:
+            self.marks[stage] = time.monotonic()
+
+    def mark_last(self, stage: str) -> None:
+        """记录阶段最近一次到达的时间点（如最后一帧发送）。"""
+        self.marks[stage] = time.monotonic()
+
+    def elapsed_ms(self) -> dict[str, int]:
+        """各阶段相对起点的毫秒偏移，按 STAGES 顺序。"""
+        return {
+            stage: round((self.marks[stage] - self.start) * 1000)
+            for stage in STAGES
+            if stage in self.marks
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "turn": self.turn,
+            "kind": self.kind,
+            "outcome": self.outcome,
+            "stages": self.elapsed_ms(),
+        }
+
+
+class TraceHub:
+    """汇总已结束的 trace：写入直方图、保留最近记录、分发给调试订阅者。"""
+
+    def __init__(self, keep: int = 64) -> None:
+        self.recent: deque[dict[str, Any]] = deque(maxlen=keep)
+        self._subscribers: set[asyncio.Queue[str]] = set()
+
+    def publish(self, user_id: str, trace: TurnTrace) -> None:
+        if trace.outcome == "ok":
+            for stage, at in trace.marks.items():
+                metrics.observe(
+                    "turn_stage_seconds", at - trace.start, kind=trace.kind, stage=stage
+                )
+        metrics.inc("turns_total", kind=trace.kind, outcome=trace.outcome)
+
+        record = {"user_id": user_id, **trace.to_dict()}
+        self.recent.append(record)
+        if self._subscribers:
+            line = json.dumps(record, ensure_ascii=False)
+            for queue in self._subscribers:
+                if queue.full():
+                    continue
+                queue.put_nowait(line)
+
+    def subscribe(self) -> asyncio.Queue[str]:
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=_SUBSCRIBER_QUEUE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[str]) -> None:
+        self._subscribers.discard(queue)
+
+
+# 全局 trace 汇总
+trace_hub = TraceHub()
@@ -0,0 +1,103 @@
+"""二进制协议 v2 — 按通道复用二进制帧，高频遥测不再走 JSON。
+
+连接建立时通过 WebSocket 子协议 `wallace.v2` 协商；未协商的连接保持 v1
+（二进制帧只承载上行音频）。v2 下每个二进制帧首字节为通道号，其后为负载：
+
+    通道            方向      负载（小端）
+    0x01 audio-in   上行      PCM 16kHz 16bit mono
+    0x02 audio-out  下行      协商的编码（pcm / adpcm），可多帧拼接
+    0x10 sensor     上行      <ffff  temp, humidity, light, air_quality
+    0x11 proximity  上行      <f?    distance, user_present
+    0x12 imu        上行      <6f    ax, ay, az (g), gx, gy, gz (°/s)
+
+遥测负载为定长结构体，长度即校验；解出的字段与 JSON 消息的字段相同，
+由同一套处理逻辑消费。低频控制消息仍为 JSON 文本帧。
+"""
+
+from __future__ import annotations
+
+import struct
+from enum import IntEnum
+from typing import Any, NamedTuple
+
+from wallace.ws.protocol import BaseMessage, ImuMessage, ProximityMessage, SensorMessage
+
+SUBPROTOCOL = "wallace.v2"
+
+
+class Channel(IntEnum):
+    AUDIO_IN = 0x01
+    AUDIO_OUT = 0x02
+    SENSOR = 0x10
+    PROXIMITY = 0x11
+    IMU = 0x12
+
+
+class FrameError(ValueError):
+    """二进制帧无法解析：空帧、未知通道或负载长度不符。"""
+
+
+# 下行音频帧头，拼接时直接前置
+AUDIO_OUT_HEADER = bytes([Channel.AUDIO_OUT])
+
+
+class _Layout(NamedTuple):
+    channel: Channel
+    struct: struct.Struct
+    model: type[BaseMessage]  # 同内容的 JSON 消息
+    fields: tuple[str, ...]
+
+
+def _layout(channel: Channel, fmt: str, model: type[BaseMessage], *fields: str) -> _Layout:
+    return _Layout(channel, struct.Struct(fmt), model, fields)
+
+
+# 遥测通道号 → 负载布局
+_TELEMETRY: dict[int, _Layout] = {
+    layout.channel: layout
+    for layout in (
+        _layout(Channel.SENSOR, "<ffff", SensorMessage, "temp", "humidity", "light", "air_quality"),
+        _layout(Channel.PROXIMITY, "<f?", ProximityMessage, "distance", "user_present"),
+        _layout(Channel.IMU, "<6f", ImuMessage, "ax", "ay", "az", "gx", "gy", "gz"),
+    )
+}
+
+_LAYOUT_OF: dict[type[BaseMessage], _Layout] = {
+    layout.model: layout for layout in _TELEMETRY.values()
+}
+
+_AUDIO_IN = int(Channel.AUDIO_IN)
+
+
+def decode_frame(data: bytes) -> tuple[Channel, bytes | dict[str, Any]]:
+    """解析 v2 上行二进制帧，返回 (通道, 音频字节或遥测字段)。
+
+    遥测字段类型由结构体保证，直接返回字段字典（与 JSON 消息 model_dump() 去掉 type 相同），
+    不再构造 pydantic 模型。非法帧抛出 FrameError。
+    """
+    if not data:
+        raise FrameError("empty frame")
+    channel = data[0]
+    if channel == _AUDIO_IN:
+        return Channel.AUDIO_IN, data[1:]
+    layout = _TELEMETRY.get(channel)
+    if layout is None:
+        raise FrameError(f"unknown channel 0x{channel:02x}")
+    if len(data) != 1 + layout.struct.size:
+        raise FrameError(
+            f"channel 0x{channel:02x} expects {layout.struct.size} bytes, got {len(data) - 1}"
+        )
+    return layout.channel, dict(zip(layout.fields, layout.struct.unpack_from(data, 1)))
+
+
+def encode_audio_in(pcm: bytes) -> bytes:
+    """上行音频帧（设备端 / 测试客户端使用）。"""
+    return bytes([Channel.AUDIO_IN]) + pcm
+
+
+def encode_telemetry(msg: BaseMessage) -> bytes:
+    """遥测消息 → v2 二进制帧（设备端 / 测试客户端使用）。"""
+    layout = _LAYOUT_OF.get(type(msg))
+    if layout is None:
+        raise FrameError(f"{msg.type} has no binary channel")
+    return bytes([layout.channel]) + layout.struct.pack(*(getattr(msg, f) for f in layout.fields))
@@ -3,17 +3,47 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import contextlib
 import logging
-import time
-from typing import TYPE_CHECKING
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
 
 from fastapi import WebSocket, WebSocketDisconnect
-
-from wallace.ws.protocol import PongMessage, SessionRestoreMessage, parse_esp32_message
-from wallace.ws.session import Session
+from pydantic import ValidationError
+
+from wallace.config import DuplexConfig, OutboxConfig, TTSConfig
+from wallace.metrics import metrics
+from wallace.pipeline.bargein import BargeInDetector
+from wallace.pipeline.codec import negotiate_codec
+from wallace.registry import LocalRegistry, SessionRegistry
+from wallace.ws.binary import SUBPROTOCOL, Channel, FrameError, decode_frame
+from wallace.ws.heartbeat import HeartbeatSupervisor
+from wallace.ws.protocol import (
+    PONG,
+    AudioConfigMessage,
+    AudioCreditMessage,
+    AudioEndMessage,
+    AudioStartMessage,
+    CommandResultMessage,
+    ConfigMessage,
+    DeviceStateMessage,
+    EventMessage,
+    LocalCmdMessage,
+    PingMessage,
+    ProximityMessage,
+    ResumeTokenMessage,
+    SensorAlertMessage,
+    SensorMessage,
+    SessionRestoreMessage,
+    WakewordResultMessage,
+    WakewordVerifyMessage,
+    decode_esp32_message,
+)
+from wallace.ws.resume import ResumeManager
+from wallace.ws.session import Session, UserMemory
 
 if TYPE_CHECKING:
+    from wallace.memory.persister import MemoryPersister
     from wallace.pipeline.orchestrator import Orchestrator
     from wallace.sensor import SensorProcessor
     from wallace.smarthome.mqtt import MQTTManager
@@ -35,19 +65,117 @@ class WebSocketHandler:
         sensor: SensorProcessor,
         wakeword: WakewordVerifier,
         mqtt: MQTTManager,
+        tts_config: TTSConfig | None = None,
+        duplex_config: DuplexConfig | None = None,
+        outbox_config: OutboxConfig | None = None,
+        heartbeat: HeartbeatSupervisor | None = None,
+        protocol_v2: bool = True,
+        resume: ResumeManager | None = None,
+        registry: SessionRegistry | None = None,
+        memory: MemoryPersister | None = None,
     ) -> None:
         self._sessions = sessions
         self._orchestrator = orchestrator
         self._sensor = sensor
         self._wakeword = wakeword
         self._mqtt = mqtt
+        self._tts_config = tts_config or TTSConfig()
+        self._duplex_config = duplex_config or DuplexConfig()
+        self._outbox_config = outbox_config or OutboxConfig()
+        # 所有连接共享的心跳超时监控
+        self._heartbeat = heartbeat or HeartbeatSupervisor(HEARTBEAT_TIMEOUT)
+        self._protocol_v2 = protocol_v2
+        # 会话续连，None = 断开即取消流水线
+        self._resume = resume
+        # 会话归属与重连状态（多 worker 时跨进程共享）
+        self._registry = registry or LocalRegistry()
+        # 用户记忆加载与写回，None = 不持久化
+        self._memory = memory
+        # 消息 type → 处理器（image 等未登记的类型校验后忽略）
+        self._routes: dict[str, Callable[[Session, Any], Awaitable[None]]] = {
+            "ping": self._on_ping,
+            "audio_start": self._on_audio_start,
+            "audio_end": self._on_audio_end,
+            "wakeword_verify": self._on_wakeword_verify,
+            "sensor": self._on_sensor,
+            "proximity": self._on_proximity,
+            "device_state": self._on_device_state,
+            "event": self._on_event,
+            "local_cmd": self._on_local_cmd,
+            "config": self._on_config,
+            "audio_credit": self._on_audio_credit,
+        }
+        # v2 遥测通道 → 处理器，入参为字段字典（imu 暂无消费方，解析后忽略）
+        self._channel_routes: dict[Channel, Callable[[Session, dict], Awaitable[None]]] = {
+            Channel.SENSOR: self._apply_sensor,
+            Channel.PROXIMITY: self._apply_proximity,
+        }
+
+    async def handle_connection(
+        self, ws: WebSocket, user_id: str, resume_token: str | None = None, ack: int = 0
+    ) -> None:
+        """处理完整的 WebSocket 连接生命周期。
+
+        resume_token / ack 来自重连 URL 的查询参数，见 ws/resume.py。
+        """
+        # 设备请求子协议 wallace.v2 时启用二进制通道，否则保持 v1
+        v2 = self._protocol_v2 and SUBPROTOCOL in ws.scope.get("subprotocols", ())
+        # 握手前读取用户记忆（在写回线程中读盘），会话登记时状态即完整
+        memory = await self._memory.load(user_id) if self._memory is not None else None
+        if v2:
+            await ws.accept(subprotocol=SUBPROTOCOL)
+        else:
+            await ws.accept()
+
+        session = None
+        if resume_token and self._resume is not None:
+            session = await self._resume_session(ws, user_id, resume_token, ack)
+        if session is None:
+            # 带 token 重连说明设备支持续连，续不上时直接签发新 token
+            session = await self._new_session(
+                ws, user_id, resumable=bool(resume_token), memory=memory
+            )
+        session.protocol = 2 if v2 else 1
 
-    async def handle_connection(self, ws: WebSocket, user_id: str) -> None:
-        """处理完整的 WebSocket 连接生命周期。"""
-        await ws.accept()
+        # 登记心跳监控
+        self._heartbeat.register(session)
+
+        try:
+            await self._message_loop(session, ws)
+        except WebSocketDisconnect:
+            logger.info("WebSocket disconnected: %s", user_id)
+        except Exception:
+            logger.exception("WebSocket error: %s", user_id)
+        finally:
+            # 会话已被带 token 的新连接接管时由新连接负责
+            if session.ws is ws:
+                self._heartbeat.unregister(session)
+                task = session.pipeline_task
+                if (
+                    self._resume is not None
+                    and session.resume_token is not None
+                    and task is not None
+                    and not task.done()
+                ):
+                    # 进行中的一轮在后台继续，输出进入重放缓冲，等待设备续连
+                    session.outbox.detach()
+                    self._resume.detach(session, self._drop_session)
+                else:
+                    await self._drop_session(session)
+
+    async def _new_session(
+        self,
+        ws: WebSocket,
+        user_id: str,
+        resumable: bool = False,
+        memory: UserMemory | None = None,
+    ) -> Session:
         session = Session(user_id, ws)
+        session.audio_pacer.jitter_buffer = self._tts_config.jitter_buffer_ms / 1000
+        session.outbox.max_telemetry = self._outbox_config.telemetry_queue
 
-        # 重连检查：是否已有同 user_id 的 session
+        # 重连检查：本 worker 是否已有同 user_id 的 session，否则取注册表中上次保存的状态
+        state = await self._registry.claim(user_id)
         old = self._sessions.get(user_id)
         if old is not None:
             # 恢复状态
@@ -55,133 +183,259 @@ class WebSocketHandler:
             session.treehouse_mode = old.treehouse_mode
             session.tts_backend = old.tts_backend
             session.memory = old.memory
-            # 清理旧 session
+            # 清理旧 session（脱离中的会话已无连接负责关闭其发送队列）
+            detached = self._resume is not None and self._resume.discard(old)
             await self._orchestrator.cancel_pipeline(old)
+            if detached:
+                old.outbox.close()
+        elif state is not None:
+            # 上次连接在本 worker 已结束，或落在其他 worker
+            session.personality = state.get("personality", session.personality)
+            session.treehouse_mode = state.get("treehouse_mode", session.treehouse_mode)
+            session.tts_backend = state.get("tts_backend", session.tts_backend)
+        if old is None and memory is not None:
+            session.memory = memory
 
         self._sessions[user_id] = session
 
+        if resumable and self._resume is not None:
+            await self._send_resume_token(session, resumed=False)
+
         # 重连时发送 session_restore
-        if old is not None:
-            await ws.send_text(
+        if old is not None or state is not None:
+            await session.outbox.send_text(
                 SessionRestoreMessage(
                     personality=session.personality,
                     treehouse=session.treehouse_mode,
                     tts_backend=session.tts_backend,
                 ).model_dump_json()
             )
-
-        # 启动心跳监控
-        heartbeat_task = asyncio.create_task(self._heartbeat_monitor(session))
-
-        try:
-            await self._message_loop(session)
-        except WebSocketDisconnect:
-            logger.info("WebSocket disconnected: %s", user_id)
-        except Exception:
-            logger.exception("WebSocket error: %s", user_id)
-        finally:
-            heartbeat_task.cancel()
-            await self._orchestrator.cancel_pipeline(session)
-            # TODO: flush memory
-            self._sessions.pop(user_id, None)
-
-    async def _message_loop(self, session: Session) -> None:
-        """消息接收主循环。"""
+        return session
+
+    async def _resume_session(
+        self, ws: WebSocket, user_id: str, token: str, ack: int
+    ) -> Session | None:
+        """按 token 续上原会话并补发设备未收到的消息；无法续连时返回 None。
+
+        原连接可能尚未被判定断开（半开 TCP），此时直接从原连接接管。
+        脱离中的会话仍登记在 sessions 中，先 claim 取消其过期计时。
+        """
+        session = self._resume.claim(token, user_id)
+        live = self._sessions.get(user_id)
+        if session is None and live is not None and live.resume_token == token:
+            session = live
+        if session is None:
+            metrics.inc("session_resume_total", outcome="unknown_token")
+            return None
+        pacer = session.audio_pacer
+        # 补发的音频不超过设备缓冲容量，断线期间已错过播放时机的更早音频丢弃
+        replayed = session.outbox.attach(ws, ack, pacer.capacity())
+        if replayed is None:
+            # 缺口已超出重放缓冲：按普通重连处理（取消原流水线，恢复状态）
+            metrics.inc("session_resume_total", outcome="gap")
+            return None
+
+        old_ws, session.ws = session.ws, ws
+        session.update_heartbeat()
+        # 设备重连后只有补发的音频在缓冲中，播放时钟与额度从此起算
+        pacer.reset()
+        if replayed:
+            pacer.on_sent(replayed)
+        metrics.inc("session_resume_total", outcome="resumed")
+        logger.info("Session %s resumed from message %d", user_id, ack)
+        await self._send_resume_token(session, resumed=True)
+        if old_ws is not ws:
+            with contextlib.suppress(Exception):
+                await old_ws.close()
+        return session
+
+    async def _send_resume_token(self, session: Session, resumed: bool) -> None:
+        token = self._resume.issue(session, reset=not resumed)
+        await session.outbox.send_text(
+            ResumeTokenMessage(
+                token=token, resumed=resumed, grace=self._resume.config.grace_seconds
+            ).model_dump_json()
+        )
+
+    async def _drop_session(self, session: Session) -> None:
+        """连接结束（或脱离后未续连）：取消流水线并移除会话。"""
+        await self._orchestrator.cancel_pipeline(session)
+        session.outbox.close()
+        if self._sessions.get(session.user_id) is session:
+            del self._sessions[session.user_id]
+            await self._registry.release(session.user_id)
+        if self._memory is not None:
+            # 强制写回（在写线程中执行）；用户已无在线会话时转入空闲缓存
+            if session.user_id in self._sessions:
+                await self._memory.flush(session.user_id)
+            else:
+                await self._memory.release(session.user_id)
+
+    async def _save_state(self, session: Session) -> None:
+        """会话状态变更后写入注册表，重连（可能落在其他 worker）时恢复。"""
+        await self._registry.save(
+            session.user_id,
+            {
+                "personality": session.personality,
+                "treehouse_mode": session.treehouse_mode,
+                "tts_backend": session.tts_backend,
+            },
+        )
+
+    async def _message_loop(self, session: Session, ws: WebSocket) -> None:
+        """消息接收主循环（读本连接的 ws，会话被续连接管后随本连接结束）。"""
         while True:
-            msg = await session.ws.receive()
+            msg = await ws.receive()
 
             if msg["type"] == "websocket.disconnect":
                 break
 
             if msg["type"] == "websocket.receive":
                 if "bytes" in msg and msg["bytes"]:
-                    # 二进制帧 → 音频
-                    session.append_audio(msg["bytes"])
+                    if session.protocol == 2:
+                        await self._route_binary(session, msg["bytes"])
+                    else:
+                        # v1 二进制帧 → 音频
+                        await self._orchestrator.handle_audio_frame(session, msg["bytes"])
                 elif "text" in msg and msg["text"]:
                     await self._route_json(session, msg["text"])
 
     async def _route_json(self, session: Session, raw: str) -> None:
-        """解析 JSON 并路由到处理器。"""
+        """单次解析为具体消息类型，按 type 查表分发。"""
         try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            logger.warning("Invalid JSON from %s: %s", session.user_id, raw[:100])
+            msg = decode_esp32_message(raw)
+        except ValidationError as e:
+            error = e.errors(include_url=False, include_input=False)[0]
+            logger.warning(
+                "Invalid message from %s (%s): %s", session.user_id, error["msg"], raw[:100]
+            )
             return
 
+        route = self._routes.get(msg.type)
+        if route is not None:
+            await route(session, msg)
+
+    async def _route_binary(self, session: Session, data: bytes) -> None:
+        """v2 二进制帧按通道分发：音频进流水线，遥测字段与同型 JSON 消息共用处理逻辑。"""
         try:
-            parse_esp32_message(data)  # validate message format
-        except ValueError as e:
-            logger.warning("Unknown message from %s: %s", session.user_id, e)
+            channel, payload = decode_frame(data)
+        except FrameError as e:
+            logger.warning("Invalid binary frame from %s: %s", session.user_id, e)
             return
 
-        msg_type = data.get("type")
-
-        if msg_type == "ping":
-            session.update_heartbeat()
-            await session.ws.send_text(PongMessage().model_dump_json())
-
-        elif msg_type == "audio_start":
-            await self._orchestrator.handle_audio_start(session)
-
-        elif msg_type == "audio_end":
-            await self._orchestrator.handle_audio_end(session)
-
-        elif msg_type == "wakeword_verify":
-            result = await self._wakeword.verify(data["audio"])
-            from wallace.ws.protocol import WakewordResultMessage
-
-            await session.ws.send_text(
-                WakewordResultMessage(confirmed=result).model_dump_json()
+        if channel is Channel.AUDIO_IN:
+            await self._orchestrator.handle_audio_frame(session, payload)
+            return
+        route = self._channel_routes.get(channel)
+        if route is not None:
+            await route(session, payload)
+
+    async def _on_ping(self, session: Session, msg: PingMessage) -> None:
+        session.update_heartbeat()
+        await session.outbox.send_text(PONG)
+
+    async def _on_audio_start(self, session: Session, msg: AudioStartMessage) -> None:
+        await self._orchestrator.handle_audio_start(session)
+
+    async def _on_audio_end(self, session: Session, msg: AudioEndMessage) -> None:
+        await self._orchestrator.handle_audio_end(session)
+
+    async def _on_wakeword_verify(self, session: Session, msg: WakewordVerifyMessage) -> None:
+        result = await self._wakeword.verify(msg.audio)
+        await session.outbox.send_text(
+            WakewordResultMessage(confirmed=result).model_dump_json()
+        )
+        if result:
+            session.wakeword_confirmed.set()
+        else:
+            session.wakeword_confirmed.clear()
+
+    async def _on_sensor(self, session: Session, msg: SensorMessage) -> None:
+        await self._apply_sensor(session, msg.model_dump())
+
+    async def _apply_sensor(self, session: Session, data: dict) -> None:
+        self._sensor.update_cache(session, data)
+        for alert_type, suggestion in self._sensor.check_alerts(session):
+            # 同类告警未发出前只保留最新一条
+            session.outbox.post_telemetry(
+                SensorAlertMessage(alert=alert_type, suggestion=suggestion).model_dump_json(),
+                key=f"sensor_alert:{alert_type}",
             )
-            if result:
-                session.wakeword_confirmed.set()
-            else:
-                session.wakeword_confirmed.clear()
 
-        elif msg_type == "sensor":
-            self._sensor.update_cache(session, data)
-            alerts = self._sensor.check_alerts(session)
-            for alert_type, suggestion in alerts:
-                from wallace.ws.protocol import SensorAlertMessage
-
-                await session.ws.send_text(
-                    SensorAlertMessage(alert=alert_type, suggestion=suggestion).model_dump_json()
-                )
-
-        elif msg_type == "proximity":
-            self._sensor.update_proximity(session, data)
-
-        elif msg_type == "device_state":
-            pass  # 更新连接状态缓存（暂存 session 属性）
-
-        elif msg_type == "event":
-            await self._handle_event(session, data)
-
-        elif msg_type == "local_cmd":
-            success, message = await self._mqtt.execute_command(data["action"])
-            from wallace.ws.protocol import CommandResultMessage
-
-            await session.ws.send_text(
-                CommandResultMessage(
-                    action=data["action"], success=success, message=message
-                ).model_dump_json()
+    async def _on_proximity(self, session: Session, msg: ProximityMessage) -> None:
+        await self._apply_proximity(session, msg.model_dump())
+
+    async def _apply_proximity(self, session: Session, data: dict) -> None:
+        self._sensor.update_proximity(session, data)
+
+    async def _on_device_state(self, session: Session, msg: DeviceStateMessage) -> None:
+        pass  # 更新连接状态缓存（暂存 session 属性）
+
+    async def _on_local_cmd(self, session: Session, msg: LocalCmdMessage) -> None:
+        success, message = await self._mqtt.execute_command(msg.action)
+        await session.outbox.send_text(
+            CommandResultMessage(
+                action=msg.action, success=success, message=message
+            ).model_dump_json()
+        )
+
+    async def _on_config(self, session: Session, msg: ConfigMessage) -> None:
+        if msg.tts_backend:
+            session.tts_backend = msg.tts_backend
+            await self._save_state(session)
+        if msg.trace is not None:
+            session.trace_to_device = msg.trace
+        if msg.full_duplex is not None:
+            session.barge_in = self._new_barge_in() if msg.full_duplex else None
+        if any(
+            v is not None for v in (msg.audio_codecs, msg.frames_per_message, msg.audio_credits)
+        ):
+            await self._negotiate_audio(session, msg)
+        if msg.resume and self._resume is not None:
+            await self._send_resume_token(session, resumed=False)
+        elif msg.resume is False:
+            # 关闭续连：断开即取消流水线
+            session.resume_token = None
+            session.outbox.replay = None
+
+    async def _on_audio_credit(self, session: Session, msg: AudioCreditMessage) -> None:
+        session.audio_pacer.grant(msg.frames)
+
+    async def _negotiate_audio(self, session: Session, msg: ConfigMessage) -> None:
+        """下行音频协商：编码取设备偏好中第一个服务端支持的，打包帧数取双方上限的较小值，
+        audio_credits 启用 credit 流控。"""
+        if msg.audio_codecs is not None:
+            session.set_audio_codec(negotiate_codec(msg.audio_codecs))
+        if msg.frames_per_message is not None:
+            session.frames_per_message = max(
+                1, min(msg.frames_per_message, self._tts_config.max_frames_per_message)
             )
+        if msg.audio_credits is not None:
+            session.audio_pacer.enable_credits(max(1, msg.audio_credits))
+
+        await session.outbox.send_text(
+            AudioConfigMessage(
+                codec=session.audio_codec, frames_per_message=session.frames_per_message
+            ).model_dump_json()
+        )
 
-        elif msg_type == "config":
-            if "tts_backend" in data:
-                session.tts_backend = data["tts_backend"]
+    def _new_barge_in(self) -> BargeInDetector:
+        echo_window = (self._tts_config.jitter_buffer_ms + self._duplex_config.echo_tail_ms) / 1000
+        return BargeInDetector(self._duplex_config, echo_window)
 
-    async def _handle_event(self, session: Session, data: dict) -> None:
-        event = data.get("event")
-        value = data.get("value")
+    async def _on_event(self, session: Session, msg: EventMessage) -> None:
+        event = msg.event
+        value = msg.value
 
         if event == "personality_switch":
 
             session.personality = value
             session.chat_history.clear()
+            await self._save_state(session)
 
         elif event == "treehouse_mode":
             session.treehouse_mode = bool(value)
+            await self._save_state(session)
 
         elif event == "shake":
             # 异步触发冷知识生成，不阻塞事件循环
@@ -189,16 +443,3 @@ class WebSocketHandler:
 
         elif event == "touch":
             pass  # optional: log interaction
-
-    async def _heartbeat_monitor(self, session: Session) -> None:
-        """监控心跳超时。"""
-        try:
-            while True:
-                await asyncio.sleep(30)
-                elapsed = time.monotonic() - session.last_heartbeat
-                if elapsed > HEARTBEAT_TIMEOUT:
-                    logger.warning("Heartbeat timeout for %s (%.0fs)", session.user_id, elapsed)
-                    await session.ws.close()
-                    break
-        except asyncio.CancelledError:
-            pass
@@ -0,0 +1,116 @@
+"""心跳超时监控 — 全服务共享一个哈希时间轮，取代每连接一个休眠任务。
+
+会话按「最后心跳 + timeout」落入对应刻度的槽；监控任务每个刻度检查一个槽：
+- 仍在超时前（期间收到过 ping）的会话按新的到期刻度重新放入时间轮
+- 已超时的会话批量关闭连接
+
+收到 ping 只更新 session.last_heartbeat（O(1)），不触碰时间轮；
+每个存活会话每个 timeout 周期最多被重新放入一次。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import TYPE_CHECKING
+
+from wallace.metrics import metrics
+
+if TYPE_CHECKING:
+    from wallace.ws.session import Session
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatSupervisor:
+    """全局心跳监控。监控任务在有会话登记时运行，全部注销后退出。"""
+
+    def __init__(self, timeout: float = 90.0, resolution: float = 1.0) -> None:
+        self.timeout = timeout
+        self.resolution = resolution
+        # 到期刻度距今不超过 timeout / resolution + 1，多留一槽避免回绕到当前槽
+        self._slots = math.ceil(timeout / resolution) + 2
+        self._wheel: list[set[Session]] = [set() for _ in range(self._slots)]
+        self._slot_of: dict[Session, int] = {}
+        self._cursor: int | None = None  # 下一个待检查的刻度
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def register(self, session: Session) -> None:
+        """连接建立时登记，从 session.last_heartbeat 起计时。"""
+        self._schedule(session)
+        metrics.set_gauge("heartbeat_sessions", len(self))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def unregister(self, session: Session) -> None:
+        slot = self._slot_of.pop(session, None)
+        if slot is not None:
+            self._wheel[slot].discard(session)
+            metrics.set_gauge("heartbeat_sessions", len(self))
+
+    def advance(self, now: float) -> list[Session]:
+        """检查截至 now 的各刻度，返回已超时的会话（已移出时间轮）。"""
+        current = int(now // self.resolution)
+        if self._cursor is None:
+            self._cursor = current
+        # 停顿超过一圈时每个槽检查一次即可
+        start = max(self._cursor, current - self._slots + 1)
+        expired: list[Session] = []
+        for tick in range(start, current + 1):
+            slot = tick % self._slots
+            bucket, self._wheel[slot] = self._wheel[slot], set()
+            for session in bucket:
+                del self._slot_of[session]
+                if now - session.last_heartbeat > self.timeout:
+                    expired.append(session)
+                else:
+                    self._schedule(session)
+        self._cursor = current + 1
+        return expired
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _schedule(self, session: Session) -> None:
+        tick = math.ceil((session.last_heartbeat + self.timeout) / self.resolution)
+        slot = tick % self._slots
+        old = self._slot_of.get(session)
+        if old is not None:
+            self._wheel[old].discard(session)
+        self._wheel[slot].add(session)
+        self._slot_of[session] = slot
+
+    async def _run(self) -> None:
+        try:
+            while self._slot_of:
+                await asyncio.sleep(self.resolution)
+                expired = self.advance(time.monotonic())
+                if expired:
+                    await self._expire(expired)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+                self._cursor = None
+
+    async def _expire(self, sessions: list[Session]) -> None:
+        metrics.inc("heartbeat_timeouts_total", len(sessions))
+        metrics.set_gauge("heartbeat_sessions", len(self))
+        logger.warning(
+            "Heartbeat timeout for %d session(s): %s",
+            len(sessions),
+            ", ".join(s.user_id for s in sessions[:10]),
+        )
+        # 关闭连接后各自的消息循环退出，由 handler 清理会话
+        results = await asyncio.gather(
+            *(s.ws.close() for s in sessions), return_exceptions=True
+        )
+        for session, result in zip(sessions, results):
+            if isinstance(result, Exception):
+                logger.debug("Close failed for %s: %s", session.user_id, result)
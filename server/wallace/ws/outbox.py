@@ -0,0 +1,245 @@
+"""会话下行发送队列 — 所有下行消息经单个写任务串行发送。
+
+对话、关怀推送、传感器告警、心跳回复等生产者不再直接并发调用 ws.send_*：
+- 同一时刻只有一个写任务在发送，不同生产者的消息不会在帧中途交错
+- 按优先级出队：控制消息 > 音频 > 遥测，同优先级先进先出
+- 控制 / 音频消息等到实际写出才返回（与直接发送语义相同，队列深度 ≤ 生产者数）；
+  生产者被取消时其尚未写出的消息随之丢弃；队列空闲时由调用方直接写出
+- 遥测消息投递后立即返回，队列有界：同 key 的旧消息被新消息合并替换，
+  超出上限时丢弃最旧的一条
+- 开启重放缓冲（续连，见 ws/resume.py）后，写出的每条消息按顺序记入缓冲；
+  连接断开时转为脱离状态，消息只记入缓冲，重连后补发设备未收到的部分
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+from wallace.metrics import metrics
+
+if TYPE_CHECKING:
+    from fastapi import WebSocket
+
+    from wallace.ws.resume import ReplayBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """出队优先级，数值越小越先发送。"""
+
+    CONTROL = 0  # tts_start / tts_end / tts_cancel / pong 等
+    AUDIO = 1  # 下行音频二进制帧
+    TELEMETRY = 2  # trace / sensor_alert，可合并或丢弃
+
+
+@dataclass
+class _Item:
+    data: str | bytes
+    priority: Priority
+    enqueued_at: float
+    future: asyncio.Future | None = None  # 遥测消息为 None
+    key: str | None = None
+    frames: int = 0  # 音频消息的帧数（续连补发时按设备缓冲容量裁剪）
+    label: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.label = self.priority.name.lower()
+
+
+class Outbox:
+    """单个会话的下行发送队列。写任务在有消息排队时启动，队列清空后退出。"""
+
+    def __init__(self, ws: WebSocket, max_telemetry: int = 16) -> None:
+        self.ws: WebSocket | None = ws  # None = 已脱离连接
+        self.max_telemetry = max_telemetry
+        self.replay: ReplayBuffer | None = None
+        self._queues: tuple[deque[_Item], ...] = tuple(deque() for _ in Priority)
+        self._replaying: deque[str | bytes] = deque()  # 重连后待补发，先于一切排队消息
+        self._writer: asyncio.Task | None = None
+        self._direct = False  # 调用方正在直接写出
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+
+    def depth(self, priority: Priority | None = None) -> int:
+        """当前排队的消息数（不含正在写出的一条）。"""
+        if priority is not None:
+            return len(self._queues[priority])
+        return len(self._replaying) + sum(len(q) for q in self._queues)
+
+    async def send_text(self, data: str, priority: Priority = Priority.CONTROL) -> None:
+        """排队发送文本消息，写出后返回。"""
+        await self._send(data, priority)
+
+    async def send_bytes(self, data: bytes, frames: int = 0) -> None:
+        """排队发送音频二进制消息（含 frames 帧），写出后返回。"""
+        await self._send(data, Priority.AUDIO, frames)
+
+    def post_telemetry(self, data: str, key: str | None = None) -> None:
+        """投递遥测消息，不等待写出。key 相同的未发送消息被替换。"""
+        if self._closed:
+            return
+        queue = self._queues[Priority.TELEMETRY]
+        if key is not None:
+            for i, pending in enumerate(queue):
+                if pending.key == key:
+                    del queue[i]
+                    metrics.inc("outbox_dropped_total", reason="merged")
+                    break
+        if len(queue) >= self.max_telemetry:
+            queue.popleft()
+            metrics.inc("outbox_dropped_total", reason="overflow")
+        self._enqueue(_Item(data, Priority.TELEMETRY, time.monotonic(), key=key))
+
+    def detach(self) -> None:
+        """连接已断开：此后的消息只记入重放缓冲，生产者照常继续。"""
+        self.ws = None
+
+    def attach(
+        self, ws: WebSocket, ack: int, max_audio_frames: int | None = None
+    ) -> int | None:
+        """切换到新连接，补发设备已收到的前 ack 条之后的消息，返回补发的音频帧数。
+
+        补发的音频不超过 max_audio_frames（设备缓冲容量），更早的音频丢弃。
+        重放缓冲未开启或缺口已被淘汰时返回 None，连接不变。
+        """
+        if self.replay is None:
+            return None
+        if (missed := self.replay.since(ack, max_audio_frames)) is None:
+            return None
+        self.ws = ws
+        self._replaying.clear()
+        self._replaying.extend(missed)
+        metrics.inc("session_replayed_messages_total", len(missed))
+        if missed:
+            self._idle.clear()
+            if not self._busy:
+                self._writer = asyncio.create_task(self._write_loop())
+        return self.replay.audio_frames()
+
+    async def drain(self) -> None:
+        """等待队列全部写出。"""
+        await self._idle.wait()
+
+    def close(self) -> None:
+        """连接关闭：停止写任务，未写出的消息全部丢弃。"""
+        self._closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        for queue in self._queues:
+            for item in queue:
+                if item.future is not None and not item.future.done():
+                    item.future.cancel()
+            queue.clear()
+        self._replaying.clear()
+        self._idle.set()
+
+    async def _send(self, data: str | bytes, priority: Priority, frames: int = 0) -> None:
+        if self._closed:
+            # 连接已关闭（如重连后清理旧会话），丢弃
+            return
+        if not self._busy and not self.depth():
+            # 空闲时由调用方直接写出，省去一次任务切换（如打断时的 tts_cancel）
+            self._direct = True
+            self._idle.clear()
+            try:
+                await self._write(data, frames)
+            finally:
+                self._direct = False
+                self._resume()
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(_Item(data, priority, time.monotonic(), future=future, frames=frames))
+        # 调用方被取消时 future 随之取消，写任务跳过该消息
+        await future
+
+    @property
+    def _busy(self) -> bool:
+        return self._writer is not None or self._direct
+
+    def _enqueue(self, item: _Item) -> None:
+        self._queues[item.priority].append(item)
+        depth = len(self._queues[item.priority])
+        metrics.observe("outbox_queue_depth", depth, priority=item.label)
+        self._idle.clear()
+        if not self._busy:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def _resume(self) -> None:
+        """直接写出结束：期间有新消息排队则启动写任务，否则置为空闲。"""
+        if self._closed or not self.depth():
+            self._idle.set()
+        elif self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def _next(self) -> _Item | None:
+        for queue in self._queues:
+            while queue:
+                item = queue.popleft()
+                if item.future is None or not item.future.cancelled():
+                    return item
+        return None
+
+    async def _write(self, data: str | bytes, frames: int = 0) -> None:
+        if self.replay is not None:
+            self.replay.append(data, frames)
+        await self._transmit(data)
+
+    async def _transmit(self, data: str | bytes) -> None:
+        ws = self.ws
+        if ws is None:
+            return
+        try:
+            if isinstance(data, str):
+                await ws.send_text(data)
+            else:
+                await ws.send_bytes(data)
+        except Exception as exc:
+            if self.replay is None:
+                raise
+            # 连接已断：消息已在重放缓冲中，不打断生产者，等待设备续连补发
+            if self.ws is ws:
+                self.ws = None
+            logger.debug("Send failed, detached: %s", exc)
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                if self._replaying:
+                    # 补发的消息已在重放缓冲中，不再重复记录
+                    await self._transmit(self._replaying.popleft())
+                    continue
+                if (item := self._next()) is None:
+                    break
+                metrics.observe(
+                    "outbox_wait_seconds", time.monotonic() - item.enqueued_at, priority=item.label
+                )
+                try:
+                    await self._write(item.data, item.frames)
+                except asyncio.CancelledError:
+                    if item.future is not None:
+                        item.future.cancel()
+                    raise
+                except Exception as exc:  # noqa: BLE001
+                    # 交由等待的生产者处理（如连接已断开），遥测仅记录
+                    if item.future is None:
+                        logger.debug("Telemetry send failed: %s", exc)
+                    elif not item.future.done():
+                        item.future.set_exception(exc)
+                    continue
+                if item.future is not None and not item.future.done():
+                    item.future.set_result(None)
+        finally:
+            self._writer = None
+            if self.depth():
+                # 写任务被外部取消，剩余消息无法再发送
+                self.close()
+            self._idle.set()
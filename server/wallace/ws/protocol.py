@@ -2,13 +2,14 @@
 
 from __future__ import annotations
 
-from typing import Any, Literal
-
-from pydantic import BaseModel
+import functools
+from typing import Annotated, Any, Literal
 
+from pydantic import BaseModel, Field, TypeAdapter
 
 # ────────────────────── 基础 ──────────────────────
 
+
 class BaseMessage(BaseModel):
     type: str
 
@@ -46,6 +47,16 @@ class ProximityMessage(BaseMessage):
     user_present: bool
 
 
+class ImuMessage(BaseMessage):
+    type: Literal["imu"] = "imu"
+    ax: float  # 加速度 (g)
+    ay: float
+    az: float
+    gx: float  # 角速度 (°/s)
+    gy: float
+    gz: float
+
+
 class DeviceStateMessage(BaseMessage):
     type: Literal["device_state"] = "device_state"
     battery_pct: int
@@ -71,7 +82,18 @@ class ImageMessage(BaseMessage):
 
 class ConfigMessage(BaseMessage):
     type: Literal["config"] = "config"
-    tts_backend: Literal["edge", "cosyvoice"]
+    tts_backend: Literal["edge", "cosyvoice", "piper"] | None = None
+    audio_codecs: list[str] | None = None  # 设备支持的下行编码，按偏好排序
+    frames_per_message: int | None = None  # 设备可接收的每消息最大帧数
+    audio_credits: int | None = None  # 启用 credit 流控，值为设备播放缓冲容量（帧）
+    trace: bool | None = None  # 每轮结束后接收 trace 时延消息（调试用）
+    full_duplex: bool | None = None  # 播报时持续上传麦克风音频，由服务端检测打断
+    resume: bool | None = None  # 启用断线续连，服务端回复 resume_token
+
+
+class AudioCreditMessage(BaseMessage):
+    type: Literal["audio_credit"] = "audio_credit"
+    frames: int  # 已播放完、可再接收的帧数
 
 
 # ────────────────────── Server → ESP32 ──────────────────────
@@ -98,6 +120,19 @@ class PongMessage(BaseMessage):
     type: Literal["pong"] = "pong"
 
 
+class AudioConfigMessage(BaseMessage):
+    type: Literal["audio_config"] = "audio_config"
+    codec: str
+    frames_per_message: int = 1
+
+
+class ResumeTokenMessage(BaseMessage):
+    type: Literal["resume_token"] = "resume_token"
+    token: str  # 断线后以 ?resume=<token>&ack=<已收到的消息数> 重连
+    resumed: bool  # True = 已续上原会话（补发消息在此之前），False = 序号从本条重新起算为 1
+    grace: float  # 断开后会话保留的秒数
+
+
 class SessionRestoreMessage(BaseMessage):
     type: Literal["session_restore"] = "session_restore"
     personality: str
@@ -136,6 +171,13 @@ class SensorAlertMessage(BaseMessage):
     suggestion: str
 
 
+class TraceMessage(BaseMessage):
+    type: Literal["trace"] = "trace"
+    turn: int
+    kind: str
+    stages: dict[str, int]  # 阶段 → 相对本轮起点的毫秒偏移
+
+
 # ────────────────────── 解析 ──────────────────────
 
 _ESP32_TYPES: dict[str, type[BaseMessage]] = {
@@ -145,11 +187,13 @@ _ESP32_TYPES: dict[str, type[BaseMessage]] = {
     "wakeword_verify": WakewordVerifyMessage,
     "sensor": SensorMessage,
     "proximity": ProximityMessage,
+    "imu": ImuMessage,
     "device_state": DeviceStateMessage,
     "event": EventMessage,
     "local_cmd": LocalCmdMessage,
     "image": ImageMessage,
     "config": ConfigMessage,
+    "audio_credit": AudioCreditMessage,
 }
 
 _SERVER_TYPES: dict[str, type[BaseMessage]] = {
@@ -158,15 +202,47 @@ _SERVER_TYPES: dict[str, type[BaseMessage]] = {
     "tts_cancel": TTSCancelMessage,
     "tts_end": TTSEndMessage,
     "pong": PongMessage,
+    "audio_config": AudioConfigMessage,
+    "resume_token": ResumeTokenMessage,
     "session_restore": SessionRestoreMessage,
     "text": TextMessage,
     "care": CareMessage,
     "command_result": CommandResultMessage,
     "memory_sync": MemorySyncMessage,
     "sensor_alert": SensorAlertMessage,
+    "trace": TraceMessage,
 }
 
 
+# type 字段为判别字段的联合类型：一次解析即得到具体消息类型
+Esp32Message = Annotated[
+    PingMessage
+    | AudioStartMessage
+    | AudioEndMessage
+    | WakewordVerifyMessage
+    | SensorMessage
+    | ProximityMessage
+    | ImuMessage
+    | DeviceStateMessage
+    | EventMessage
+    | LocalCmdMessage
+    | ImageMessage
+    | ConfigMessage
+    | AudioCreditMessage,
+    Field(discriminator="type"),
+]
+
+_esp32_adapter: TypeAdapter[Esp32Message] = TypeAdapter(Esp32Message)
+
+
+def decode_esp32_message(raw: str | bytes) -> BaseMessage:
+    """由 JSON 文本直接解析出 ESP32 消息（pydantic-core 原生解析，无中间 dict）。
+
+    JSON 非法、type 未知或字段不合法时抛出 pydantic.ValidationError。
+    """
+    return _esp32_adapter.validate_json(raw)
+
+
 def parse_esp32_message(data: dict) -> BaseMessage:
     """解析 ESP32 → Server 的 JSON 消息。"""
     msg_type = data.get("type")
@@ -183,3 +259,17 @@ def parse_server_message(data: dict) -> BaseMessage:
     if cls is None:
         raise ValueError(f"Unknown server message type: {msg_type!r}")
     return cls(**data)
+
+
+# ────────────────────── 预序列化 ──────────────────────
+
+# 无参数的高频消息只序列化一次
+PONG = PongMessage().model_dump_json()
+TTS_END = TTSEndMessage().model_dump_json()
+TTS_CANCEL = TTSCancelMessage().model_dump_json()
+
+
+@functools.lru_cache(maxsize=32)
+def tts_start(mood: str = "thinking") -> str:
+    """tts_start 按 mood 缓存序列化结果（mood 取值有限）。"""
+    return TTSStartMessage(mood=mood).model_dump_json()
@@ -0,0 +1,168 @@
+"""会话续连 — 短暂断网后带 token 重连，继续进行中的一轮而不是取消重来。
+
+- 每条下行消息按实际写出顺序编号（从 1 开始，每个会话连续计数），
+  同时存入有界的重放缓冲（ReplayBuffer）
+- 设备以 `config.resume = true` 开启续连，服务端回复 `resume_token`；断开时若流水线
+  仍在运行，会话进入脱离状态：流水线继续执行，输出只写入重放缓冲，保留 grace 秒
+- 设备以 `/ws/{user_id}?resume=<token>&ack=<已收到的消息数>` 重连，服务端补发
+  ack 之后的消息再接续实时输出；token 无效、已过期或缺口超出缓冲时按新连接处理
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import secrets
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING
+
+from wallace.config import ResumeConfig
+from wallace.metrics import metrics
+
+if TYPE_CHECKING:
+    from wallace.ws.session import Session
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayBuffer:
+    """最近写出的下行消息，按字节数有界，超出时淘汰最旧的消息。"""
+
+    def __init__(self, max_bytes: int = 256 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.seq = 0  # 最后一条消息的序号
+        self._items: deque[tuple[str | bytes, int]] = deque()  # (消息, 音频帧数)
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def append(self, data: str | bytes, frames: int = 0) -> int:
+        """记录一条已写出（或待补发）的消息，返回其序号。frames 为音频消息的帧数。"""
+        self.seq += 1
+        self._items.append((data, frames))
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            self._bytes -= len(self._items.popleft()[0])
+        return self.seq
+
+    def audio_frames(self) -> int:
+        """缓冲中音频消息的总帧数。"""
+        return sum(frames for _, frames in self._items)
+
+    def since(
+        self, ack: int, max_audio_frames: int | None = None
+    ) -> list[str | bytes] | None:
+        """设备已收到前 ack 条时需补发的消息；缺口已被淘汰或 ack 超前时返回 None。
+
+        给定 max_audio_frames 时只保留最新的这么多帧音频（设备缓冲容量），
+        更早的音频已错过播放时机，丢弃并重新编号，设备的计数与序号保持一致。
+        """
+        first = self.seq - len(self._items) + 1
+        if ack > self.seq or ack < first - 1:
+            return None
+        # 设备已确认的部分不会再被请求
+        for _ in range(ack - first + 1):
+            self._bytes -= len(self._items.popleft()[0])
+        if max_audio_frames is not None:
+            self._drop_stale_audio(max_audio_frames)
+        return [data for data, _ in self._items]
+
+    def _drop_stale_audio(self, max_frames: int) -> None:
+        kept: deque[tuple[str | bytes, int]] = deque()
+        budget = max_frames
+        dropped = 0
+        for data, frames in reversed(self._items):
+            if frames and frames > budget:
+                budget = 0
+                self._bytes -= len(data)
+                dropped += frames
+                continue
+            budget -= frames
+            kept.appendleft((data, frames))
+        if dropped:
+            self.seq -= len(self._items) - len(kept)
+            self._items = kept
+            metrics.inc("session_replay_dropped_frames_total", dropped)
+
+
+class ResumeManager:
+    """签发续连 token，托管脱离连接的会话直到重连或过期。"""
+
+    def __init__(self, config: ResumeConfig | None = None) -> None:
+        self.config = config or ResumeConfig()
+        self._detached: dict[str, tuple[Session, asyncio.TimerHandle]] = {}
+        self._expiring: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._detached)
+
+    def issue(self, session: Session, reset: bool = True) -> str:
+        """为会话签发新 token（每次连接轮换）。
+
+        reset 时新建重放缓冲，序号从下一条消息重新起算；续连时保留原缓冲，序号连续。
+        """
+        if reset or session.outbox.replay is None:
+            session.outbox.replay = ReplayBuffer(self.config.replay_kb * 1024)
+        session.resume_token = secrets.token_urlsafe(16)
+        return session.resume_token
+
+    def detach(
+        self, session: Session, on_expire: Callable[[Session], Awaitable[None]]
+    ) -> None:
+        """连接断开但流水线仍在运行：保留会话 grace 秒，过期后调用 on_expire 清理。"""
+        token = session.resume_token
+        if token is None:
+            return
+        handle = asyncio.get_running_loop().call_later(
+            self.config.grace_seconds, self._expire, token, on_expire
+        )
+        self._detached[token] = (session, handle)
+        metrics.set_gauge("sessions_detached", len(self))
+        logger.info(
+            "Session %s detached, resumable for %.0fs", session.user_id, self.config.grace_seconds
+        )
+
+    def claim(self, token: str, user_id: str) -> Session | None:
+        """取回脱离中的会话；token 不存在或不属于该用户时返回 None。"""
+        entry = self._detached.get(token)
+        if entry is None or entry[0].user_id != user_id:
+            return None
+        session, handle = self._detached.pop(token)
+        handle.cancel()
+        metrics.set_gauge("sessions_detached", len(self))
+        return session
+
+    def discard(self, session: Session) -> bool:
+        """会话已被无 token 的新连接接管（由调用方清理），不再等待续连。
+
+        返回会话此前是否处于脱离状态。
+        """
+        if session.resume_token is None:
+            return False
+        entry = self._detached.pop(session.resume_token, None)
+        if entry is None:
+            return False
+        entry[1].cancel()
+        metrics.set_gauge("sessions_detached", len(self))
+        return True
+
+    def close(self) -> None:
+        for _, handle in self._detached.values():
+            handle.cancel()
+        self._detached.clear()
+        for task in self._expiring:
+            task.cancel()
+
+    def _expire(self, token: str, on_expire: Callable[[Session], Awaitable[None]]) -> None:
+        entry = self._detached.pop(token, None)
+        if entry is None:
+            return
+        session = entry[0]
+        metrics.set_gauge("sessions_detached", len(self))
+        metrics.inc("session_resume_total", outcome="expired")
+        logger.info("Session %s not resumed within grace period", session.user_id)
+        task = asyncio.create_task(on_expire(session))
+        self._expiring.add(task)
+        task.add_done_callback(self._expiring.discard)
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import datetime
 import enum
 import time
 from dataclasses import dataclass, field
@@ -10,6 +11,12 @@ from typing import TYPE_CHECKING, Any
 
 import numpy as np
 
+from wallace.pipeline.bargein import BargeInDetector
+from wallace.pipeline.codec import create_encoder
+from wallace.pipeline.pacer import AudioPacer
+from wallace.tracing import TurnTrace, trace_hub
+from wallace.ws.outbox import Outbox
+
 if TYPE_CHECKING:
     from fastapi import WebSocket
 
@@ -39,6 +46,18 @@ class UserMemory:
     important_dates: dict[str, str] = field(default_factory=dict)
     interaction_count: int = 0
     first_met: str = ""
+    # 变更计数（不持久化）：修改字段后调用 touch()，写回时据此判断是否需要落盘
+    version: int = field(default=0, compare=False, repr=False)
+
+    def touch(self) -> None:
+        self.version += 1
+
+    def record_interaction(self) -> None:
+        """完成一轮对话：交互次数 +1，首次交互时记下日期。"""
+        self.interaction_count += 1
+        if not self.first_met:
+            self.first_met = datetime.date.today().isoformat()
+        self.touch()
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -62,12 +81,19 @@ class Session:
     def __init__(self, user_id: str, ws: WebSocket) -> None:
         self.user_id = user_id
         self.ws = ws
+        # 所有下行消息经此队列串行发送
+        self.outbox = Outbox(ws)
+        # 协议版本：2 = 已协商 wallace.v2，二进制帧带通道头
+        self.protocol: int = 1
+        # 续连 token（未开启续连时为 None）
+        self.resume_token: str | None = None
 
         # 状态
         self.personality: str = "normal"
         self.treehouse_mode: bool = False
         self.tts_backend: str = "edge"
         self.state: PipelineState = PipelineState.IDLE
+        self.mood: str = "neutral"  # 最近一次应答的情绪
 
         # 流水线
         self.pipeline_task: asyncio.Task | None = None
@@ -83,6 +109,64 @@ class Session:
         # 对话
         self.chat_history: list[dict[str, str]] = []
         self.memory = UserMemory()
+        self.recalled: list[str] = []  # 本轮从长期记忆召回、注入 prompt 的内容
+
+        # 音频下行
+        self.audio_codec: str = "pcm"
+        self.audio_encoder = create_encoder(self.audio_codec)
+        self.frames_per_message: int = 1
+        self.audio_bytes_raw: int = 0
+        self.audio_bytes_wire: int = 0
+        self.audio_messages_sent: int = 0
+        self.audio_pacer = AudioPacer()
+        # 全双工打断检测，None = 半双工（仅靠设备 audio_start 打断）
+        self.barge_in: BargeInDetector | None = None
+
+        # 时延追踪
+        self.turn_count: int = 0
+        self.trace: TurnTrace | None = None
+        self.last_trace: TurnTrace | None = None
+        self.trace_to_device: bool = False
+
+    def start_trace(self, kind: str = "conversation") -> TurnTrace:
+        """开始新一轮追踪（覆盖未结束的上一轮）。"""
+        self.turn_count += 1
+        self.trace = TurnTrace(self.turn_count, kind)
+        return self.trace
+
+    def end_trace(self, outcome: str = "ok") -> TurnTrace | None:
+        """结束当前追踪并汇总到 trace_hub；没有进行中的追踪时返回 None。"""
+        trace, self.trace = self.trace, None
+        if trace is None:
+            return None
+        trace.outcome = outcome
+        self.last_trace = trace
+        trace_hub.publish(self.user_id, trace)
+        return trace
+
+    def set_audio_codec(self, codec: str) -> None:
+        """切换下行音频编码（codec 须已协商通过）。"""
+        self.audio_codec = codec
+        self.audio_encoder = create_encoder(codec)
+
+    def stats(self) -> dict[str, Any]:
+        """会话级指标快照。"""
+        return {
+            "state": self.state.value,
+            "protocol": self.protocol,
+            "audio_codec": self.audio_codec,
+            "audio_bytes_raw": self.audio_bytes_raw,
+            "audio_bytes_wire": self.audio_bytes_wire,
+            "audio_bytes_saved": self.audio_bytes_raw - self.audio_bytes_wire,
+            "audio_frames_per_message": self.frames_per_message,
+            "audio_messages_sent": self.audio_messages_sent,
+            "audio_buffer_ms": round(self.audio_pacer.buffered() * 1000),
+            "audio_credits": (
+                self.audio_pacer.credits if self.audio_pacer.credits_enabled else None
+            ),
+            "outbox_depth": self.outbox.depth(),
+            "last_trace": self.last_trace.to_dict() if self.last_trace else None,
+        }
 
     def transition_to(self, new_state: PipelineState) -> None:
         """状态机转换，校验合法路径。"""